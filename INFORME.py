@@ -33,16 +33,18 @@ if str(_script_dir) not in sys.path:
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import glob
 import argparse
 import warnings
 import smtplib
-import ssl
 from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
+from src.transporte_email import transporte_compartido
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo, iniciar_tramo
 from src.paths import INPUT_DIR, OUTPUT_DIR, INFORMES_DIR
+from src.manifiesto_entradas import obtener_manifiesto
 from src.date_utils import get_periodo_y_año_dinamico, get_periodo_info_detallada
 warnings.filterwarnings('ignore')
 
@@ -83,13 +85,8 @@ DESTINATARIO_IVAN = {
     'email': 'ivan.delgado@viveverde.es'
 }
 
-# Configuración del servidor SMTP
-SMTP_CONFIG = {
-    'servidor': 'smtp.serviciodecorreo.es',
-    'puerto': 465,
-    'remitente_email': 'ivan.delgado@viveverde.es',
-    'remitente_nombre': 'Sistema de Pedidos automáticos VIVEVERDE'
-}
+# Configuración del servidor SMTP (servidor y remitente desde config/email.json)
+SMTP_CONFIG = obtener_registro().smtp().como_dict_scripts('Sistema de Pedidos automáticos VIVEVERDE')
 
 # Configuración de fechas
 FECHA_INICIO = datetime(2025, 1, 1)
@@ -175,11 +172,12 @@ Sistema de Pedidos automáticos VIVEVERDE."""
             except Exception as e:
                 print(f"  ERROR al adjuntar archivo {archivo}: {e}")
         
-        # Enviar email mediante SSL
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'], context=context) as server:
-            server.login(SMTP_CONFIG['remitente_email'], password)
-            server.sendmail(SMTP_CONFIG['remitente_email'], email_destinatario, msg.as_string())
+        # Enviar email por la sesión SMTP compartida (SSL)
+        transporte = transporte_compartido(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'],
+                                           SMTP_CONFIG['remitente_email'], password)
+        resultado = transporte.enviar(msg, [email_destinatario])
+        if not resultado.enviado:
+            raise smtplib.SMTPException(resultado.error)
         
         print(f"  Email enviado a {nombre_destinatario} ({email_destinatario})")
         return True
@@ -208,7 +206,7 @@ def obtener_archivos_clasificacion(filtro_periodo=None, filtro_año=None, filtro
     
     archivos_encontrados = []
     for patron in patrones:
-        archivos_encontrados.extend(glob.glob(patron))
+        archivos_encontrados.extend(obtener_manifiesto().glob(patron))
     
     # Normalizar rutas y eliminar duplicados
     archivos_normalizados = set()
@@ -385,7 +383,7 @@ def leer_capital_inmovilizado_stock(df_seccion):
     
     archivo_encontrado = None
     for patron in patrones_stock:
-        archivos = glob.glob(patron)
+        archivos = obtener_manifiesto().glob(patron)
         if archivos:
             # Ordenar por nombre (P4 > P3 > P2 > P1)
             archivos.sort(reverse=True)
@@ -1319,7 +1317,9 @@ def procesar_seccion(ruta_archivo, nombre_seccion):
     try:
         # Leer datos del Excel
         print("    [1/4] Leyendo datos del archivo de clasificación...")
-        hojas = leer_datos_clasificacion(ruta_archivo)
+        with tramo('carga', seccion=nombre_seccion) as t:
+            hojas = leer_datos_clasificacion(ruta_archivo)
+            t.filas(salida=sum(len(h) for h in hojas.values()))
         
         # Combinar todas las categorías en un solo DataFrame
         print("    [2/4] Combinando datos de categorías...")
@@ -1338,6 +1338,7 @@ def procesar_seccion(ruta_archivo, nombre_seccion):
         
         # Calcular métricas por categoría ABC
         print("    [3/4] Calculando métricas...")
+        t = iniciar_tramo('metricas', filas_entrada=df_completo, seccion=nombre_seccion)
         
         # Determinar categoría ABC de cada fila según la hoja de origen
         df_a = hojas.get('CATEGORIA A – BASICOS', pd.DataFrame())
@@ -1426,15 +1427,18 @@ def procesar_seccion(ruta_archivo, nombre_seccion):
             'top_estrella': df_completo[(df_completo['Importe ventas (€)'] > 0)].nlargest(15, 'Importe ventas (€)')
         }
         
+        t.terminar(filas_salida=df_completo)
+        
         # Generar HTML
         print("    [4/4] Generando informe HTML...")
-        html_informe = generar_html_informe(datos, df_completo, nombre_seccion)
-        
-        # Guardar archivo HTML
-        nombre_salida = INFORMES_DIR / f"INFORME_FINAL_{nombre_seccion}_{PERIODO_FILENAME}.html"
-        
-        with open(nombre_salida, 'w', encoding='utf-8') as f:
-            f.write(html_informe)
+        with tramo('escritura_html', filas_entrada=df_completo, seccion=nombre_seccion):
+            html_informe = generar_html_informe(datos, df_completo, nombre_seccion)
+            
+            # Guardar archivo HTML
+            nombre_salida = INFORMES_DIR / f"INFORME_FINAL_{nombre_seccion}_{PERIODO_FILENAME}.html"
+            
+            with open(nombre_salida, 'w', encoding='utf-8') as f:
+                f.write(html_informe)
         
         print(f"    ✓ INFORME GENERADO: {nombre_salida}")
         return True
@@ -1467,11 +1471,13 @@ def main():
     
     # Buscar archivos de clasificación con filtros
     print("\n[1/2] Buscando archivos de clasificacion ABC+D...")
-    archivos = obtener_archivos_clasificacion(
-        filtro_periodo=ARG_PERIODO,
-        filtro_año=ARG_AÑO,
-        filtro_seccion=ARG_SECCION
-    )
+    with tramo('busqueda_archivos') as t:
+        archivos = obtener_archivos_clasificacion(
+            filtro_periodo=ARG_PERIODO,
+            filtro_año=ARG_AÑO,
+            filtro_seccion=ARG_SECCION
+        )
+        t.filas(salida=archivos)
     
     if not archivos:
         print("    ERROR: No se encontraron archivos CLASIFICACION_ABC+D_*.xlsx")
@@ -1490,7 +1496,8 @@ def main():
     for archivo in archivos:
         nombre_seccion = extraer_nombre_seccion(archivo)
         if nombre_seccion:
-            exito = procesar_seccion(archivo, nombre_seccion)
+            with tramo('procesar_seccion', seccion=nombre_seccion):
+                exito = procesar_seccion(archivo, nombre_seccion)
             if exito:
                 informes_generados += 1
             else:
@@ -1523,7 +1530,8 @@ def main():
         
         # Enviar email a Ivan con todos los informes adjuntos
         print("\nEnviando email a Ivan con los informes...")
-        email_enviado = enviar_email_informes(archivos_informes)
+        with tramo('email', filas_entrada=archivos_informes):
+            email_enviado = enviar_email_informes(archivos_informes)
         
         if email_enviado:
             print("  ✓ Email enviado correctamente a Ivan")
@@ -1569,6 +1577,12 @@ Ejemplos de uso:
         help='Sección específica a procesar (ej: vivero, maf, interior). Si no se especifica, procesa todas.'
     )
     
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Guardar tiempos, filas y memoria por etapa en data/perfiles/'
+    )
+    
     args = parser.parse_args()
     
     # Asignar a variables globales
@@ -1625,7 +1639,8 @@ Ejemplos de uso:
     
     try:
         # Ejecutar el proceso principal
-        main()
+        with perfilado('INFORME', activo=args.profile):
+            main()
         logger.info("Proceso de generación de informes completado exitosamente.")
     except Exception as e:
         logger.critical(f"Error crítico en el script INFORME: {e}", exc_info=True)
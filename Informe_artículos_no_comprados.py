@@ -25,17 +25,22 @@ import re
 from datetime import datetime
 from pathlib import Path
 from src.paths import INPUT_DIR, OUTPUT_DIR, ARTICULOS_NO_COMPRADOS_DIR, PEDIDOS_SEMANALES_DIR
+from src.auditoria_compras import crear_motor_auditoria
+from src.lectura_entradas import leer_tabla, resolver_entrada
 import glob
 import warnings
 import smtplib
-import ssl
 import os
+import sys
 import logging
 import traceback
 from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
+from src.transporte_email import transporte_compartido
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo
 from email.utils import formatdate
 
 # Ignorar warnings de openpyxl
@@ -133,13 +138,8 @@ def obtener_semana_desde_archivos() -> str:
         print(f"  AVISO: No se pudo extraer la semana: {e}")
         return 'desconocida'
 
-# Configuración del servidor SMTP
-SMTP_CONFIG = {
-    'servidor': 'smtp.serviciodecorreo.es',
-    'puerto': 465,
-    'remitente_email': 'ivan.delgado@viveverde.es',
-    'remitente_nombre': 'Sistema de Pedidos Viveverde'
-}
+# Configuración del servidor SMTP (servidor y remitente desde config/email.json)
+SMTP_CONFIG = obtener_registro().smtp().como_dict_scripts('Sistema de Pedidos Viveverde')
 
 
 def normalizar_codigo_articulo(codigo):
@@ -222,9 +222,9 @@ def cargar_ventas_semana():
     """
     Carga el archivo de ventas de la semana.
     """
-    archivo = DATA_INPUT_PATH / "SPA_ventas_semana.xlsx"
+    archivo = resolver_entrada(DATA_INPUT_PATH / "SPA_ventas_semana.xlsx")
     if archivo.exists():
-        df = pd.read_excel(archivo)
+        df = leer_tabla(archivo)
         # Rellenar celdas en blanco
         df = fill_forward_blank_cells(df, ['Artículo', 'Nombre artículo'])
         print(f"  - Cargado: {archivo.name}")
@@ -236,9 +236,9 @@ def cargar_stock_actual():
     """
     Carga el archivo de stock actual.
     """
-    archivo = DATA_INPUT_PATH / "SPA_stock_actual.xlsx"
+    archivo = resolver_entrada(DATA_INPUT_PATH / "SPA_stock_actual.xlsx")
     if archivo.exists():
-        df = pd.read_excel(archivo)
+        df = leer_tabla(archivo)
         # Rellenar celdas en blanco
         df = fill_forward_blank_cells(df, ['Artículo', 'Nombre artículo'])
         print(f"  - Cargado: {archivo.name}")
@@ -246,7 +246,15 @@ def cargar_stock_actual():
     return pd.DataFrame()
 
 
-def identificar_articulos_no_comprados(seccion):
+def crear_motor():
+    """
+    Crea el motor de auditoría que carga ventas, stock actual y los pedidos
+    de todas las secciones una sola vez.
+    """
+    return crear_motor_auditoria(SECCIONES, dir_entrada=DATA_INPUT_PATH, dir_pedidos=PEDIDOS_SEMANALES_DIR)
+
+
+def identificar_articulos_no_comprados(seccion, motor=None):
     """
     Identifica los artículos que según el pedido deberían haberse comprado
     pero no se encontraron ni en ventas ni en stock.
@@ -257,100 +265,23 @@ def identificar_articulos_no_comprados(seccion):
     3. Cargar ventas de la semana y stock actual
     4. Verificar si cada artículo del pedido aparece en ventas o stock
     5. Incluir solo los que NO aparecen en ninguno (Opción C)
+    
+    El cálculo se hace para todas las secciones a la vez en el motor de
+    auditoría; pasar el mismo motor en cada llamada evita recargar los ficheros.
     """
     print(f"\nProcesando sección: {seccion}")
     
-    # Cargar datos
-    print("  Cargando archivos...")
-    pedido = cargar_pedido_semana(seccion)
-    ventas = cargar_ventas_semana()
-    stock = cargar_stock_actual()
-    
-    if pedido.empty:
-        print(f"  - No hay pedido para {seccion}")
-        return pd.DataFrame()
+    if motor is None:
+        motor = crear_motor()
     
-    # Normalizar columna de código de artículo en el pedido
-    if 'Código artículo' in pedido.columns:
-        pedido['Artículo'] = pedido['Código artículo']
-    
-    # Normalizar códigos
-    if 'Artículo' in pedido.columns:
-        pedido['Artículo_norm'] = pedido['Artículo'].apply(normalizar_codigo_articulo)
-    else:
-        pedido['Artículo_norm'] = ''
-    
-    # Crear clave para el pedido
-    pedido['clave'] = pedido.apply(
-        lambda x: crear_clave_articulo(
-            x.get('Artículo_norm', ''),
-            str(x.get('Talla', '')),
-            str(x.get('Color', ''))
-        ), axis=1
-    )
+    df_resultados = motor.articulos_no_comprados_por_seccion().get(seccion, pd.DataFrame())
     
-    # Obtener las unidades de compra del pedido (columna "Pedido Final" o similar)
-    # Buscar la columna de unidades
-    unidades_col = None
-    for col in ['Pedido Final', 'Unidades Calculadas', 'Unidades']:
-        if col in pedido.columns:
-            unidades_col = col
-            break
-    
-    # Obtener conjunto de claves de ventas
-    claves_ventas = set()
-    if not ventas.empty and 'Artículo' in ventas.columns:
-        ventas['clave'] = ventas.apply(
-            lambda x: crear_clave_articulo(
-                normalizar_codigo_articulo(x.get('Artículo', '')),
-                str(x.get('Talla', '')),
-                str(x.get('Color', ''))
-            ), axis=1
-        )
-        claves_ventas = set(ventas['clave'].dropna())
-    
-    # Obtener conjunto de claves de stock
-    claves_stock = set()
-    if not stock.empty and 'Artículo' in stock.columns:
-        stock['clave'] = stock.apply(
-            lambda x: crear_clave_articulo(
-                normalizar_codigo_articulo(x.get('Artículo', '')),
-                str(x.get('Talla', '')),
-                str(x.get('Color', ''))
-            ), axis=1
-        )
-        claves_stock = set(stock['clave'].dropna())
-    
-    # Filtrar: solo artículos que NO están en ventas NI en stock
-    resultados = []
-    for idx, row in pedido.iterrows():
-        clave = row.get('clave', '')
-        
-        # Solo procesar si la clave no está vacía
-        if not clave or clave == '__':
-            continue
-            
-        # Verificar si aparece en ventas o stock
-        if clave not in claves_ventas and clave not in claves_stock:
-            # Obtener unidades de compra
-            unidades = ''
-            if unidades_col and unidades_col in row.index:
-                unidades = row[unidades_col]
-            
-            resultados.append({
-                'Artículo': normalizar_codigo_articulo(row.get('Artículo', '')),
-                'Nombre artículo': row.get('Nombre Artículo', row.get('Nombre artículo', '')),
-                'Talla': row.get('Talla', ''),
-                'Color': row.get('Color', ''),
-                'Unidades compra': unidades
-            })
+    if not df_resultados.empty:
+        print(f"  - Encontrados {len(df_resultados)} artículos NO comprados")
+        return df_resultados
     
-    if resultados:
-        print(f"  - Encontrados {len(resultados)} artículos NO comprados")
-        return pd.DataFrame(resultados)
-    else:
-        print(f"  - No hay artículos NO comprados para {seccion}")
-        return pd.DataFrame()
+    print(f"  - No hay artículos NO comprados para {seccion}")
+    return pd.DataFrame()
 
 
 def aplicar_estilo_excel(worksheet):
@@ -446,8 +377,8 @@ def main():
     # Verificar que existen los archivos necesarios
     print("\nVerificando archivos de entrada...")
     
-    ventas_file = DATA_INPUT_PATH / "SPA_ventas_semana.xlsx"
-    stock_file = DATA_INPUT_PATH / "SPA_stock_actual.xlsx"
+    ventas_file = resolver_entrada(DATA_INPUT_PATH / "SPA_ventas_semana.xlsx")
+    stock_file = resolver_entrada(DATA_INPUT_PATH / "SPA_stock_actual.xlsx")
     
     if not ventas_file.exists():
         print(f"ERROR: No se encuentra el archivo: {ventas_file}")
@@ -460,11 +391,15 @@ def main():
     print(f"  - {ventas_file.name} ✓")
     print(f"  - {stock_file.name} ✓")
     
-    # Procesar cada sección
+    # Cargar los datos una sola vez y procesar cada sección
+    with tramo('carga'):
+        motor = crear_motor()
     resultados_por_seccion = {}
     
     for seccion in SECCIONES:
-        df_resultado = identificar_articulos_no_comprados(seccion)
+        with tramo('procesar_seccion', seccion=seccion) as t:
+            df_resultado = identificar_articulos_no_comprados(seccion, motor)
+            t.filas(salida=df_resultado)
         resultados_por_seccion[seccion] = df_resultado
     
     # Extraer la semana del nombre del archivo de pedido más reciente
@@ -475,14 +410,16 @@ def main():
     print("GENERANDO INFORME EXCEL")
     print("=" * 60)
     
-    output_file = generar_informe_excel(resultados_por_seccion)
+    with tramo('escritura_excel'):
+        output_file = generar_informe_excel(resultados_por_seccion)
     
     # Enviar email con el informe adjunto
     print("\n" + "=" * 60)
     print("ENVIANDO EMAIL")
     print("=" * 60)
     
-    email_enviado = enviar_email_informe(output_file, semana)
+    with tramo('email'):
+        email_enviado = enviar_email_informe(output_file, semana)
     
     print("\n" + "=" * 60)
     print("PROCESO COMPLETADO")
@@ -563,11 +500,12 @@ Sistema de Pedidos Viveverde."""
             part.add_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             msg.attach(part)
             
-            # Enviar email mediante SSL
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'], context=context) as server:
-                server.login(SMTP_CONFIG['remitente_email'], password)
-                server.sendmail(SMTP_CONFIG['remitente_email'], email_destinatario, msg.as_string())
+            # Enviar email por la sesión SMTP compartida (SSL)
+            transporte = transporte_compartido(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'],
+                                               SMTP_CONFIG['remitente_email'], password)
+            resultado = transporte.enviar(msg, [email_destinatario])
+            if not resultado.enviado:
+                raise smtplib.SMTPException(resultado.error)
             
             print(f"  Email enviado a {nombre_destinatario} ({email_destinatario})")
             emails_enviados += 1
@@ -601,7 +539,8 @@ if __name__ == "__main__":
     
     try:
         # Ejecutar el proceso principal
-        main()
+        with perfilado('Informe_articulos_no_comprados', activo='--profile' in sys.argv):
+            main()
         logger.info("Proceso de informe de artículos no comprados completado exitosamente.")
     except Exception as e:
         logger.critical(f"Error crítico en el script Informe_artículos_no_comprados: {e}", exc_info=True)
@@ -34,19 +34,21 @@ if str(_script_dir) not in sys.path:
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import glob
 import argparse
 import warnings
 import smtplib
-import ssl
 from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
+from src.transporte_email import transporte_compartido
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo
 warnings.filterwarnings('ignore')
 
 # Importar rutas centralizadas
 from src.paths import INPUT_DIR, OUTPUT_DIR, PATRON_CLASIFICACION_ABC, PRESENTACIONES_DIR
+from src.manifiesto_entradas import obtener_manifiesto
 from src.date_utils import get_periodo_y_año_dinamico, get_periodo_info_detallada
 
 # Crear directorios necesarios si no existen
@@ -90,13 +92,8 @@ DESTINATARIO_IVAN = {
     'email': 'ivan.delgado@viveverde.es'
 }
 
-# Configuración del servidor SMTP
-SMTP_CONFIG = {
-    'servidor': 'smtp.serviciodecorreo.es',
-    'puerto': 465,
-    'remitente_email': 'ivan.delgado@viveverde.es',
-    'remitente_nombre': 'Sistema de Pedidos Viveverde'
-}
+# Configuración del servidor SMTP (servidor y remitente desde config/email.json)
+SMTP_CONFIG = obtener_registro().smtp().como_dict_scripts('Sistema de Pedidos Viveverde')
 
 # Configuración de fechas
 FECHA_INICIO = datetime(2025, 1, 1)
@@ -203,11 +200,12 @@ Sistema de Pedidos Viveverde."""
             except Exception as e:
                 print(f"  ERROR al adjuntar archivo {archivo}: {e}")
         
-        # Enviar email mediante SSL
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'], context=context) as server:
-            server.login(SMTP_CONFIG['remitente_email'], password)
-            server.sendmail(SMTP_CONFIG['remitente_email'], email_destinatario, msg.as_string())
+        # Enviar email por la sesión SMTP compartida (SSL)
+        transporte = transporte_compartido(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'],
+                                           SMTP_CONFIG['remitente_email'], password)
+        resultado = transporte.enviar(msg, [email_destinatario])
+        if not resultado.enviado:
+            raise smtplib.SMTPException(resultado.error)
         
         print(f"  Email enviado a {nombre_destinatario} ({email_destinatario})")
         return True
@@ -235,7 +233,7 @@ def obtener_archivos_clasificacion(filtro_periodo=None, filtro_año=None, filtro
     
     archivos_encontrados = []
     for patron in patrones:
-        archivos_encontrados.extend(glob.glob(patron))
+        archivos_encontrados.extend(obtener_manifiesto().glob(patron))
     
     # Normalizar rutas y eliminar duplicados
     archivos_normalizados = set()
@@ -1367,11 +1365,13 @@ def main():
     
     # Buscar archivos de clasificación con filtros
     print("\n[1/3] Buscando archivos de clasificación ABC+D...")
-    archivos_clasificacion = obtener_archivos_clasificacion(
-        filtro_periodo=ARG_PERIODO,
-        filtro_año=ARG_AÑO,
-        filtro_seccion=ARG_SECCION
-    )
+    with tramo('busqueda_archivos') as t:
+        archivos_clasificacion = obtener_archivos_clasificacion(
+            filtro_periodo=ARG_PERIODO,
+            filtro_año=ARG_AÑO,
+            filtro_seccion=ARG_SECCION
+        )
+        t.filas(salida=archivos_clasificacion)
     
     if not archivos_clasificacion:
         print("    ⚠ No se encontraron archivos CLASIFICACION_ABC+D_*.xlsx")
@@ -1398,27 +1398,31 @@ def main():
         try:
             # Leer datos de clasificación (TODAS las hojas)
             print("    [1/2] Leyendo clasificación...")
-            hojas_dict, df_combinado = leer_datos_clasificacion(archivo)
+            with tramo('carga', seccion=nombre_seccion) as t:
+                hojas_dict, df_combinado = leer_datos_clasificacion(archivo)
+                t.filas(salida=df_combinado)
             print(f"      ✓ Hojas leídas: {list(hojas_dict.keys())}")
             print(f"      ✓ Total artículos: {len(df_combinado)}")
             
             # Obtener datos de la sección
             print("    [2/2] Generando presentación...")
-            datos_seccion, categorias, ventas_por_categoria, stock_por_categoria = obtener_datos_seccion(hojas_dict)
+            with tramo('metricas', filas_entrada=df_combinado, seccion=nombre_seccion):
+                datos_seccion, categorias, ventas_por_categoria, stock_por_categoria = obtener_datos_seccion(hojas_dict)
             
-            # Generar HTML
-            html_presentacion = generar_html_presentacion(
-                datos_seccion, 
-                categorias, 
-                ventas_por_categoria, 
-                stock_por_categoria, 
-                nombre_seccion
-            )
-            
-            # Guardar archivo
-            nombre_salida = PRESENTACIONES_DIR / f"PRESENTACION_{nombre_seccion}_{PERIODO_FILENAME}.html"
-            with open(nombre_salida, 'w', encoding='utf-8') as f:
-                f.write(html_presentacion)
+            with tramo('escritura_html', filas_entrada=df_combinado, seccion=nombre_seccion):
+                # Generar HTML
+                html_presentacion = generar_html_presentacion(
+                    datos_seccion, 
+                    categorias, 
+                    ventas_por_categoria, 
+                    stock_por_categoria, 
+                    nombre_seccion
+                )
+                
+                # Guardar archivo
+                nombre_salida = PRESENTACIONES_DIR / f"PRESENTACION_{nombre_seccion}_{PERIODO_FILENAME}.html"
+                with open(nombre_salida, 'w', encoding='utf-8') as f:
+                    f.write(html_presentacion)
             
             print(f"      ✓ GENERADO: {nombre_salida}")
             print(f"      ✓ Artículos: {datos_seccion['total_articulos']}")
@@ -1457,7 +1461,8 @@ def main():
         
         # Enviar email a Ivan con todas las presentaciones adjuntas
         print("\nEnviando email a Ivan con las presentaciones...")
-        email_enviado = enviar_email_presentaciones(archivos_presentaciones)
+        with tramo('email', filas_entrada=archivos_presentaciones):
+            email_enviado = enviar_email_presentaciones(archivos_presentaciones)
         
         if email_enviado:
             print("  ✓ Email enviado correctamente a Ivan")
@@ -1509,6 +1514,12 @@ Ejemplos de uso:
         help='Sección específica a procesar (ej: vivero, maf, interior). Si no se especifica, procesa todas.'
     )
     
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Guardar tiempos, filas y memoria por etapa en data/perfiles/'
+    )
+    
     args = parser.parse_args()
     
     # Asignar a variables globales
@@ -1565,7 +1576,8 @@ Ejemplos de uso:
     
     try:
         # Ejecutar el proceso principal
-        main()
+        with perfilado('PRESENTACION', activo=args.profile):
+            main()
         logger.info("Proceso de generación de presentaciones completado exitosamente.")
     except Exception as e:
         logger.critical(f"Error crítico en el script PRESENTACION: {e}", exc_info=True)
@@ -35,25 +35,28 @@ _script_dir = Path(__file__).resolve().parent
 if str(_script_dir) not in sys.path:
     sys.path.insert(0, str(_script_dir))
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 import glob
-import json
 import smtplib
-import ssl
 import traceback
 from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
+from src.transporte_email import transporte_compartido
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo, iniciar_tramo
 from email.utils import formatdate
 
 # Importar rutas centralizadas
-from src.paths import INPUT_DIR, OUTPUT_DIR, CONFIG_DIR, ARCHIVO_STOCK_ACTUAL, PATRON_CLASIFICACION_ABC, ANALISIS_CATEGORIA_CD_DIR
+from src.paths import INPUT_DIR, OUTPUT_DIR, ARCHIVO_STOCK_ACTUAL, PATRON_CLASIFICACION_ABC, ANALISIS_CATEGORIA_CD_DIR
 from src.date_utils import get_periodo_y_año_dinamico, get_periodo_info_detallada
+from src.historico_cd import crear_historico_cd
 
 # ============================================================================
 # INTEGRACIÓN DE ALERTAS - IMPORTS Y INICIALIZACIÓN
@@ -105,22 +108,13 @@ DESTINATARIOS = [
     {'nombre': 'Sandra', 'email': 'ivan.delgado@viveverde.es'}
 ]
 
-# Configuración del servidor SMTP
-SMTP_CONFIG = {
-    'servidor': 'smtp.serviciodecorreo.es',
-    'puerto': 465,
-    'remitente_email': 'ivan.delgado@viveverde.es',
-    'remitente_nombre': 'Sistema de Pedidos Viveverde'
-}
+# Configuración del servidor SMTP (servidor y remitente desde config/email.json)
+SMTP_CONFIG = obtener_registro().smtp().como_dict_scripts('Sistema de Pedidos Viveverde')
 
 
 def cargar_configuracion():
     """Carga la configuración del sistema."""
-    config_path = CONFIG_DIR / "config.json"
-    if config_path.exists():
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return obtener_registro().principal()
 
 
 def obtener_archivo_clasificacion(seccion):
@@ -257,30 +251,176 @@ def comparar_con_stock(df_categoria_cd, df_stock):
     return df_en_stock
 
 
-def obtener_unidades_stock(articulo, talla, color, df_stock):
+def _normalizar_clave_texto(serie):
     """
-    Obtiene las unidades en stock para un artículo específico.
+    Normaliza una columna de Talla/Color para usarla como clave de unión.
+    Aplica la misma conversión que se usaba al comparar celda a celda (str + strip).
     """
-    if pd.isna(talla):
-        talla = None
-    if pd.isna(color):
-        color = None
+    return serie.astype(str).str.strip()
+
+
+def construir_indice_stock(df_stock):
+    """
+    Agrega el stock una única vez en un índice (artículo, talla, color) -> unidades.
+    
+    Las columnas Talla y Color se convierten a texto una sola vez para toda la
+    tabla, en lugar de hacerlo por cada artículo consultado.
     
-    # Buscar en stock
-    mask = df_stock['Artículo'] == articulo
+    Returns:
+        pd.Series: Unidades sumadas con MultiIndex (Artículo, Talla, Color)
+    """
+    n = len(df_stock)
+    talla = df_stock['Talla'] if 'Talla' in df_stock.columns else pd.Series([None] * n, index=df_stock.index)
+    color = df_stock['Color'] if 'Color' in df_stock.columns else pd.Series([None] * n, index=df_stock.index)
     
-    if talla is not None:
-        mask = mask & (df_stock['Talla'].astype(str).str.strip() == str(talla).strip())
-    if color is not None:
-        mask = mask & (df_stock['Color'].astype(str).str.strip() == str(color).strip())
+    df_indice = pd.DataFrame({
+        'Artículo': df_stock['Artículo'],
+        'Talla': _normalizar_clave_texto(talla),
+        'Color': _normalizar_clave_texto(color),
+        'Unidades': pd.to_numeric(df_stock['Unidades'], errors='coerce')
+    })
     
-    unidades = df_stock.loc[mask, 'Unidades'].sum()
-    return unidades if pd.notna(unidades) else 0
+    return df_indice.groupby(['Artículo', 'Talla', 'Color'], sort=False)['Unidades'].sum()
 
 
-def calcular_metricas(df_en_stock, df_stock, seccion):
+def calcular_unidades_stock(df_articulos, indice_stock):
+    """
+    Obtiene las unidades en stock de cada fila de df_articulos mediante joins contra
+    el índice agregado de stock.
+    
+    Si la talla o el color de la fila están vacíos (NaN), se suman todas las tallas
+    o colores del artículo, igual que hacía la búsqueda fila a fila.
+    
+    Returns:
+        pd.Series: Unidades en stock alineadas con el índice de df_articulos
+    """
+    unidades = pd.Series(0.0, index=df_articulos.index)
+    if df_articulos.empty or indice_stock.empty:
+        return unidades
+    
+    n = len(df_articulos)
+    talla = df_articulos['Talla'] if 'Talla' in df_articulos.columns else pd.Series([None] * n, index=df_articulos.index)
+    color = df_articulos['Color'] if 'Color' in df_articulos.columns else pd.Series([None] * n, index=df_articulos.index)
+    
+    claves = pd.DataFrame({
+        'Artículo': df_articulos['Artículo'],
+        'Talla': _normalizar_clave_texto(talla),
+        'Color': _normalizar_clave_texto(color)
+    }, index=df_articulos.index)
+    tiene_talla = talla.notna()
+    tiene_color = color.notna()
+    
+    # Un nivel de agregación por cada combinación de talla/color informados
+    for usar_talla in (True, False):
+        for usar_color in (True, False):
+            seleccion = (tiene_talla == usar_talla) & (tiene_color == usar_color)
+            if not seleccion.any():
+                continue
+            
+            niveles = ['Artículo']
+            if usar_talla:
+                niveles.append('Talla')
+            if usar_color:
+                niveles.append('Color')
+            
+            if len(niveles) == 3:
+                agregado = indice_stock
+            else:
+                agregado = indice_stock.groupby(level=niveles, sort=False).sum()
+            
+            if len(niveles) == 1:
+                claves_busqueda = pd.Index(claves.loc[seleccion, 'Artículo'])
+            else:
+                claves_busqueda = pd.MultiIndex.from_frame(claves.loc[seleccion, niveles])
+            
+            unidades.loc[seleccion] = agregado.reindex(claves_busqueda).fillna(0).to_numpy()
+    
+    return unidades
+
+
+def calcular_evolucion_stock(df_articulos, stock_anterior):
+    """
+    Calcula de forma vectorizada el stock de la semana anterior y la flecha de
+    evolución de cada fila, uniendo con el stock de la semana anterior.
+    
+    Requiere que df_articulos tenga ya la columna 'unidades'.
+    
+    Returns:
+        tuple: (pd.Series stock_anterior, pd.Series evolucion)
+    """
+    indice = df_articulos.index
+    if not stock_anterior:
+        return pd.Series([None] * len(indice), index=indice, dtype=object), pd.Series("N/A", index=indice)
+    
+    df_anterior = pd.DataFrame(
+        [(clave[0], clave[1], clave[2], datos.get('unidades', 0)) for clave, datos in stock_anterior.items()],
+        columns=['Artículo', 'Talla', 'Color', 'Stock_Anterior']
+    ).drop_duplicates(subset=['Artículo', 'Talla', 'Color'], keep='last')
+    
+    claves = pd.DataFrame({
+        'Artículo': df_articulos['Artículo'],
+        'Talla': df_articulos['Talla'].map(lambda v: str(v) if pd.notna(v) else "") if 'Talla' in df_articulos.columns else "",
+        'Color': df_articulos['Color'].map(lambda v: str(v) if pd.notna(v) else "") if 'Color' in df_articulos.columns else ""
+    }, index=indice)
+    
+    cruce = claves.merge(df_anterior, on=['Artículo', 'Talla', 'Color'], how='left')
+    cruce.index = indice
+    
+    encontrado = cruce['Stock_Anterior'].notna()
+    anteriores = cruce['Stock_Anterior'].fillna(0)
+    actuales = df_articulos['unidades']
+    
+    evolucion = np.select(
+        [
+            ~encontrado,
+            anteriores == 0,
+            actuales > anteriores,
+            actuales < anteriores
+        ],
+        [
+            "NEW",
+            np.where(actuales > 0, "NEW", "N/A"),
+            "↑",
+            "↓"
+        ],
+        default="="
+    )
+    
+    return anteriores, pd.Series(evolucion, index=indice)
+
+
+def preparar_articulos_en_stock(resultados, indice_stock, stock_anterior=None):
+    """
+    Calcula unidades, stock de la semana anterior y evolución de los artículos C+D
+    en stock de todas las secciones en una sola pasada.
+    
+    Args:
+        resultados: dict {seccion: {'en_stock': DataFrame, ...}}
+        indice_stock: Índice agregado devuelto por construir_indice_stock
+        stock_anterior: dict con el stock de la semana anterior (o None)
+    """
+    secciones = [s for s in resultados if not resultados[s]['en_stock'].empty]
+    if not secciones:
+        return
+    
+    df_todas = pd.concat(
+        [resultados[s]['en_stock'].assign(_seccion=s) for s in secciones],
+        ignore_index=True
+    )
+    
+    df_todas['unidades'] = calcular_unidades_stock(df_todas, indice_stock)
+    stock_ant, evolucion = calcular_evolucion_stock(df_todas, stock_anterior)
+    df_todas['Stock Sem. Ant.'] = stock_ant
+    df_todas['Evolución'] = evolucion
+    
+    for seccion, df_seccion in df_todas.groupby('_seccion', sort=False):
+        resultados[seccion]['en_stock'] = df_seccion.drop(columns='_seccion').reset_index(drop=True)
+
+
+def calcular_metricas(df_en_stock, seccion):
     """
     Calcula métricas de resumen para la sección.
+    Requiere que df_en_stock tenga la columna 'unidades' (ver preparar_articulos_en_stock).
     """
     if df_en_stock.empty:
         return {
@@ -296,16 +436,7 @@ def calcular_metricas(df_en_stock, df_stock, seccion):
     total_cd = len(df_en_stock)
     
     # Unidades totales en stock
-    # Para cada artículo, sumar sus unidades en stock
-    unidades_totales = 0
-    for _, row in df_en_stock.iterrows():
-        unidades = obtener_unidades_stock(
-            row['Artículo'], 
-            row.get('Talla'), 
-            row.get('Color'), 
-            df_stock
-        )
-        unidades_totales += unidades
+    unidades_totales = df_en_stock['unidades'].sum()
     
     # Calcular métricas
     metricas = {
@@ -320,6 +451,23 @@ def calcular_metricas(df_en_stock, df_stock, seccion):
     return metricas
 
 
+# Etiquetas de las métricas de resumen (se usan en el Excel y en el histórico)
+ETIQUETAS_METRICAS = [
+    ('total_articulos_cd', 'Total artículos C+D identificados'),
+    ('total_articulos_en_stock', 'Artículos todavía en stock'),
+    ('unidades_totales_en_stock', 'Unidades totales en stock'),
+    ('articulos_sin_stock', 'Artículos ya eliminados del stock'),
+    ('porcentaje_sin_eliminar', 'Porcentaje sin eliminar (%)')
+]
+
+
+def obtener_filas_metricas(metricas):
+    """
+    Devuelve las métricas de una sección como lista de (clave, etiqueta, valor).
+    """
+    return [(clave, etiqueta, metricas[clave]) for clave, etiqueta in ETIQUETAS_METRICAS]
+
+
 def crear_excel(df_en_stock, metricas, seccion, workbook, stock_anterior=None):
     """
     Crea una hoja en el workbook con los datos de la sección.
@@ -370,46 +518,22 @@ def crear_excel(df_en_stock, metricas, seccion, workbook, stock_anterior=None):
     
     # Datos de la tabla
     if not df_en_stock.empty:
-        # Obtener unidades en stock para cada artículo
+        # Unidades y evolución ya calculadas en preparar_articulos_en_stock
+        # FILTRO: No incluir artículos con 0 unidades en el informe
+        df_tabla = df_en_stock[df_en_stock['unidades'] != 0]
+        
         datos_tabla = []
-        for _, row in df_en_stock.iterrows():
-            articulo = row['Artículo']
-            nombre = row.get('Nombre artículo', '')
-            talla = row.get('Talla', '')
-            color = row.get('Color', '')
-            
-            # Obtener unidades en stock
-            unidades = obtener_unidades_stock(articulo, talla, color, 
-                                             df_stock_global[seccion])
-            
-            # FILTRO: No incluir artículos con 0 unidades en el informe
-            if unidades == 0:
-                continue
-            
-            # Obtener datos de la semana anterior y calcular evolución
-            stock_anterior_val = 0
-            evolucion = "N/A"
-            
-            if stock_anterior:
-                # Buscar en el diccionario de la semana anterior
-                clave = (articulo, str(talla) if pd.notna(talla) else "", 
-                       str(color) if pd.notna(color) else "")
-                
-                if clave in stock_anterior:
-                    stock_anterior_val = stock_anterior[clave].get('unidades', 0)
-                    evolucion = calcular_evolucion(unidades, stock_anterior_val)
-                else:
-                    # Artículo no encontrado - es nuevo
-                    evolucion = "NEW"
-            
+        for fila in df_tabla.to_dict('records'):
+            talla = fila.get('Talla', '')
+            color = fila.get('Color', '')
             datos_tabla.append({
-                'Artículo': articulo,
-                'Nombre artículo': nombre,
+                'Artículo': fila['Artículo'],
+                'Nombre artículo': fila.get('Nombre artículo', ''),
                 'Talla': '' if pd.isna(talla) else str(talla),
                 'Color': '' if pd.isna(color) else str(color),
-                'unidades': unidades,
-                'Stock Sem. Ant.': stock_anterior_val if stock_anterior else None,
-                'Evolución': evolucion
+                'unidades': fila['unidades'],
+                'Stock Sem. Ant.': fila['Stock Sem. Ant.'] if stock_anterior else None,
+                'Evolución': fila['Evolución']
             })
         
         # Escribir datos
@@ -469,11 +593,8 @@ def crear_excel(df_en_stock, metricas, seccion, workbook, stock_anterior=None):
     
     # Datos de métricas
     metricas_data = [
-        ('Total artículos C+D identificados', metricas['total_articulos_cd']),
-        ('Artículos todavía en stock', metricas['total_articulos_en_stock']),
-        ('Unidades totales en stock', metricas['unidades_totales_en_stock']),
-        ('Artículos ya eliminados del stock', metricas['articulos_sin_stock']),
-        ('Porcentaje sin eliminar (%)', f"{metricas['porcentaje_sin_eliminar']:.1f}%")
+        (etiqueta, f"{valor:.1f}%" if clave == 'porcentaje_sin_eliminar' else valor)
+        for clave, etiqueta, valor in obtener_filas_metricas(metricas)
     ]
     
     for row_idx, (metrica, valor) in enumerate(metricas_data, start=fila_metricas + 1):
@@ -501,10 +622,6 @@ def crear_excel(df_en_stock, metricas, seccion, workbook, stock_anterior=None):
     ws.merge_cells(f'A{fila_nota + 1}:G{fila_nota + 1}')
 
 
-# Variable global para almacenar el stock por sección
-df_stock_global = {}
-
-
 def generar_informe():
     """
     Genera el informe completo de artículos de categoría C y D.
@@ -518,11 +635,16 @@ def generar_informe():
     
     # Cargar stock actual
     print("\n📊 Cargando stock actual...")
-    df_stock = cargar_stock_actual()
-    print(f"  ✓ Stock cargado: {len(df_stock)} registros")
-    
-    # Cargar datos de la semana anterior para comparación
-    stock_semana_anterior = cargar_datos_semana_anterior()
+    with tramo('carga', origen='stock_actual+semana_anterior') as t:
+        df_stock = cargar_stock_actual()
+        print(f"  ✓ Stock cargado: {len(df_stock)} registros")
+        
+        # Agregar el stock una sola vez: (artículo, talla, color) -> unidades
+        indice_stock = construir_indice_stock(df_stock)
+        
+        # Cargar datos de la semana anterior para comparación
+        stock_semana_anterior = cargar_datos_semana_anterior()
+        t.filas(salida=df_stock)
     
     # Cargar archivos de clasificación y procesar cada sección
     resultados = {}
@@ -533,36 +655,41 @@ def generar_informe():
         print(f"\n  ▶ Procesando {seccion}...")
         
         # Cargar clasificación
-        df_clasificacion = cargar_clasificacion(seccion)
+        with tramo('carga', seccion=seccion) as t:
+            df_clasificacion = cargar_clasificacion(seccion)
+            t.filas(salida=df_clasificacion)
         
         if df_clasificacion is None:
             print(f"    ⚠️ Saltando {seccion} - no hay archivo de clasificación")
             continue
         
-        # Identificar artículos de categoría C y D
-        df_categoria_cd = identificar_articulos_categoria_c_d(df_clasificacion)
-        print(f"    ✓ Artículos C+D en clasificación: {len(df_categoria_cd)}")
-        
-        # Comparar con stock actual
-        df_en_stock = comparar_con_stock(df_categoria_cd, df_stock)
+        with tramo('cruce_stock', filas_entrada=df_clasificacion, seccion=seccion) as t:
+            # Identificar artículos de categoría C y D
+            df_categoria_cd = identificar_articulos_categoria_c_d(df_clasificacion)
+            print(f"    ✓ Artículos C+D en clasificación: {len(df_categoria_cd)}")
+            
+            # Comparar con stock actual
+            df_en_stock = comparar_con_stock(df_categoria_cd, df_stock)
+            t.filas(salida=df_en_stock)
         print(f"    ✓ Artículos todavía en stock: {len(df_en_stock)}")
         
-        # Guardar stock por sección para usarlo en crear_excel
-        df_stock_global[seccion] = df_stock.copy()
-        
-        # Calcular métricas
-        metricas = calcular_metricas(df_en_stock, df_stock, seccion)
-        metricas_todas.append(metricas)
-        
         resultados[seccion] = {
             'clasificacion': df_clasificacion,
             'categoria_cd': df_categoria_cd,
-            'en_stock': df_en_stock,
-            'metricas': metricas
+            'en_stock': df_en_stock
         }
     
+    # Unidades, evolución y métricas de todas las secciones en una sola pasada
+    with tramo('metricas', filas_entrada=sum(len(d['en_stock']) for d in resultados.values())):
+        preparar_articulos_en_stock(resultados, indice_stock, stock_semana_anterior)
+        for seccion, datos in resultados.items():
+            metricas = calcular_metricas(datos['en_stock'], seccion)
+            datos['metricas'] = metricas
+            metricas_todas.append(metricas)
+    
     # Crear archivo Excel
     print("\n📝 Generando archivo Excel...")
+    t = iniciar_tramo('escritura_excel', filas_entrada=sum(len(d['en_stock']) for d in resultados.values()))
     workbook = Workbook()
     
     # Eliminar la hoja por defecto
@@ -583,8 +710,12 @@ def generar_informe():
     
     # Guardar archivo
     workbook.save(ruta_salida)
+    t.terminar()
     print(f"\n✅ Archivo generado: {ruta_salida}")
     
+    # Registrar métricas y stock por artículo en el histórico
+    registrar_en_historico(resultados, ruta_salida)
+    
     # Mostrar resumen
     print("\n" + "=" * 60)
     print("RESUMEN DE RESULTADOS")
@@ -616,13 +747,78 @@ def generar_informe():
 # FUNCIONES PARA COMPARACIÓN CON SEMANA ANTERIOR
 # ============================================================================
 
+def registrar_en_historico(resultados, ruta_salida=None, fecha=None):
+    """
+    Registra las métricas por sección y el stock de los artículos C/D del informe
+    en el histórico de análisis (serie temporal usada en las comparaciones).
+    
+    Solo se guardan los artículos con unidades, igual que en el Excel.
+    """
+    try:
+        metricas_por_seccion = {}
+        articulos = []
+        for seccion, datos in resultados.items():
+            metricas_por_seccion[seccion] = {
+                etiqueta: valor for _, etiqueta, valor in obtener_filas_metricas(datos['metricas'])
+            }
+            df_en_stock = datos['en_stock']
+            if not df_en_stock.empty:
+                articulos.append(df_en_stock[df_en_stock['unidades'] != 0].assign(Seccion=seccion))
+        
+        df_articulos = pd.concat(articulos, ignore_index=True) if articulos else None
+        
+        historico = crear_historico_cd()
+        historico.registrar_analisis(
+            metricas_por_seccion,
+            df_articulos,
+            fecha=fecha,
+            periodo=obtener_periodo_año(),
+            archivo=ruta_salida
+        )
+        print(f"  ✓ Métricas registradas en el histórico: {historico.ruta_bd}")
+        return True
+    except Exception as e:
+        print(f"  ⚠️ No se pudo registrar el análisis en el histórico: {e}")
+        return False
+
+
+def cargar_stock_anterior_historico(fecha_actual=None):
+    """
+    Obtiene el stock por artículo de la ejecución anterior desde el histórico.
+    
+    Returns:
+        dict o None: Mismo formato que cargar_datos_semana_anterior
+    """
+    try:
+        historico = crear_historico_cd()
+        ejecucion = historico.obtener_ejecucion_anterior(fecha_actual or datetime.now())
+        if ejecucion is None:
+            return None
+        print(f"  ✓ Ejecución anterior encontrada en el histórico: {ejecucion['fecha']}")
+        return historico.obtener_stock_articulos(ejecucion['id_ejecucion'])
+    except Exception as e:
+        print(f"  ⚠️ No se pudo consultar el histórico: {e}")
+        return None
+
+
 def cargar_datos_semana_anterior():
     """
-    Carga los datos del archivo de la semana anterior para obtener el stock de cada artículo.
+    Carga el stock de cada artículo de la semana anterior.
+    
+    Primero consulta el histórico de análisis; si todavía no hay ninguna
+    ejecución anterior registrada, lo reconstruye desde el Excel de la
+    semana anterior.
     Returns:
         dict: Diccionario con clave = (articulo, talla, color) y valor = unidades
     """
-    print("\n📊 Buscando archivo de la semana anterior...")
+    print("\n📊 Buscando datos de la semana anterior...")
+    
+    stock_anterior = cargar_stock_anterior_historico(datetime.now())
+    if stock_anterior is not None:
+        print(f"  ✓ Stock cargado: {len(stock_anterior)} artículos de la semana anterior")
+        return stock_anterior
+    
+    print("  Sin datos en el histórico, buscando archivo de la semana anterior...")
     
     archivo_anterior = buscar_archivo_semana_anterior(datetime.now())
     
@@ -827,22 +1023,26 @@ def comparar_con_semana_anterior(ruta_archivo_actual):
     Compara el archivo actual con el de la semana anterior.
     """
     print("\n" + "=" * 60)
-    print("BUSCANDO ARCHIVO DE LA SEMANA ANTERIOR")
+    print("BUSCANDO DATOS DE LA SEMANA ANTERIOR")
     print("=" * 60)
     
-    # Pasar la fecha actual para excluir archivos del mismo día
-    archivo_anterior = buscar_archivo_semana_anterior(datetime.now())
-    
-    if archivo_anterior is None:
-        print("⚠️ No se encontró archivo de la semana anterior para comparar")
-        return None
-    
-    print(f"📊 Archivo anterior encontrado: {archivo_anterior}")
-    
     # Importar y ejecutar la comparación
     try:
-        from comparar_analisis_cd import comparar_archivos
-        resultado = comparar_archivos(ruta_archivo_actual, archivo_anterior)
+        from comparar_analisis_cd import comparar_archivos, comparar_desde_historico
+        
+        # Primero, comparación directa contra el histórico de métricas
+        resultado = comparar_desde_historico(datetime.now())
+        
+        if resultado is None:
+            # Pasar la fecha actual para excluir archivos del mismo día
+            archivo_anterior = buscar_archivo_semana_anterior(datetime.now())
+            
+            if archivo_anterior is None:
+                print("⚠️ No se encontró archivo de la semana anterior para comparar")
+                return None
+            
+            print(f"📊 Archivo anterior encontrado: {archivo_anterior}")
+            resultado = comparar_archivos(ruta_archivo_actual, archivo_anterior)
         
         # También enviar email con la comparación
         if resultado:
@@ -955,11 +1155,12 @@ Sistema de Pedidos Viveverde."""
             part.add_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             msg.attach(part)
             
-            # Enviar email mediante SSL
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'], context=context) as server:
-                server.login(SMTP_CONFIG['remitente_email'], password)
-                server.sendmail(SMTP_CONFIG['remitente_email'], email_destinatario, msg.as_string())
+            # Enviar email por la sesión SMTP compartida (SSL)
+            transporte = transporte_compartido(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'],
+                                               SMTP_CONFIG['remitente_email'], password)
+            resultado = transporte.enviar(msg, [email_destinatario])
+            if not resultado.enviado:
+                raise smtplib.SMTPException(resultado.error)
             
             print(f"  Email enviado a {nombre_destinatario} ({email_destinatario})")
             emails_enviados += 1
@@ -992,26 +1193,29 @@ if __name__ == "__main__":
             alert_service = None
     
     try:
-        archivo_salida = generar_informe()
-        
-        # Después de generar el informe, comparar con la semana anterior
-        print("\n" + "=" * 60)
-        print("INICIANDO COMPARACIÓN SEMANAL")
-        print("=" * 60)
-        resultado_comparacion = comparar_con_semana_anterior(archivo_salida)
-        
-        if resultado_comparacion:
-            print(f"\n✅ Comparación generada: {resultado_comparacion}")
-        
-        # Obtener período para el email
-        periodo = obtener_periodo_año()
-        
-        # Enviar email con el informe adjunto
-        print("\n" + "=" * 60)
-        print("ENVIANDO EMAIL")
-        print("=" * 60)
-        
-        email_enviado = enviar_email_informe(archivo_salida, periodo)
+        with perfilado('analisis_categoria_cd', activo='--profile' in sys.argv):
+            archivo_salida = generar_informe()
+            
+            # Después de generar el informe, comparar con la semana anterior
+            print("\n" + "=" * 60)
+            print("INICIANDO COMPARACIÓN SEMANAL")
+            print("=" * 60)
+            with tramo('comparacion_semanal'):
+                resultado_comparacion = comparar_con_semana_anterior(archivo_salida)
+            
+            if resultado_comparacion:
+                print(f"\n✅ Comparación generada: {resultado_comparacion}")
+            
+            # Obtener período para el email
+            periodo = obtener_periodo_año()
+            
+            # Enviar email con el informe adjunto
+            print("\n" + "=" * 60)
+            print("ENVIANDO EMAIL")
+            print("=" * 60)
+            
+            with tramo('email'):
+                email_enviado = enviar_email_informe(archivo_salida, periodo)
         
         print(f"\n🎉 Proceso completado exitosamente!")
         print(f"📄 Archivo principal: {archivo_salida}")
@@ -0,0 +1,9 @@
+"""
+Benchmarks del Sistema de Pedidos Viveverde V2
+
+Cada módulo bench_*.py se ejecuta con `python -m benchmarks.<módulo>`, mide
+una parte del sistema, compara el resultado con su presupuesto y añade una
+línea al histórico en logs/benchmarks/ para poder seguir su evolución.
+datos_sinteticos.py genera los ficheros de entrada del ERP a la escala
+pedida para los benchmarks que ejecutan el pipeline completo.
+"""
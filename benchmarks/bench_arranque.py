@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque de los comandos administrativos de main.py
+
+Mide el tiempo total de `python main.py --status` y `--verificar-email` en un
+proceso nuevo, y el tiempo acumulado de los imports según
+`python -X importtime`. Comprueba además que estos comandos no cargan pandas,
+numpy ni openpyxl, y compara la mediana con el presupuesto de arranque.
+
+Uso:
+    python -m benchmarks.bench_arranque
+    python -m benchmarks.bench_arranque --repeticiones 10 --presupuesto 0.3
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.paths import BASE_DIR, BENCHMARKS_DIR
+
+# Presupuesto por defecto (segundos, mediana de un proceso completo)
+PRESUPUESTO_ARRANQUE = 0.35
+
+COMANDOS = {
+    'status': ['--status'],
+    'verificar_email': ['--verificar-email'],
+}
+
+MODULOS_PESADOS = ('pandas', 'numpy', 'openpyxl')
+
+PATRON_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def _ejecutar(argumentos: List[str], ruta_log: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    comando = [sys.executable]
+    if importtime:
+        comando += ['-X', 'importtime']
+    comando += [str(BASE_DIR / 'main.py'), *argumentos, '--log', ruta_log]
+    entorno = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    return subprocess.run(comando, cwd=str(BASE_DIR), capture_output=True, text=True, env=entorno)
+
+
+def medir_comando(argumentos: List[str], repeticiones: int) -> Dict[str, Any]:
+    """
+    Mide un comando administrativo de main.py.
+
+    Args:
+        argumentos: Argumentos de línea de comandos
+        repeticiones: Número de ejecuciones cronometradas
+
+    Returns:
+        Dict: mediana, mínimo y máximo en segundos, tiempo total de imports
+        en milisegundos y módulos pesados cargados
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_log = os.path.join(tmp, 'bench.log')
+
+        # Una ejecución previa para que los .pyc y la caché del disco estén calientes
+        _ejecutar(argumentos, ruta_log)
+
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            _ejecutar(argumentos, ruta_log)
+            tiempos.append(time.perf_counter() - inicio)
+
+        traza = _ejecutar(argumentos, ruta_log, importtime=True).stderr
+
+    acumulado_por_modulo = {}
+    for linea in traza.splitlines():
+        coincidencia = PATRON_IMPORTTIME.match(linea)
+        if coincidencia:
+            acumulado_por_modulo[coincidencia.group(4)] = int(coincidencia.group(2))
+
+    importados = {m.split('.')[0] for m in acumulado_por_modulo}
+    return {
+        'mediana_s': round(statistics.median(tiempos), 4),
+        'minimo_s': round(min(tiempos), 4),
+        'maximo_s': round(max(tiempos), 4),
+        'import_total_ms': round(sum(us for m, us in acumulado_por_modulo.items()
+                                     if m.count('.') == 0) / 1000, 1),
+        'modulos_pesados': sorted(set(MODULOS_PESADOS) & importados),
+    }
+
+
+def ejecutar_benchmark(repeticiones: int = 5, presupuesto: float = PRESUPUESTO_ARRANQUE,
+                       guardar: bool = True) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark de arranque y, opcionalmente, lo añade al histórico.
+
+    Args:
+        repeticiones: Ejecuciones cronometradas por comando
+        presupuesto: Mediana máxima admitida por comando (segundos)
+        guardar: Añadir el resultado a logs/benchmarks/arranque.jsonl
+
+    Returns:
+        Dict: Resultado por comando y si se cumple el presupuesto
+    """
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'presupuesto_s': presupuesto,
+        'comandos': {},
+    }
+    for nombre, argumentos in COMANDOS.items():
+        medida = medir_comando(argumentos, repeticiones)
+        medida['dentro_presupuesto'] = (medida['mediana_s'] <= presupuesto
+                                        and not medida['modulos_pesados'])
+        resultado['comandos'][nombre] = medida
+    resultado['dentro_presupuesto'] = all(m['dentro_presupuesto'] for m in resultado['comandos'].values())
+
+    if guardar:
+        BENCHMARKS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(BENCHMARKS_DIR / 'arranque.jsonl', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque de los comandos administrativos de main.py')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones cronometradas por comando')
+    parser.add_argument('--presupuesto', type=float, default=PRESUPUESTO_ARRANQUE,
+                        help=f'Mediana máxima admitida en segundos (default: {PRESUPUESTO_ARRANQUE})')
+    parser.add_argument('--no-guardar', action='store_true', help='No añadir el resultado al histórico')
+    args = parser.parse_args()
+
+    resultado = ejecutar_benchmark(args.repeticiones, args.presupuesto, guardar=not args.no_guardar)
+
+    print(f"Presupuesto de arranque: {resultado['presupuesto_s']:.3f} s")
+    for nombre, medida in resultado['comandos'].items():
+        estado = 'OK' if medida['dentro_presupuesto'] else 'FUERA DE PRESUPUESTO'
+        print(f"  {nombre:<16} mediana {medida['mediana_s']:.3f} s "
+              f"(min {medida['minimo_s']:.3f}, max {medida['maximo_s']:.3f}) - "
+              f"imports {medida['import_total_ms']:.0f} ms - {estado}")
+        if medida['modulos_pesados']:
+            print(f"    módulos pesados cargados: {', '.join(medida['modulos_pesados'])}")
+
+    sys.exit(0 if resultado['dentro_presupuesto'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Benchmark de lectura de las entradas del ERP: .xlsx frente a .csv/.tsv
+
+Genera (o reutiliza de la caché) un juego de datos sintéticos con
+benchmarks/datos_sinteticos.py, exporta cada fichero SPA_*.xlsx como texto
+delimitado y mide, con los cargadores de producción, cuánto tarda cada
+formato:
+
+- leer_tabla() de cada fichero (lo que hacen clasificacionABC y los informes
+  de auditoría)
+- DataLoader.leer_ventas() (con la proyección de COLUMNAS_VENTAS) y
+  DataLoader.leer_coste()
+- leer_archivo_ventas_semana() y leer_archivo_stock_actual()
+
+Comprueba además que los dos formatos dan exactamente el mismo DataFrame
+(columnas, tipos y valores). El formato csv imita el exporte del ERP en
+español (';', coma decimal, fechas dd/mm/aaaa y Windows-1252); el tsv usa
+tabulador, punto decimal, fechas ISO y UTF-8. Cada ejecución se añade a
+logs/benchmarks/entradas.jsonl.
+
+Uso:
+    python -m benchmarks.bench_entradas                        # Escala grande (300k filas de ventas)
+    python -m benchmarks.bench_entradas --escala minima --formato tsv
+    python -m benchmarks.bench_entradas --escala media --repeticiones 3
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.paths import BENCHMARKS_DIR
+from src.lectura_entradas import leer_tabla
+from benchmarks.datos_sinteticos import ESCALAS, ParametrosDatos, obtener_datos
+
+DATOS_DIR = BENCHMARKS_DIR / 'datos'
+
+# Ficheros del ERP que se exportan como texto
+FICHEROS = ('SPA_ventas', 'SPA_ventas_semana', 'SPA_coste', 'SPA_compras',
+            'SPA_stock_P1', 'SPA_stock_actual', 'SPA_stock_semana_anterior')
+
+FORMATOS = {
+    'csv': {'extension': '.csv', 'sep': ';', 'decimal': ',', 'date_format': '%d/%m/%Y', 'encoding': 'cp1252'},
+    'tsv': {'extension': '.tsv', 'sep': '\t', 'decimal': '.', 'date_format': '%Y-%m-%d', 'encoding': 'utf-8'},
+}
+
+
+def exportar_texto(origen: Path, destino: Path, formato: str) -> List[Path]:
+    """Escribe cada SPA_*.xlsx de `origen` como texto delimitado en `destino`."""
+    opciones = dict(FORMATOS[formato])
+    extension = opciones.pop('extension')
+    destino.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for nombre in FICHEROS:
+        ruta_excel = origen / f'{nombre}.xlsx'
+        if not ruta_excel.exists():
+            continue
+        ruta = destino / f'{nombre}{extension}'
+        pd.read_excel(ruta_excel).to_csv(ruta, index=False, errors='replace', **opciones)
+        rutas.append(ruta)
+    return rutas
+
+
+def _cronometrar(funcion: Callable[[], Any], repeticiones: int):
+    tiempos, resultado = [], None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+
+def _iguales(a: Any, b: Any) -> bool:
+    if isinstance(a, tuple):
+        a, b = a[0], b[0]
+    if not isinstance(a, pd.DataFrame) or not isinstance(b, pd.DataFrame):
+        return a is None and b is None
+    try:
+        pd.testing.assert_frame_equal(a.reset_index(drop=True), b.reset_index(drop=True))
+        return True
+    except AssertionError:
+        return False
+
+
+def _filas(resultado: Any) -> int:
+    if isinstance(resultado, tuple):
+        resultado = resultado[0]
+    return len(resultado) if isinstance(resultado, pd.DataFrame) else 0
+
+
+def cargadores(directorio: Path, extension: str) -> Dict[str, Callable[[], Any]]:
+    """Cargadores de producción leyendo de `directorio` con la extensión indicada."""
+    from src.data_loader import DataLoader
+    from src.correction_data_loader import leer_archivo_ventas_semana, leer_archivo_stock_actual
+
+    config = {'rutas': {'directorio_entrada': str(directorio)}}
+    funciones = {f'leer_tabla {nombre}': (lambda ruta=directorio / f'{nombre}{extension}': leer_tabla(ruta))
+                 for nombre in FICHEROS if (directorio / f'{nombre}{extension}').exists()}
+    # Un DataLoader nuevo en cada lectura: no debe servir la caché de la anterior
+    funciones['DataLoader.leer_ventas'] = lambda: DataLoader(config).leer_ventas()
+    funciones['DataLoader.leer_coste'] = lambda: DataLoader(config).leer_coste()
+    funciones['leer_archivo_ventas_semana'] = lambda: leer_archivo_ventas_semana(str(directorio))
+    funciones['leer_archivo_stock_actual'] = lambda: leer_archivo_stock_actual(str(directorio))
+    return funciones
+
+
+def ejecutar_benchmark(parametros: ParametrosDatos, formato: str = 'csv', repeticiones: int = 1,
+                       guardar: bool = True) -> Dict[str, Any]:
+    """
+    Mide la lectura de cada entrada en .xlsx y en texto delimitado.
+
+    Args:
+        parametros: Juego de datos sintético
+        formato: 'csv' (exporte del ERP en español) o 'tsv'
+        repeticiones: Lecturas por cargador y formato (se toma la más rápida)
+        guardar: Añadir el resultado a logs/benchmarks/entradas.jsonl
+
+    Returns:
+        Dict: Tiempos por cargador, aceleración y si los dos formatos coinciden
+    """
+    parametros = parametros.resueltos()
+    datos = obtener_datos(parametros, DATOS_DIR, verbose=True)
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'datos': parametros.clave(),
+        'formato': formato,
+        'repeticiones': repeticiones,
+        'cargadores': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='bench_entradas_') as tmp:
+        directorio_excel = Path(tmp) / 'xlsx'
+        directorio_texto = Path(tmp) / formato
+        directorio_excel.mkdir()
+        for nombre in FICHEROS:
+            if (datos / f'{nombre}.xlsx').exists():
+                (directorio_excel / f'{nombre}.xlsx').symlink_to(datos / f'{nombre}.xlsx')
+        inicio = time.perf_counter()
+        exportar_texto(datos, directorio_texto, formato)
+        resultado['exportacion_s'] = round(time.perf_counter() - inicio, 2)
+
+        excel = cargadores(directorio_excel, '.xlsx')
+        texto = cargadores(directorio_texto, FORMATOS[formato]['extension'])
+        for nombre, funcion in excel.items():
+            if nombre not in texto:
+                continue
+            tiempo_excel, datos_excel = _cronometrar(funcion, repeticiones)
+            tiempo_texto, datos_texto = _cronometrar(texto[nombre], repeticiones)
+            resultado['cargadores'][nombre] = {
+                'filas': _filas(datos_excel),
+                'xlsx_s': round(tiempo_excel, 3),
+                'texto_s': round(tiempo_texto, 3),
+                'aceleracion': round(tiempo_excel / tiempo_texto, 1) if tiempo_texto else None,
+                'iguales': _iguales(datos_excel, datos_texto),
+            }
+
+    medidas = resultado['cargadores'].values()
+    resultado['xlsx_total_s'] = round(sum(m['xlsx_s'] for m in medidas), 3)
+    resultado['texto_total_s'] = round(sum(m['texto_s'] for m in medidas), 3)
+    resultado['iguales'] = all(m['iguales'] for m in medidas)
+
+    if guardar:
+        BENCHMARKS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(BENCHMARKS_DIR / 'entradas.jsonl', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de lectura de las entradas del ERP: xlsx frente a csv/tsv')
+    parser.add_argument('--escala', choices=sorted(ESCALAS), default='grande', help='Escala predefinida (default: grande)')
+    parser.add_argument('--filas', type=int, default=None, help='Filas de SPA_ventas.xlsx')
+    parser.add_argument('--secciones', type=int, default=None, help='Número de secciones')
+    parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv', help='Formato de texto (default: csv)')
+    parser.add_argument('--repeticiones', type=int, default=1, help='Lecturas por cargador y formato (default: 1)')
+    parser.add_argument('--no-guardar', action='store_true', help='No añadir el resultado al histórico')
+    args = parser.parse_args()
+
+    # Los cargadores registran cada lectura: solo interesan los avisos
+    logging.basicConfig(level=logging.WARNING)
+
+    base = ESCALAS[args.escala]
+    parametros = ParametrosDatos(filas=args.filas or base['filas'], secciones=args.secciones or base['secciones'])
+    resultado = ejecutar_benchmark(parametros, args.formato, args.repeticiones, guardar=not args.no_guardar)
+
+    print(f"\nDatos {resultado['datos']} - formato {resultado['formato']} "
+          f"(exportación {resultado['exportacion_s']:.1f} s)")
+    print(f"  {'Cargador':<38}{'Filas':>9}{'xlsx':>10}{args.formato:>10}{'x':>7}  Iguales")
+    for nombre, medida in resultado['cargadores'].items():
+        print(f"  {nombre:<38}{medida['filas']:>9}{medida['xlsx_s']:>9.3f}s{medida['texto_s']:>9.3f}s"
+              f"{medida['aceleracion'] or 0:>7.1f}  {'sí' if medida['iguales'] else 'NO'}")
+    print(f"  {'Total':<38}{'':>9}{resultado['xlsx_total_s']:>9.3f}s{resultado['texto_total_s']:>9.3f}s")
+
+    sys.exit(0 if resultado['iguales'] else 1)
+
+
+if __name__ == "__main__":
+    main()
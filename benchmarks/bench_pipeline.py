@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pipeline completo con datos sintéticos
+
+Genera (o reutiliza de la caché) un juego de datos sintéticos con
+benchmarks/datos_sinteticos.py, copia el código a un directorio temporal con
+esos datos en data/input y ejecuta cada script como en producción, con
+--profile y sin email: clasificacionABC.py, main.py, INFORME.py,
+PRESENTACION.py, analisis_categoria_cd.py y los dos informes de auditoría.
+
+De cada paso guarda el tiempo total, el código de salida, el pico de memoria
+y las etapas del perfil (src/perfilado.py). Con --memoria-reducida la
+clasificación y el pedido se ejecutan con ese modo (src/memoria.py), y con
+--presupuesto-memoria el benchmark falla si su pico de memoria supera
+PRESUPUESTOS_MEMORIA para la escala. Con --equivalencia-memoria esos dos
+pasos se ejecutan en modo normal y con --memoria-reducida sobre los mismos
+datos, y sus salidas se comparan con src/equivalencia.py: la reducción de
+tipos no debe cambiar ni categorías ni pedidos. Las etapas de main.py se agrupan
+además por componente: DataLoader (carga), ForecastEngine (forecast, fusión
+de tendencia y stock mínimo), CorrectionEngine (corrección) y OrderGenerator
+(escritura de pedidos). Cada ejecución se añade a logs/benchmarks/pipeline.jsonl
+con el commit, para comparar escalas y commits con --comparar.
+
+Uso:
+    python -m benchmarks.bench_pipeline                        # Escala mínima (5k filas, 1 sección)
+    python -m benchmarks.bench_pipeline --escala media         # 100k filas, 11 secciones
+    python -m benchmarks.bench_pipeline --filas 1000000 --secciones 11
+    python -m benchmarks.bench_pipeline --pasos clasificacion,pedidos
+    python -m benchmarks.bench_pipeline --comparar             # Diferencia con la ejecución anterior
+    python -m benchmarks.bench_pipeline --escala grande --memoria-reducida --presupuesto-memoria
+    python -m benchmarks.bench_pipeline --equivalencia-memoria
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.paths import BASE_DIR, BENCHMARKS_DIR
+from benchmarks.datos_sinteticos import ESCALAS, ParametrosDatos, obtener_datos
+
+# Datos sintéticos generados, reutilizados entre ejecuciones y commits
+DATOS_DIR = BENCHMARKS_DIR / 'datos'
+
+# Semana procesada por main.py (dentro de P1, el período de los datos de clasificación)
+SEMANA_PEDIDO = 6
+PERIODO = 'P1'
+
+# (nombre, script, argumentos, nombre del perfil); se ejecutan en este orden
+PASOS = [
+    ('clasificacion', 'clasificacionABC.py', [PERIODO, '{año}'], 'clasificacionABC'),
+    ('pedidos', 'main.py', ['--semana', str(SEMANA_PEDIDO), '--sin-email', '--log', 'logs/bench.log'], 'pedidos'),
+    ('informe', 'INFORME.py', ['-p', PERIODO, '-a', '{año}'], 'INFORME'),
+    ('presentacion', 'PRESENTACION.py', ['-p', PERIODO, '-a', '{año}'], 'PRESENTACION'),
+    ('analisis_cd', 'analisis_categoria_cd.py', [], 'analisis_categoria_cd'),
+    ('compras_sin_autorizacion', 'informe_compras_sin_autorizacion.py', [], 'informe_compras_sin_autorizacion'),
+    ('articulos_no_comprados', 'Informe_artículos_no_comprados.py', [], 'Informe_articulos_no_comprados'),
+]
+
+# Pasos que aceptan --memoria-reducida
+PASOS_MEMORIA_REDUCIDA = ('clasificacion', 'pedidos')
+
+# Pico de memoria máximo (MB) por escala y paso en el modo --memoria-reducida,
+# con un ~10% de margen sobre lo medido. En 'grande' el pico lo marca la lectura
+# del Excel de ventas con openpyxl; los DataFrames ya cargados ocupan bastante
+# menos que en el modo normal.
+PRESUPUESTOS_MEMORIA = {
+    'minima': {'clasificacion': 110, 'pedidos': 110},
+    'grande': {'clasificacion': 480, 'pedidos': 480},
+}
+
+# Salidas de los pasos con --memoria-reducida que deben coincidir con las del
+# modo normal: (directorio relativo al árbol, patrón de ficheros)
+SALIDAS_EQUIVALENCIA = (
+    ('data/input', 'CLASIFICACION_ABC+D_*.xlsx'),
+    ('data/output/Pedidos_semanales', '*.xlsx'),
+)
+
+# Etapas del perfil de main.py que corresponden a cada componente de src/
+COMPONENTES = {
+    'DataLoader': ('carga', 'division_seccion'),
+    'ForecastEngine': ('forecast', 'fusion_tendencia', 'stock_minimo'),
+    'CorrectionEngine': ('correccion',),
+    'OrderGenerator': ('escritura_excel',),
+}
+
+# Lo que no hace falta copiar al directorio del benchmark
+IGNORAR_COPIA = shutil.ignore_patterns('.git', 'data', 'logs', 'Python', 'build', 'docs',
+                                       '__pycache__', '*.pyc', 'requests.jsonl')
+
+
+def _commit_actual() -> Optional[str]:
+    try:
+        salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=str(BASE_DIR),
+                                capture_output=True, text=True, timeout=10)
+        return salida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def preparar_entorno(directorio: Path, datos: Path):
+    """Copia el código y los datos sintéticos a un árbol aislado del proyecto."""
+    shutil.copytree(BASE_DIR, directorio, ignore=IGNORAR_COPIA, dirs_exist_ok=True)
+    entrada = directorio / 'data' / 'input'
+    shutil.copytree(datos, entrada, ignore=shutil.ignore_patterns('.completo'), dirs_exist_ok=True)
+    (directorio / 'logs').mkdir(exist_ok=True)
+
+
+def _ultimo_perfil(directorio: Path, nombre: str) -> Optional[Dict[str, Any]]:
+    perfiles = sorted((directorio / 'data' / 'perfiles').glob(f'perfil_{nombre}_*[0-9].json'))
+    if not perfiles:
+        return None
+    with open(perfiles[-1], encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ejecutar_paso(directorio: Path, script: str, argumentos: List[str], perfil: str,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Ejecuta un script en el árbol aislado y recoge su perfil.
+
+    Returns:
+        Dict: duracion_s, codigo_salida, rss_pico_mb, etapas (resumen del perfil)
+        y las últimas líneas de stderr si el script falló
+    """
+    entorno = {k: v for k, v in os.environ.items() if k != 'EMAIL_PASSWORD'}
+    entorno['PYTHONDONTWRITEBYTECODE'] = '1'
+    comando = [sys.executable, script, *argumentos, '--profile']
+
+    inicio = time.perf_counter()
+    try:
+        proceso = subprocess.run(comando, cwd=str(directorio), capture_output=True, text=True,
+                                 env=entorno, timeout=timeout)
+        codigo, stderr = proceso.returncode, proceso.stderr
+    except subprocess.TimeoutExpired:
+        codigo, stderr = None, f'Tiempo máximo superado ({timeout} s)'
+    duracion = time.perf_counter() - inicio
+
+    datos_perfil = _ultimo_perfil(directorio, perfil) or {}
+    resultado = {
+        'duracion_s': round(duracion, 3),
+        'codigo_salida': codigo,
+        'rss_pico_mb': datos_perfil.get('rss_pico_mb'),
+        'etapas': {e['nombre']: {'total_s': e['total_s'], 'veces': e['veces'],
+                                 'filas_entrada': e['filas_entrada'], 'filas_salida': e['filas_salida']}
+                   for e in datos_perfil.get('resumen', [])},
+    }
+    if codigo != 0:
+        resultado['error'] = stderr.strip().splitlines()[-5:]
+    return resultado
+
+
+def tiempos_por_componente(etapas: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Agrupa las etapas de main.py por el componente de src/ que las ejecuta."""
+    return {componente: round(sum(etapas[e]['total_s'] for e in nombres if e in etapas), 4)
+            for componente, nombres in COMPONENTES.items()}
+
+
+def ejecutar_benchmark(parametros: ParametrosDatos, pasos: Optional[List[str]] = None,
+                       guardar: bool = True, conservar: bool = False,
+                       timeout: Optional[float] = None, memoria_reducida: bool = False) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark del pipeline y, opcionalmente, lo añade al histórico.
+
+    Args:
+        parametros: Escala de los datos sintéticos
+        pasos: Ejecutar solo estos pasos (nombres de PASOS)
+        guardar: Añadir el resultado a logs/benchmarks/pipeline.jsonl
+        conservar: No borrar el árbol temporal (para revisar las salidas)
+        timeout: Tiempo máximo por paso en segundos
+        memoria_reducida: Ejecutar la clasificación y el pedido con --memoria-reducida
+
+    Returns:
+        Dict: Parámetros, tiempo de generación de datos y resultado por paso
+    """
+    parametros = parametros.resueltos()
+    inicio = time.perf_counter()
+    datos = obtener_datos(parametros, DATOS_DIR, verbose=True)
+    preparacion_datos = time.perf_counter() - inicio
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_actual(),
+        'python': sys.version.split()[0],
+        'parametros': asdict(parametros),
+        'clave_datos': parametros.clave(),
+        'memoria_reducida': memoria_reducida,
+        'preparacion_datos_s': round(preparacion_datos, 3),
+        'pasos': {},
+    }
+
+    directorio = Path(tempfile.mkdtemp(prefix='bench_pipeline_'))
+    try:
+        preparar_entorno(directorio, datos)
+        for nombre, script, argumentos, perfil in PASOS:
+            if pasos and nombre not in pasos:
+                continue
+            argumentos = [a.format(año=parametros.año) for a in argumentos]
+            if memoria_reducida and nombre in PASOS_MEMORIA_REDUCIDA:
+                argumentos.append('--memoria-reducida')
+            print(f"  {nombre:<26} ...", end='', flush=True)
+            medida = ejecutar_paso(directorio, script, argumentos, perfil, timeout)
+            print(f" {medida['duracion_s']:8.2f} s (salida {medida['codigo_salida']})")
+            resultado['pasos'][nombre] = medida
+    finally:
+        if conservar:
+            print(f"Árbol del benchmark conservado en {directorio}")
+        else:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    if 'pedidos' in resultado['pasos']:
+        resultado['componentes'] = tiempos_por_componente(resultado['pasos']['pedidos']['etapas'])
+    if 'clasificacion' in resultado['pasos']:
+        etapa = resultado['pasos']['clasificacion']['etapas'].get('procesar_seccion')
+        resultado.setdefault('componentes', {})['clasificacionABC.procesar_seccion'] = \
+            etapa['total_s'] if etapa else None
+    resultado['total_s'] = round(sum(p['duracion_s'] for p in resultado['pasos'].values()), 3)
+    resultado['correcto'] = all(p['codigo_salida'] == 0 for p in resultado['pasos'].values())
+
+    if guardar:
+        BENCHMARKS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(BENCHMARKS_DIR / 'pipeline.jsonl', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    return resultado
+
+
+def comprobar_equivalencia_memoria(parametros: ParametrosDatos, timeout: Optional[float] = None) -> bool:
+    """
+    Ejecuta la clasificación y el pedido en modo normal y con --memoria-reducida
+    sobre los mismos datos y compara las salidas (SALIDAS_EQUIVALENCIA).
+
+    Returns:
+        bool: True si los dos modos terminan bien y dan las mismas salidas
+    """
+    from src.equivalencia import comparar_directorios
+
+    parametros = parametros.resueltos()
+    datos = obtener_datos(parametros, DATOS_DIR, verbose=True)
+    arboles = {}
+    correcto = True
+    try:
+        for modo in ('normal', 'memoria_reducida'):
+            arboles[modo] = Path(tempfile.mkdtemp(prefix=f'bench_equivalencia_{modo}_'))
+            preparar_entorno(arboles[modo], datos)
+            for nombre, script, argumentos, perfil in PASOS:
+                if nombre not in PASOS_MEMORIA_REDUCIDA:
+                    continue
+                argumentos = [a.format(año=parametros.año) for a in argumentos]
+                if modo == 'memoria_reducida':
+                    argumentos.append('--memoria-reducida')
+                medida = ejecutar_paso(arboles[modo], script, argumentos, perfil, timeout)
+                print(f"  {nombre:<26} {modo:<17} {medida['duracion_s']:8.2f} s (salida {medida['codigo_salida']})")
+                for linea in medida.get('error', []):
+                    print(f"      {linea}")
+                correcto = correcto and medida['codigo_salida'] == 0
+
+        print("Equivalencia modo normal / --memoria-reducida:")
+        for relativo, patron in SALIDAS_EQUIVALENCIA:
+            informes = comparar_directorios(arboles['normal'] / relativo, arboles['memoria_reducida'] / relativo,
+                                            patron)
+            if not informes:
+                print(f"  {relativo}/{patron}: sin salidas")
+                correcto = False
+            for fichero, informe in informes.items():
+                if informe is None:
+                    print(f"  {fichero}: solo en uno de los dos modos")
+                    correcto = False
+                else:
+                    print(f"  {fichero}: {'OK' if informe.equivalente else 'DIFERENTE'}")
+                    if not informe.equivalente:
+                        print(informe.texto())
+                        correcto = False
+    finally:
+        for arbol in arboles.values():
+            shutil.rmtree(arbol, ignore_errors=True)
+    return correcto
+
+
+def resultado_anterior(clave_datos: str, excluir_fecha: Optional[str] = None,
+                       memoria_reducida: bool = False) -> Optional[Dict[str, Any]]:
+    """Última ejecución guardada con el mismo juego de datos (y el mismo modo de memoria)."""
+    ruta = BENCHMARKS_DIR / 'pipeline.jsonl'
+    if not ruta.exists():
+        return None
+    anterior = None
+    with open(ruta, encoding='utf-8') as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+            if registro.get('clave_datos') == clave_datos and registro.get('fecha') != excluir_fecha \
+                    and registro.get('memoria_reducida', False) == memoria_reducida:
+                anterior = registro
+    return anterior
+
+
+def _variacion(actual: Optional[float], previo: Optional[float]) -> str:
+    if not actual or not previo:
+        return ''
+    return f"  ({(actual - previo) / previo * 100:+.1f}% vs {previo:.2f} s)"
+
+
+def mostrar_resultado(resultado: Dict[str, Any], anterior: Optional[Dict[str, Any]] = None):
+    anterior = anterior or {}
+    pasos_previos = anterior.get('pasos', {})
+    if anterior:
+        print(f"Comparando con {anterior.get('commit') or '?'} ({anterior.get('fecha')})")
+    print(f"Datos {resultado['clave_datos']} - total {resultado['total_s']:.2f} s"
+          f"{_variacion(resultado['total_s'], anterior.get('total_s'))}")
+    for nombre, medida in resultado['pasos'].items():
+        memoria = f"{medida['rss_pico_mb']:7.0f} MB" if medida['rss_pico_mb'] else ' ' * 10
+        previo = pasos_previos.get(nombre, {}).get('duracion_s')
+        estado = 'OK' if medida['codigo_salida'] == 0 else f"ERROR ({medida['codigo_salida']})"
+        print(f"  {nombre:<26} {medida['duracion_s']:8.2f} s {memoria}  {estado}"
+              f"{_variacion(medida['duracion_s'], previo)}")
+        for linea in medida.get('error', []):
+            print(f"      {linea}")
+    componentes_previos = anterior.get('componentes', {})
+    if resultado.get('componentes'):
+        print("Componentes:")
+        for componente, segundos in resultado['componentes'].items():
+            if segundos is not None:
+                print(f"  {componente:<34} {segundos:8.2f} s"
+                      f"{_variacion(segundos, componentes_previos.get(componente))}")
+
+
+def comprobar_presupuesto_memoria(resultado: Dict[str, Any], presupuesto: Dict[str, float]) -> bool:
+    """
+    Compara el pico de memoria de cada paso con su presupuesto y lo anota en el resultado.
+
+    Returns:
+        bool: False si algún paso con presupuesto lo supera o no tiene medida
+    """
+    dentro = True
+    print("Presupuesto de memoria:")
+    for nombre, limite in presupuesto.items():
+        medida = resultado['pasos'].get(nombre)
+        if medida is None:
+            continue
+        pico = medida.get('rss_pico_mb')
+        medida['dentro_presupuesto_memoria'] = pico is not None and pico <= limite
+        estado = 'OK' if medida['dentro_presupuesto_memoria'] else 'SUPERADO'
+        pico_texto = f"{pico:.0f} MB" if pico is not None else 'sin medida'
+        print(f"  {nombre:<26} {pico_texto:>10} / {limite:.0f} MB  {estado}")
+        dentro = dentro and medida['dentro_presupuesto_memoria']
+    return dentro
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del pipeline completo con datos sintéticos')
+    parser.add_argument('--escala', choices=list(ESCALAS), default='minima',
+                        help='Escala predefinida de los datos (default: minima)')
+    parser.add_argument('--filas', type=int, default=None, help='Filas de SPA_ventas.xlsx (sustituye a la escala)')
+    parser.add_argument('--secciones', type=int, default=None, help='Número de secciones (sustituye a la escala)')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla de los datos sintéticos')
+    parser.add_argument('--pasos', type=str, default=None,
+                        help=f"Ejecutar solo estos pasos ({', '.join(p[0] for p in PASOS)})")
+    parser.add_argument('--timeout', type=float, default=None, help='Tiempo máximo por paso en segundos')
+    parser.add_argument('--comparar', action='store_true',
+                        help='Mostrar la variación respecto a la última ejecución con los mismos datos')
+    parser.add_argument('--conservar', action='store_true', help='No borrar el árbol temporal del benchmark')
+    parser.add_argument('--no-guardar', action='store_true', help='No añadir el resultado al histórico')
+    parser.add_argument('--memoria-reducida', action='store_true',
+                        help=f"Ejecutar {' y '.join(PASOS_MEMORIA_REDUCIDA)} con --memoria-reducida")
+    parser.add_argument('--presupuesto-memoria', action='store_true',
+                        help='Fallar si el pico de memoria supera PRESUPUESTOS_MEMORIA de la escala')
+    parser.add_argument('--equivalencia-memoria', action='store_true',
+                        help=f"Comprobar que {' y '.join(PASOS_MEMORIA_REDUCIDA)} dan lo mismo con --memoria-reducida")
+    args = parser.parse_args()
+    if args.presupuesto_memoria and (args.filas or args.secciones or args.escala not in PRESUPUESTOS_MEMORIA):
+        parser.error(f"--presupuesto-memoria solo con las escalas {', '.join(PRESUPUESTOS_MEMORIA)}")
+
+    escala = ESCALAS[args.escala]
+    parametros = ParametrosDatos(filas=args.filas or escala['filas'],
+                                 secciones=args.secciones or escala['secciones'],
+                                 semilla=args.semilla)
+    pasos = [p.strip() for p in args.pasos.split(',') if p.strip()] if args.pasos else None
+    if pasos:
+        desconocidos = set(pasos) - {p[0] for p in PASOS}
+        if desconocidos:
+            print(f"ERROR: pasos desconocidos: {', '.join(sorted(desconocidos))}")
+            sys.exit(2)
+
+    if args.equivalencia_memoria:
+        sys.exit(0 if comprobar_equivalencia_memoria(parametros, timeout=args.timeout) else 1)
+
+    anterior = resultado_anterior(parametros.clave(), memoria_reducida=args.memoria_reducida) \
+        if args.comparar else None
+    resultado = ejecutar_benchmark(parametros, pasos, guardar=not args.no_guardar,
+                                   conservar=args.conservar, timeout=args.timeout,
+                                   memoria_reducida=args.memoria_reducida)
+    mostrar_resultado(resultado, anterior)
+
+    correcto = resultado['correcto']
+    if args.presupuesto_memoria:
+        correcto = comprobar_presupuesto_memoria(resultado, PRESUPUESTOS_MEMORIA[args.escala]) and correcto
+    sys.exit(0 if correcto else 1)
+
+
+if __name__ == "__main__":
+    main()
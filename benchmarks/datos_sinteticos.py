@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos del ERP para los benchmarks
+
+Crea un juego completo de ficheros de entrada con las mismas hojas y columnas
+que exportan el ERP y clasificacionABC.py, a partir de unos pocos parámetros:
+
+- SPA_ventas.xlsx            (Ventas por vendedor, año completo)
+- SPA_ventas_semana.xlsx     (Ventas por vendedor, última semana)
+- SPA_coste.xlsx             (Tarifas de compra)
+- SPA_compras.xlsx           (Compras por proveedor artículo)
+- SPA_stock_P1..P4.xlsx, SPA_stock_actual.xlsx, SPA_stock_semana_anterior.xlsx
+- CLASIFICACION_ABC+D_<SECCION>_<P>_<AÑO>.xlsx (hojas A, B, C y D)
+
+Los códigos de artículo siguen las reglas de sección de
+DataLoader.determinar_seccion (10 dígitos, prefijos por sección y códigos de
+mascotas vivas de config_comun.json), las ventas tienen popularidad tipo Zipf
+y estacionalidad de primavera, y el ABC+D se calcula sobre las ventas del
+período, así que las cantidades y categorías son coherentes entre ficheros.
+Con la misma semilla se generan siempre los mismos datos.
+
+Uso:
+    python -m benchmarks.datos_sinteticos --filas 100000 --secciones 11 --destino /tmp/datos
+    python -m benchmarks.datos_sinteticos --escala grande --destino /tmp/datos
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Versión del formato generado: forma parte de la clave de la caché de datos,
+# así que debe incrementarse cuando cambie cualquier fichero generado
+VERSION_DATOS = 2
+
+# Fracción mínima de líneas de venta cuya clave Artículo|Talla|Color existe en
+# SPA_coste.xlsx (sin cruce no hay PVP, coste ni proveedor en los pedidos)
+TASA_CRUCE_MINIMA = 0.99
+
+# Orden en que se añaden secciones al aumentar `secciones`
+ORDEN_SECCIONES = [
+    'vivero', 'interior', 'maf', 'deco_interior', 'deco_exterior', 'semillas',
+    'utiles_jardin', 'fitos', 'tierras_aridos', 'mascotas_manufacturado', 'mascotas_vivo',
+]
+
+# Nombre de la sección en los ficheros CLASIFICACION_ABC+D_*
+NOMBRE_FICHERO_SECCION = {'tierras_aridos': 'TIERRA_ARIDOS'}
+
+# Prefijos de código por sección (ver DataLoader.determinar_seccion)
+PREFIJOS_SECCION = {
+    'interior': [f'1{d}' for d in range(1, 10)],
+    'utiles_jardin': [f'4{d}' for d in range(1, 10)],
+    'semillas': [f'5{d}' for d in range(1, 10)],
+    'deco_interior': [f'6{d}' for d in range(1, 10)],
+    'maf': [f'7{d}' for d in range(1, 10)],
+    'vivero': [f'8{d}' for d in range(1, 10)],
+    'deco_exterior': [f'9{d}' for d in range(1, 10)],
+    'tierras_aridos': ['31', '32'],
+    'fitos': [f'3{d}' for d in range(3, 10)],
+    'mascotas_manufacturado': ['2101', '2201', '2301', '2401', '2501'],
+    'mascotas_vivo': None,  # códigos de config_comun.json
+}
+
+# Escalas predefinidas: filas de SPA_ventas.xlsx y número de secciones
+ESCALAS = {
+    'minima': {'filas': 5_000, 'secciones': 1},
+    'pequeña': {'filas': 20_000, 'secciones': 3},
+    'media': {'filas': 100_000, 'secciones': 11},
+    'grande': {'filas': 300_000, 'secciones': 11},
+    'maxima': {'filas': 1_000_000, 'secciones': 11},
+}
+
+HOJAS_ABC = {
+    'A': 'CATEGORIA A – BASICOS',
+    'B': 'CATEGORIA B – COMPLEMENTO',
+    'C': 'CATEGORIA C – BAJO IMPACTO',
+    'D': 'CATEGORIA D – SIN VENTAS',
+}
+
+COLUMNAS_ABC = [
+    'Artículo', 'Nombre artículo', 'Talla', 'Color', 'Familia', 'Nombre Familia',
+    'Rotación Familia (días)', 'Ventas (unidades)', 'Importe ventas (€)', 'Beneficio (importe €)',
+    'Tasa de venta (%)', 'Rotación excedida (unidades)', 'Stock mínimo (unidades)',
+    'Stock máximo (unidades)', 'Stock Final (unidades)', 'Antigüedad Última Venta (días)',
+    'Antigüedad Stock (días)', '% Rotación Consumido', 'Descuento Sugerido (%)',
+    'Riesgo de Merma/ inmovilizado', 'Acción Sugerida', 'Origen Stock Final', 'Escenario',
+]
+
+# Acciones sugeridas por categoría, con el texto que interpreta ForecastEngine.calcular_factor_compra
+ACCIONES = {
+    'A': ['OPTIMIZAR PREVENTIVO: Aplicar descuento 10% preventivo. Mantener nivel de compras actual. Stock bien gestionado.',
+          'AUMENTAR STOCK: Producto de alto interés. Incrementar compras 20% próxima temporada. Maximizar disponibilidad.'],
+    'B': ['MANTENER: Mantener nivel de compras actual. Stock bien gestionado.',
+          'AUMENTAR STOCK: Producto de alto interés. Incrementar compras 20% próxima temporada. Maximizar disponibilidad.'],
+    'C': ['DESCUENTO PREVENTIVO: Aplicar descuento 10% para acelerar rotación. Reducir compras 40% próxima temporada. Monitorear evolución semanal.',
+          'LIQUIDACIÓN URGENTE: Aplicar descuento 30% inmediato. Eliminar del catálogo próxima temporada. Prioridad máxima.'],
+    'D': ['LIQUIDACIÓN URGENTE: Aplicar descuento 30% inmediato. Eliminar del catálogo próxima temporada. Prioridad máxima.'],
+}
+
+TALLAS = ['', '', 'M12', 'M15A35', 'C17A50', '10LA90', '3LA120', 'P9']
+COLORES = ['', 'UNICO', 'UNICO', 'BLANCO', 'ROJO', 'VERDE']
+
+
+def _codigos_mascotas_vivo() -> List[str]:
+    try:
+        from src.registro_config import obtener_registro
+        codigos = obtener_registro().comun().get('configuracion_mascotas', {}).get('codigos_mascotas_vivo', [])
+        if codigos:
+            return [str(c) for c in codigos]
+    except Exception:
+        pass
+    return ['2104', '2204', '2305']
+
+
+def escribir_excel(ruta: Path, hojas: Dict[str, pd.DataFrame]):
+    """
+    Escribe un Excel hoja a hoja en modo write_only de openpyxl.
+
+    Es varias veces más rápido que DataFrame.to_excel para cientos de miles de
+    filas; las celdas NaN/NaT se dejan vacías como en los exportes del ERP.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    for nombre, df in hojas.items():
+        hoja = libro.create_sheet(title=nombre[:31])
+        hoja.append(list(df.columns))
+        valores = df.astype(object).where(df.notna(), None)
+        for fila in valores.itertuples(index=False, name=None):
+            hoja.append(fila)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    libro.save(ruta)
+
+
+@dataclass(frozen=True)
+class ParametrosDatos:
+    """Parámetros que determinan un juego de datos sintético."""
+    filas: int = 5_000
+    secciones: int = 1
+    articulos: Optional[int] = None
+    año: Optional[int] = None
+    semilla: int = 42
+
+    def resueltos(self) -> 'ParametrosDatos':
+        """Copia con los valores por defecto calculados (artículos y año)."""
+        secciones = max(1, min(self.secciones, len(ORDEN_SECCIONES)))
+        articulos = self.articulos or int(min(max(self.filas // 25, 150 * secciones), 60_000))
+        año = self.año or datetime.now().year - 1
+        return ParametrosDatos(self.filas, secciones, articulos, año, self.semilla)
+
+    def clave(self) -> str:
+        p = self.resueltos()
+        return f"v{VERSION_DATOS}_{p.filas}f_{p.secciones}s_{p.articulos}a_{p.año}_{p.semilla}"
+
+
+class GeneradorDatosSinteticos:
+    """
+    Genera los ficheros de entrada del sistema a partir de ParametrosDatos.
+
+    Attributes:
+        parametros (ParametrosDatos): Parámetros resueltos
+        secciones (list): Secciones incluidas
+        catalogo (pd.DataFrame): Artículos con sección, familia, PVP, coste y proveedor
+    """
+
+    def __init__(self, parametros: Optional[ParametrosDatos] = None, **kwargs):
+        self.parametros = (parametros or ParametrosDatos(**kwargs)).resueltos()
+        self.secciones = ORDEN_SECCIONES[:self.parametros.secciones]
+        self._rng = np.random.default_rng(self.parametros.semilla)
+        self.catalogo = self._generar_catalogo()
+        self._ventas: Optional[pd.DataFrame] = None
+
+    # ------------------------------------------------------------------
+    # CATÁLOGO
+    # ------------------------------------------------------------------
+
+    def _generar_catalogo(self) -> pd.DataFrame:
+        rng = self._rng
+        n_total = self.parametros.articulos
+        por_seccion = np.full(len(self.secciones), n_total // len(self.secciones))
+        por_seccion[: n_total % len(self.secciones)] += 1
+
+        partes = []
+        for seccion, n in zip(self.secciones, por_seccion):
+            prefijos = PREFIJOS_SECCION[seccion] or _codigos_mascotas_vivo()
+            indices = np.arange(n)
+            prefijo = np.array(prefijos)[indices % len(prefijos)]
+            resto = 10 - np.char.str_len(prefijo)
+            secuencia = indices // len(prefijos)
+            codigos = [p + str(s).zfill(r) for p, s, r in zip(prefijo, secuencia, resto)]
+            partes.append(pd.DataFrame({'Codigo': codigos, 'Seccion': seccion}))
+        catalogo = pd.concat(partes, ignore_index=True)
+
+        n = len(catalogo)
+        # Texto, como en los exportes del ERP: así el código no pasa a float al
+        # intercalar las filas de cabecera vacías
+        catalogo['Artículo'] = catalogo['Codigo']
+        catalogo['Familia'] = catalogo['Codigo'].str[:2].astype(int)
+        catalogo['Nombre Familia'] = 'FAMILIA ' + catalogo['Codigo'].str[:2]
+        catalogo['Nombre artículo'] = ('ARTICULO ' + catalogo['Seccion'].str.upper() + ' '
+                                       + catalogo['Codigo'].str[-6:])
+        catalogo['Talla'] = rng.choice(TALLAS, n)
+        catalogo['Color'] = rng.choice(COLORES, n)
+        catalogo['PVP'] = np.round(np.exp(rng.normal(2.3, 0.8, n)).clip(0.5, 900), 2)
+        catalogo['Coste'] = np.round(catalogo['PVP'] / 1.21 / rng.uniform(1.8, 2.6, n), 2)
+        catalogo['Proveedor'] = 40_000_001 + rng.integers(0, max(5, n // 150), n)
+        # Popularidad tipo Zipf dentro del catálogo completo
+        rango = rng.permutation(n) + 1
+        catalogo['Peso'] = 1.0 / rango ** 1.1
+        return catalogo
+
+    def _articulos(self, indices: np.ndarray) -> pd.DataFrame:
+        return self.catalogo.iloc[indices].reset_index(drop=True)
+
+    @staticmethod
+    def _texto_erp(serie: pd.Series, ancho: int) -> pd.Series:
+        """Rellena con espacios como los campos de texto de ancho fijo del ERP."""
+        return serie.astype(str).str.ljust(ancho)
+
+    def _fechas_año(self, n: int) -> pd.Series:
+        """Fechas del año de datos con pico de ventas en primavera."""
+        año = self.parametros.año
+        dias = (datetime(año, 12, 31) - datetime(año, 1, 1)).days + 1
+        dia = np.arange(dias)
+        peso = 1.0 + 0.8 * np.exp(-((dia - 110) / 45.0) ** 2) + 0.3 * np.exp(-((dia - 340) / 12.0) ** 2)
+        elegidos = self._rng.choice(dias, n, p=peso / peso.sum())
+        return pd.to_datetime(datetime(año, 1, 1)) + pd.to_timedelta(np.sort(elegidos), unit='D')
+
+    def _lineas_sin_codigo(self, df: pd.DataFrame, fraccion: float = 0.005) -> pd.DataFrame:
+        """
+        Deja sin código una pequeña parte de las líneas (lotes y promociones),
+        como en los listados de ventas del ERP. Con esas celdas en blanco la
+        columna Artículo se lee como texto y los códigos no pasan a float.
+        """
+        n = max(1, int(len(df) * fraccion))
+        filas = self._rng.choice(len(df), n, replace=False)
+        df = df.copy()
+        df.loc[filas, 'Artículo'] = ' ' * 10
+        df.loc[filas, 'Nombre artículo'] = self._texto_erp('LOTE ' + df.loc[filas, 'Nombre artículo'].str.strip(), 50)
+        df.loc[filas, 'Talla'] = ' ' * 9
+        df.loc[filas, 'Color'] = ' ' * 8
+        return df
+
+    @staticmethod
+    def _con_cabeceras(df: pd.DataFrame, columna_grupo: str, texto_cabecera: Dict) -> pd.DataFrame:
+        """Inserta una fila 'Cabecera' antes de cada grupo, como en los listados del ERP."""
+        partes = []
+        for clave, grupo in df.groupby(columna_grupo, sort=True):
+            cabecera = {c: np.nan for c in df.columns}
+            cabecera['Nombre artículo'] = texto_cabecera[clave]
+            cabecera['Tipo registro'] = 'Cabecera'
+            partes.append(pd.DataFrame([cabecera]))
+            partes.append(grupo)
+        return pd.concat(partes, ignore_index=True)
+
+    # ------------------------------------------------------------------
+    # FICHEROS DEL ERP
+    # ------------------------------------------------------------------
+
+    def ventas(self) -> pd.DataFrame:
+        """SPA_ventas.xlsx: ventas por vendedor del año completo."""
+        if self._ventas is not None:
+            return self._ventas
+        rng = self._rng
+        n = self.parametros.filas
+        pesos = self.catalogo['Peso'].to_numpy()
+        arts = self._articulos(rng.choice(len(self.catalogo), n, p=pesos / pesos.sum()))
+        unidades = (1 + rng.poisson(1.2, n)).astype(float)
+        devoluciones = rng.random(n) < 0.01
+        unidades[devoluciones] *= -1
+        vendedor = rng.integers(1, 4, n)
+
+        ventas = pd.DataFrame({
+            'Vendedor': vendedor,
+            'Serie': 'T' + pd.Series(vendedor).astype(str),
+            'Documento': [f'TK{i:08d}' for i in range(n)],
+            'Fecha': self._fechas_año(n),
+            'Factura': '',
+            'Artículo': arts['Artículo'],
+            'Nombre artículo': self._texto_erp(arts['Nombre artículo'], 50),
+            'Talla': self._texto_erp(arts['Talla'], 9),
+            'Color': self._texto_erp(arts['Color'], 8),
+            'Unidades': unidades,
+            'Precio': arts['PVP'],
+            'Importe': np.round(unidades * arts['PVP'], 2),
+            'Comisión': 0.0,
+            'Tipo registro': 'Detalle',
+        })
+        ventas = self._lineas_sin_codigo(ventas)
+        nombres = {v: f'{v:02d} - VENDEDOR {v}' for v in ventas['Vendedor'].unique()}
+        self._ventas = self._con_cabeceras(ventas.sort_values(['Vendedor', 'Fecha'], kind='stable'),
+                                           'Vendedor', nombres)
+        return self._ventas
+
+    def ventas_semana(self) -> pd.DataFrame:
+        """SPA_ventas_semana.xlsx: ventas de la última semana (sin fecha)."""
+        rng = self._rng
+        n = max(100, self.parametros.filas // 52)
+        pesos = self.catalogo['Peso'].to_numpy()
+        arts = self._articulos(rng.choice(len(self.catalogo), n, p=pesos / pesos.sum()))
+        unidades = (1 + rng.poisson(1.2, n)).astype(float)
+        ventas = pd.DataFrame({
+            'Artículo': arts['Artículo'],
+            'Nombre artículo': self._texto_erp(arts['Nombre artículo'], 50),
+            'Talla': self._texto_erp(arts['Talla'], 9),
+            'Color': self._texto_erp(arts['Color'], 8),
+            'Unidades': unidades,
+            'Precio': arts['PVP'],
+            'Importe': np.round(unidades * arts['PVP'], 2),
+            'Comisión': 0.0,
+            'Tipo registro': 'Detalle',
+            'Vendedor': 1,
+        })
+        ventas = self._con_cabeceras(self._lineas_sin_codigo(ventas), 'Vendedor', {1: '01 - VENDEDOR POR DEFECTO'})
+        return ventas.drop(columns='Vendedor')
+
+    def coste(self) -> pd.DataFrame:
+        """SPA_coste.xlsx: tarifas de compra (algunos artículos con dos proveedores)."""
+        rng = self._rng
+        cat = self.catalogo
+        duplicados = cat[rng.random(len(cat)) < 0.2]
+        filas = pd.concat([cat, duplicados], ignore_index=True)
+        n = len(filas)
+        año = self.parametros.año
+        ultima = pd.to_datetime(datetime(año - 2, 1, 1)) + pd.to_timedelta(rng.integers(0, 900, n), unit='D')
+        tarifa = np.round(filas['Coste'] * rng.uniform(0.95, 1.1, n), 2)
+        return pd.DataFrame({
+            'Artículo': filas['Artículo'],
+            'Definición': self._texto_erp(filas['Nombre artículo'], 50),
+            'Proveedor': filas['Proveedor'],
+            'Nombre proveedor': self._texto_erp('PROVEEDOR ' + filas['Proveedor'].astype(str), 120),
+            'Referencia': ' ' * 25,
+            'Talla': self._texto_erp(filas['Talla'], 9),
+            'Color': self._texto_erp(filas['Color'], 8),
+            'Tarifa': tarifa,
+            'Tarifa10': filas['PVP'],
+            'Dto. 1': 0.0,
+            'Dto. 2': 0.0,
+            'Dto. 3': 0.0,
+            'Coste': tarifa,
+            'Últ. compra': ultima,
+        }).sort_values('Artículo', kind='stable').reset_index(drop=True)
+
+    def compras(self) -> pd.DataFrame:
+        """SPA_compras.xlsx: compras por proveedor del año completo."""
+        rng = self._rng
+        n = max(200, self.parametros.filas // 4)
+        pesos = np.sqrt(self.catalogo['Peso'].to_numpy())
+        arts = self._articulos(rng.choice(len(self.catalogo), n, p=pesos / pesos.sum()))
+        unidades = rng.integers(1, 10, n).astype(float) * rng.choice([1, 5, 10], n)
+        compras = pd.DataFrame({
+            'Artículo': arts['Artículo'],
+            'Nombre artículo': self._texto_erp(arts['Nombre artículo'], 50),
+            'Talla': self._texto_erp(arts['Talla'], 9),
+            'Color': self._texto_erp(arts['Color'], 8),
+            'Fecha': self._fechas_año(n),
+            'Documento': [f'  PS{i:06d}' for i in range(n)],
+            'Unidades': unidades,
+            'Precio': arts['Coste'],
+            'Dto. 1': 0.0,
+            'Dto. 2': 0.0,
+            'Importe': np.round(unidades * arts['Coste'], 2),
+            'Factura': [f'CIN{i:07d}' for i in range(n)],
+            'Tipo registro': 'Detalle',
+            'Proveedor': arts['Proveedor'],
+        })
+        nombres = {p: f'{p} - PROVEEDOR {p}' for p in compras['Proveedor'].unique()}
+        compras = self._con_cabeceras(compras.sort_values(['Proveedor', 'Fecha'], kind='stable'),
+                                      'Proveedor', nombres)
+        return compras.drop(columns='Proveedor')
+
+    def stock(self, presencia: float = 0.7) -> pd.DataFrame:
+        """Valoración de stocks (SPA_stock_*.xlsx) de una fecha."""
+        rng = self._rng
+        arts = self.catalogo[rng.random(len(self.catalogo)) < presencia].reset_index(drop=True)
+        n = len(arts)
+        unidades = rng.poisson(6, n).astype(float) - (rng.random(n) < 0.03) * rng.integers(1, 4, n)
+        return pd.DataFrame({
+            'Artículo': arts['Artículo'],
+            'Nombre artículo': self._texto_erp(arts['Nombre artículo'], 50),
+            'Talla': self._texto_erp(arts['Talla'], 9),
+            'Color': self._texto_erp(arts['Color'], 8),
+            'Unidades': unidades,
+            'Precio': arts['Coste'],
+            'Total': np.round(unidades * arts['Coste'], 2),
+            'Tipo registro': 'Detalle',
+        })
+
+    def clasificacion_abc(self, seccion: str, periodo: str, stock: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Hojas del CLASIFICACION_ABC+D de una sección y período.
+
+        Las categorías salen del importe vendido en el período (A hasta el 80 %
+        acumulado, B hasta el 95 %, C el resto); los artículos en stock sin
+        ventas forman la categoría D.
+        """
+        from src.registro_config import obtener_registro
+
+        definicion = obtener_registro().periodos().get(periodo, {})
+        año = self.parametros.año
+        inicio = datetime(año, definicion.get('mes_inicio', 1), definicion.get('dia_inicio', 1))
+        fin = datetime(año, definicion.get('mes_fin', 12), definicion.get('dia_fin', 31))
+
+        ventas = self.ventas()
+        ventas = ventas[(ventas['Tipo registro'] == 'Detalle') & (ventas['Fecha'] >= inicio)
+                        & (ventas['Fecha'] <= fin)]
+        ventas = ventas.merge(self.catalogo[['Artículo', 'Seccion', 'Coste']], on='Artículo')
+        ventas = ventas[ventas['Seccion'] == seccion]
+        agregado = ventas.groupby('Artículo').agg(unidades=('Unidades', 'sum'), importe=('Importe', 'sum'),
+                                                 coste=('Coste', 'first')).reset_index()
+        agregado = agregado.sort_values('importe', ascending=False)
+        acumulado = agregado['importe'].cumsum() / max(agregado['importe'].sum(), 1e-9)
+        agregado['Categoria'] = np.select([acumulado <= 0.80, acumulado <= 0.95], ['A', 'B'], 'C')
+
+        stock_seccion = stock.merge(self.catalogo[['Artículo', 'Seccion']], on='Artículo')
+        stock_seccion = stock_seccion[stock_seccion['Seccion'] == seccion]
+        stock_por_articulo = stock_seccion.groupby('Artículo')['Unidades'].sum()
+        sin_ventas = stock_por_articulo.index.difference(agregado['Artículo'])
+        d = pd.DataFrame({'Artículo': sin_ventas, 'unidades': 0.0, 'importe': 0.0, 'Categoria': 'D'})
+        d = d.merge(self.catalogo[['Artículo', 'Coste']].rename(columns={'Coste': 'coste'}), on='Artículo')
+        filas = pd.concat([agregado, d], ignore_index=True).merge(
+            self.catalogo.drop(columns=['Coste']), on='Artículo')
+
+        rng = self._rng
+        n = len(filas)
+        stock_final = filas['Artículo'].map(stock_por_articulo).fillna(0).astype(int)
+        dias = (fin - inicio).days + 1
+        rotacion_consumida = np.round(rng.uniform(0, 200, n), 2)
+        riesgo = np.select([rotacion_consumida > 150, rotacion_consumida > 60], ['Crítico', 'Medio'], 'Bajo')
+        accion = [ACCIONES[c][i % len(ACCIONES[c])] for i, c in enumerate(filas['Categoria'])]
+        tabla = pd.DataFrame({
+            'Artículo': filas['Artículo'],
+            'Nombre artículo': filas['Nombre artículo'],
+            'Talla': filas['Talla'],
+            'Color': filas['Color'],
+            'Familia': filas['Familia'],
+            'Nombre Familia': filas['Nombre Familia'],
+            'Rotación Familia (días)': 30,
+            'Ventas (unidades)': filas['unidades'].astype(int),
+            'Importe ventas (€)': np.round(filas['importe'], 2),
+            'Beneficio (importe €)': np.round(filas['importe'] / 1.21 - filas['unidades'] * filas['coste'], 2),
+            'Tasa de venta (%)': np.round(100 * filas['unidades'] / (filas['unidades'] + stock_final.clip(lower=0) + 1e-9), 2),
+            'Rotación excedida (unidades)': np.where(filas['Categoria'] == 'D', stock_final.clip(lower=0), 0),
+            'Stock mínimo (unidades)': np.round(filas['unidades'] / dias * 7, 1),
+            'Stock máximo (unidades)': np.round(filas['unidades'] / dias * 21, 1),
+            'Stock Final (unidades)': stock_final,
+            'Antigüedad Última Venta (días)': rng.integers(0, dias, n),
+            'Antigüedad Stock (días)': rng.integers(0, dias, n),
+            '% Rotación Consumido': rotacion_consumida,
+            'Descuento Sugerido (%)': np.select([riesgo == 'Crítico', riesgo == 'Medio'], [30, 10], 0),
+            'Riesgo de Merma/ inmovilizado': riesgo,
+            'Acción Sugerida': accion,
+            'Origen Stock Final': 'Stock inicial',
+            'Escenario': rng.integers(1, 17, n).astype(str),
+            'Categoria': filas['Categoria'],
+        })
+        return {hoja: tabla[tabla['Categoria'] == c].drop(columns='Categoria')[COLUMNAS_ABC]
+                for c, hoja in HOJAS_ABC.items()}
+
+    @staticmethod
+    def _claves_coste(df: pd.DataFrame) -> pd.Series:
+        """Clave Artículo|Talla|Color normalizada como en DataLoader.leer_costes."""
+        return (df['Artículo'].astype(str).str.strip() + '|' + df['Talla'].astype(str).str.strip()
+                + '|' + df['Color'].astype(str).str.strip())
+
+    def tasa_cruce(self, coste: pd.DataFrame) -> float:
+        """Fracción de líneas de detalle de ventas con código que tienen tarifa en `coste`."""
+        ventas = self.ventas()
+        detalle = ventas[(ventas['Tipo registro'] == 'Detalle') & (ventas['Artículo'].str.strip() != '')]
+        if detalle.empty:
+            return 1.0
+        return float(self._claves_coste(detalle).isin(self._claves_coste(coste)).mean())
+
+    # ------------------------------------------------------------------
+    # ESCRITURA
+    # ------------------------------------------------------------------
+
+    def generar(self, directorio: Path, periodos: Tuple[str, ...] = ('P1', 'P2', 'P3', 'P4'),
+                verbose: bool = False) -> Dict[str, Path]:
+        """
+        Escribe todos los ficheros de entrada en `directorio`.
+
+        Args:
+            directorio: Destino (se crea si no existe)
+            periodos: Períodos con SPA_stock_<P> y clasificación ABC+D
+            verbose: Mostrar el progreso
+
+        Returns:
+            Dict[str, Path]: Nombre lógico -> ruta del fichero generado
+        """
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        rutas: Dict[str, Path] = {}
+
+        def escribir(nombre: str, fichero: str, hojas: Dict[str, pd.DataFrame]):
+            inicio = time.perf_counter()
+            rutas[nombre] = directorio / fichero
+            escribir_excel(rutas[nombre], hojas)
+            if verbose:
+                filas = sum(len(df) for df in hojas.values())
+                print(f"  {fichero:<55} {filas:>9} filas  {time.perf_counter() - inicio:6.1f} s")
+
+        escribir('ventas', 'SPA_ventas.xlsx', {'Ventas por vendedor': self.ventas()})
+        escribir('ventas_semana', 'SPA_ventas_semana.xlsx', {'Ventas por vendedor': self.ventas_semana()})
+        coste = self.coste()
+        tasa = self.tasa_cruce(coste)
+        if tasa < TASA_CRUCE_MINIMA:
+            raise RuntimeError(f"Solo el {tasa:.1%} de las ventas cruza con SPA_coste.xlsx "
+                               f"(mínimo {TASA_CRUCE_MINIMA:.0%})")
+        if verbose:
+            print(f"  Cruce ventas-coste: {tasa:.1%}")
+        escribir('coste', 'SPA_coste.xlsx', {'Tarifas de compra': coste})
+        escribir('compras', 'SPA_compras.xlsx', {'Compras por proveedor artículo': self.compras()})
+        stock_actual = self.stock()
+        escribir('stock_actual', 'SPA_stock_actual.xlsx', {'Valoración de stocks': stock_actual})
+        escribir('stock_semana_anterior', 'SPA_stock_semana_anterior.xlsx', {'Sheet1': self.stock()})
+        for periodo in periodos:
+            stock_periodo = self.stock()
+            escribir(f'stock_{periodo}', f'SPA_stock_{periodo}.xlsx', {'Valoración de stocks': stock_periodo})
+            for seccion in self.secciones:
+                nombre = NOMBRE_FICHERO_SECCION.get(seccion, seccion.upper())
+                escribir(f'abc_{seccion}_{periodo}',
+                         f'CLASIFICACION_ABC+D_{nombre}_{periodo}_{self.parametros.año}.xlsx',
+                         self.clasificacion_abc(seccion, periodo, stock_periodo))
+        return rutas
+
+
+def obtener_datos(parametros: ParametrosDatos, directorio_cache: Path,
+                  verbose: bool = False) -> Path:
+    """
+    Devuelve el directorio con el juego de datos de `parametros`, generándolo
+    solo si no está ya en la caché (así todas las ejecuciones de un benchmark
+    usan exactamente los mismos ficheros, también entre commits).
+    """
+    destino = Path(directorio_cache) / parametros.clave()
+    marca = destino / '.completo'
+    if marca.exists():
+        return destino
+    if verbose:
+        print(f"Generando datos sintéticos {parametros.clave()} en {destino}")
+    GeneradorDatosSinteticos(parametros).generar(destino, verbose=verbose)
+    marca.write_text(datetime.now().isoformat(timespec='seconds'), encoding='utf-8')
+    return destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos del ERP con el formato de los ficheros de entrada')
+    parser.add_argument('--destino', type=str, required=True, help='Directorio de salida')
+    parser.add_argument('--escala', choices=sorted(ESCALAS), default=None, help='Escala predefinida')
+    parser.add_argument('--filas', type=int, default=None, help='Filas de SPA_ventas.xlsx')
+    parser.add_argument('--secciones', type=int, default=None, help=f'Número de secciones (1-{len(ORDEN_SECCIONES)})')
+    parser.add_argument('--articulos', type=int, default=None, help='Artículos del catálogo')
+    parser.add_argument('--año', type=int, default=None, help='Año de los datos (default: año anterior)')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria')
+    args = parser.parse_args()
+
+    base = ESCALAS.get(args.escala, ESCALAS['minima'])
+    parametros = ParametrosDatos(filas=args.filas or base['filas'], secciones=args.secciones or base['secciones'],
+                                 articulos=args.articulos, año=args.año, semilla=args.semilla).resueltos()
+    print(f"Parámetros: {asdict(parametros)}")
+    inicio = time.perf_counter()
+    GeneradorDatosSinteticos(parametros).generar(Path(args.destino), verbose=True)
+    print(f"Datos generados en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,12 +34,20 @@ Ejecutar:
     python clasificacionABC.py -P P1 -Y 2025               # Período P1 del año 2025
     python clasificacionABC.py -S maf                       # Solo sección maf (modo automático)
     python clasificacionABC.py -P P2 -Y 2025 -S vivero     # Período P2 de 2025, solo vivero
+    python clasificacionABC.py --profile                    # Guardar perfil por etapa en data/perfiles/
+    python clasificacionABC.py --memoria-reducida           # Menos memoria con ficheros de ventas grandes
+    python clasificacionABC.py --tienda centro              # Entradas y salidas de la tienda 'centro'
 
 Los datos se leen de archivos con datos de TODO el año:
 - SPA_compras.xlsx: Datos de compras de todo el año
 - SPA_ventas.xlsx: Datos de ventas de todo el año
 - SPA_stock_{periodo}.xlsx: Datos de stock actual
 - SPA_coste.xlsx: Costes unitarios de artículos (para calcular beneficio real)
+Cada uno puede ser también la exportación .csv/.tsv del ERP con el mismo nombre.
+Con --tienda se leen de la carpeta de entrada de la tienda (data/tiendas/<codigo>/input,
+bloque tiendas de config.json), que es también donde se guardan sus CLASIFICACION_ABC+D_*
+y donde main.py los busca; las entradas compartidas que la tienda no tenga
+(tiendas.compartidos, p. ej. el coste) se leen de data/input.
 
 El script filtra automáticamente los datos según las fechas del período indicado.
 Al generar cada archivo de clasificación, se envía automáticamente un email
@@ -59,9 +67,7 @@ import sys
 import argparse
 import warnings
 import smtplib
-import ssl
 import os
-import json
 import unicodedata
 import logging
 import traceback
@@ -69,6 +75,11 @@ from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
+from src.transporte_email import transporte_compartido
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo, iniciar_tramo
+from src.memoria import copia_defensiva, reducir_memoria, activar_modo_memoria_reducida
+from src.lectura_entradas import buscar_entradas, leer_tabla, resolver_entrada
 from pathlib import Path
 warnings.filterwarnings('ignore')
 
@@ -106,6 +117,10 @@ DIRECTORIO_BASE = os.path.dirname(os.path.abspath(__file__))
 DIRECTORIO_DATA = os.path.join(DIRECTORIO_BASE, 'data', 'input')
 DIRECTORIO_CONFIG = os.path.join(DIRECTORIO_BASE, 'config')
 
+# Con --tienda: configuración de la tienda (src/tiendas.py) y sus entradas compartidas
+CONFIG_TIENDA = None
+ENTRADAS_COMPARTIDAS = {}
+
 # ============================================================================
 # FUNCIONES DE NORMALIZACIÓN PARA BÚSQUEDAS INTELIGENTES
 # ============================================================================
@@ -439,17 +454,11 @@ def cargar_configuracion():
     Returns:
         dict: Configuración cargada o None si hay error
     """
-    try:
-        ruta_config = os.path.join(DIRECTORIO_CONFIG, 'config_comun.json')
-        if os.path.exists(ruta_config):
-            with open(ruta_config, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            print(f"ADVERTENCIA: No se encontró {ruta_config}. Usando configuración por defecto.")
-            return None
-    except Exception as e:
-        print(f"ERROR al cargar configuración: {e}. Usando valores por defecto.")
+    registro = obtener_registro()
+    if not registro.existe('comun'):
+        print(f"ADVERTENCIA: No se encontró {registro.ruta('comun')}. Usando configuración por defecto.")
         return None
+    return registro.comun()
 
 def obtener_fechas_periodo(periodo_nombre, config, año_actual=None):
     """
@@ -589,6 +598,98 @@ def configurar_periodo(periodo_seleccionado, config, año_datos=None):
     dias_periodo = (fecha_fin - fecha_inicio).days + 1
     return fecha_inicio, fecha_fin, dias_periodo, "ANUAL", año_datos
 
+def configurar_tienda(codigo):
+    """
+    Clasifica con las entradas de una tienda (--tienda CODIGO).
+    
+    Las entradas y los CLASIFICACION_ABC+D_* generados pasan a la carpeta de
+    entrada de la tienda y el histórico de ventas es el de la tienda.
+    
+    Args:
+        codigo: Código de la tienda en tiendas.lista de config.json
+    
+    Raises:
+        ValueError: Si la tienda no está configurada
+    """
+    global DIRECTORIO_DATA, CONFIG_TIENDA, ENTRADAS_COMPARTIDAS
+    from src.tiendas import cargar_tiendas, config_tienda, rutas_compartidas
+    config_principal = obtener_registro().principal()
+    tienda = cargar_tiendas(config_principal, [codigo])[0]
+    ENTRADAS_COMPARTIDAS = rutas_compartidas(config_principal)
+    CONFIG_TIENDA = config_tienda(config_principal, tienda, ENTRADAS_COMPARTIDAS)
+    DIRECTORIO_DATA = str(tienda.directorio_entrada)
+    os.makedirs(DIRECTORIO_DATA, exist_ok=True)
+    print(f"TIENDA: {tienda.nombre} ({tienda.codigo}) - entradas y salidas en {DIRECTORIO_DATA}")
+
+def ruta_entrada(nombre, clave=None):
+    """
+    Ruta de una entrada del ERP en DIRECTORIO_DATA (.xlsx o su exportación .csv/.tsv).
+    
+    Con --tienda, si la tienda no tiene el fichero y es una entrada compartida
+    (clave de archivos_entrada en tiendas.compartidos), la ruta de data/input.
+    """
+    ruta = resolver_entrada(os.path.join(DIRECTORIO_DATA, nombre))
+    if clave in ENTRADAS_COMPARTIDAS and not os.path.exists(ruta):
+        return ENTRADAS_COMPARTIDAS[clave]
+    return ruta
+
+def leer_ventas_historico(periodo_seleccionado, año_datos, seccion_especifica=None):
+    """
+    Lee las ventas del período desde el histórico de ventas (src/historico_ventas.py).
+    
+    Args:
+        periodo_seleccionado: Período (P1, P2, P3, P4)
+        año_datos: Año de los datos a analizar
+        seccion_especifica: Leer solo esta sección (None para todas)
+    
+    Returns:
+        DataFrame con las columnas de SPA_ventas.xlsx, o None si el histórico no está
+        activo en config.json (historico_ventas.usar) o le falta alguna semana del período
+    """
+    from src.historico_ventas import crear_historico_ventas, historico_activo
+    config_principal = CONFIG_TIENDA or obtener_registro().principal()
+    if not historico_activo(config_principal):
+        return None
+    
+    fecha_inicio, fecha_fin, _, _, _ = configurar_periodo(periodo_seleccionado, CONFIG, año_datos)
+    historico = crear_historico_ventas(config_principal)
+    if not historico.cubre(desde=fecha_inicio, hasta=fecha_fin):
+        print("Histórico de ventas incompleto para el período: se lee SPA_ventas.xlsx")
+        return None
+    
+    secciones = [seccion_especifica] if seccion_especifica else None
+    ventas_df = historico.ventas(desde=fecha_inicio, hasta=fecha_fin, secciones=secciones)
+    print(f"VENTAS leídas del histórico: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}")
+    return ventas_df.drop(columns=['Seccion'])
+
+def validar_entradas_clasificacion(periodo_seleccionado):
+    """
+    Comprueba los encabezados de compras, ventas, costes y stock antes de cargarlos.
+    
+    Usa src/validacion_entradas.py (bloque validacion_entradas de config.json):
+    cada fichero se abre en modo de solo lectura y se lee solo su fila de
+    encabezados. Los problemas se registran y se envían en una única alerta.
+    
+    Args:
+        periodo_seleccionado: Período (P1, P2, P3, P4) del stock a comprobar
+    
+    Returns:
+        bool: False si falta algún fichero o columna imprescindible
+    """
+    from src.historico_ventas import historico_activo
+    from src.validacion_entradas import crear_validador
+    config_principal = CONFIG_TIENDA or obtener_registro().principal()
+    validador = crear_validador(config_principal)
+    if validador is None:
+        return True
+    entradas = validador.entradas_clasificacion(periodo_seleccionado, DIRECTORIO_DATA,
+                                                ventas_historico=historico_activo(config_principal),
+                                                compartidas=ENTRADAS_COMPARTIDAS)
+    resultado = validador.validar(entradas)
+    resultado.registrar()
+    resultado.alertar('clasificacionABC.py')
+    return resultado.correcto
+
 def detectar_año_datos(compras_df, ventas_df):
     """
     Detecta automáticamente el año de los datos basándose en las fechas de compras y ventas.
@@ -952,18 +1053,11 @@ def cargar_encargados():
     Returns:
         dict: Diccionario de encargados cargado desde JSON
     """
-    try:
-        ruta_encargados = os.path.join(DIRECTORIO_CONFIG, 'encargados.json')
-        if os.path.exists(ruta_encargados):
-            with open(ruta_encargados, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('encargados', {})
-        else:
-            print(f"ADVERTENCIA: No se encontró {ruta_encargados}. Usando diccionario vacío.")
-            return {}
-    except Exception as e:
-        print(f"ERROR al cargar encargados: {e}. Usando diccionario vacío.")
+    registro = obtener_registro()
+    if not registro.existe('encargados'):
+        print(f"ADVERTENCIA: No se encontró {registro.ruta('encargados')}. Usando diccionario vacío.")
         return {}
+    return registro.encargados_json().get('encargados', {})
 
 # Cargar encargados desde JSON al inicio
 ENCARGADOS = cargar_encargados()
@@ -979,38 +1073,7 @@ def cargar_configuracion_smtp():
     Returns:
         dict: Diccionario con configuración SMTP
     """
-    ruta_email_json = Path('config/email.json')
-    
-    try:
-        if ruta_email_json.exists():
-            with open(ruta_email_json, 'r', encoding='utf-8') as f:
-                email_config = json.load(f)
-            
-            smtp = email_config.get('smtp', {})
-            remitente = email_config.get('remitente', {})
-            
-            return {
-                'servidor': smtp.get('servidor', 'smtp.serviciodecorreo.es'),
-                'puerto': smtp.get('puerto', 465),
-                'remitente_email': remitente.get('email', 'ivan.delgado@viveverde.es'),
-                'remitente_nombre': remitente.get('nombre', 'Sistema de Pedidos VIVEVERDE')
-            }
-        else:
-            # Valor por defecto si no existe el archivo
-            return {
-                'servidor': 'smtp.serviciodecorreo.es',
-                'puerto': 465,
-                'remitente_email': 'ivan.delgado@viveverde.es',
-                'remitente_nombre': 'Sistema de Pedidos VIVEVERDE'
-            }
-    except Exception as e:
-        print(f"Error al cargar configuración SMTP: {e}")
-        return {
-            'servidor': 'smtp.serviciodecorreo.es',
-            'puerto': 465,
-            'remitente_email': 'ivan.delgado@viveverde.es',
-            'remitente_nombre': 'Sistema de Pedidos VIVEVERDE'
-        }
+    return obtener_registro().smtp().como_dict_scripts()
 
 # Cargar configuración SMTP al iniciar el módulo
 SMTP_CONFIG = cargar_configuracion_smtp()
@@ -1072,7 +1135,8 @@ def enviar_email_clasificacion(seccion: str, archivo: str, periodo: str) -> bool
             msg = MIMEMultipart()
             msg['From'] = f"{SMTP_CONFIG['remitente_nombre']} <{SMTP_CONFIG['remitente_email']}>"
             msg['To'] = email_destinatario
-            msg['Subject'] = f"Viveverde: listado ClasificacionABC+D de {seccion} - Periodo {PERIODO}"
+            tienda = f" - {CONFIG_TIENDA['tienda']['nombre']}" if CONFIG_TIENDA else ''
+            msg['Subject'] = f"Viveverde: listado ClasificacionABC+D de {seccion} - Periodo {PERIODO}{tienda}"
             
             # Cuerpo del email
             cuerpo = f"""Buenos días {nombre_encargado},
@@ -1103,11 +1167,12 @@ Sistema de Pedidos automáticos Viveverde."""
             part.add_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             msg.attach(part)
             
-            # Enviar email mediante SSL
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'], context=context) as server:
-                server.login(SMTP_CONFIG['remitente_email'], password)
-                server.sendmail(SMTP_CONFIG['remitente_email'], email_destinatario, msg.as_string())
+            # Enviar email por la sesión SMTP compartida (SSL)
+            transporte = transporte_compartido(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'],
+                                               SMTP_CONFIG['remitente_email'], password)
+            resultado = transporte.enviar(msg, [email_destinatario])
+            if not resultado.enviado:
+                raise smtplib.SMTPException(resultado.error)
             
             print(f"  Email enviado a {nombre_encargado} ({email_destinatario})")
             emails_enviados += 1
@@ -1267,12 +1332,12 @@ def procesar_seccion(compras_df, ventas_df, stock_df, coste_df, nombre_seccion,
             if determinar_seccion(codigo) == nombre_seccion:
                 codigos_seccion.add(codigo)
         
-        return df[df[columna_codigo].isin(codigos_seccion)]
+        return copia_defensiva(df[df[columna_codigo].isin(codigos_seccion)])
     
-    # Crear copias filtradas
-    compras_seccion = filtrar_por_seccion(compras_df.copy(), 'codigo_str')
-    ventas_seccion = filtrar_por_seccion(ventas_df.copy(), 'codigo_str')
-    stock_seccion = filtrar_por_seccion(stock_df.copy(), 'codigo_str')
+    # Copias filtradas (solo las filas de la sección)
+    compras_seccion = filtrar_por_seccion(compras_df, 'codigo_str')
+    ventas_seccion = filtrar_por_seccion(ventas_df, 'codigo_str')
+    stock_seccion = filtrar_por_seccion(stock_df, 'codigo_str')
     
     print(f"Datos filtrados:")
     print(f"  - Compras: {len(compras_seccion)} registros")
@@ -1707,6 +1772,7 @@ def procesar_seccion(compras_df, ventas_df, stock_df, coste_df, nombre_seccion,
     # GUARDAR ARCHIVO EXCEL
     # =========================================================================
     
+    t = iniciar_tramo('escritura_excel', filas_entrada=df_clasificado, seccion=nombre_seccion)
     nombre_archivo = os.path.join(DIRECTORIO_DATA, f"CLASIFICACION_ABC+D_{nombre_seccion.upper()}_{PERIODO}_{AÑO}.xlsx")
     
     with pd.ExcelWriter(nombre_archivo, engine='openpyxl') as writer:
@@ -1790,6 +1856,7 @@ def procesar_seccion(compras_df, ventas_df, stock_df, coste_df, nombre_seccion,
         aplicar_formato_hoja(ws, df)
     
     wb.save(nombre_archivo)
+    t.terminar()
     
     print(f"\nEnviando email al encargado de la sección...")
     
@@ -1797,7 +1864,8 @@ def procesar_seccion(compras_df, ventas_df, stock_df, coste_df, nombre_seccion,
     periodo_str = f"{FECHA_INICIO.strftime('%d/%m/%Y')} - {FECHA_FIN.strftime('%d/%m/%Y')}"
     
     # Enviar email con el archivo adjunto
-    email_enviado = enviar_email_clasificacion(nombre_seccion, nombre_archivo, periodo_str)
+    with tramo('email', seccion=nombre_seccion):
+        email_enviado = enviar_email_clasificacion(nombre_seccion, nombre_archivo, periodo_str)
     
     # Retornar estadísticas
     return {
@@ -1842,6 +1910,9 @@ def main():
                 argumentos_con_prefijo[arg] = True
                 i += 1
         # Argumentos con prefijo longo (--P3, --2025, --maf)
+        elif arg == '--tienda':
+            # Su valor (el código de la tienda) lo lee configurar_tienda()
+            i += 2
         elif arg.startswith('--'):
             arg_sin_doble_guion = arg[2:]
             # Detectar se é un período (P1, P2, P3, P4)
@@ -1993,6 +2064,15 @@ def main():
     else:
         print(f"MODO: Multi-sección (todas las secciones)")
     
+    # =========================================================================
+    # VALIDACIÓN PREVIA DE LAS ENTRADAS (SOLO ENCABEZADOS)
+    # =========================================================================
+    
+    if not validar_entradas_clasificacion(periodo_seleccionado):
+        print("ERROR: Los ficheros de entrada no tienen las columnas necesarias (ver el log). "
+              "No se ha procesado ningún dato.")
+        sys.exit(1)
+    
     # =========================================================================
     # CARGA DE DATOS DESDE ARCHIVOS CON DATOS DEL AÑO COMPLETO
     # =========================================================================
@@ -2001,16 +2081,22 @@ def main():
     print("FASE 1: CARGA Y EXTRACCIÓN DE DATOS")
     print("=" * 80)
     
+    t = iniciar_tramo('carga')
     try:
-        # Cargar archivos con datos de TODO el año
-        compras_df = pd.read_excel(os.path.join(DIRECTORIO_DATA, 'SPA_compras.xlsx'))
-        ventas_df = pd.read_excel(os.path.join(DIRECTORIO_DATA, 'SPA_ventas.xlsx'))
+        # Cargar archivos con datos de TODO el año (.xlsx o su exportación .csv/.tsv)
+        compras_df = leer_tabla(ruta_entrada('SPA_compras.xlsx', 'compras'))
+        # Con el histórico de ventas activo se leen solo las semanas del período
+        ventas_df = leer_ventas_historico(periodo_seleccionado, año_datos, seccion_especifica)
+        if ventas_df is None:
+            ventas_df = leer_tabla(ruta_entrada('SPA_ventas.xlsx', 'ventas'))
         # El archivo de stock se cargará después de detectar el año
         # El archivo de costes puede llamarse SPA_Coste.xlsx o SPA_coste.xlsx
-        if os.path.exists(os.path.join(DIRECTORIO_DATA, 'SPA_Coste.xlsx')):
-            coste_df = pd.read_excel(os.path.join(DIRECTORIO_DATA, 'SPA_Coste.xlsx'))
-        elif os.path.exists(os.path.join(DIRECTORIO_DATA, 'SPA_coste.xlsx')):
-            coste_df = pd.read_excel(os.path.join(DIRECTORIO_DATA, 'SPA_coste.xlsx'))
+        ruta_coste_mayuscula = resolver_entrada(os.path.join(DIRECTORIO_DATA, 'SPA_Coste.xlsx'))
+        ruta_coste = ruta_entrada('SPA_coste.xlsx', 'coste')
+        if os.path.exists(ruta_coste_mayuscula):
+            coste_df = leer_tabla(ruta_coste_mayuscula)
+        elif os.path.exists(ruta_coste):
+            coste_df = leer_tabla(ruta_coste)
         else:
             raise FileNotFoundError("No se encontró SPA_Coste.xlsx ni SPA_coste.xlsx")
     except FileNotFoundError as e:
@@ -2034,17 +2120,17 @@ def main():
     
     # Determinar el nombre del archivo de stock según el período seleccionado
     # Siempre hay un período seleccionado (ya sea automático o manual)
-    nombre_stock = f'SPA_stock_{periodo_seleccionado}.xlsx'
+    nombre_stock = os.path.basename(resolver_entrada(os.path.join(DIRECTORIO_DATA, f'SPA_stock_{periodo_seleccionado}.xlsx')))
     
     try:
-        stock_df = pd.read_excel(os.path.join(DIRECTORIO_DATA, nombre_stock))
+        stock_df = leer_tabla(os.path.join(DIRECTORIO_DATA, nombre_stock))
     except FileNotFoundError:
         print(f"ADVERTENCIA: No se encontró {nombre_stock}, buscando archivo alternativo...")
         # Buscar cualquier archivo de stock disponible
-        archivos_stock = [f for f in os.listdir(DIRECTORIO_DATA) if f.startswith('SPA_stock') and f.endswith('.xlsx')]
+        archivos_stock = buscar_entradas(DIRECTORIO_DATA, 'SPA_stock')
         if archivos_stock:
-            nombre_stock = archivos_stock[0]
-            stock_df = pd.read_excel(os.path.join(DIRECTORIO_DATA, nombre_stock))
+            nombre_stock = os.path.basename(archivos_stock[0])
+            stock_df = leer_tabla(os.path.join(DIRECTORIO_DATA, nombre_stock))
         else:
             print("ERROR: No se encontró ningún archivo de stock")
             sys.exit(1)
@@ -2061,6 +2147,8 @@ def main():
     print(f"   Fechas: {FECHA_INICIO.strftime('%d de %B de %Y')} - {FECHA_FIN.strftime('%d de %B de %Y')}")
     print(f"   Días: {DIAS_PERIODO}")
     
+    t.terminar(filas_salida=len(compras_df) + len(ventas_df) + len(stock_df) + len(coste_df))
+    
     # =========================================================================
     # FILTRAR DATOS POR PERÍODO (SOLO COMPRAS Y VENTAS)
     # =========================================================================
@@ -2068,6 +2156,7 @@ def main():
     print("\n" + "=" * 80)
     print("FASE 1A: FILTRADO DE DATOS POR PERÍODO")
     print("=" * 80)
+    t = iniciar_tramo('preparacion', filas_entrada=len(compras_df) + len(ventas_df))
     
     # Convertir fechas a datetime si no lo son
     compras_df['Fecha'] = pd.to_datetime(compras_df['Fecha'], errors='coerce')
@@ -2078,7 +2167,7 @@ def main():
     compras_df = compras_df[
         (compras_df['Fecha'] >= FECHA_INICIO) & 
         (compras_df['Fecha'] <= FECHA_FIN)
-    ].copy()
+    ]
     filas_despues_compras = len(compras_df)
     print(f"COMPRAS filtradas por período: {filas_antes_compras} → {filas_despues_compras} registros")
     print(f"   Período: {FECHA_INICIO.strftime('%d/%m/%Y')} - {FECHA_FIN.strftime('%d/%m/%Y')}")
@@ -2088,7 +2177,7 @@ def main():
     ventas_df = ventas_df[
         (ventas_df['Fecha'] >= FECHA_INICIO) & 
         (ventas_df['Fecha'] <= FECHA_FIN)
-    ].copy()
+    ]
     filas_despues_ventas = len(ventas_df)
     print(f"VENTAS filtradas por período: {filas_antes_ventas} → {filas_despues_ventas} registros")
     print(f"   Período: {FECHA_INICIO.strftime('%d/%m/%Y')} - {FECHA_FIN.strftime('%d/%m/%Y')}")
@@ -2124,7 +2213,7 @@ def main():
     
     # Filtrar solo filas de tipo 'Detalle'
     filas_ventas_total = len(ventas_df)
-    ventas_df = ventas_df[ventas_df['Tipo registro'] == 'Detalle'].copy()
+    ventas_df = copia_defensiva(ventas_df[ventas_df['Tipo registro'] == 'Detalle'])
     print(f"VENTAS: {filas_ventas_total} filas totales → {len(ventas_df)} filas de Detalle")
     
     # Normalizar claves de unión en Coste
@@ -2134,11 +2223,11 @@ def main():
         coste_df_sorted = coste_df.sort_values(columna_fecha, ascending=False)
     else:
         print("ADVERTENCIA: No se encontró columna de fecha de última compra, usando orden original")
-        coste_df_sorted = coste_df.copy()
-    coste_df_latest = coste_df_sorted.drop_duplicates(subset=['Artículo', 'Talla', 'Color'], keep='first').copy()
+        coste_df_sorted = copia_defensiva(coste_df)
+    coste_df_latest = coste_df_sorted.drop_duplicates(subset=['Artículo', 'Talla', 'Color'], keep='first')
     
     def normalize_keys(df):
-        df = df.copy()
+        df = copia_defensiva(df)
         df['Artículo'] = df['Artículo'].astype(str).str.replace(r'\.0$', '', regex=True)
         df['Talla'] = df['Talla'].fillna('').astype(str).str.strip()
         df['Color'] = df['Color'].fillna('').astype(str).str.strip()
@@ -2146,7 +2235,7 @@ def main():
     
     def normalize_keys_coste(df):
         """Normalizar claves para el archivo SPA_Coste.xlsx (ya tiene columna 'Artículo')"""
-        df = df.copy()
+        df = copia_defensiva(df)
         df['Artículo'] = df['Artículo'].astype(str).str.replace(r'\.0$', '', regex=True)
         df['Talla'] = df['Talla'].fillna('').astype(str).str.strip()
         df['Color'] = df['Color'].fillna('').astype(str).str.strip()
@@ -2156,7 +2245,7 @@ def main():
     coste_normalized = normalize_keys_coste(coste_df_latest)
     
     # Seleccionar solo las columnas necesarias de coste (ya renombrado a Artículo)
-    coste_for_merge = coste_normalized[['Artículo', 'Talla', 'Color', 'Coste']].copy()
+    coste_for_merge = coste_normalized[['Artículo', 'Talla', 'Color', 'Coste']]
     
     # Merge de ventas con costes
     ventas_with_costs = pd.merge(
@@ -2212,7 +2301,7 @@ def main():
                        'Unidades', 'Precio', 'Importe', 'Comisión', 'Tipo registro',
                        'Coste', 'Beneficio']
     
-    ventas_df = ventas_with_costs[columnas_ventas].copy()
+    ventas_df = copia_defensiva(ventas_with_costs[columnas_ventas])
     
     # Convertir columnas a tipos numéricos correctos
     ventas_df['Unidades'] = pd.to_numeric(ventas_df['Unidades'], errors='coerce').fillna(0)
@@ -2241,7 +2330,7 @@ def main():
     print("=" * 80)
     
     def normalizar_articulo(df):
-        df = df.copy()
+        df = copia_defensiva(df)
         
         def convertir_articulo(valor):
             if pd.isna(valor):
@@ -2281,9 +2370,9 @@ def main():
     stock_filas_antes = len(stock_df)
     
     # Filtrar artículos con códigos menores a 10 dígitos
-    compras_df = compras_df[compras_df['codigo_str'].apply(codigo_valido)].copy()
-    ventas_df = ventas_df[ventas_df['codigo_str'].apply(codigo_valido)].copy()
-    stock_df = stock_df[stock_df['codigo_str'].apply(codigo_valido)].copy()
+    compras_df = compras_df[compras_df['codigo_str'].apply(codigo_valido)]
+    ventas_df = ventas_df[ventas_df['codigo_str'].apply(codigo_valido)]
+    stock_df = stock_df[stock_df['codigo_str'].apply(codigo_valido)]
     
     print(f"\nFiltrados {compras_filas_antes - len(compras_df)} artículos con menos de 10 dígitos en COMPRAS")
     print(f"Filtrados {ventas_filas_antes - len(ventas_df)} artículos con menos de 10 dígitos en VENTAS")
@@ -2297,18 +2386,25 @@ def main():
     ventas_filas_antes = len(ventas_df)
     stock_filas_antes = len(stock_df)
     
-    compras_df = compras_df[compras_df['Unidades'].notna() & (compras_df['Unidades'] > 0)].copy()
-    ventas_df = ventas_df[ventas_df['Unidades'].notna() & (ventas_df['Unidades'] > 0)].copy()
-    stock_df = stock_df[stock_df['Unidades'].notna() & (stock_df['Unidades'] > 0)].copy()
+    compras_df = copia_defensiva(compras_df[compras_df['Unidades'].notna() & (compras_df['Unidades'] > 0)])
+    ventas_df = copia_defensiva(ventas_df[ventas_df['Unidades'].notna() & (ventas_df['Unidades'] > 0)])
+    stock_df = copia_defensiva(stock_df[stock_df['Unidades'].notna() & (stock_df['Unidades'] > 0)])
     
     print(f"\nFiltradas {compras_filas_antes - len(compras_df)} filas con 0 unidades en COMPRAS")
     print(f"Filtradas {ventas_filas_antes - len(ventas_df)} filas con 0 unidades en VENTAS")
     print(f"Filtradas {stock_filas_antes - len(stock_df)} filas con 0 unidades en STOCK")
     
+    # Modo --memoria-reducida: texto repetitivo como category (las claves
+    # normalizadas ya están calculadas y no se modifican por sección)
+    for df in (compras_df, ventas_df, stock_df):
+        reducir_memoria(df)
+    
     # =========================================================================
     # PROCESAR SECCIONES
     # =========================================================================
     
+    t.terminar(filas_salida=len(compras_df) + len(ventas_df))
+    
     print("\n" + "=" * 80)
     print("FASE 3: PROCESAMIENTO DE SECCIONES")
     print("=" * 80)
@@ -2325,10 +2421,12 @@ def main():
     secciones_sin_datos = []
     
     for nombre_seccion, seccion_info in secciones_a_procesar:
-        resultado = procesar_seccion(
-            compras_df, ventas_df, stock_df, coste_df,
-            nombre_seccion, seccion_info
-        )
+        with tramo('procesar_seccion', seccion=nombre_seccion) as t:
+            resultado = procesar_seccion(
+                compras_df, ventas_df, stock_df, coste_df,
+                nombre_seccion, seccion_info
+            )
+            t.filas(salida=resultado['total_articulos'] if resultado else 0)
         
         if resultado:
             estadisticas.append(resultado)
@@ -2398,7 +2496,16 @@ if __name__ == "__main__":
     
     try:
         # Ejecutar el proceso principal
-        main()
+        if '--memoria-reducida' in sys.argv:
+            activar_modo_memoria_reducida()
+        if '--tienda' in sys.argv:
+            indice = sys.argv.index('--tienda') + 1
+            if indice >= len(sys.argv):
+                print("ERROR: --tienda necesita el código de la tienda")
+                sys.exit(1)
+            configurar_tienda(sys.argv[indice])
+        with perfilado('clasificacionABC', activo='--profile' in sys.argv):
+            main()
         logger.info("Proceso de clasificación ABC completado exitosamente.")
     except Exception as e:
         logger.critical(f"Error crítico en el script clasificacionABC: {e}", exc_info=True)
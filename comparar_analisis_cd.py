@@ -18,7 +18,6 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 import glob
 import smtplib
-import ssl
 import os
 import logging
 import traceback
@@ -26,6 +25,9 @@ from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
+from src.transporte_email import transporte_compartido
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo
 from email.utils import formatdate
 
 # Configuración de logging
@@ -55,6 +57,10 @@ except ImportError as e:
 
 # Importar rutas centralizadas
 from src.paths import OUTPUT_DIR, ANALISIS_CATEGORIA_CD_DIR, COMPARACION_CATEGORIA_CD_DIR
+from src.historico_cd import crear_historico_cd
+
+# Número de semanas incluidas en la hoja de tendencia de la comparación
+SEMANAS_TENDENCIA = 8
 
 # ============================================================================
 # CONFIGURACIÓN DE EMAIL
@@ -66,13 +72,8 @@ DESTINATARIOS = [
     {'nombre': 'Sandra', 'email': 'ivan.delgado@viveverde.es'}
 ]
 
-# Configuración del servidor SMTP
-SMTP_CONFIG = {
-    'servidor': 'smtp.serviciodecorreo.es',
-    'puerto': 465,
-    'remitente_email': 'ivan.delgado@viveverde.es',
-    'remitente_nombre': 'Sistema de Pedidos Viveverde'
-}
+# Configuración del servidor SMTP (servidor y remitente desde config/email.json)
+SMTP_CONFIG = obtener_registro().smtp().como_dict_scripts('Sistema de Pedidos Viveverde')
 
 
 # ============================================================================
@@ -149,11 +150,12 @@ Sistema de Pedidos Viveverde."""
             part.add_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             msg.attach(part)
             
-            # Enviar email mediante SSL
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'], context=context) as server:
-                server.login(SMTP_CONFIG['remitente_email'], password)
-                server.sendmail(SMTP_CONFIG['remitente_email'], email_destinatario, msg.as_string())
+            # Enviar email por la sesión SMTP compartida (SSL)
+            transporte = transporte_compartido(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'],
+                                               SMTP_CONFIG['remitente_email'], password)
+            resultado = transporte.enviar(msg, [email_destinatario])
+            if not resultado.enviado:
+                raise smtplib.SMTPException(resultado.error)
             
             print(f"  Email enviado a {nombre_destinatario} ({email_destinatario})")
             emails_enviados += 1
@@ -175,7 +177,7 @@ def extraer_metricas_de_excel(ruta_archivo):
     metricas = {}
     
     try:
-        wb = load_workbook(ruta_archivo, data_only=True)
+        wb = load_workbook(ruta_archivo, read_only=True, data_only=True)
         
         for nombre_hoja in wb.sheetnames:
             ws = wb[nombre_hoja]
@@ -183,24 +185,27 @@ def extraer_metricas_de_excel(ruta_archivo):
             # Buscar la sección de métricas
             metricas_seccion = {}
             
-            # Buscar la fila donde dice "MÉTRICAS DE RESUMEN"
+            # Recorrer la hoja una sola vez: localizar "MÉTRICAS DE RESUMEN"
+            # y leer las 9 filas siguientes
             fila_metricas = None
-            for i, row in enumerate(ws.iter_rows(values_only=True), start=1):
-                if row[0] and "MÉTRICAS DE RESUMEN" in str(row[0]):
-                    fila_metricas = i
+            for i, row in enumerate(ws.iter_rows(max_col=2, values_only=True), start=1):
+                if fila_metricas is None:
+                    if row and row[0] and "MÉTRICAS DE RESUMEN" in str(row[0]):
+                        fila_metricas = i
+                    continue
+                
+                if i >= fila_metricas + 10:
                     break
+                
+                if len(row) >= 2 and row[0] and row[1] is not None:
+                    clave = str(row[0]).strip()
+                    valor = row[1]
+                    metricas_seccion[clave] = valor
             
             if fila_metricas:
-                # Leer las métricas
-                for i in range(fila_metricas + 1, fila_metricas + 10):
-                    row = list(ws.iter_rows(min_row=i, max_row=i, values_only=True))[0]
-                    if row[0] and row[1] is not None:
-                        clave = str(row[0]).strip()
-                        valor = row[1]
-                        metricas_seccion[clave] = valor
-                
                 metricas[nombre_hoja] = metricas_seccion
         
+        wb.close()
         return metricas
     
     except Exception as e:
@@ -271,9 +276,15 @@ def comparar_metricas(metricas_actual, metricas_anterior):
     return comparacion
 
 
-def generar_excel_comparacion(comparacion, archivo_salida):
+def generar_excel_comparacion(comparacion, archivo_salida, serie_tendencia=None):
     """
     Genera un archivo Excel con la comparación.
+    
+    Args:
+        comparacion: Resultado de comparar_metricas
+        archivo_salida: Ruta del Excel a generar
+        serie_tendencia: DataFrame opcional con la serie de métricas de las
+                         últimas semanas (ver HistoricoAnalisisCD.obtener_serie_metricas)
     """
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -413,11 +424,54 @@ def generar_excel_comparacion(comparacion, archivo_salida):
     ws.column_dimensions['E'].width = 15
     ws.column_dimensions['F'].width = 12
     
+    # Hoja de tendencia de las últimas semanas (solo si hay histórico suficiente)
+    if serie_tendencia is not None and not serie_tendencia.empty and serie_tendencia['fecha'].nunique() > 2:
+        generar_hoja_tendencia(wb, serie_tendencia, header_font, header_fill, header_alignment, thin_border)
+    
     # Guardar archivo
     wb.save(archivo_salida)
     return archivo_salida
 
 
+def generar_hoja_tendencia(wb, serie_tendencia, header_font, header_fill, header_alignment, thin_border):
+    """
+    Añade una hoja con la evolución de cada métrica por sección en las últimas semanas.
+    Una fila por (sección, métrica) y una columna por fecha de análisis.
+    """
+    ws = wb.create_sheet(title="TENDENCIA")
+    
+    fechas = sorted(serie_tendencia['fecha'].unique())
+    
+    ws['A1'] = f"TENDENCIA DE ARTÍCULOS C Y D - ÚLTIMAS {len(fechas)} SEMANAS"
+    ws['A1'].font = Font(bold=True, size=14, color="FF008000")
+    
+    headers = ['Sección', 'Métrica'] + [
+        f"S{int(semana):02d} ({datetime.strptime(fecha, '%Y-%m-%d').strftime('%d/%m')})"
+        for fecha, semana in serie_tendencia.drop_duplicates('fecha').sort_values('fecha')[['fecha', 'semana_iso']].itertuples(index=False)
+    ]
+    for col_idx, header in enumerate(headers, start=1):
+        cell = ws.cell(row=3, column=col_idx, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = thin_border
+    
+    tabla = serie_tendencia.pivot_table(
+        index=['seccion', 'metrica'], columns='fecha', values='valor', aggfunc='last', sort=False
+    ).reindex(columns=fechas)
+    
+    for row_idx, ((seccion, metrica), valores) in enumerate(tabla.iterrows(), start=4):
+        ws.cell(row=row_idx, column=1, value=seccion).border = thin_border
+        ws.cell(row=row_idx, column=2, value=metrica).border = thin_border
+        for col_idx, valor in enumerate(valores, start=3):
+            cell = ws.cell(row=row_idx, column=col_idx, value=None if pd.isna(valor) else float(valor))
+            cell.border = thin_border
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+    
+    ws.column_dimensions['A'].width = 25
+    ws.column_dimensions['B'].width = 35
+
+
 def buscar_archivos_analisis():
     """
     Busca automáticamente el archivo más reciente y el anterior.
@@ -496,16 +550,67 @@ def comparar_archivos(archivo_actual=None, archivo_anterior=None, archivo_salida
     
     # Extraer métricas
     print("\n📥 Extrayendo métricas...")
-    metricas_actual = extraer_metricas_de_excel(archivo_actual)
-    metricas_anterior = extraer_metricas_de_excel(archivo_anterior)
+    with tramo('carga', origen='excel'):
+        metricas_actual = extraer_metricas_de_excel(archivo_actual)
+        metricas_anterior = extraer_metricas_de_excel(archivo_anterior)
     
     if metricas_actual is None or metricas_anterior is None:
         print("❌ Error al leer los archivos")
         return None
     
+    return generar_comparacion(metricas_actual, metricas_anterior, archivo_salida)
+
+
+def comparar_desde_historico(fecha_actual=None, archivo_salida=None, n_semanas_tendencia=SEMANAS_TENDENCIA):
+    """
+    Compara el análisis de la fecha indicada (por defecto, el último registrado)
+    con el anterior usando el histórico de métricas, sin abrir los Excel.
+    
+    Returns:
+        Ruta del archivo de comparación, o None si el histórico no tiene
+        al menos dos ejecuciones para comparar
+    """
+    print("=" * 60)
+    print("COMPARANDO ANÁLISIS DE ARTÍCULOS C Y D (HISTÓRICO)")
+    print("=" * 60)
+    
+    try:
+        historico = crear_historico_cd()
+        ejecucion_actual = historico.obtener_ejecucion(fecha_actual)
+        if ejecucion_actual is None:
+            print("⚠️ La ejecución actual no está registrada en el histórico")
+            return None
+        
+        fecha_ref = datetime.strptime(ejecucion_actual['fecha'], '%Y-%m-%d')
+        ejecucion_anterior = historico.obtener_ejecucion_anterior(fecha_ref)
+        if ejecucion_anterior is None:
+            print("⚠️ No hay ejecuciones anteriores en el histórico para comparar")
+            return None
+        
+        print(f"\n📊 Análisis actual: {ejecucion_actual['fecha']} (semana {ejecucion_actual['semana_iso']})")
+        print(f"📊 Análisis anterior: {ejecucion_anterior['fecha']} (semana {ejecucion_anterior['semana_iso']})")
+        
+        with tramo('carga', origen='historico') as t:
+            metricas_actual = historico.obtener_metricas(ejecucion_actual['id_ejecucion'])
+            metricas_anterior = historico.obtener_metricas(ejecucion_anterior['id_ejecucion'])
+            serie_tendencia = historico.obtener_serie_metricas(n_semanas_tendencia, hasta=fecha_ref)
+            t.filas(salida=serie_tendencia)
+    except Exception as e:
+        print(f"⚠️ No se pudo consultar el histórico: {e}")
+        return None
+    
+    return generar_comparacion(metricas_actual, metricas_anterior, archivo_salida, serie_tendencia)
+
+
+def generar_comparacion(metricas_actual, metricas_anterior, archivo_salida=None, serie_tendencia=None):
+    """
+    Compara dos conjuntos de métricas {seccion: {metrica: valor}}, genera el
+    Excel de comparación y muestra el resumen en consola.
+    """
     # Comparar métricas
     print("📊 Comparando métricas...")
-    comparacion = comparar_metricas(metricas_actual, metricas_anterior)
+    with tramo('metricas', filas_entrada=metricas_actual):
+        comparacion = comparar_metricas(metricas_actual, metricas_anterior)
     
     # Generar archivo Excel
     if archivo_salida is None:
@@ -513,7 +618,8 @@ def comparar_archivos(archivo_actual=None, archivo_anterior=None, archivo_salida
         archivo_salida = COMPARACION_CATEGORIA_CD_DIR / f"Comparacion_Categorias_C_y_D_{fecha}.xlsx"
     
     print(f"\n📝 Generando archivo de comparación: {archivo_salida}")
-    generar_excel_comparacion(comparacion, archivo_salida)
+    with tramo('escritura_excel', filas_entrada=comparacion):
+        generar_excel_comparacion(comparacion, archivo_salida, serie_tendencia)
     
     # Mostrar resumen en consola
     print("\n" + "=" * 60)
@@ -575,64 +681,79 @@ if __name__ == "__main__":
     import sys
     from src.date_utils import get_periodo_y_año_dinamico
     
-    # Verificar si se proporcionan argumentos
-    if len(sys.argv) >= 3:
-        # Modo manual: usar los argumentos proporcionados
-        archivo_actual = sys.argv[1]
-        archivo_anterior = sys.argv[2]
-        archivo_salida = sys.argv[3] if len(sys.argv) > 3 else None
-    else:
-        # Modo automático: buscar los archivos más recientes
-        print("🔍 Modo automático: buscando archivos...")
-        archivo_actual, archivo_anterior = buscar_archivos_analisis()
-        archivo_salida = None
+    # --profile no es un argumento posicional
+    perfilar = '--profile' in sys.argv
+    if perfilar:
+        sys.argv.remove('--profile')
+    
+    with perfilado('comparar_analisis_cd', activo=perfilar):
+        # Verificar si se proporcionan argumentos
+        if len(sys.argv) >= 3:
+            # Modo manual: usar los argumentos proporcionados
+            archivo_actual = sys.argv[1]
+            archivo_anterior = sys.argv[2]
+            archivo_salida = sys.argv[3] if len(sys.argv) > 3 else None
+        else:
+            # Modo automático: usar el histórico de métricas o, si no hay
+            # suficientes ejecuciones registradas, los archivos más recientes
+            print("🔍 Modo automático: consultando histórico...")
+            archivo_actual, archivo_anterior = None, None
+            archivo_salida = comparar_desde_historico()
         
-        if archivo_actual is None or archivo_anterior is None:
-            print("\nUso (manual):")
-            print("  python comparar_analisis_cd.py <archivo_actual> <archivo_anterior> [archivo_salida]")
-            print("\nEjemplo:")
-            print("  python comparar_analisis_cd.py Analisis_Categorias_C_y_D_21022026.xlsx Analisis_Categorias_C_y_D_13022026.xlsx")
-            sys.exit(1)
+            if archivo_salida is None:
+                print("🔍 Buscando archivos...")
+                archivo_actual, archivo_anterior = buscar_archivos_analisis()
+        
+            if archivo_salida is None and (archivo_actual is None or archivo_anterior is None):
+                print("\nUso (manual):")
+                print("  python comparar_analisis_cd.py <archivo_actual> <archivo_anterior> [archivo_salida]")
+                print("\nEjemplo:")
+                print("  python comparar_analisis_cd.py Analisis_Categorias_C_y_D_21022026.xlsx Analisis_Categorias_C_y_D_13022026.xlsx")
+                sys.exit(1)
     
-    try:
-        resultado = comparar_archivos(archivo_actual, archivo_anterior, archivo_salida)
-        if resultado:
-            print(f"\n✅ Comparación completada: {resultado}")
+        try:
+            if archivo_actual is None and archivo_salida is not None:
+                resultado = archivo_salida
+            else:
+                resultado = comparar_archivos(archivo_actual, archivo_anterior, archivo_salida)
+            if resultado:
+                print(f"\n✅ Comparación completada: {resultado}")
             
-            # Obtener período para el email
-            try:
-                datos_dinamicos = get_periodo_y_año_dinamico(tipo_calculo="actual")
-                periodo = f"{datos_dinamicos['periodo']}_{datos_dinamicos['año']}"
-            except:
-                periodo = datetime.now().strftime("%m%Y")
+                # Obtener período para el email
+                try:
+                    datos_dinamicos = get_periodo_y_año_dinamico(tipo_calculo="actual")
+                    periodo = f"{datos_dinamicos['periodo']}_{datos_dinamicos['año']}"
+                except:
+                    periodo = datetime.now().strftime("%m%Y")
             
-            # Enviar email con el informe adjunto
-            print("\n" + "=" * 60)
-            print("ENVIANDO EMAIL")
-            print("=" * 60)
+                # Enviar email con el informe adjunto
+                print("\n" + "=" * 60)
+                print("ENVIANDO EMAIL")
+                print("=" * 60)
             
-            email_enviado = enviar_email_informe(resultado, periodo)
+                with tramo('email'):
+                    email_enviado = enviar_email_informe(resultado, periodo)
             
-            if email_enviado:
-                print(f"\n📧 Email enviado a los destinatarios: Ivan y Sandra")
+                if email_enviado:
+                    print(f"\n📧 Email enviado a los destinatarios: Ivan y Sandra")
             
-            logger.info("Proceso de comparación de análisis C y D completado exitosamente.")
-    except Exception as e:
-        logger.critical(f"Error crítico en el script comparar_analisis_cd: {e}", exc_info=True)
-        if alert_service:
-            alert_service.reportar_error("ERROR_EJECUCION", {
-                "script": "comparar_analisis_cd",
-                "error": str(e),
-                "traceback": traceback.format_exc()
-            })
-        print(f"\n❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
-    finally:
-        # Enviar resumen de alertas si el servicio está disponible
-        if alert_service:
-            try:
-                alert_service.enviar_resumen_alertas("comparar_analisis_cd")
-            except Exception as e:
-                logger.error(f"Error al enviar resumen de alertas: {e}")
+                logger.info("Proceso de comparación de análisis C y D completado exitosamente.")
+        except Exception as e:
+            logger.critical(f"Error crítico en el script comparar_analisis_cd: {e}", exc_info=True)
+            if alert_service:
+                alert_service.reportar_error("ERROR_EJECUCION", {
+                    "script": "comparar_analisis_cd",
+                    "error": str(e),
+                    "traceback": traceback.format_exc()
+                })
+            print(f"\n❌ Error: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+        finally:
+            # Enviar resumen de alertas si el servicio está disponible
+            if alert_service:
+                try:
+                    alert_service.enviar_resumen_alertas("comparar_analisis_cd")
+                except Exception as e:
+                    logger.error(f"Error al enviar resumen de alertas: {e}")
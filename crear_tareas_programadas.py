@@ -1,6 +1,10 @@
 """
 Script para crear tareas programadas en Windows
 Ejecuta main.py, clasificacionABC.py, PRESENTACION.py e INFORME.py en fechas específicas
+
+Con --pipeline crea en su lugar una única tarea semanal que ejecuta
+pipeline_semanal.py (todos los scripts en un proceso, ver src/orquestador.py).
+En Linux, usar `python pipeline_semanal.py --instalar-cron`.
 """
 
 import subprocess
@@ -427,6 +431,29 @@ def crear_tareas_informes_adicionales():
     )
 
 
+def crear_tarea_pipeline():
+    """
+    Crea una única tarea semanal para pipeline_semanal.py, que sustituye a las
+    tareas independientes de main.py, informes adicionales, clasificación ABC,
+    PRESENTACION e INFORME (el pipeline decide qué pasos tocan cada semana).
+    """
+    print("\n" + "-"*60)
+    print("Creando tarea para PIPELINE_SEMANAL.PY")
+    print("-"*60)
+    
+    crear_tarea_semanal(
+        nombre_tarea="Vivero_Pipeline_Semanal",
+        nombre_script="pipeline_semanal.py",
+        parametros="",
+        dia_semana="THU",
+        hora=21,
+        minuto=0
+    )
+    
+    print("\nSi existían, elimina las tareas independientes (eliminar_todas_las_tareas)")
+    print("para que los scripts no se ejecuten dos veces.")
+
+
 def crear_todas_las_tareas():
     """Crea todas las tareas programadas"""
     print("\n" + "="*60)
@@ -628,5 +655,7 @@ if __name__ == "__main__":
     # Si se pasa el argumento --auto, crea las tareas sin preguntar
     if len(sys.argv) > 1 and sys.argv[1] == "--auto":
         crear_todas_las_tareas()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--pipeline":
+        crear_tarea_pipeline()
     else:
         main()
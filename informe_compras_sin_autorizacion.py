@@ -21,34 +21,40 @@ Los errores y advertencias se enviarán por email automáticamente.
 
 Estructura de datos de entrada:
 - SPA_stock_actual.xlsx (stock actual)
-- SPA_stock_semana_{fecha}.xlsx (stock semanal guardado, en stocks_semanales/)
+- stock_{año}_S{semana}.npz (snapshot semanal de stock, en stocks_semanales/)
 - Pedido_Semana_{semana}_{sección}.xlsx (pedidos semanales)
 
 Estructura de datos de salida:
 - Excel con 11 hojas (una por sección)
-- Archivo de stock semanal guardado para uso futuro
+- Snapshot del stock de la semana en el archivo semanal de stock
 
 Autor: Sistema de Pedidos VIVEVERDE
 Fecha: 2026-02-28
 """
 
 import pandas as pd
-import json
 import os
+import sys
 import re
 from datetime import datetime
 from pathlib import Path
-from src.paths import INPUT_DIR, OUTPUT_DIR, HISTORICO_COMPRAS_SIN_PEDIDO, COMPRAS_SIN_AUTORIZACION_DIR, PEDIDOS_SEMANALES_DIR
+from src.paths import INPUT_DIR, OUTPUT_DIR, HISTORICO_COMPRAS_SIN_PEDIDO_DIR, COMPRAS_SIN_AUTORIZACION_DIR, PEDIDOS_SEMANALES_DIR
+from src.auditoria_compras import crear_motor_auditoria
+from src.archivo_stock import crear_archivo_stock
+from src.historico_compras import crear_historico_compras
+from src.lectura_entradas import leer_tabla, resolver_entrada
 import glob
 import warnings
 import smtplib
-import ssl
 import logging
 import traceback
 from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
+from src.transporte_email import transporte_compartido
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo
 from email.utils import formatdate
 
 # Ignorar warnings de openpyxl
@@ -86,7 +92,7 @@ DATA_INPUT_PATH = INPUT_DIR
 DATA_OUTPUT_PATH = COMPRAS_SIN_AUTORIZACION_DIR
 # Directorio donde están los pedidos semanales
 PEDIDOS_DIR = PEDIDOS_SEMANALES_DIR
-HISTORY_FILE = HISTORICO_COMPRAS_SIN_PEDIDO
+HISTORY_DIR = HISTORICO_COMPRAS_SIN_PEDIDO_DIR
 
 # Secciones del sistema
 SECCIONES = [
@@ -116,13 +122,8 @@ DESTINATARIOS = [
     {'nombre': 'Sandra', 'email': 'ivan.delgado@viveverde.es'}
 ]
 
-# Configuración del servidor SMTP
-SMTP_CONFIG = {
-    'servidor': 'smtp.serviciodecorreo.es',
-    'puerto': 465,
-    'remitente_email': 'ivan.delgado@viveverde.es',
-    'remitente_nombre': 'Sistema de Pedidos Viveverde'
-}
+# Configuración del servidor SMTP (servidor y remitente desde config/email.json)
+SMTP_CONFIG = obtener_registro().smtp().como_dict_scripts('Sistema de Pedidos Viveverde')
 
 
 # ============================================================================
@@ -226,11 +227,12 @@ Sistema de Pedidos Viveverde."""
             part.add_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             msg.attach(part)
             
-            # Enviar email mediante SSL
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'], context=context) as server:
-                server.login(SMTP_CONFIG['remitente_email'], password)
-                server.sendmail(SMTP_CONFIG['remitente_email'], email_destinatario, msg.as_string())
+            # Enviar email por la sesión SMTP compartida (SSL)
+            transporte = transporte_compartido(SMTP_CONFIG['servidor'], SMTP_CONFIG['puerto'],
+                                               SMTP_CONFIG['remitente_email'], password)
+            resultado = transporte.enviar(msg, [email_destinatario])
+            if not resultado.enviado:
+                raise smtplib.SMTPException(resultado.error)
             
             print(f"  Email enviado a {nombre_destinatario} ({email_destinatario})")
             emails_enviados += 1
@@ -288,9 +290,9 @@ def cargar_stock_historico():
     dfs = []
     
     for periodo in PERIODOS:
-        archivo = DATA_INPUT_PATH / f"SPA_stock_{periodo}.xlsx"
+        archivo = resolver_entrada(DATA_INPUT_PATH / f"SPA_stock_{periodo}.xlsx")
         if archivo.exists():
-            df = pd.read_excel(archivo)
+            df = leer_tabla(archivo)
             # Rellenar celdas en blanco hacia abajo para Artículo y Nombre
             df = fill_forward_blank_cells(df, ['Artículo', 'Nombre artículo'])
             df['Periodo'] = periodo
@@ -306,9 +308,9 @@ def cargar_stock_actual():
     """
     Carga el archivo de stock actual.
     """
-    archivo = DATA_INPUT_PATH / "SPA_stock_actual.xlsx"
+    archivo = resolver_entrada(DATA_INPUT_PATH / "SPA_stock_actual.xlsx")
     if archivo.exists():
-        df = pd.read_excel(archivo)
+        df = leer_tabla(archivo)
         # Rellenar celdas en blanco hacia abajo para Artículo y Nombre
         df = fill_forward_blank_cells(df, ['Artículo', 'Nombre artículo'])
         print(f"  - Cargado: {archivo.name}")
@@ -427,76 +429,68 @@ def cargar_pedido_semana_anterior(seccion):
 
 def cargar_stock_semana_anterior():
     """
-    Carga el archivo de stock de la semana anterior.
+    Carga el stock de la semana anterior desde el archivo semanal de stock
+    (data/stocks_semanales), es decir, el último snapshot guardado en una
+    semana ISO anterior a la actual.
     
-    Busca el archivo SPA_stock_semana_anterior.xlsx en el directorio data/input.
-    Si no existe, usa el archivo P más antiguo disponible como referencia.
+    Mientras el archivo no tenga semanas anteriores se usa la copia heredada
+    SPA_stock_semana_anterior.xlsx de data/input, si existe.
     
     Returns:
         DataFrame con los artículos del stock de la semana anterior
     """
-    # Buscar el archivo固定 SPA_stock_semana_anterior.xlsx en data/input
-    archivo_stock_semana_anterior = DATA_INPUT_PATH / "SPA_stock_semana_anterior.xlsx"
+    archivo_stock = crear_archivo_stock()
+    semana = archivo_stock.semana_anterior()
+    
+    if semana is not None:
+        df = archivo_stock.stock_en_semana(semana)
+        print(f"  - Cargado stock semana anterior: snapshot {semana[0]}-W{semana[1]:02d}")
+        return df
+    
+    archivo_stock_semana_anterior = resolver_entrada(DATA_INPUT_PATH / "SPA_stock_semana_anterior.xlsx")
     
     if archivo_stock_semana_anterior.exists():
         try:
-            df = pd.read_excel(archivo_stock_semana_anterior)
+            df = leer_tabla(archivo_stock_semana_anterior)
             df = fill_forward_blank_cells(df, ['Artículo', 'Nombre artículo'])
             print(f"  - Cargado stock semana anterior: {archivo_stock_semana_anterior.name}")
             return df
         except Exception as e:
             print(f"  AVISO: Error al cargar stock semana anterior: {e}")
     
-    # Si no hay stock de semana anterior, usar el archivo P más antiguo disponible como referencia
-    # (esto es un fallback - idealmente debería haber un stock de semana anterior guardado)
-    print("  AVISO: No se encontró SPA_stock_semana_anterior.xlsx. Usando archivo P más antiguo como referencia.")
-    
-    for periodo in ["P1", "P2", "P3", "P4"]:
-        archivo = DATA_INPUT_PATH / f"SPA_stock_{periodo}.xlsx"
-        if archivo.exists():
-            try:
-                df = pd.read_excel(archivo)
-                df = fill_forward_blank_cells(df, ['Artículo', 'Nombre artículo'])
-                df['Periodo'] = periodo
-                print(f"  - Cargado stock histórico ({periodo}): {archivo.name}")
-                return df
-            except Exception as e:
-                print(f"  AVISO: Error al cargar {archivo.name}: {e}")
-                continue
-    
-    print("  ERROR: No se encontró ningún archivo de stock histórico")
+    print("  AVISO: No hay snapshot de stock de semanas anteriores")
     return pd.DataFrame()
 
 
-def guardar_stock_semana_actual():
+def guardar_stock_semana_actual(stock_actual=None):
     """
-    Guarda una copia del stock actual como SPA_stock_semana_anterior.xlsx en data/input.
-    Esto permite tener un registro del stock al final de cada semana para
-    compararlo en la próxima ejecución. Se sobrescribe en cada ejecución.
+    Guarda el stock actual en el archivo semanal de stock (data/stocks_semanales)
+    como snapshot de la semana ISO en curso, para compararlo en la próxima
+    ejecución. Si la semana ya estaba guardada se sustituye.
+    
+    Args:
+        stock_actual: Stock ya cargado (p. ej. por el motor de auditoría); si no
+            se indica se lee SPA_stock_actual.xlsx
     
     Returns:
-        str: Ruta del archivo guardado o None si falló
+        str: Ruta del snapshot guardado o None si falló
     """
     try:
         # Cargar stock actual
-        stock_actual = cargar_stock_actual()
+        if stock_actual is None:
+            stock_actual = cargar_stock_actual()
         
         if stock_actual.empty:
             print("  AVISO: No hay stock actual para guardar")
             return None
         
-        # Nombre固定 para el archivo de stock de semana anterior (en data/input)
-        nombre_archivo = "SPA_stock_semana_anterior.xlsx"
-        archivo_destino = DATA_INPUT_PATH / nombre_archivo
-        
-        # Guardar archivo (se sobrescribe en cada ejecución)
-        stock_actual.to_excel(archivo_destino, index=False)
-        print(f"  - Stock semana anterior guardado: {nombre_archivo}")
+        archivo_destino = crear_archivo_stock().guardar_semana(stock_actual)
+        print(f"  - Stock semanal guardado: {archivo_destino.name}")
         
         return str(archivo_destino)
     
     except Exception as e:
-        print(f"  ERROR al guardar stock semana anterior: {e}")
+        print(f"  ERROR al guardar stock semanal: {e}")
         return None
 
 
@@ -587,58 +581,33 @@ def crear_clave_articulo(articulo, talla, color):
     return f"{articulo_norm}_{talla}_{color}"
 
 
-def cargar_historico_json():
+def registrar_historico(resultados_por_seccion):
     """
-    Carga el archivo JSON con el histórico de compras sin pedido.
-    Estructura: {seccion: {articulo_clave: {stock: float, fecha_actualizacion: str}}}
+    Registra las compras sin pedido de esta semana en el histórico semanal
+    (data/historico_compras_sin_pedido). Solo se escribe la partición de la
+    semana actual; las semanas anteriores no se leen ni se reescriben.
     
-    Nota: Si existe un archivo con estructura antigua (solo fechas), lo migra automáticamente.
+    Returns:
+        str: Ruta de la partición escrita o None si falló
     """
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Detectar si es la estructura antigua (sin stock)
-        # Estructura antigua: {seccion: {articulo: {fecha_deteccion: date}}}
-        # Estructura nueva: {seccion: {articulo: {stock: float, fecha_actualizacion: date}}}
-        first_key = list(data.keys())[0] if data else None
-        if first_key and first_key in SECCIONES:
-            first_item = list(data[first_key].values())[0] if data[first_key] else {}
-            if isinstance(first_item, dict) and 'stock' not in first_item:
-                print("  - Migrando estructura antigua del JSON a nueva estructura...")
-                # Migrar estructura antigua a nueva
-                nueva_data = {}
-                for seccion, articulos in data.items():
-                    nueva_data[seccion] = {}
-                    if isinstance(articulos, dict):
-                        for articulo, info in articulos.items():
-                            if isinstance(info, dict):
-                                nueva_data[seccion][articulo] = {
-                                    'stock': 0,
-                                    'fecha_actualizacion': info.get('fecha_deteccion', datetime.now().strftime('%Y-%m-%d'))
-                                }
-                            else:
-                                # Si el valor no es un dict, inicializar con stock 0
-                                nueva_data[seccion][articulo] = {
-                                    'stock': 0,
-                                    'fecha_actualizacion': datetime.now().strftime('%Y-%m-%d')
-                                }
-                return nueva_data
-        
-        return data
-    return {}
+    try:
+        ruta = crear_historico_compras().registrar_semana(resultados_por_seccion)
+        print(f"  - Histórico actualizado: {ruta.name}")
+        return str(ruta)
+    except Exception as e:
+        print(f"  ERROR al actualizar el histórico de compras sin pedido: {e}")
+        return None
 
 
-def guardar_historico_json(datos):
+def crear_motor():
     """
-    Guarda el histórico en el archivo JSON.
+    Crea el motor de auditoría que carga stock actual, stock de la semana
+    anterior y pedidos de la semana anterior de todas las secciones una sola vez.
     """
-    with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(datos, f, indent=2, ensure_ascii=False)
-    print(f"  - Historico actualizado: {HISTORY_FILE.name}")
+    return crear_motor_auditoria(SECCIONES, SECCION_PREFIX, DATA_INPUT_PATH, PEDIDOS_DIR)
 
 
-def identificar_compras_sin_pedido(seccion):
+def identificar_compras_sin_pedido(seccion, motor=None):
     """
     Identifica los artículos comprados sin estar en el pedido para una sección.
     
@@ -653,125 +622,22 @@ def identificar_compras_sin_pedido(seccion):
       NO incluido (ya existía antes, no es compra reciente)
     - Si el artículo NO está en pedido_semana_anterior Y NO está en stock_semana_anterior → 
       SÍ incluido (comprado sin autorización en esta semana)
+    
+    El cálculo se hace para todas las secciones a la vez en el motor de
+    auditoría; pasar el mismo motor en cada llamada evita recargar los ficheros.
     """
     print(f"\nProcesando sección: {seccion}")
     
-    # Cargar datos
-    print("  Cargando archivos...")
-    stock_actual = cargar_stock_actual()
-    pedido_semana_anterior = cargar_pedido_semana_anterior(seccion)
-    stock_semana_anterior = cargar_stock_semana_anterior()
+    if motor is None:
+        motor = crear_motor()
     
-    if stock_actual.empty:
-        print(f"  - No hay stock actual para {seccion}")
-        return pd.DataFrame()
+    df_resultados = motor.compras_sin_pedido_por_seccion().get(seccion, pd.DataFrame())
     
-    # Normalizar columnas
-    stock_actual = normalizar_columnas(stock_actual, tipo='stock')
-    pedido_semana_anterior = normalizar_columnas(pedido_semana_anterior, tipo='pedido')
-    stock_semana_anterior = normalizar_columnas(stock_semana_anterior, tipo='stock')
-    
-    # ============================================================
-    # Paso 1: Obtener artículos autorizados (pedido semana anterior)
-    # ============================================================
-    if not pedido_semana_anterior.empty and 'Artículo' in pedido_semana_anterior.columns:
-        # Crear clave única para pedido
-        pedido_semana_anterior['clave'] = pedido_semana_anterior.apply(
-            lambda x: crear_clave_articulo(
-                str(x.get('Artículo', '')), 
-                str(x.get('Talla', '')), 
-                str(x.get('Color', ''))
-            ), axis=1
-        )
-        articulos_autorizados = set(pedido_semana_anterior['clave'].dropna())
-        print(f"  - Artículos autorizados (pedido semana anterior): {len(articulos_autorizados)}")
-    else:
-        articulos_autorizados = set()
-        print(f"  - No se encontró pedido de semana anterior (0 artículos autorizados)")
-    
-    # ============================================================
-    # Paso 2: Obtener artículos que existían la semana pasada
-    # ============================================================
-    if not stock_semana_anterior.empty and 'Artículo' in stock_semana_anterior.columns:
-        # Crear clave única para stock semana anterior
-        stock_semana_anterior['clave'] = stock_semana_anterior.apply(
-            lambda x: crear_clave_articulo(
-                str(x.get('Artículo', '')), 
-                str(x.get('Talla', '')), 
-                str(x.get('Color', ''))
-            ), axis=1
-        )
-        articulos_stock_semana_anterior = set(stock_semana_anterior['clave'].dropna())
-        print(f"  - Artículos en stock semana anterior: {len(articulos_stock_semana_anterior)}")
-    else:
-        articulos_stock_semana_anterior = set()
-        print(f"  - No se encontró stock de semana anterior (0 artículos)")
-    
-    # ============================================================
-    # Paso 3: Procesar stock actual y aplicar lógica de comparación
-    # ============================================================
-    if 'Artículo' in stock_actual.columns:
-        # Crear clave única para stock actual
-        stock_actual['clave'] = stock_actual.apply(
-            lambda x: crear_clave_articulo(
-                str(x.get('Artículo', '')), 
-                str(x.get('Talla', '')), 
-                str(x.get('Color', ''))
-            ), axis=1
-        )
-        
-        # Filtrar: solo artículos con stock > 0
-        stock_con_stock = stock_actual[stock_actual['Stock'].fillna(0) > 0].copy()
-        
-        # Aplicar la lógica de comparación según el flujo especificado:
-        # 1. Si está en pedido_semana_anterior → NO incluir (autorizado)
-        # 2. Si NO está en pedido Y SÍ está en stock_semana_anterior → NO incluir (ya existía)
-        # 3. Si NO está en pedido Y NO está en stock_semana_anterior → SÍ incluir (compra sin autorización)
-        
-        resultados = []
-        
-        for idx, row in stock_con_stock.iterrows():
-            clave = row['clave']
-            stock_actual_val = float(row.get('Stock', 0))
-            
-            # Opción 1: ¿El artículo está en el pedido de la semana anterior?
-            if clave in articulos_autorizados:
-                # Artículo autorizado - NO incluir en el informe
-                continue
-            
-            # Opción 2: ¿El artículo NO está en pedido pero SÍ existía la semana pasada?
-            if clave in articulos_stock_semana_anterior:
-                # El artículo ya existía antes - NO incluir en el informe
-                continue
-            
-            # Opción 3: El artículo NO está en pedido Y NO estaba en stock semana anterior
-            # → ES UNA COMPRA SIN AUTORIZACIÓN - SÍ incluir
-            resultados.append({
-                'Artículo': row.get('Artículo', ''),
-                'Nombre Artículo': row.get('Nombre Artículo', ''),
-                'Talla': row.get('Talla', ''),
-                'Color': row.get('Color', ''),
-                'Stock': stock_actual_val
-            })
-        
-        # Filtrar también por prefijo de sección para asegurar que
-        # solojamos artículos que pertenecen a esta sección
-        if resultados:
-            df_resultados = pd.DataFrame(resultados)
-            df_resultados = df_resultados[
-                df_resultados['Artículo'].apply(lambda x: es_articulo_de_seccion(x, seccion))
-            ]
-            
-            if not df_resultados.empty:
-                print(f"  - Encontrados {len(df_resultados)} artículos comprados sin autorización")
-                return df_resultados
-            else:
-                print(f"  - No hay compras sin autorización para {seccion}")
-                return pd.DataFrame()
-        else:
-            print(f"  - No hay compras sin autorización para {seccion}")
-            return pd.DataFrame()
+    if not df_resultados.empty:
+        print(f"  - Encontrados {len(df_resultados)} artículos comprados sin autorización")
+        return df_resultados
     
+    print(f"  - No hay compras sin autorización para {seccion}")
     return pd.DataFrame()
 
 
@@ -868,18 +734,22 @@ def main():
     # Verificar que existen los archivos necesarios
     print("\nVerificando archivos de entrada...")
     
-    stock_actual = DATA_INPUT_PATH / "SPA_stock_actual.xlsx"
+    stock_actual = resolver_entrada(DATA_INPUT_PATH / "SPA_stock_actual.xlsx")
     if not stock_actual.exists():
         print(f"ERROR: No se encuentra el archivo: {stock_actual}")
         return
     
     print(f"  - {stock_actual.name} ✓")
     
-    # Procesar cada sección
+    # Cargar los datos una sola vez y procesar cada sección
+    with tramo('carga'):
+        motor = crear_motor()
     resultados_por_seccion = {}
     
     for seccion in SECCIONES:
-        df_resultado = identificar_compras_sin_pedido(seccion)
+        with tramo('procesar_seccion', seccion=seccion) as t:
+            df_resultado = identificar_compras_sin_pedido(seccion, motor)
+            t.filas(salida=df_resultado)
         resultados_por_seccion[seccion] = df_resultado
     
     # Generar informe Excel
@@ -887,7 +757,8 @@ def main():
     print("GENERANDO INFORME EXCEL")
     print("=" * 60)
     
-    output_file = generar_informe_excel(resultados_por_seccion)
+    with tramo('escritura_excel', filas_entrada=sum(len(df) for df in resultados_por_seccion.values())):
+        output_file = generar_informe_excel(resultados_por_seccion)
     
     # Extraer la semana del nombre del archivo de pedido más reciente
     semana = obtener_semana_desde_archivos()
@@ -897,19 +768,22 @@ def main():
     print("ENVIANDO EMAIL")
     print("=" * 60)
     
-    email_enviado = enviar_email_informe(output_file, semana)
+    with tramo('email'):
+        email_enviado = enviar_email_informe(output_file, semana)
     
-    # Guardar stock actual para uso en próximas ejecuciones
+    # Guardar stock actual y compras de la semana para próximas ejecuciones
     print("\n" + "=" * 60)
-    print("GUARDANDO STOCK SEMANAL")
+    print("GUARDANDO STOCK SEMANAL E HISTÓRICO")
     print("=" * 60)
-    guardar_stock_semana_actual()
+    with tramo('historico'):
+        guardar_stock_semana_actual(motor.stock_actual)
+        registrar_historico(resultados_por_seccion)
     
     print("\n" + "=" * 60)
     print("PROCESO COMPLETADO")
     print("=" * 60)
     print(f"Archivo de salida: {output_file}")
-    print(f"Histórico guardado en: {HISTORY_FILE}")
+    print(f"Histórico guardado en: {HISTORY_DIR}")
     if email_enviado:
         print(f"Email enviado a los destinatarios: Ivan y Sandra")
 
@@ -935,7 +809,8 @@ if __name__ == "__main__":
     
     try:
         # Ejecutar el proceso principal
-        main()
+        with perfilado('informe_compras_sin_autorizacion', activo='--profile' in sys.argv):
+            main()
         logger.info("Proceso de informe de compras sin autorización completado exitosamente.")
     except Exception as e:
         logger.critical(f"Error crítico en el script informe_compras_sin_autorizacion: {e}", exc_info=True)
@@ -6,45 +6,33 @@ Autor: Sistema de Pedidos Viveverde V2
 Fecha: 2026-02-05 (Actualizado con correcciones de bugs de email)
 """
 
+from __future__ import annotations
+
 import sys
 import os
 import json
 import logging
 import argparse
 import unicodedata
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, TYPE_CHECKING
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.paths import INPUT_DIR, OUTPUT_DIR, PEDIDOS_SEMANALES_DIR, RESUMENES_DIR
-from src.data_loader import DataLoader
+from src.paths import INPUT_DIR, OUTPUT_DIR, PEDIDOS_SEMANALES_DIR, RESUMENES_DIR, directorio_config
+from src.registro_config import obtener_registro
+from src.perfilado import perfilado, tramo, iniciar_tramo
 from src.state_manager import StateManager
-from src.forecast_engine import ForecastEngine
-from src.order_generator import OrderGenerator
 from src.scheduler_service import SchedulerService, EstadoEjecucion
+from src.tiendas import Tienda, cargar_tiendas, config_tienda, etiqueta_tienda
 
-from src.correction_data_loader import CorrectionDataLoader
-from src.correction_engine import CorrectionEngine, crear_correction_engine
-from src.correction_data_loader import (
-    encontrar_archivo_semana_anterior,
-    leer_archivo_ventas_reales,
-    leer_archivo_ventas_semana,
-    leer_archivo_stock_actual,
-    normalizar_datos_historicos,
-    fusionar_datos_tendencia
-)
-
-from src.email_service import EmailService, crear_email_service
-from src.alert_service import (
-    iniciar_sistema_alertas,
-    crear_alert_service,
-    AlertLoggingHandler,
-    configurar_excepthook
-)
-
-import pandas as pd
+# pandas, openpyxl (vía OrderGenerator), los motores de cálculo y los servicios
+# de email y alertas se importan en las funciones que los usan: los comandos
+# administrativos (--status, --reset, --verificar-email) no los necesitan.
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.order_generator import OrderGenerator
 
 # Variable global para el logger
 logger = None
@@ -84,8 +72,16 @@ def cargar_configuracion(ruta: str = 'config/config.json') -> Optional[Dict[str,
             print(f"ERROR: No se encontró el archivo de configuración: {ruta_completa}")
             return None
         
-        with open(ruta_completa, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        # Los ficheros de config/ se comparten a través del registro del proceso
+        registro = obtener_registro()
+        nombre = registro.nombre_de_ruta(ruta_completa)
+        if nombre is not None:
+            config = registro.obtener(nombre)
+            for problema in registro.problemas(nombre):
+                print(f"ADVERTENCIA: {problema}")
+        else:
+            with open(ruta_completa, 'r', encoding='utf-8') as f:
+                config = json.load(f)
         
         print(f"Configuración cargada desde: {ruta}")
         return config
@@ -119,6 +115,8 @@ def normalizar_texto(texto):
     Returns:
         str: Texto normalizado (minúsculas, sin acentos, sin puntuación) o cadena vacía si es None/NaN
     """
+    import pandas as pd
+    
     if pd.isna(texto):
         return ''
     texto = str(texto)
@@ -151,6 +149,8 @@ def normalizar_con_espacios(texto):
     Returns:
         str: Texto normalizado (minúsculas, sin acentos,保留 espacios, sin otra puntuación)
     """
+    import pandas as pd
+    
     if pd.isna(texto):
         return ''
     texto = str(texto)
@@ -205,6 +205,7 @@ def obtener_columna_segura(df, nombre_buscado):
         return df[nombre_real]
     else:
         logger.warning(f"No se encontró columna '{nombre_buscado}' en el DataFrame")
+        import pandas as pd
         return pd.Series([], dtype='object')
 
 def filtrar_por_valor_normalizado(df, nombre_columna, valor_buscado):
@@ -306,8 +307,7 @@ def buscar_valores_unicos_normalizados(df, nombre_columna):
 
 def verificar_archivos_correccion(config: Dict[str, Any], semana: int) -> Dict[str, bool]:
     # Usar ruta centralizada por defecto, permitir override desde config
-    dir_entrada_config = config.get('rutas', {}).get('directorio_entrada')
-    dir_entrada = str(INPUT_DIR) if dir_entrada_config is None else dir_entrada_config
+    dir_entrada = directorio_config(config, 'directorio_entrada', INPUT_DIR)
     
     archivos_correccion = config.get('archivos_correccion', {})
     
@@ -318,12 +318,15 @@ def verificar_archivos_correccion(config: Dict[str, Any], semana: int) -> Dict[s
         'ventas': [f'SPA_ventas_semana_{semana}.xlsx', f'SPA_ventas_Semana_{semana}.xlsx', 'SPA_ventas_semana.xlsx']
     }
     
+    from src.lectura_entradas import resolver_entrada
+    
     for tipo, patrones_archivo in patrones.items():
         for patron in patrones_archivo:
-            ruta = os.path.join(dir_entrada, patron)
+            # El .xlsx o su exportación .csv/.tsv
+            ruta = resolver_entrada(os.path.join(dir_entrada, patron))
             if os.path.exists(ruta):
                 disponibilidad[tipo] = True
-                logger.info(f"Archivo de {tipo} encontrado: {patron}")
+                logger.info(f"Archivo de {tipo} encontrado: {os.path.basename(ruta)}")
                 break
     
     return disponibilidad
@@ -333,33 +336,41 @@ def aplicar_correccion_pedido(
     semana: int,
     config: Dict[str, Any],
     seccion: str,
-    parametros_abc: Optional[Dict[str, Any]] = None
+    parametros_abc: Optional[Dict[str, Any]] = None,
+    datos_correccion: Optional[Dict[str, Optional[pd.DataFrame]]] = None
 ) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
     logger.info("\n" + "=" * 60)
     logger.info("FASE 2: APLICANDO CORRECCIÓN AL PEDIDO")
     logger.info("=" * 60)
     
+    from src.memoria import copia_defensiva
+    
     params_correccion = config.get('parametros_correccion', {})
     if not params_correccion.get('habilitar_correccion', True):
         logger.info("Corrección deshabilitada en configuración. Usando pedido teórico.")
-        return pedido_teorico.copy(), {'correccion_aplicada': False}
+        return copia_defensiva(pedido_teorico), {'correccion_aplicada': False}
     
     disponibilidad = verificar_archivos_correccion(config, semana)
     
     if not any(disponibilidad.values()):
         logger.warning("No se encontraron archivos de corrección. Usando pedido teórico.")
-        return pedido_teorico.copy(), {'correccion_aplicada': False, 'razon': 'sin_archivos'}
+        return copia_defensiva(pedido_teorico), {'correccion_aplicada': False, 'razon': 'sin_archivos'}
     
     logger.info(f"Archivos de corrección disponibles: {disponibilidad}")
     
+    from src.correction_data_loader import CorrectionDataLoader
+    from src.correction_engine import crear_correction_engine
+    from src.equivalencia import ejecutar_etapa
+    
     try:
         correction_loader = CorrectionDataLoader(config)
-        datos_correccion = correction_loader.cargar_datos_correccion(semana)
+        if datos_correccion is None:
+            datos_correccion = correction_loader.cargar_datos_correccion(semana)
         
         datos_cargados = sum(1 for v in datos_correccion.values() if v is not None)
         if datos_cargados == 0:
             logger.warning("No se pudieron cargar datos de corrección. Usando pedido teórico.")
-            return pedido_teorico.copy(), {'correccion_aplicada': False, 'razon': 'sin_datos'}
+            return copia_defensiva(pedido_teorico), {'correccion_aplicada': False, 'razon': 'sin_datos'}
         
         pedido_fusionado = correction_loader.merge_con_pedido_teorico(
             pedido_teorico, datos_correccion
@@ -373,8 +384,9 @@ def aplicar_correccion_pedido(
             config_abc=config_abc
         )
         
-        pedido_corregido = engine.aplicar_correccion_dataframe(
-            pedido_fusionado,
+        pedido_corregido = ejecutar_etapa(
+            'correccion', engine, config, contexto={'seccion': seccion, 'semana': f"s{semana}"},
+            pedido=pedido_fusionado,
             columna_pedido='Pedido_Corregido_Stock',
             columna_stock_minimo='Stock_Minimo_Objetivo',
             columna_stock_real='Stock_Fisico',
@@ -426,7 +438,7 @@ def aplicar_correccion_pedido(
         logger.error(f"Error al aplicar corrección: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        return pedido_teorico.copy(), {'correccion_aplicada': False, 'razon': 'error', 'error': str(e)}
+        return copia_defensiva(pedido_teorico), {'correccion_aplicada': False, 'razon': 'error', 'error': str(e)}
 
 def generar_archivo_pedido_corregido(
     pedido_corregido: pd.DataFrame,
@@ -438,6 +450,7 @@ def generar_archivo_pedido_corregido(
 ) -> Optional[str]:
     try:
         from datetime import datetime, timedelta
+        from src.memoria import copia_defensiva
         fecha_base = datetime.now()
         
         dia_semana = fecha_base.weekday()
@@ -450,16 +463,14 @@ def generar_archivo_pedido_corregido(
         fecha_lunes_str = fecha_lunes.strftime('%Y-%m-%d')
         
         # Usar ruta centralizada por defecto, permitir override desde config
-        dir_salida_config = config.get('rutas', {}).get('directorio_salida')
-        if dir_salida_config:
-            dir_salida = dir_salida_config
-        else:
-            dir_salida = str(PEDIDOS_SEMANALES_DIR)
+        dir_salida = directorio_config(config, 'directorio_salida', PEDIDOS_SEMANALES_DIR)
         
-        nombre_archivo = f"Pedido_Semana_{semana}_{fecha_lunes_str}_{seccion}_CORREGIDO.xlsx"
+        tienda = etiqueta_tienda(config)
+        seccion_archivo = f"{tienda}_{seccion}" if tienda else seccion
+        nombre_archivo = f"Pedido_Semana_{semana}_{fecha_lunes_str}_{seccion_archivo}_CORREGIDO.xlsx"
         ruta_archivo = os.path.join(dir_salida, nombre_archivo)
         
-        df_exportar = pedido_corregido.copy()
+        df_exportar = copia_defensiva(pedido_corregido)
         
         renombrar = {
             'Pedido_Corregido_Stock': 'Pedido_Teorico',
@@ -527,6 +538,8 @@ def enviar_emails_pedidos(
         logger.info("Envío de emails deshabilitado en configuración.")
         return {'exito': False, 'razon': 'deshabilitado'}, None
 
+    from src.email_service import crear_email_service
+
     try:
         email_service = crear_email_service(config)
 
@@ -540,26 +553,22 @@ def enviar_emails_pedidos(
                 logger.error("No se puede enviar emails sin configurar la variable EMAIL_PASSWORD")
                 return {'exito': False, 'razon': 'sin_password'}, None
 
-        resultados = {}
         emails_enviados = 0
         emails_fallidos = 0
 
+        secciones_con_archivos = {}
         for seccion, archivos in archivos_por_seccion.items():
             if not archivos:
                 logger.info(f"Sin archivos para la sección {seccion}. Saltando.")
                 continue
 
-            logger.info(f"\nEnviando email para sección: {seccion}")
-            logger.info(f"Archivos: {archivos}")
+            logger.info(f"Email para sección: {seccion} - Archivos: {archivos}")
+            secciones_con_archivos[seccion] = archivos
 
-            resultado = email_service.enviar_pedido_por_seccion(
-                semana=semana,
-                seccion=seccion,
-                archivos=archivos
-            )
-
-            resultados[seccion] = resultado
+        # Todas las secciones se envían en un lote por las sesiones SMTP compartidas
+        resultados = email_service.enviar_pedidos_secciones(semana, secciones_con_archivos)
 
+        for seccion, resultado in resultados.items():
             if resultado.get('enviado', False):
                 emails_enviados += 1
                 logger.info(f"✓ Email enviado exitosamente a {seccion}")
@@ -615,11 +624,7 @@ def agrupar_archivos_por_seccion(
     archivos_por_seccion = {}
     
     # Usar ruta centralizada por defecto, permitir override desde config
-    dir_salida_config = config.get('rutas', {}).get('directorio_salida')
-    if dir_salida_config:
-        dir_salida = dir_salida_config
-    else:
-        dir_salida = str(PEDIDOS_SEMANALES_DIR)
+    dir_salida = directorio_config(config, 'directorio_salida', PEDIDOS_SEMANALES_DIR)
 
     for archivo in archivos_generados:
         if not archivo:
@@ -660,6 +665,224 @@ def agrupar_archivos_por_seccion(
 
     return archivos_por_seccion
 
+def _filas(df) -> Optional[int]:
+    """Filas de un DataFrame opcional (para los tramos de perfilado)."""
+    return len(df) if df is not None else None
+
+
+def lunes_semana_iso(semana: int, hoy: Optional[datetime] = None) -> datetime:
+    """
+    Lunes de la semana ISO 'semana' más cercana a hoy.
+
+    El año ISO de hoy no sirve a final o principio de año: la semana 1 pedida
+    el 29 de diciembre es la del año siguiente y la 52 pedida el 2 de enero,
+    la del anterior.
+    """
+    hoy = hoy or datetime.now()
+    candidatos = []
+    for año in (hoy.year - 1, hoy.year, hoy.year + 1):
+        try:
+            candidatos.append(datetime.fromisocalendar(año, semana, 1))
+        except ValueError:
+            # La semana 53 solo existe en algunos años
+            continue
+    if not candidatos:
+        raise ValueError(f"semana ISO no válida: {semana}")
+    return min(candidatos, key=lambda lunes: abs(lunes - hoy))
+
+
+def actualizar_historico_ventas(config: Dict[str, Any], df_ventas_reales: Optional[pd.DataFrame], semana: int):
+    """
+    Paso de ingesta del histórico de ventas (historico_ventas.usar en config.json).
+
+    La primera vez importa SPA_ventas.xlsx; después añade SPA_ventas_semana.xlsx
+    como ventas de la semana anterior a la del pedido. Un fallo no detiene el
+    pedido: las ventas se leen entonces del fichero anual.
+    """
+    from src.historico_ventas import crear_historico_ventas, historico_activo
+    if not historico_activo(config):
+        return
+    try:
+        semana_ventas = lunes_semana_iso(semana) - timedelta(days=7)
+        with tramo('historico_ventas', filas_entrada=_filas(df_ventas_reales)) as t:
+            escritas = crear_historico_ventas(config).actualizar(df_ventas_reales, semana_ventas)
+            t.filas(salida=len(escritas))
+    except Exception as e:
+        logger.warning(f"No se pudo actualizar el histórico de ventas: {e}")
+
+
+def precargar_entradas(config: Dict[str, Any], semanas: List[int]):
+    """
+    Lanza en segundo plano la lectura de los ficheros que va a leer el pedido.
+
+    Son las ventas, costes, ventas de la semana, stock actual y el ABC de cada
+    sección para el período de las semanas, localizados con el manifiesto de
+    entradas. Se leen en paralelo (bloque precarga_entradas de config.json)
+    mientras se carga el estado y se inicia el sistema de alertas; los
+    cargadores reciben la lectura ya hecha a través de leer_tabla().
+
+    Returns:
+        PrecargaEntradas o None si está deshabilitada o no se pudo iniciar
+    """
+    precarga = None
+    try:
+        from src.data_loader import DataLoader
+        from src.lectura_entradas import crear_precarga, resolver_entrada
+
+        precarga = crear_precarga(config)
+        if precarga is None:
+            return None
+        data_loader = DataLoader(config)
+        dir_entrada = data_loader.obtener_directorio_entrada()
+        rutas = [resolver_entrada(os.path.join(dir_entrada, nombre))
+                 for nombre in ('SPA_ventas_semana.xlsx', 'SPA_stock_actual.xlsx')]
+        rutas += data_loader.archivos_pedido(semanas)
+        lanzadas = precarga.precargar(rutas)
+        logger.info(f"Precarga de entradas: {lanzadas} ficheros en segundo plano ({precarga.modo}, "
+                    f"{precarga.max_trabajadores} a la vez)")
+        return precarga
+    except Exception as e:
+        logger.warning(f"No se pudo iniciar la precarga de entradas: {e}")
+        return precarga
+
+
+def validar_entradas(config: Dict[str, Any], semanas: List[int], aplicar_correccion: bool = True,
+                     alert_service=None, configs_tienda: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+    """
+    Comprueba los encabezados de todas las entradas del pedido antes de leerlas.
+
+    Abre cada fichero en modo de solo lectura y lee solo sus encabezados
+    (bloque validacion_entradas de config.json). Si falta un fichero
+    obligatorio o una columna imprescindible se envía una única alerta con
+    todos los problemas y no se sigue, para no descubrirlos a mitad de la
+    ejecución; si solo faltan columnas opcionales se avisa y se sigue. Con
+    varias tiendas (configs_tienda) se comprueban las entradas de todas y los
+    problemas van en la misma alerta, cada uno con su tienda.
+
+    Returns:
+        bool: False si la ejecución no debe continuar
+    """
+    try:
+        from src.validacion_entradas import ResultadoValidacion, ValidadorEntradas, crear_validador
+
+        validador = crear_validador(config)
+        if validador is None:
+            return True
+        if configs_tienda:
+            resultado = ResultadoValidacion(estricto=validador.estricto)
+            for codigo, configuracion in configs_tienda.items():
+                validador_tienda = ValidadorEntradas(configuracion, validador.max_trabajadores, validador.estricto)
+                resultado.incorporar(validador_tienda.validar(
+                    validador_tienda.entradas_pedido(semanas, correccion=aplicar_correccion)), codigo)
+        else:
+            resultado = validador.validar(validador.entradas_pedido(semanas, correccion=aplicar_correccion))
+    except Exception as e:
+        logger.warning(f"No se pudo validar las entradas: {e}")
+        return True
+
+    resultado.registrar()
+    resultado.alertar('main.py', alert_service)
+    if not resultado.correcto:
+        logger.error("Entradas no válidas: se detiene la ejecución antes de procesar ningún dato",
+                     extra={'sin_alerta': True})
+    return resultado.correcto
+
+
+def preparar_horizonte(semanas: List[int], config: Dict[str, Any], aplicar_correccion: bool = True) -> Dict[str, Any]:
+    """
+    Carga una sola vez los datos de un horizonte de semanas y calcula su forecast.
+
+    Las ventas, costes, ventas de la semana y stock se leen una vez; el ABC una
+    vez por sección y período; y el forecast de cada sección se calcula para
+    todas las semanas de un mismo período con ForecastEngine.calcular_pedidos_semanas().
+    procesar_pedido_semana() recibe el resultado como datos_horizonte y solo
+    hace por semana lo que depende del stock acumulado (stock mínimo,
+    corrección) y la escritura de ficheros.
+
+    Args:
+        semanas (List[int]): Semanas del horizonte, en orden
+        config (Dict[str, Any]): Configuración del sistema
+        aplicar_correccion (bool): Cargar también los datos de la FASE 2
+
+    Returns:
+        Dict[str, Any]: datos_horizonte para procesar_pedido_semana()
+    """
+    from src.data_loader import DataLoader, añadir_columna_semana
+    from src.forecast_engine import ForecastEngine
+    from src.correction_data_loader import (
+        CorrectionDataLoader,
+        leer_archivo_ventas_semana,
+        leer_archivo_stock_actual
+    )
+
+    data_loader = DataLoader(config)
+    forecast_engine = ForecastEngine(config)
+    dir_entrada = directorio_config(config, 'directorio_entrada', INPUT_DIR)
+
+    with tramo('carga', origen='ventas_semana+stock_actual') as t:
+        df_ventas_reales, _ = leer_archivo_ventas_semana(dir_entrada)
+        df_stock_actual = leer_archivo_stock_actual(dir_entrada)
+        t.filas(salida=(_filas(df_ventas_reales) or 0) + (_filas(df_stock_actual) or 0))
+    actualizar_historico_ventas(config, df_ventas_reales, semanas[0])
+
+    datos_correccion = None
+    if aplicar_correccion and any(verificar_archivos_correccion(config, semanas[0]).values()):
+        datos_correccion = CorrectionDataLoader(config).cargar_datos_correccion(semanas[0])
+
+    # Con una implementación de forecast distinta de la actual, o en modo sombra,
+    # el forecast se hace semana a semana a través de ejecutar_etapa()
+    equivalencia = config.get('equivalencia', {})
+    forecast_por_lotes = (
+        equivalencia.get('implementaciones', {}).get('forecast', 'legacy') == 'legacy'
+        and not equivalencia.get('modo_sombra', False)
+    )
+
+    semanas_por_periodo: Dict[str, List[int]] = {}
+    for semana in semanas:
+        semanas_por_periodo.setdefault(data_loader.obtener_periodo_desde_semana(semana), []).append(semana)
+
+    datos_secciones: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    for seccion in config.get('secciones_activas', []):
+        datos_secciones[seccion] = {}
+        for periodo, semanas_periodo in semanas_por_periodo.items():
+            t = iniciar_tramo('carga', seccion=seccion, periodo=periodo)
+            abc_df, ventas_df, costes_df = data_loader.leer_datos_seccion(seccion, semanas_periodo[0], semanas_periodo)
+            t.terminar(filas_salida=_filas(ventas_df))
+            if abc_df is None or ventas_df is None or costes_df is None or not añadir_columna_semana(ventas_df):
+                # procesar_pedido_semana() lo vuelve a intentar y lo registra como error
+                continue
+
+            pedidos_semanas = {}
+            if forecast_por_lotes:
+                with tramo('forecast', filas_entrada=ventas_df, seccion=seccion, periodo=periodo) as t:
+                    pedidos_semanas = forecast_engine.calcular_pedidos_semanas(
+                        semanas_periodo, ventas_df, abc_df, costes_df, seccion
+                    )
+                    t.filas(salida=sum(len(p) for p in pedidos_semanas.values()))
+
+            for semana in semanas_periodo:
+                datos_secciones[seccion][semana] = {
+                    'abc': abc_df,
+                    'costes': costes_df,
+                    'ventas': ventas_df[ventas_df['Semana'] == semana],
+                    'pedidos': pedidos_semanas.get(semana),
+                }
+
+    return {
+        'data_loader': data_loader,
+        'forecast_engine': forecast_engine,
+        'ventas_reales': df_ventas_reales,
+        'stock_actual': df_stock_actual,
+        'correccion': datos_correccion,
+        'secciones': datos_secciones,
+    }
+
+def _totales_pedido(pedidos_final: pd.DataFrame) -> Tuple[int, float]:
+    """Artículos con pedido e importe objetivo de un pedido final."""
+    columna = 'Pedido_Final' if 'Pedido_Final' in pedidos_final.columns else 'Pedido_Corregido_Stock'
+    pedidos_validos = pedidos_final[pedidos_final[columna] > 0]
+    return len(pedidos_validos), pedidos_validos['Ventas_Objetivo'].sum()
+
 def procesar_pedido_semana(
     semana: int, 
     config: Dict[str, Any], 
@@ -667,7 +890,10 @@ def procesar_pedido_semana(
     forzar: bool = False,
     aplicar_correccion: bool = True,
     enviar_email: bool = True,
-    alert_service=None
+    alert_service=None,
+    recalcular: bool = False,
+    datos_horizonte: Optional[Dict[str, Any]] = None,
+    pedidos_salida: Optional[Dict[str, pd.DataFrame]] = None
 ) -> Tuple[bool, Optional[str], int, float, Dict[str, Any], Dict[str, Any]]:
     logger.info("=" * 70)
     logger.info(f"PROCESANDO PEDIDO PARA SEMANA {semana}")
@@ -678,8 +904,32 @@ def procesar_pedido_semana(
     else:
         logger.info("MODO: Solo FASE 1 (Forecast) - Corrección deshabilitada")
     
-    data_loader = DataLoader(config)
-    forecast_engine = ForecastEngine(config)
+    import pandas as pd
+    from src.data_loader import DataLoader, añadir_columna_semana
+    from src.forecast_engine import ForecastEngine
+    from src.order_generator import OrderGenerator
+    from src.equivalencia import ejecutar_etapa
+    from src.memoria import copia_defensiva
+    from src.puntos_control import (
+        crear_puntos_control, huella_dataframe, huella_fichero, huella_valor,
+        filas_de_articulos, codigos_articulo, config_seccion
+    )
+    from src.correction_data_loader import (
+        encontrar_archivo_semana_anterior,
+        leer_archivo_ventas_semana,
+        leer_archivo_stock_actual,
+        leer_pedido_semana_anterior,
+        fusionar_datos_tendencia,
+        extraer_diccionarios_tendencia
+    )
+    
+    if datos_horizonte is not None:
+        # Modo horizonte: las lecturas y el forecast de todas las semanas ya están hechos
+        data_loader = datos_horizonte['data_loader']
+        forecast_engine = datos_horizonte['forecast_engine']
+    else:
+        data_loader = DataLoader(config)
+        forecast_engine = ForecastEngine(config)
     order_generator = OrderGenerator(config)
     scheduler = SchedulerService(config)
     
@@ -689,6 +939,15 @@ def procesar_pedido_semana(
     stock_acumulado = state_manager.obtener_stock_acumulado()
     logger.info(f"Stock acumulado cargado: {len(stock_acumulado)} artículos")
     
+    # Secciones cuyas entradas no cambiaron desde la última ejecución de esta semana
+    # se reutilizan; una ejecución fallida se reanuda desde la última sección terminada
+    dir_puntos_control = config.get('rutas', {}).get('directorio_puntos_control')
+    if dir_puntos_control:
+        puntos_control = crear_puntos_control(semana, Path(dir_puntos_control))
+    else:
+        puntos_control = crear_puntos_control(semana)
+    secciones_reutilizadas = []
+    
     secciones = config.get('secciones_activas', [])
     pedidos_totales = {}
     pedidos_corregidos = {}
@@ -704,27 +963,22 @@ def procesar_pedido_semana(
     # ============================================================================
     # Estos datos se usan para calcular la tendencia comparando ventas reales con objetivo
     
-    # Determinar directorios
-    dir_base = os.path.dirname(os.path.abspath(__file__))
-    dir_entrada_config = config.get('rutas', {}).get('directorio_entrada')
-    # Usar ruta centralizada por defecto si no hay override en config
-    if dir_entrada_config is None:
-        dir_entrada = str(INPUT_DIR)
-    else:
-        dir_entrada = os.path.join(dir_base, dir_entrada_config)
+    # Determinar directorios: ruta centralizada por defecto, permitir override desde config
+    dir_entrada = directorio_config(config, 'directorio_entrada', INPUT_DIR)
+    dir_salida = directorio_config(config, 'directorio_salida', PEDIDOS_SEMANALES_DIR)
     
-    # Usar ruta centralizada por defecto, permitir override desde config
-    dir_salida_config = config.get('rutas', {}).get('directorio_salida')
-    if dir_salida_config is None:
-        dir_salida = str(PEDIDOS_SEMANALES_DIR)
+    if datos_horizonte is not None:
+        df_ventas_reales = datos_horizonte['ventas_reales']
+        df_stock_actual = datos_horizonte['stock_actual']
     else:
-        dir_salida = os.path.join(dir_base, dir_salida_config)
-    
-    # Cargar archivo de ventas de semana (SPA_ventas_semana.xlsx) - Contiene las ventas reales de la semana anterior
-    df_ventas_reales, ventas_reales_existe = leer_archivo_ventas_semana(dir_entrada)
-    
-    # Cargar archivo de stock actual (SPA_stock_actual.xlsx)
-    df_stock_actual = leer_archivo_stock_actual(dir_entrada)
+        with tramo('carga', origen='ventas_semana+stock_actual') as t:
+            # Cargar archivo de ventas de semana (SPA_ventas_semana.xlsx) - Contiene las ventas reales de la semana anterior
+            df_ventas_reales, ventas_reales_existe = leer_archivo_ventas_semana(dir_entrada)
+            
+            # Cargar archivo de stock actual (SPA_stock_actual.xlsx)
+            df_stock_actual = leer_archivo_stock_actual(dir_entrada)
+            t.filas(salida=(_filas(df_ventas_reales) or 0) + (_filas(df_stock_actual) or 0))
+        actualizar_historico_ventas(config, df_ventas_reales, semana)
     
     for seccion in secciones:
         logger.info(f"\n{'=' * 50}")
@@ -741,27 +995,31 @@ def procesar_pedido_semana(
             logger.debug(f"No se pudo actualizar contexto de alertas: {e}")
         
         try:
-            abc_df, ventas_df, costes_df = data_loader.leer_datos_seccion(seccion, semana)
-            
-            logger.debug(f"[DEBUG] abc_df: {len(abc_df) if abc_df is not None else 0} registros")
-            logger.debug(f"[DEBUG] ventas_df: {len(ventas_df) if ventas_df is not None else 0} registros")
-            logger.debug(f"[DEBUG] costes_df: {len(costes_df) if costes_df is not None else 0} registros")
-            
-            if abc_df is None or ventas_df is None or costes_df is None:
-                logger.error(f"No se pudieron leer los datos para la seccion '{seccion}'")
-                continue
-            
-            if 'Semana' not in ventas_df.columns:
-                if 'Fecha' in ventas_df.columns:
-                    ventas_df['Fecha'] = pd.to_datetime(ventas_df['Fecha'], errors='coerce')
-                    ventas_df['Semana'] = ventas_df['Fecha'].apply(
-                        lambda x: x.isocalendar()[1] if pd.notna(x) else None
-                    )
-                else:
+            entrada_horizonte = datos_horizonte['secciones'].get(seccion, {}).get(semana) if datos_horizonte else None
+            if entrada_horizonte is not None:
+                abc_df = entrada_horizonte['abc']
+                costes_df = entrada_horizonte['costes']
+                datos_semana = entrada_horizonte['ventas']
+            else:
+                t = iniciar_tramo('carga', seccion=seccion)
+                abc_df, ventas_df, costes_df = data_loader.leer_datos_seccion(seccion, semana, [semana])
+                t.terminar(filas_salida=_filas(ventas_df))
+
+                logger.debug(f"[DEBUG] abc_df: {len(abc_df) if abc_df is not None else 0} registros")
+                logger.debug(f"[DEBUG] ventas_df: {len(ventas_df) if ventas_df is not None else 0} registros")
+                logger.debug(f"[DEBUG] costes_df: {len(costes_df) if costes_df is not None else 0} registros")
+
+                if abc_df is None or ventas_df is None or costes_df is None:
+                    logger.error(f"No se pudieron leer los datos para la seccion '{seccion}'")
+                    continue
+
+                t = iniciar_tramo('division_seccion', filas_entrada=ventas_df, seccion=seccion)
+                if not añadir_columna_semana(ventas_df):
                     logger.warning(f"No hay columna 'Fecha' ni 'Semana' en ventas de '{seccion}'")
                     continue
-            
-            datos_semana = ventas_df[ventas_df['Semana'] == semana]
+
+                datos_semana = ventas_df[ventas_df['Semana'] == semana]
+                t.terminar(filas_salida=datos_semana)
             
             if len(datos_semana) == 0:
                 logger.warning(f"No hay datos de ventas para la semana {semana} en '{seccion}'")
@@ -769,6 +1027,42 @@ def procesar_pedido_semana(
             
             logger.info(f"Datos de ventas: {len(datos_semana)} registros")
             
+            # ============================================================================
+            # HUELLA DE LAS ENTRADAS DE LA SECCIÓN
+            # ============================================================================
+            archivo_semana_anterior = encontrar_archivo_semana_anterior(dir_salida, semana, seccion)
+            codigos_seccion = codigos_articulo(datos_semana)
+            huella = puntos_control.huella_seccion(seccion, {
+                'ventas': huella_dataframe(datos_semana),
+                'abc': huella_dataframe(abc_df),
+                'costes': huella_dataframe(costes_df),
+                'stock': huella_dataframe(filas_de_articulos(df_stock_actual, codigos_seccion)),
+                'ventas_semana': huella_dataframe(filas_de_articulos(df_ventas_reales, codigos_seccion)),
+                'pedido_anterior': huella_fichero(archivo_semana_anterior),
+                'config': huella_valor(config_seccion(config, seccion)),
+                'correccion': aplicar_correccion,
+            })
+            
+            guardado = None if recalcular else puntos_control.obtener(seccion, huella, stock_acumulado)
+            if guardado is not None:
+                pedidos_final = guardado['pedidos_final']
+                archivo = guardado['archivo']
+                stock_acumulado.update(guardado['stock_nuevo'])
+                metricas = guardado['metricas']
+                if metricas and metricas.get('correccion_aplicada', False):
+                    metricas_correccion_total[seccion] = metricas
+                    pedidos_corregidos[seccion] = pedidos_final
+                if archivo:
+                    archivos_generados.append(archivo)
+                    articulos, importe = _totales_pedido(pedidos_final)
+                    articulos_totales += articulos
+                    importe_total += importe
+                pedidos_totales[seccion] = pedidos_final
+                datos_semanales[seccion] = datos_semana
+                secciones_reutilizadas.append(seccion)
+                logger.info(f"Entradas sin cambios: se reutiliza el pedido ya generado ({Path(archivo).name if archivo else 'sin archivo'})")
+                continue
+            
             parametros_seccion = {
                 'objetivos_semanales': config.get('secciones', {}).get(seccion, {}).get('objetivos_semanales', {}),
                 'objetivo_crecimiento': config.get('parametros', {}).get('objetivo_crecimiento', 0.05),
@@ -776,9 +1070,15 @@ def procesar_pedido_semana(
                 'festivos': config.get('festivos', {})
             }
             
-            pedidos = forecast_engine.calcular_pedido_semana(
-                semana, datos_semana, abc_df, costes_df, seccion
-            )
+            if entrada_horizonte is not None and entrada_horizonte['pedidos'] is not None:
+                pedidos = entrada_horizonte['pedidos']
+            else:
+                with tramo('forecast', filas_entrada=datos_semana, seccion=seccion) as t:
+                    pedidos = ejecutar_etapa(
+                        'forecast', forecast_engine, config, contexto={'seccion': seccion, 'semana': f"s{semana}"},
+                        semana=semana, datos_semana=datos_semana, abc_df=abc_df, costes_df=costes_df, seccion=seccion
+                    )
+                    t.filas(salida=pedidos)
             
             if len(pedidos) == 0:
                 logger.warning(f"No se generaron pedidos para '{seccion}'")
@@ -789,17 +1089,8 @@ def procesar_pedido_semana(
             # ============================================================================
             # Añadir columnas: Unidades_Calculadas_Semana_Pasada, Ventas_Reales, Stock_Real
             # Buscar archivo de pedido de la semana anterior para esta sección
-            archivo_semana_anterior = encontrar_archivo_semana_anterior(dir_salida, semana, seccion)
-            df_ventas_objetivo_anterior = None
-            if archivo_semana_anterior:
-                try:
-                    # IMPORTANTE: El archivo Excel tiene los encabezados en la fila 2 (índice 1)
-                    # La primera fila es un índice. Sin header=1, pandas lee índices (1,2,3...) como columnas
-                    df_pedido_anterior = pd.read_excel(archivo_semana_anterior, header=1)
-                    df_ventas_objetivo_anterior = normalizar_datos_historicos(df_pedido_anterior)
-                    logger.info(f"Cargados datos de la semana anterior ({seccion}): {len(df_ventas_objetivo_anterior)} registros")
-                except Exception as e:
-                    logger.warning(f"No se pudo leer el archivo de la semana anterior para '{seccion}': {str(e)}")
+            t = iniciar_tramo('fusion_tendencia', filas_entrada=pedidos, seccion=seccion)
+            df_ventas_objetivo_anterior = leer_pedido_semana_anterior(archivo_semana_anterior, seccion)
             
             pedidos = fusionar_datos_tendencia(
                 pedidos,
@@ -812,33 +1103,30 @@ def procesar_pedido_semana(
             # EXTRAER DICCIONARIOS PARA APLICAR STOCK MÍNIMO
             # ============================================================================
             # Crear diccionarios de stock real y ventas a partir de los datos fusionados
-            stock_real_dict = {}
-            ventas_reales_dict = {}
-            ventas_objetivo_dict = {}
-
-            for idx, row in pedidos.iterrows():
-                # Normalizar Codigo_Articulo igual que en fusionar_datos_tendencia
-                codigo_raw = row.get('Codigo_Articulo', '')
-                codigo = str(codigo_raw).replace('.0', '', 1).strip() if pd.notna(codigo_raw) else ''
-                clave = f"{codigo}|{row.get('Talla', '')}|{row.get('Color', '')}"
-                stock_real_dict[clave] = row.get('Stock_Real', 0)
-                ventas_reales_dict[clave] = row.get('Ventas_Reales', 0)
-                ventas_objetivo_dict[clave] = row.get('Unidades_Calculadas_Semana_Pasada', 0)
+            stock_real_dict, ventas_reales_dict, ventas_objetivo_dict = extraer_diccionarios_tendencia(pedidos)
+            t.terminar(filas_salida=pedidos)
             
             # ============================================================================
             # APLICAR STOCK MÍNIMO Y CALCULAR PEDIDO FINAL
             # ============================================================================
-            pedidos, nuevo_stock, ajustes = forecast_engine.aplicar_stock_minimo(
-                pedidos, semana, stock_acumulado, stock_real_dict, ventas_reales_dict, ventas_objetivo_dict
-            )
+            with tramo('stock_minimo', filas_entrada=pedidos, seccion=seccion) as t:
+                pedidos, nuevo_stock, ajustes = forecast_engine.aplicar_stock_minimo(
+                    pedidos, semana, stock_acumulado, stock_real_dict, ventas_reales_dict, ventas_objetivo_dict
+                )
+                t.filas(salida=pedidos)
             
+            stock_previo = {clave: stock_acumulado.get(clave, 0) for clave in nuevo_stock}
             stock_acumulado.update(nuevo_stock)
             
+            metricas = None
             if aplicar_correccion:
-                pedidos_corregido, metricas = aplicar_correccion_pedido(
-                    pedidos.copy(), semana, config, seccion,
-                    parametros_abc=config.get('parametros', {})
-                )
+                with tramo('correccion', filas_entrada=pedidos, seccion=seccion) as t:
+                    pedidos_corregido, metricas = aplicar_correccion_pedido(
+                        copia_defensiva(pedidos), semana, config, seccion,
+                        parametros_abc=config.get('parametros', {}),
+                        datos_correccion=datos_horizonte.get('correccion') if datos_horizonte else None
+                    )
+                    t.filas(salida=pedidos_corregido)
 
                 if metricas.get('correccion_aplicada', False):
                     metricas_correccion_total[seccion] = metricas
@@ -855,19 +1143,14 @@ def procesar_pedido_semana(
             else:
                 pedidos_final = pedidos
 
-            archivo = order_generator.generar_archivo_pedido(pedidos_final, semana, seccion, parametros_seccion)
+            with tramo('escritura_excel', filas_entrada=pedidos_final, seccion=seccion):
+                archivo = order_generator.generar_archivo_pedido(pedidos_final, semana, seccion, parametros_seccion)
             
+            articulos, importe = 0, 0.0
             if archivo:
                 archivos_generados.append(archivo)
                 
-                if 'Pedido_Final' in pedidos_final.columns:
-                    pedidos_validos = pedidos_final[pedidos_final['Pedido_Final'] > 0]
-                    articulos = len(pedidos_validos)
-                    importe = pedidos_validos['Ventas_Objetivo'].sum()
-                else:
-                    pedidos_validos = pedidos_final[pedidos_final['Pedido_Corregido_Stock'] > 0]
-                    articulos = len(pedidos_validos)
-                    importe = pedidos_validos['Ventas_Objetivo'].sum()
+                articulos, importe = _totales_pedido(pedidos_final)
                 
                 articulos_totales += articulos
                 importe_total += importe
@@ -881,15 +1164,30 @@ def procesar_pedido_semana(
             pedidos_totales[seccion] = pedidos_final
             datos_semanales[seccion] = datos_semana
             
+            puntos_control.guardar(
+                seccion, huella, pedidos_final, metricas, archivo,
+                stock_previo=stock_previo, stock_nuevo=nuevo_stock,
+                articulos=articulos, importe=importe
+            )
+            
         except Exception as e:
+            puntos_control.invalidar(seccion)
             logger.error(f"Error procesando seccion '{seccion}': {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
             continue
     
+    if secciones_reutilizadas:
+        logger.info(f"Secciones reutilizadas sin cambios: {len(secciones_reutilizadas)}/{len(secciones)} "
+                    f"({', '.join(secciones_reutilizadas)})")
+    
     if stock_acumulado:
         state_manager.actualizar_stock_acumulado(stock_acumulado)
     
+    # Pedidos finales por sección para quien los pida (totales por proveedor de las tiendas)
+    if pedidos_salida is not None:
+        pedidos_salida.update(pedidos_totales)
+    
     # CORRECCIÓN: Generar archivo de resumen para CADA SECCIÓN y uno consolidado
     if pedidos_totales:
         resumen_data = []
@@ -905,7 +1203,8 @@ def procesar_pedido_semana(
         if resumen_data:
             resumen_df = pd.DataFrame(resumen_data)
             # CORRECCIÓN: Generar un resumen consolidado con TODAS las secciones
-            archivo_resumen = order_generator.generar_resumen_excel(resumen_df, 'CONSOLIDADO')
+            with tramo('escritura_excel', filas_entrada=resumen_df, seccion='CONSOLIDADO'):
+                archivo_resumen = order_generator.generar_resumen_excel(resumen_df, 'CONSOLIDADO')
             if archivo_resumen:
                 archivos_generados.append(archivo_resumen)
     
@@ -935,10 +1234,22 @@ def procesar_pedido_semana(
         logger.info("PREPARANDO ENVÍO DE EMAILS")
         logger.info("=" * 60)
         
+        t = iniciar_tramo('email', filas_entrada=archivos_generados)
         # CORRECCIÓN: Usar la función grouping corregida
         archivos_por_seccion = agrupar_archivos_por_seccion(archivos_generados, config)
+        
+        # No reenviar a una sección los ficheros que ya recibió con el mismo contenido
+        if not recalcular:
+            for seccion_email, archivos in archivos_por_seccion.items():
+                pendientes = puntos_control.pendientes_de_envio(seccion_email, archivos)
+                if archivos and not pendientes:
+                    logger.info(f"Pedido de {seccion_email} ya enviado sin cambios. No se reenvía.")
+                archivos_por_seccion[seccion_email] = pendientes
 
         resultado_email, email_service = enviar_emails_pedidos(semana, config, archivos_por_seccion)
+        for seccion_email, res in resultado_email.get('resultados', {}).items():
+            if res.get('enviado', False):
+                puntos_control.registrar_envio(seccion_email, archivos_por_seccion.get(seccion_email, []))
 
         # Enviar resumen a los responsables de gestión (Sandra, Ivan, Pedro)
         if email_service:
@@ -958,11 +1269,21 @@ def procesar_pedido_semana(
             
             if archivo_resumen:
                 logger.info(f"Archivo de resumen encontrado: {Path(archivo_resumen).name}")
-                resultado_resumen_gestion = email_service.enviar_resumen_gestion(semana, archivo_resumen)
+                if not recalcular and not puntos_control.pendientes_de_envio('gestion', [archivo_resumen]):
+                    logger.info("Resumen ya enviado sin cambios. No se reenvía.")
+                    resultado_resumen_gestion = {'enviado': False, 'razon': 'ya_enviado'}
+                else:
+                    resultado_resumen_gestion = email_service.enviar_resumen_gestion(semana, archivo_resumen)
+                    if resultado_resumen_gestion.get('enviado'):
+                        puntos_control.registrar_envio('gestion', [archivo_resumen])
             else:
                 logger.warning("No se encontró archivo de resumen consolidado")
                 logger.info("Omitiendo envío de resumen a responsables de gestión")
-    
+
+            # Cerrar las sesiones SMTP compartidas por pedidos y resumen
+            email_service.cerrar()
+        t.terminar(filas_salida=resultado_email.get('emails_enviados', 0))
+
     logger.info("\n" + "=" * 70)
     logger.info("RESUMEN DE EJECUCION")
     logger.info("=" * 70)
@@ -1051,6 +1372,163 @@ def procesar_pedido_semana(
     
     return len(archivos_generados) > 0, archivo_principal, articulos_totales, importe_total, metricas_correccion_total, resultado_email, resultado_resumen_gestion
 
+def _log_tienda(log_file: Optional[str], codigo: str) -> Optional[str]:
+    """Log de una tienda procesada en otro proceso: logs/sistema.log -> logs/sistema_<tienda>.log."""
+    if not log_file:
+        return None
+    raiz, extension = os.path.splitext(log_file)
+    return f"{raiz}_{codigo}{extension or '.log'}"
+
+def procesar_tienda(codigo: str, config: Dict[str, Any], semanas: List[int],
+                    opciones: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """
+    Pedidos de una tienda, en un trabajador de EjecutorTiendas (src/tiendas.py).
+
+    Procesa las semanas con la configuración de la tienda (config_tienda): su
+    carpeta de entradas y salidas, su state.json y sus objetivos. En un
+    proceso trabajador main() no se ha ejecutado, así que se configuran aquí
+    el log de la tienda y el sistema de alertas.
+
+    Args:
+        codigo: Código de la tienda
+        config: Configuración de la tienda
+        semanas: Semanas a procesar (varias = modo horizonte)
+        opciones: aplicar_correccion, enviar_email, recalcular, memoria_reducida,
+            nivel_log y log de la ejecución principal
+
+    Returns:
+        Dict: {semana: {exito, archivo, articulos, importe, proveedores}}
+    """
+    global logger
+    if logger is None:
+        logger = configurar_logging(opciones.get('nivel_log', logging.INFO),
+                                    log_file=_log_tienda(opciones.get('log'), codigo))
+        if opciones.get('memoria_reducida'):
+            from src.memoria import activar_modo_memoria_reducida
+            activar_modo_memoria_reducida()
+        try:
+            from src.alert_service import iniciar_sistema_alertas
+            iniciar_sistema_alertas(config)
+        except Exception as e:
+            logger.warning(f"No se pudo inicializar el sistema de alertas en la tienda {codigo}: {e}")
+
+    from src.tiendas import totales_proveedor
+
+    logger.info(f"TIENDA {codigo}: {config.get('tienda', {}).get('nombre', codigo)}")
+    state_manager = StateManager(config)
+    state_manager.cargar_estado()
+
+    aplicar_correccion = opciones.get('aplicar_correccion', True)
+    datos_horizonte = preparar_horizonte(semanas, config, aplicar_correccion) if len(semanas) > 1 else None
+    resultados = {}
+    for semana in semanas:
+        pedidos = {}
+        exito, archivo, articulos, importe, *_ = procesar_pedido_semana(
+            semana, config, state_manager,
+            forzar=True,
+            aplicar_correccion=aplicar_correccion,
+            enviar_email=opciones.get('enviar_email', True),
+            recalcular=opciones.get('recalcular', False),
+            datos_horizonte=datos_horizonte,
+            pedidos_salida=pedidos
+        )
+        resultados[semana] = {
+            'exito': exito,
+            'archivo': archivo,
+            'articulos': int(articulos),
+            'importe': float(importe),
+            'proveedores': totales_proveedor(pedidos),
+        }
+    return resultados
+
+def procesar_tiendas(
+    tiendas: List[Tienda],
+    semanas: List[int],
+    config: Dict[str, Any],
+    state_manager: StateManager,
+    opciones: Dict[str, Any],
+    alert_service=None
+) -> bool:
+    """
+    Pedidos de varias tiendas en paralelo (bloque tiendas de config.json).
+
+    Valida las entradas de todas las tiendas, lee una vez las entradas
+    compartidas, procesa cada tienda en un trabajador y al final escribe los
+    totales por proveedor de todas las tiendas de cada semana. El estado
+    general (data/state.json) registra la ejecución consolidada y solo la da
+    por correcta si todas las tiendas generaron su pedido, para que el
+    programador semanal no avance dejando tiendas sin pedido.
+
+    Returns:
+        bool: True si todas las tiendas generaron su pedido
+    """
+    import pandas as pd
+    from src.tiendas import config_tienda, crear_ejecutor_tiendas, generar_consolidado, rutas_compartidas
+
+    compartidas = rutas_compartidas(config)
+    configs = {tienda.codigo: config_tienda(config, tienda, compartidas) for tienda in tiendas}
+    logger.info(f"Tiendas: {', '.join(f'{t.codigo} ({t.nombre})' for t in tiendas)}")
+    if not validar_entradas(config, semanas, opciones.get('aplicar_correccion', True), alert_service, configs):
+        return False
+
+    ejecutor = crear_ejecutor_tiendas(config)
+    ejecutor.compartir(compartidas.values())
+    logger.info(f"Procesando {len(tiendas)} tiendas en paralelo ({ejecutor.modo})")
+    resultados = ejecutor.ejecutar(procesar_tienda, {
+        tienda.codigo: (tienda.codigo, configs[tienda.codigo], semanas, opciones) for tienda in tiendas
+    })
+
+    todas_ok = True
+    for semana in semanas:
+        filas, totales = [], {}
+        for tienda in tiendas:
+            resultado = resultados.get(tienda.codigo)
+            fila = {'Tienda': tienda.codigo, 'Nombre': tienda.nombre, 'Exito': False,
+                    'Articulos': 0, 'Importe': 0.0, 'Archivo': '', 'Error': ''}
+            if isinstance(resultado, Exception) or resultado is None:
+                fila['Error'] = f"{type(resultado).__name__}: {resultado}"
+            else:
+                semana_tienda = resultado[semana]
+                totales[tienda.codigo] = semana_tienda['proveedores']
+                fila.update(Exito=semana_tienda['exito'], Articulos=semana_tienda['articulos'],
+                            Importe=round(semana_tienda['importe'], 2), Archivo=semana_tienda['archivo'] or '')
+            todas_ok = todas_ok and fila['Exito']
+            filas.append(fila)
+
+        resumen = pd.DataFrame(filas)
+        archivo = generar_consolidado(semana, totales, resumen)
+        correctas = int(resumen['Exito'].sum())
+        state_manager.registrar_ejecucion(
+            semana=semana,
+            archivo_generado=archivo or "Sin archivo",
+            articulos=int(resumen['Articulos'].sum()),
+            importe=float(resumen['Importe'].sum()),
+            exitosa=correctas == len(tiendas),
+            notas=f"Tiendas con pedido: {correctas}/{len(tiendas)}"
+        )
+
+        logger.info("\n" + "=" * 70)
+        logger.info(f"RESUMEN DE TIENDAS - SEMANA {semana}")
+        logger.info("=" * 70)
+        for fila in filas:
+            estado = "OK" if fila['Exito'] else f"SIN PEDIDO {fila['Error']}".strip()
+            logger.info(f"  {fila['Tienda']:<12} {fila['Articulos']:5d} artículos  {fila['Importe']:12.2f}€  {estado}")
+        if archivo:
+            logger.info(f"Totales por proveedor: {archivo}")
+    return todas_ok
+
+def rango_semanas(texto: str) -> List[int]:
+    """Tipo de argparse para --semanas: 'A-B' (o 'A') -> [A, ..., B]."""
+    try:
+        partes = [int(p) for p in texto.split('-')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"rango de semanas no válido: '{texto}' (formato A-B)")
+    if len(partes) == 1:
+        partes = partes * 2
+    if len(partes) != 2 or not 1 <= partes[0] <= partes[1] <= 53:
+        raise argparse.ArgumentTypeError(f"rango de semanas no válido: '{texto}' (A-B con 1 <= A <= B <= 53)")
+    return list(range(partes[0], partes[1] + 1))
+
 def main():
     parser = argparse.ArgumentParser(
         description='Sistema de Generación de Pedidos de Compra - Viveverde V2 (FASE 1 + FASE 2 + Email)',
@@ -1059,6 +1537,7 @@ def main():
 Ejemplos de uso:
   python main.py                      # Ejecución normal (jueves 21:50)
   python main.py --semana 15          # Forzar semana específica
+  python main.py --semanas 10-22      # Pedidos de un rango de semanas en una sola ejecución
   python main.py --continuo           # Modo continuo (se ejecuta y espera la siguiente semana)
   python main.py --status             # Mostrar estado del sistema
   python main.py --reset              # Resetear estado del sistema
@@ -1066,10 +1545,17 @@ Ejemplos de uso:
   python main.py --semana 15 --con-correccion     # FASE 1 + FASE 2 (forzado)
   python main.py --semana 15 --sin-email          # Sin enviar emails
   python main.py --verificar-email                # Verificar configuración de email
+  python main.py --semana 15 --profile            # Guardar perfil por etapa en data/perfiles/
+  python main.py --semana 15 --shadow             # Comparar con la implementación candidata (logs/equivalencia/)
+  python main.py --semana 15 --recalcular         # Ignorar puntos de control: recalcular y reenviar todas las secciones
+  python main.py --semana 15 --memoria-reducida   # Menos memoria con los ficheros de ventas grandes
+  python main.py --semana 15 --tienda centro      # Solo esa tienda (bloque tiendas de config.json)
         """
     )
     
     parser.add_argument('--semana', '-s', type=int, help='Número de semana a procesar (para pruebas)')
+    parser.add_argument('--semanas', type=rango_semanas, metavar='A-B',
+                        help='Calcular los pedidos de las semanas A a B en una sola pasada (planificación o recuperación)')
     parser.add_argument('--continuo', '-c', action='store_true', help='Ejecutar en modo continuo')
     parser.add_argument('--status', action='store_true', help='Mostrar estado del sistema y salir')
     parser.add_argument('--reset', action='store_true', help='Resetear el estado del sistema')
@@ -1079,8 +1565,20 @@ Ejemplos de uso:
     parser.add_argument('--con-correccion', action='store_true', help='Forzar ejecución con corrección FASE 2')
     parser.add_argument('--sin-email', action='store_true', help='No enviar emails después de generar los pedidos')
     parser.add_argument('--verificar-email', action='store_true', help='Verificar la configuración de email y salir')
+    parser.add_argument('--profile', action='store_true',
+                        help='Guardar tiempos, filas y memoria por etapa en data/perfiles/ (JSON y traza de Chrome)')
+    parser.add_argument('--shadow', action='store_true',
+                        help='Ejecutar también la implementación de sombra de forecast y corrección y avisar si difiere')
+    parser.add_argument('--recalcular', action='store_true',
+                        help='Recalcular todas las secciones aunque sus entradas no hayan cambiado (y reenviar los emails)')
+    parser.add_argument('--memoria-reducida', action='store_true',
+                        help='Cargar texto repetitivo como category y evitar copias completas de los DataFrames')
+    parser.add_argument('--tienda', action='append', metavar='CODIGO',
+                        help='Procesar solo esta tienda del bloque tiendas de config.json (se puede repetir)')
     
     args = parser.parse_args()
+    if args.semanas and (args.semana or args.continuo):
+        parser.error("--semanas no se puede combinar con --semana ni --continuo")
     
     nivel_log = logging.DEBUG if args.verbose else logging.INFO
     
@@ -1097,39 +1595,21 @@ Ejemplos de uso:
         logger.error("No se pudo cargar la configuración. Saliendo.")
         sys.exit(1)
     
+    if args.shadow:
+        config.setdefault('equivalencia', {})['modo_sombra'] = True
+    
     # ========================================================================
-    # INTEGRACIÓN DEL SISTEMA DE ALERTAS
+    # COMANDOS ADMINISTRATIVOS (RUTA RÁPIDA)
     # ========================================================================
-    # IMPORTAR Y CONFIGURAR EL SERVICIO DE ALERTAS
-    try:
-        from src.alert_service import (
-            iniciar_sistema_alertas,
-            crear_alert_service,
-            AlertLoggingHandler,
-            configurar_excepthook
-        )
-        
-        # Obtener destinatario de alertas desde configuración
-        env_config = config.get('env_email', {})
-        destinatario_alertas = env_config.get('destinatario_alertas', 'ivan.delgado@viveverde.es')
-        
-        # Crear alert service con destinatario configurable
-        alert_service = crear_alert_service(config, destinatario=destinatario_alertas)
-        
-        # Iniciar sistema completo de alertas (logging handler + excepthook)
-        iniciar_sistema_alertas(config)
-        logger.info(f"Sistema de alertas automáticamente configurado (destinatario: {destinatario_alertas})")
-        
-    except Exception as e:
-        # Si falla la configuración de alertas, continuar sin ellas pero avisar
-        logger.warning(f"No se pudo inicializar el sistema de alertas: {e}")
-        logger.warning("El sistema continuará sin notificaciones por email")
-    
+    # Se resuelven antes de iniciar el sistema de alertas y sin importar
+    # pandas ni los motores de cálculo.
     if args.verificar_email:
         logger.info("\nVERIFICANDO CONFIGURACIÓN DE EMAIL:")
         logger.info("-" * 40)
         
         try:
+            from src.email_service import crear_email_service
+            
             email_service = crear_email_service(config)
             verificacion = email_service.verificar_configuracion()
             
@@ -1153,19 +1633,21 @@ Ejemplos de uso:
         
         sys.exit(0)
     
-    params_correccion = config.get('parametros_correccion', {})
-    correccion_habilitada = params_correccion.get('habilitar_correccion', True)
-    aplicar_correccion = correccion_habilitada and not args.sin_correccion
-    
-    if args.con_correccion:
-        aplicar_correccion = True
-    
-    email_config = config.get('email', {})
-    email_habilitado = email_config.get('habilitar_envio', True)
-    enviar_email = email_habilitado and not args.sin_email
+    # Varias tiendas: cada una se procesa en su trabajador con su carpeta
+    try:
+        tiendas = cargar_tiendas(config, args.tienda)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    if args.tienda and not tiendas:
+        logger.error("--tienda requiere tiendas configuradas en el bloque tiendas de config.json")
+        sys.exit(1)
     
-    logger.info(f"Modo de ejecución: {'FASE 1 + FASE 2' if aplicar_correccion else 'Solo FASE 1'}")
-    logger.info(f"Envío de emails: {'Sí' if enviar_email else 'No'}")
+    # Con la semana dada por argumento las entradas se empiezan a leer ya,
+    # mientras se cargan el estado y el sistema de alertas
+    precarga = None
+    if (args.semana or args.semanas) and not (args.reset or args.status or tiendas):
+        precarga = precargar_entradas(config, args.semanas or [args.semana])
     
     state_manager = StateManager(config)
     state_manager.cargar_estado()
@@ -1189,8 +1671,127 @@ Ejemplos de uso:
         metricas = state_manager.obtener_metricas()
         logger.info(f"Métricas: {metricas}")
         
+        for tienda in tiendas:
+            estado_tienda = StateManager(config_tienda(config, tienda))
+            estado_tienda.cargar_estado()
+            ultima = estado_tienda.obtener_ultima_semana_procesada()
+            logger.info(f"Tienda {tienda.codigo} ({tienda.nombre}): última semana procesada "
+                        f"{ultima if ultima else 'Ninguna'} - {tienda.directorio}")
+        
         sys.exit(0)
     
+    # ========================================================================
+    # INTEGRACIÓN DEL SISTEMA DE ALERTAS
+    # ========================================================================
+    # IMPORTAR Y CONFIGURAR EL SERVICIO DE ALERTAS
+    try:
+        from src.alert_service import (
+            iniciar_sistema_alertas,
+            crear_alert_service,
+            AlertLoggingHandler,
+            configurar_excepthook
+        )
+        
+        # Obtener destinatario de alertas desde configuración
+        env_config = config.get('env_email', {})
+        destinatario_alertas = env_config.get('destinatario_alertas', 'ivan.delgado@viveverde.es')
+        
+        # Crear alert service con destinatario configurable
+        alert_service = crear_alert_service(config, destinatario=destinatario_alertas)
+        
+        # Iniciar sistema completo de alertas (logging handler + excepthook)
+        iniciar_sistema_alertas(config)
+        logger.info(f"Sistema de alertas automáticamente configurado (destinatario: {destinatario_alertas})")
+        
+    except Exception as e:
+        # Si falla la configuración de alertas, continuar sin ellas pero avisar
+        logger.warning(f"No se pudo inicializar el sistema de alertas: {e}")
+        logger.warning("El sistema continuará sin notificaciones por email")
+    
+    params_correccion = config.get('parametros_correccion', {})
+    correccion_habilitada = params_correccion.get('habilitar_correccion', True)
+    aplicar_correccion = correccion_habilitada and not args.sin_correccion
+    
+    if args.con_correccion:
+        aplicar_correccion = True
+    
+    email_config = config.get('email', {})
+    email_habilitado = email_config.get('habilitar_envio', True)
+    enviar_email = email_habilitado and not args.sin_email
+    
+    logger.info(f"Modo de ejecución: {'FASE 1 + FASE 2' if aplicar_correccion else 'Solo FASE 1'}")
+    logger.info(f"Envío de emails: {'Sí' if enviar_email else 'No'}")
+    
+    if args.memoria_reducida:
+        from src.memoria import activar_modo_memoria_reducida
+        activar_modo_memoria_reducida()
+    
+    # ========================================================================
+    # VARIAS TIENDAS (bloque tiendas de config.json)
+    # ========================================================================
+    # Cada tienda se procesa en paralelo con su configuración; al final se
+    # generan los totales por proveedor de todas las tiendas.
+    if tiendas:
+        if args.semanas or args.semana:
+            semanas = args.semanas or [args.semana]
+        else:
+            semana, msg_semana = SchedulerService(config).calcular_semana_a_procesar(
+                state_manager.obtener_ultima_semana_procesada())
+            logger.info(msg_semana)
+            if semana is None:
+                sys.exit(0)
+            semanas = [semana]
+        opciones = {
+            'aplicar_correccion': aplicar_correccion,
+            'enviar_email': enviar_email,
+            'recalcular': args.recalcular,
+            'memoria_reducida': args.memoria_reducida,
+            'nivel_log': nivel_log,
+            'log': args.log,
+        }
+        with perfilado('pedidos', activo=args.profile):
+            exito = procesar_tiendas(tiendas, semanas, config, state_manager, opciones,
+                                     alert_service if 'alert_service' in dir() else None)
+        sys.exit(0 if exito else 1)
+    
+    # ========================================================================
+    # MODO HORIZONTE (--semanas A-B)
+    # ========================================================================
+    # Los datos se cargan y el forecast se calcula una vez para todas las
+    # semanas; el stock acumulado se encadena de una semana a la siguiente
+    # en memoria a través del state_manager.
+    if args.semanas:
+        logger.info(f"Horizonte de semanas: {args.semanas[0]} a {args.semanas[-1]} ({len(args.semanas)} semanas)")
+        if not validar_entradas(config, args.semanas, aplicar_correccion,
+                                alert_service if 'alert_service' in dir() else None):
+            if precarga is not None:
+                precarga.cerrar()
+            sys.exit(1)
+        resultados_horizonte = {}
+        with perfilado('pedidos', activo=args.profile):
+            datos_horizonte = preparar_horizonte(args.semanas, config, aplicar_correccion)
+            for semana in args.semanas:
+                exito, archivo, articulos, importe, *_ = procesar_pedido_semana(
+                    semana, config, state_manager,
+                    forzar=True,
+                    aplicar_correccion=aplicar_correccion,
+                    enviar_email=enviar_email,
+                    alert_service=alert_service if 'alert_service' in dir() else None,
+                    recalcular=args.recalcular,
+                    datos_horizonte=datos_horizonte
+                )
+                resultados_horizonte[semana] = (exito, articulos, importe)
+        if precarga is not None:
+            precarga.cerrar()
+        
+        logger.info("\n" + "=" * 70)
+        logger.info("RESUMEN DEL HORIZONTE")
+        logger.info("=" * 70)
+        for semana, (exito, articulos, importe) in resultados_horizonte.items():
+            estado = "OK" if exito else "SIN PEDIDO"
+            logger.info(f"  Semana {semana:2d}: {articulos:5d} artículos  {importe:12.2f}€  {estado}")
+        sys.exit(0 if all(r[0] for r in resultados_horizonte.values()) else 1)
+    
     scheduler = SchedulerService(config)
     ultima_procesada = state_manager.obtener_ultima_semana_procesada()
     
@@ -1207,6 +1808,7 @@ Ejemplos de uso:
             sys.exit(0)
         
         logger.info(msg_semana)
+        precarga = precargar_entradas(config, [semana])
     
     # ============================================================
     # MODIFICACIÓN: Eliminada la verificación de semana procesada
@@ -1214,13 +1816,23 @@ Ejemplos de uso:
     # Siempre se generará el mismo archivo si los datos de entrada son los mismos
     # ============================================================
     
-    exito, archivo, articulos, importe, metricas_correccion, resultado_email, resultado_resumen_gestion = procesar_pedido_semana(
-        semana, config, state_manager, 
-        forzar=args.semana is not None,
-        aplicar_correccion=aplicar_correccion,
-        enviar_email=enviar_email,
-        alert_service=alert_service if 'alert_service' in dir() else None
-    )
+    if not validar_entradas(config, [semana], aplicar_correccion,
+                            alert_service if 'alert_service' in dir() else None):
+        if precarga is not None:
+            precarga.cerrar()
+        sys.exit(1)
+    
+    with perfilado('pedidos', activo=args.profile):
+        exito, archivo, articulos, importe, metricas_correccion, resultado_email, resultado_resumen_gestion = procesar_pedido_semana(
+            semana, config, state_manager, 
+            forzar=args.semana is not None,
+            aplicar_correccion=aplicar_correccion,
+            enviar_email=enviar_email,
+            alert_service=alert_service if 'alert_service' in dir() else None,
+            recalcular=args.recalcular
+        )
+    if precarga is not None:
+        precarga.cerrar()
     
     if exito:
         logger.info(f"\n¡PEDIDO GENERADO EXITOSAMENTE!")
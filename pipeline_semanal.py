@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Pipeline semanal - Ejecuta todos los scripts del proyecto en un único proceso
+
+Sustituye las tareas programadas independientes de crear_tareas_programadas.py
+por un grafo de pasos (ver src/orquestador.py): clasificación ABC, pedidos
+semanales, INFORME, PRESENTACION, análisis y comparación C y D y los dos
+informes de auditoría. Las ramas independientes se ejecutan en paralelo, los
+Excel se leen una sola vez y se omiten los pasos cuyas entradas no cambiaron.
+
+Uso:
+    python pipeline_semanal.py                     # Ejecutar el pipeline
+    python pipeline_semanal.py --plan              # Ver qué se ejecutaría
+    python pipeline_semanal.py --forzar            # Ejecutar todos los pasos
+    python pipeline_semanal.py --pasos informe,presentacion
+    python pipeline_semanal.py --profile           # Perfil por paso y etapa en data/perfiles/
+    python pipeline_semanal.py --cron              # Mostrar la línea de crontab
+    python pipeline_semanal.py --instalar-cron     # Programarlo en cron (Linux)
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.orquestador import (
+    crear_pipeline_semanal, linea_cron, instalar_cron, ESTADOS_CORRECTOS
+)
+from src.perfilado import perfilado
+
+logger = logging.getLogger(__name__)
+
+
+def mostrar_plan(pipeline, forzar: bool):
+    print("=" * 70)
+    print("PLAN DEL PIPELINE SEMANAL")
+    print("=" * 70)
+    for decision in pipeline.plan(forzar=forzar):
+        paso = pipeline.pasos[decision.nombre]
+        accion = 'EJECUTAR' if not decision.estado else decision.estado.upper()
+        dependencias = f" (tras {', '.join(paso.depende_de)})" if paso.depende_de else ''
+        motivo = f" - {decision.motivo}" if decision.motivo else ''
+        print(f"  {decision.nombre:<26} {accion:<10} {paso.script}{dependencias}{motivo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline semanal de Viveverde en un único proceso')
+    parser.add_argument('--plan', action='store_true', help='Mostrar qué pasos se ejecutarían y salir')
+    parser.add_argument('--forzar', action='store_true',
+                        help='Ejecutar todos los pasos aunque no toquen o no hayan cambiado sus entradas')
+    parser.add_argument('--pasos', type=str, default=None,
+                        help='Ejecutar solo estos pasos (separados por comas)')
+    parser.add_argument('--hilos', type=int, default=4, help='Pasos simultáneos (default: 4)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Guardar tiempos, filas y memoria de cada paso y etapa en data/perfiles/')
+    parser.add_argument('--cron', action='store_true', help='Mostrar la línea de crontab y salir')
+    parser.add_argument('--instalar-cron', action='store_true',
+                        help='Instalar el pipeline en el crontab del usuario (horario de config.json)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    if args.cron:
+        print(linea_cron())
+        return 0
+    if args.instalar_cron:
+        try:
+            print(f"Instalado: {instalar_cron()}")
+            return 0
+        except RuntimeError as e:
+            print(f"ERROR: {e}")
+            return 1
+
+    pipeline = crear_pipeline_semanal(max_hilos=args.hilos)
+    if args.plan:
+        mostrar_plan(pipeline, args.forzar)
+        return 0
+
+    solo = [p.strip() for p in args.pasos.split(',') if p.strip()] if args.pasos else None
+    try:
+        with perfilado('pipeline_semanal', activo=args.profile):
+            resultados = pipeline.ejecutar(forzar=args.forzar, solo=solo)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    print("\n" + "=" * 70)
+    print("RESUMEN DEL PIPELINE SEMANAL")
+    print("=" * 70)
+    for resultado in resultados.values():
+        duracion = f"{resultado.duracion_s:7.1f} s" if resultado.duracion_s else ' ' * 9
+        motivo = f" - {resultado.motivo}" if resultado.motivo else ''
+        print(f"  {resultado.nombre:<26} {resultado.estado:<10} {duracion}{motivo}")
+
+    return 0 if all(r.estado in ESTADOS_CORRECTOS for r in resultados.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,12 +17,18 @@ import logging
 import traceback
 import sys
 import platform
+import atexit
+import hashlib
+import queue
+import threading
+import time
 
 # Importar config_loader para acceder a la configuración centralizada
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from src import config_loader
+from src.limitador_alertas import crear_limitador_alertas
 
 # psutil es opcional - si no está disponible, se usa una versión simple
 try:
@@ -224,6 +230,25 @@ Verificar que el archivo de datos tiene la columna correcta. Posiblemente el nom
         "icono": "🔍"
     },
     
+    "ENTRADAS_INVALIDAS": {
+        "nivel": NivelAlerta.ERROR,
+        "asunto": "[ERROR] Ficheros de entrada no válidos - {errores} problema(s)",
+        "cuerpo": """La validación previa de los ficheros de entrada ha encontrado problemas.
+Resultado: {resultado}
+
+PROBLEMAS ENCONTRADOS:
+{detalle}
+
+INFORMACIÓN ADICIONAL:
+- Ficheros revisados: {ficheros}
+- Proceso: {proceso}
+- Fecha y hora: {timestamp}
+
+ACCIÓN RECOMENDADA:
+Volver a exportar desde el ERP los ficheros indicados con las columnas esperadas y repetir la ejecución.""",
+        "icono": "🧾"
+    },
+    
     "DATOS_VACIOS": {
         "nivel": NivelAlerta.WARNING,
         "asunto": "[WARNING] Datos vacíos o insuficientes - {seccion}",
@@ -683,7 +708,7 @@ class AlertService:
         self.smtp_config = {}
         self.remitente = {}
         self.alertas_enviadas = []
-        self.alertas_contador = {}  # Para evitar spam de alertas similares
+        self.alertas_contador = {}  # Respaldo en memoria si no se puede usar el limitador
         self._alertas_deshabilitadas = False  # Para deshabilitar alertas si hay error de autenticación
         
         # Contexto global para información de sección/fecha/área
@@ -704,6 +729,14 @@ class AlertService:
         # Cargar configuración
         self._cargar_configuracion()
         
+        # Control anti-spam compartido entre scripts (data/estado_alertas.db)
+        try:
+            self.limitador = crear_limitador_alertas(config)
+        except Exception as e:
+            logger.warning(f"No se pudo abrir el estado de alertas compartido: {e}. "
+                           "Se usará el control anti-spam en memoria.")
+            self.limitador = None
+        
         logger.info("AlertService inicializado correctamente")
         logger.info(f"Destinatario de alertas: {self.destinatario_principal}")
     
@@ -960,26 +993,42 @@ class AlertService:
             logger.error(f"Error al enviar alerta por email: {e}")
             return False
     
-    def _evitar_spam(self, tipo_alerta: str, clave_unica: str = None) -> bool:
+    def _evitar_spam(self, tipo_alerta: str, clave_unica: str = None,
+                     contexto: Optional[Dict[str, Any]] = None) -> bool:
         """
         Evita enviar múltiples alertas similares en poco tiempo.
         
+        El registro de envíos se comparte entre todos los scripts mediante
+        LimitadorAlertas (ventana deslizante por clave); las apariciones
+        suprimidas se cuentan para el resumen periódico.
+        
         Args:
             tipo_alerta: Tipo de alerta
             clave_unica: Clave única para identificar la alerta específica
+            contexto: Variables de la alerta, para describirla en el resumen
             
         Returns:
             bool: True si se puede enviar, False si ya se envió recientemente
         """
-        import time
-        
         if clave_unica is None:
             clave_unica = tipo_alerta
         
         # Crear clave de identificación
         key = f"{tipo_alerta}_{clave_unica}"
         
-        # Verificar si ya se envió recientemente (últimos 60 minutos)
+        if self.limitador is not None:
+            contexto = contexto or {}
+            descripcion = str(contexto.get('descripcion') or ", ".join(
+                f"{k}: {v}" for k, v in contexto.items() if k != 'timestamp'))[:300]
+            try:
+                permitido = self.limitador.permitir(key, tipo_alerta, descripcion)
+                if not permitido:
+                    logger.debug(f"Alerta {tipo_alerta} suprimida (enviada recientemente)")
+                return permitido
+            except Exception as e:
+                logger.debug(f"Estado de alertas compartido no disponible: {e}")
+        
+        # Respaldo en memoria: últimos 60 minutos en este proceso
         tiempo_actual = time.time()
         
         if key in self.alertas_contador:
@@ -992,6 +1041,46 @@ class AlertService:
         self.alertas_contador[key] = tiempo_actual
         return True
     
+    def enviar_resumen_suprimidas(self, forzar: bool = False) -> bool:
+        """
+        Envía el resumen de alertas suprimidas si ha pasado el intervalo configurado.
+        
+        Solo un script por intervalo envía el resumen; los contadores se
+        descuentan únicamente si el correo sale correctamente.
+        
+        Args:
+            forzar: Enviar aunque no haya pasado el intervalo mínimo
+            
+        Returns:
+            bool: True si se envió un resumen, False si no tocaba o falló
+        """
+        if self.limitador is None or self._alertas_deshabilitadas:
+            return False
+        try:
+            filas = self.limitador.reclamar_resumen(forzar=forzar)
+        except Exception as e:
+            logger.debug(f"No se pudo consultar el resumen de alertas suprimidas: {e}")
+            return False
+        if not filas:
+            return False
+        
+        total = sum(f['veces'] for f in filas)
+        asunto = f"[RESUMEN] {total} alertas suprimidas del Sistema de Pedidos"
+        lineas = ["ALERTAS SUPRIMIDAS POR REPETICIÓN", ""]
+        for f in filas:
+            desde = datetime.fromtimestamp(f['primera']).strftime('%Y-%m-%d %H:%M')
+            hasta = datetime.fromtimestamp(f['ultima']).strftime('%Y-%m-%d %H:%M')
+            lineas.append(f"- {f['tipo']} x{f['veces']} ({desde} - {hasta})")
+            if f['descripcion']:
+                lineas.append(f"    {f['descripcion']}")
+        
+        msg = self._crear_mensaje_alerta(asunto, "\n".join(lineas), "RESUMEN_SUPRIMIDAS")
+        enviado = self._registrar_envio(self._enviar_email(msg), "RESUMEN_SUPRIMIDAS", asunto,
+                                        {'suprimidas': total, 'claves': len(filas)})
+        if enviado:
+            self.limitador.confirmar_resumen(filas)
+        return enviado
+    
     def enviar_alerta(self, tipo_alerta: str, contexto: Dict[str, str], 
                      clave_unica: str = None) -> bool:
         """
@@ -1011,7 +1100,10 @@ class AlertService:
             return False
         
         # Verificar si ya se envió recientemente
-        if not self._evitar_spam(tipo_alerta, clave_unica):
+        permitida = self._evitar_spam(tipo_alerta, clave_unica, contexto)
+        # El resumen de suprimidas se comprueba con cada alerta, no solo al suprimir una
+        self.enviar_resumen_suprimidas()
+        if not permitida:
             logger.info(f"Alerta {tipo_alerta} suprimida para evitar spam")
             return False
         
@@ -1027,19 +1119,69 @@ class AlertService:
         
         # Enviar email
         logger.info(f"Enviando alerta: {tipo_alerta} - {mensaje['asunto']}")
-        enviado = self._enviar_email(msg)
+        return self._registrar_envio(self._enviar_email(msg), tipo_alerta,
+                                     mensaje['asunto'], contexto)
+    
+    def enviar_alertas_agrupadas(self, alertas: List[Dict[str, Any]]) -> bool:
+        """
+        Envía varias alertas en un único correo de resumen.
+        
+        Cada alerta se filtra con la misma regla anti-spam que enviar_alerta;
+        si tras el filtro solo queda una, se envía como alerta individual.
         
+        Args:
+            alertas: Lista de dicts con 'tipo_alerta', 'contexto' y 'clave_unica'
+            
+        Returns:
+            bool: True si se envió correctamente, False si no
+        """
+        if self._alertas_deshabilitadas:
+            return False
+        
+        pendientes = [a for a in alertas
+                      if self._evitar_spam(a['tipo_alerta'], a.get('clave_unica'), a.get('contexto'))]
+        self.enviar_resumen_suprimidas()
+        if not pendientes:
+            return False
+        if len(pendientes) == 1:
+            # Ya pasó el filtro anti-spam: enviar sin volver a comprobarlo
+            alerta = pendientes[0]
+            mensaje = self._formatear_mensaje(alerta['tipo_alerta'], alerta['contexto'])
+            msg = self._crear_mensaje_alerta(mensaje['asunto'], mensaje['cuerpo'], alerta['tipo_alerta'])
+            return self._registrar_envio(self._enviar_email(msg), alerta['tipo_alerta'],
+                                         mensaje['asunto'], alerta['contexto'])
+        
+        mensajes = [self._formatear_mensaje(a['tipo_alerta'], a['contexto']) for a in pendientes]
+        por_tipo = {}
+        for alerta in pendientes:
+            por_tipo[alerta['tipo_alerta']] = por_tipo.get(alerta['tipo_alerta'], 0) + 1
+        
+        asunto = (f"[ALERTA] {len(pendientes)} alertas del Sistema de Pedidos - "
+                  f"{self.contexto_global.get('seccion_actual', 'Sistema')}")
+        separador = "\n" + "=" * 70 + "\n"
+        cuerpo = "RESUMEN DE ALERTAS AGRUPADAS\n\n"
+        cuerpo += "\n".join(f"- {tipo}: {n}" for tipo, n in por_tipo.items())
+        cuerpo += separador
+        cuerpo += separador.join(f"{m['asunto']}\n\n{m['cuerpo']}" for m in mensajes)
+        
+        msg = self._crear_mensaje_alerta(asunto, cuerpo, "RESUMEN_AGRUPADO")
+        logger.info(f"Enviando resumen de {len(pendientes)} alertas agrupadas")
+        return self._registrar_envio(self._enviar_email(msg), "RESUMEN_AGRUPADO", asunto,
+                                     {'alertas': len(pendientes), 'por_tipo': por_tipo})
+    
+    def _registrar_envio(self, enviado: bool, tipo_alerta: str, asunto: str,
+                         contexto: Dict[str, Any]) -> bool:
+        """Anota en el historial de la ejecución una alerta enviada."""
         if enviado:
             self.alertas_enviadas.append({
                 'tipo': tipo_alerta,
-                'asunto': mensaje['asunto'],
+                'asunto': asunto,
                 'timestamp': datetime.now().isoformat(),
                 'contexto': contexto
             })
             logger.info(f"Alerta enviada correctamente: {tipo_alerta}")
         else:
             logger.error(f"Error al enviar alerta: {tipo_alerta}")
-        
         return enviado
     
     # -------------------------------------------------------------------------
@@ -1077,6 +1219,18 @@ class AlertService:
             'seccion': seccion
         }, clave_unica=f"{archivo}_{columna}")
     
+    def alerta_entradas_invalidas(self, problemas: List[str], ficheros: int,
+                                  proceso: str = "N/A", detenida: bool = True) -> bool:
+        """Envía una única alerta con todos los problemas de la validación de entradas."""
+        return self.enviar_alerta("ENTRADAS_INVALIDAS", {
+            'errores': len(problemas),
+            'detalle': '\n'.join(f"- {problema}" for problema in problemas),
+            'ficheros': ficheros,
+            'proceso': proceso,
+            'resultado': ("ejecución detenida antes de procesar ningún dato" if detenida
+                          else "la ejecución continúa sin las columnas opcionales")
+        }, clave_unica='|'.join(sorted(problemas)))
+    
     def alerta_excepcion(self, excepcion: Exception, seccion: str = "N/A") -> bool:
         """Envía alerta de excepción no manejada."""
         return self.enviar_alerta("EXCEPCION_NO_ESPERADA", {
@@ -1190,6 +1344,35 @@ def crear_alert_service(config: dict, destinatario: str = "ivan.delgado@viveverd
     return AlertService(config, destinatario)
 
 
+_ALERT_SERVICE_COMPARTIDO: Optional[AlertService] = None
+_BLOQUEO_COMPARTIDO = threading.Lock()
+
+
+def obtener_alert_service_compartido() -> Optional[AlertService]:
+    """
+    Devuelve el AlertService compartido por todos los módulos del proceso.
+    
+    Se crea la primera vez con la configuración común y el destinatario de
+    alertas del registro de configuración, de modo que email.json y
+    config_comun.json no se vuelven a leer por cada módulo.
+    
+    Returns:
+        AlertService: Servicio compartido, o None si no se pudo crear
+    """
+    global _ALERT_SERVICE_COMPARTIDO
+    if _ALERT_SERVICE_COMPARTIDO is None:
+        with _BLOQUEO_COMPARTIDO:
+            if _ALERT_SERVICE_COMPARTIDO is None:
+                try:
+                    from src.registro_config import obtener_registro
+                    registro = obtener_registro()
+                    _ALERT_SERVICE_COMPARTIDO = crear_alert_service(
+                        registro.comun(), registro.destinatario_alertas())
+                except Exception as e:
+                    logger.warning(f"No se pudo crear el servicio de alertas compartido: {e}")
+    return _ALERT_SERVICE_COMPARTIDO
+
+
 # ============================================================================
 # FUNCIONES DE INTEGRACIÓN CON EL SISTEMA EXISTENTE
 # ============================================================================
@@ -1500,6 +1683,96 @@ if __name__ == "__main__":
 # HANDLER DE LOGGING PARA ALERTAS AUTOMÁTICAS
 # ============================================================================
 
+class DespachadorAlertas:
+    """
+    Cola de envío de alertas en segundo plano.
+    
+    Las alertas se encolan desde el hilo que registra el mensaje (la llamada
+    vuelve de inmediato) y un hilo despachador las envía. Las alertas que
+    llegan dentro de la misma ventana de agrupación se envían en un único
+    correo de resumen. Al cerrar (o al terminar el proceso) se vacía la cola.
+    
+    Attributes:
+        alert_service (AlertService): Servicio que realiza los envíos
+        ventana_segundos (float): Tiempo que se espera tras la primera alerta
+            para agrupar las siguientes
+    """
+    
+    def __init__(self, alert_service, ventana_segundos: float = 5.0, max_por_resumen: int = 50):
+        self.alert_service = alert_service
+        self.ventana_segundos = ventana_segundos
+        self.max_por_resumen = max_por_resumen
+        self._cola = queue.Queue()
+        self._cerrado = False
+        self._hilo = threading.Thread(target=self._bucle, name="DespachadorAlertas", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+    
+    def encolar(self, tipo_alerta: str, contexto: Dict[str, Any], clave_unica: str = None) -> bool:
+        """Encola una alerta para su envío. Devuelve False si el despachador está cerrado."""
+        if self._cerrado:
+            return False
+        self._cola.put({'tipo_alerta': tipo_alerta, 'contexto': contexto, 'clave_unica': clave_unica})
+        return True
+    
+    def _bucle(self):
+        while True:
+            alerta = self._cola.get()
+            if alerta is None:
+                self._cola.task_done()
+                return
+            
+            lote = [alerta]
+            fin_ventana = time.monotonic() + self.ventana_segundos
+            parar = False
+            while len(lote) < self.max_por_resumen:
+                restante = fin_ventana - time.monotonic()
+                try:
+                    siguiente = self._cola.get(timeout=max(restante, 0)) if restante > 0 \
+                        else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    parar = True
+                    break
+                lote.append(siguiente)
+            
+            try:
+                self.alert_service.enviar_alertas_agrupadas(lote)
+            except Exception as e:
+                logger.debug(f"Error en el despachador de alertas: {e}")
+            finally:
+                for _ in range(len(lote) + (1 if parar else 0)):
+                    self._cola.task_done()
+            if parar:
+                return
+    
+    def vaciar(self):
+        """Espera a que se envíen todas las alertas encoladas hasta ahora."""
+        if self._hilo.is_alive():
+            self._cola.join()
+    
+    def cerrar(self, timeout: Optional[float] = None):
+        """
+        Envía las alertas pendientes y detiene el hilo despachador.
+        
+        Las alertas que quedan en la cola se agrupan sin esperar a que
+        termine su ventana. Después se envía el resumen de suprimidas si ya
+        toca, para que no se quede sin enviar cuando la ejecución termina o
+        no llegan más alertas.
+        """
+        if self._cerrado:
+            return
+        self._cerrado = True
+        self.ventana_segundos = 0
+        self._cola.put(None)
+        self._hilo.join(timeout)
+        try:
+            self.alert_service.enviar_resumen_suprimidas()
+        except Exception as e:
+            logger.debug(f"No se pudo enviar el resumen de alertas suprimidas: {e}")
+
+
 class AlertLoggingHandler(logging.Handler):
     """
     Handler de logging que automáticamente convierte advertencias y errores en alertas por email.
@@ -1509,6 +1782,11 @@ class AlertLoggingHandler(logging.Handler):
     - logger.error("mensaje") -> Se envía una alerta ERROR
     - logger.critical("mensaje") -> Se envía una alerta CRITICAL
     
+    Las alertas no se envían dentro de la llamada de logging: se encolan en un
+    DespachadorAlertas que las envía en segundo plano, agrupando en un único
+    correo las que llegan en la misma ventana (config['alertas']['ventana_agrupacion_segundos'],
+    5 segundos por defecto). Con asincrono=False se mantiene el envío inmediato.
+    
     Usage:
         # En tu código de inicialización (ej: main.py):
         alert_handler = AlertLoggingHandler(config)
@@ -1519,7 +1797,8 @@ class AlertLoggingHandler(logging.Handler):
         alert_handler = AlertLoggingHandler(config, alert_service=alert_service)
     """
     
-    def __init__(self, config: dict, nivel_minimo: int = logging.WARNING, alert_service=None):
+    def __init__(self, config: dict, nivel_minimo: int = logging.WARNING, alert_service=None,
+                 asincrono: bool = True):
         """
         Inicializa el handler.
         
@@ -1527,11 +1806,13 @@ class AlertLoggingHandler(logging.Handler):
             config: Configuración del sistema
             nivel_minimo: Nivel mínimo de logging que triggers alertas (default: WARNING)
             alert_service: AlertService existente (opcional)
+            asincrono: Enviar las alertas en segundo plano agrupadas (default: True)
         """
         super().__init__()
         self.config = config
         self.nivel_minimo = nivel_minimo
         self.alert_service = alert_service
+        self.despachador = None
         self.formato = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
@@ -1543,9 +1824,13 @@ class AlertLoggingHandler(logging.Handler):
                 logging.debug("AlertLoggingHandler inicializado correctamente")
             except Exception as e:
                 logging.error(f"Error al inicializar AlertService: {e}")
+        
+        if asincrono and self.alert_service:
+            ventana = (config or {}).get('alertas', {}).get('ventana_agrupacion_segundos', 5.0)
+            self.despachador = DespachadorAlertas(self.alert_service, ventana_segundos=ventana)
     
     def emit(self, record: logging.LogRecord):
-        """Envía una alerta cuando se registra un mensaje de nivel WARNING o superior."""
+        """Encola una alerta cuando se registra un mensaje de nivel WARNING o superior."""
         # Solo procesar si el nivel es suficiente y tenemos el servicio activo
         if record.levelno < self.nivel_minimo or not self.alert_service:
             return
@@ -1563,7 +1848,12 @@ class AlertLoggingHandler(logging.Handler):
             if 'alert_service' in modulo.lower() or 'alerta' in mensaje.lower():
                 return
             
-            # Obtener contexto global del AlertService
+            # Mensajes que ya forman parte de una alerta propia (p. ej. la
+            # alerta única de la validación de entradas)
+            if getattr(record, 'sin_alerta', False):
+                return
+            
+            # Obtener contexto global del AlertService (en el momento del mensaje)
             contexto_global = getattr(self.alert_service, 'contexto_global', {})
             seccion_actual = contexto_global.get('seccion_actual', modulo)
             fecha_proceso = contexto_global.get('fecha_proceso', datetime.now().strftime('%Y-%m-%d'))
@@ -1572,35 +1862,46 @@ class AlertLoggingHandler(logging.Handler):
             # Determinar tipo de alerta según el nivel
             if record.levelno >= logging.CRITICAL:
                 tipo_alerta = "EXCEPCION_NO_ESPERADA"
-                seccion = seccion_actual
             elif record.levelno >= logging.ERROR:
                 tipo_alerta = "PROCESAMIENTO_ERROR"
-                seccion = seccion_actual
             else:  # WARNING
                 tipo_alerta = "WARNING_GENERICO"
-                seccion = seccion_actual
             
             # Contexto para la alerta
             contexto = {
                 'titulo': f"{record.levelname} en {modulo}",
                 'descripcion': mensaje,
-                'seccion': seccion,
+                'seccion': seccion_actual,
                 'seccion_actual': seccion_actual,
                 'fecha_proceso': fecha_proceso,
                 'area': area,
                 'fase': 'procesamiento',
-                'traza': 'Ver logs para detalles'
+                'traza': 'Ver logs para detalles',
+                'timestamp': datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')
             }
             
-            # Enviar alerta (usar clave única basada en mensaje para evitar spam)
-            import hashlib
+            # Clave única basada en el mensaje para evitar spam
             clave = hashlib.md5(mensaje.encode()).hexdigest()[:8]
             
-            self.alert_service.enviar_alerta(tipo_alerta, contexto, clave_unica=f"{modulo}_{clave}")
+            if self.despachador:
+                self.despachador.encolar(tipo_alerta, contexto, clave_unica=f"{modulo}_{clave}")
+            else:
+                self.alert_service.enviar_alerta(tipo_alerta, contexto, clave_unica=f"{modulo}_{clave}")
             
         except Exception as e:
             # No dejar que el handler de alertas falle el proceso
             logging.debug(f"Error en AlertLoggingHandler: {e}")
+    
+    def flush(self):
+        """Espera a que se envíen las alertas encoladas."""
+        if self.despachador:
+            self.despachador.vaciar()
+    
+    def close(self):
+        """Envía las alertas pendientes y detiene el despachador."""
+        if self.despachador:
+            self.despachador.cerrar()
+        super().close()
 
 
 def configurar_alertas_logging(config: dict, alert_service=None) -> AlertLoggingHandler:
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Módulo ArchivoStock - Archivo semanal comprimido de snapshots de stock
+
+Cada semana se guarda el stock (SPA_stock_actual.xlsx ya cargado) como una
+partición columnar comprimida identificada por su semana ISO
+(data/stocks_semanales/stock_2026_S09.npz). Para no repetir cada semana las
+miles de filas que no cambian, las particiones se codifican por diferencia
+contra el snapshot anterior: solo se guardan las filas nuevas o modificadas y
+una lista de tramos que indica qué filas del snapshot anterior se reutilizan.
+Cada SNAPSHOTS_ENTRE_BASES semanas (o cuando la diferencia no compensa) se
+guarda un snapshot completo para acotar la cadena de reconstrucción.
+
+Consultas disponibles:
+    - stock_en_semana(W): stock tal y como se guardó en la semana W
+    - stock_semana_anterior(fecha): último snapshot anterior a la semana de 'fecha'
+    - unidades_en_semana(W): unidades por artículo+talla+color de la semana W
+    - diferencia(W1, W2): unidades por artículo+talla+color que cambian entre dos semanas
+
+Solo usa numpy/pandas (np.savez_compressed), sin dependencias adicionales.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-09
+"""
+
+import logging
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.paths import STOCKS_SEMANALES_DIR
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+# Cada cuántas particiones se fuerza un snapshot completo
+SNAPSHOTS_ENTRE_BASES = 8
+
+# Si más de esta fracción de filas cambia, se guarda el snapshot completo
+FRACCION_MAXIMA_DELTA = 0.5
+
+SEPARADOR_FILA = '\x1f'
+
+PATRON_ARCHIVO = re.compile(r'^stock_(\d{4})_S(\d{2})\.npz$')
+
+Semana = Tuple[int, int]
+ValorSemana = Union[Semana, str, date, datetime]
+
+
+def clave_semana(valor: ValorSemana) -> Semana:
+    """
+    Convierte una fecha, una tupla (año, semana) o un texto '2026-W09' en la
+    tupla (año_iso, semana_iso).
+    """
+    if isinstance(valor, (datetime, date)):
+        año, semana, _ = valor.isocalendar()
+        return int(año), int(semana)
+    if isinstance(valor, str):
+        match = re.match(r'^(\d{4})-?[WwSs](\d{1,2})$', valor.strip())
+        if not match:
+            raise ValueError(f"Semana no válida: '{valor}' (formato esperado: 2026-W09)")
+        return int(match.group(1)), int(match.group(2))
+    año, semana = valor
+    return int(año), int(semana)
+
+
+class ArchivoStockSemanal:
+    """
+    Archivo de snapshots semanales de stock con codificación por diferencias.
+
+    Attributes:
+        directorio (Path): Carpeta donde se guardan las particiones .npz
+    """
+
+    def __init__(self, directorio: Optional[Path] = None):
+        """
+        Inicializa el archivo.
+
+        Args:
+            directorio: Carpeta de particiones. Por defecto data/stocks_semanales
+        """
+        self.directorio = Path(directorio) if directorio else STOCKS_SEMANALES_DIR
+        self._cache: Dict[Semana, pd.DataFrame] = {}
+
+    # ------------------------------------------------------------------
+    # Particiones
+    # ------------------------------------------------------------------
+
+    def _ruta(self, semana: Semana) -> Path:
+        return self.directorio / f"stock_{semana[0]}_S{semana[1]:02d}.npz"
+
+    def semanas(self) -> List[Semana]:
+        """Semanas ISO archivadas, en orden cronológico."""
+        if not self.directorio.exists():
+            return []
+        semanas = []
+        for archivo in self.directorio.iterdir():
+            match = PATRON_ARCHIVO.match(archivo.name)
+            if match:
+                semanas.append((int(match.group(1)), int(match.group(2))))
+        return sorted(semanas)
+
+    def _leer_particion(self, semana: Semana) -> Dict[str, np.ndarray]:
+        with np.load(self._ruta(semana), allow_pickle=False) as datos:
+            return {nombre: datos[nombre] for nombre in datos.files}
+
+    def _escribir_particion(self, semana: Semana, arrays: Dict[str, np.ndarray]):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self._ruta(semana)
+        temporal = ruta.with_name(ruta.stem + '.tmp.npz')
+        np.savez_compressed(temporal, **arrays)
+        os.replace(temporal, ruta)
+
+    # ------------------------------------------------------------------
+    # Codificación columnar
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _codificar_columnas(df: pd.DataFrame, prefijo: str) -> Dict[str, np.ndarray]:
+        """
+        Convierte cada columna en un array numpy: las numéricas como float64 y
+        el resto como texto de ancho fijo con una máscara de vacíos.
+        """
+        arrays = {}
+        for i, col in enumerate(df.columns):
+            serie = df[col]
+            if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+                arrays[f'{prefijo}{i}'] = serie.to_numpy(dtype='float64', na_value=np.nan)
+            else:
+                nulos = serie.isna().to_numpy()
+                arrays[f'{prefijo}{i}'] = np.array(serie.where(~nulos, '').map(str).tolist(), dtype=str)
+                arrays[f'{prefijo}{i}_nulos'] = nulos
+        return arrays
+
+    @staticmethod
+    def _decodificar_columnas(arrays: Dict[str, np.ndarray], prefijo: str,
+                              columnas: List[str], tipos: List[str]) -> pd.DataFrame:
+        datos = {}
+        for i, (col, tipo) in enumerate(zip(columnas, tipos)):
+            valores = arrays[f'{prefijo}{i}']
+            if tipo == 'num':
+                datos[col] = valores
+            else:
+                serie = pd.Series(valores, dtype=object)
+                datos[col] = serie.where(~arrays[f'{prefijo}{i}_nulos'], np.nan)
+        return pd.DataFrame(datos, columns=columnas)
+
+    @staticmethod
+    def _huellas_filas(df: pd.DataFrame) -> pd.Series:
+        """
+        Texto que identifica cada fila completa (para detectar filas sin cambios).
+        Usa la misma representación con la que se guardan las columnas, de modo
+        que una fila leída del archivo coincide con la misma fila recién cargada.
+        """
+        if df.empty:
+            return pd.Series([], dtype=object)
+        huella = None
+        for col in df.columns:
+            serie = df[col]
+            if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+                parte = pd.Series(serie.to_numpy(dtype='float64', na_value=np.nan).astype(str))
+            else:
+                parte = pd.Series(serie.where(serie.notna(), '\x00').map(str).to_numpy())
+            huella = parte if huella is None else huella + SEPARADOR_FILA + parte
+        return huella
+
+    @staticmethod
+    def _tramos(indices: np.ndarray) -> np.ndarray:
+        """Comprime una lista de índices en tramos consecutivos (inicio, longitud)."""
+        if len(indices) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        cortes = np.flatnonzero(np.diff(indices) != 1) + 1
+        inicios = np.concatenate(([0], cortes))
+        longitudes = np.diff(np.concatenate((inicios, [len(indices)])))
+        return np.column_stack((indices[inicios], longitudes)).astype(np.int64)
+
+    @staticmethod
+    def _expandir_tramos(tramos: np.ndarray) -> np.ndarray:
+        if len(tramos) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(inicio, inicio + longitud) for inicio, longitud in tramos])
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def guardar_semana(self, df: pd.DataFrame, semana: Optional[ValorSemana] = None) -> Path:
+        """
+        Archiva el stock de una semana (por defecto, la semana actual).
+
+        Si la semana ya estaba archivada se sustituye; la partición siguiente,
+        si dependía de ella, se reescribe antes como snapshot completo.
+
+        Args:
+            df: Stock a archivar (tal y como lo usan los informes)
+            semana: Semana ISO, fecha o '2026-W09'
+
+        Returns:
+            Path: Ruta de la partición escrita
+        """
+        semana = clave_semana(semana if semana is not None else datetime.now())
+        df = df.reset_index(drop=True)
+        columnas = [str(c) for c in df.columns]
+        df.columns = columnas
+
+        semanas = self.semanas()
+        posteriores = [s for s in semanas if s > semana]
+        if semana in semanas and posteriores:
+            siguiente = posteriores[0]
+            if self._leer_particion(siguiente)['base'].size:
+                self._escribir_completo(siguiente, self.stock_en_semana(siguiente))
+
+        anteriores = [s for s in semanas if s < semana]
+        arrays = None
+        if anteriores:
+            arrays = self._codificar_delta(df, anteriores[-1], cadena=self._longitud_cadena(anteriores[-1]))
+        if arrays is None:
+            self._escribir_completo(semana, df)
+        else:
+            self._escribir_particion(semana, arrays)
+
+        self._cache = {s: v for s, v in self._cache.items() if s < semana}
+        logger.info(f"Stock archivado para la semana {semana[0]}-W{semana[1]:02d}: {self._ruta(semana).name}")
+        return self._ruta(semana)
+
+    def _metadatos(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        tipos = ['num' if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])
+                 else 'txt' for c in df.columns]
+        return {
+            'columnas': np.array(list(df.columns), dtype=str),
+            'tipos': np.array(tipos, dtype=str),
+            'filas': np.array(len(df), dtype=np.int64),
+        }
+
+    def _escribir_completo(self, semana: Semana, df: pd.DataFrame):
+        arrays = self._metadatos(df)
+        arrays['base'] = np.empty(0, dtype=np.int64)
+        arrays.update(self._codificar_columnas(df, 'col_'))
+        self._escribir_particion(semana, arrays)
+
+    def _longitud_cadena(self, semana: Semana) -> int:
+        """Número de particiones delta encadenadas hasta el snapshot completo."""
+        longitud = 0
+        while True:
+            base = self._leer_particion(semana)['base']
+            if not base.size:
+                return longitud
+            semana = (int(base[0]), int(base[1]))
+            longitud += 1
+
+    def _codificar_delta(self, df: pd.DataFrame, semana_base: Semana,
+                         cadena: int) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Codifica df contra el snapshot de semana_base. Devuelve None si conviene
+        guardar el snapshot completo (columnas distintas, demasiados cambios o
+        cadena de diferencias demasiado larga).
+        """
+        if cadena + 1 >= SNAPSHOTS_ENTRE_BASES or df.empty:
+            return None
+        base = self.stock_en_semana(semana_base)
+        metadatos = self._metadatos(df)
+        if list(base.columns) != list(df.columns) or \
+                list(self._metadatos(base)['tipos']) != list(metadatos['tipos']):
+            return None
+
+        huellas_base = self._huellas_filas(base)
+        posiciones = pd.Series(np.arange(len(base)), index=huellas_base.values)
+        posiciones = posiciones[~posiciones.index.duplicated()]
+        referencias = self._huellas_filas(df).map(posiciones)
+
+        nuevas = referencias.isna().to_numpy()
+        if nuevas.mean() > FRACCION_MAXIMA_DELTA:
+            return None
+
+        # Las filas nuevas se numeran a continuación de las del snapshot base
+        indices = referencias.to_numpy(dtype='float64', na_value=np.nan).copy()
+        indices[nuevas] = len(base) + np.arange(int(nuevas.sum()))
+
+        arrays = metadatos
+        arrays['base'] = np.array(semana_base, dtype=np.int64)
+        arrays['tramos'] = self._tramos(indices.astype(np.int64))
+        arrays.update(self._codificar_columnas(df[nuevas], 'nueva_'))
+        return arrays
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def stock_en_semana(self, semana: ValorSemana) -> pd.DataFrame:
+        """
+        Stock archivado en la semana indicada.
+
+        Args:
+            semana: Semana ISO, fecha o '2026-W09'
+
+        Returns:
+            DataFrame con el stock de esa semana (vacío si no está archivada)
+        """
+        semana = clave_semana(semana)
+        if semana in self._cache:
+            return self._cache[semana].copy()
+        if not self._ruta(semana).exists():
+            return pd.DataFrame()
+
+        arrays = self._leer_particion(semana)
+        columnas = [str(c) for c in arrays['columnas']]
+        tipos = [str(t) for t in arrays['tipos']]
+
+        if not arrays['base'].size:
+            df = self._decodificar_columnas(arrays, 'col_', columnas, tipos)
+        else:
+            base = self.stock_en_semana((int(arrays['base'][0]), int(arrays['base'][1])))
+            nuevas = self._decodificar_columnas(arrays, 'nueva_', columnas, tipos)
+            combinado = pd.concat([base, nuevas], ignore_index=True)
+            df = combinado.iloc[self._expandir_tramos(arrays['tramos'])].reset_index(drop=True)
+
+        self._cache[semana] = df
+        return df.copy()
+
+    def semana_anterior(self, fecha: Optional[ValorSemana] = None) -> Optional[Semana]:
+        """Última semana archivada estrictamente anterior a la de 'fecha' (hoy por defecto)."""
+        actual = clave_semana(fecha if fecha is not None else datetime.now())
+        anteriores = [s for s in self.semanas() if s < actual]
+        return anteriores[-1] if anteriores else None
+
+    def stock_semana_anterior(self, fecha: Optional[ValorSemana] = None) -> pd.DataFrame:
+        """
+        Stock del último snapshot archivado antes de la semana de 'fecha'.
+
+        Returns:
+            DataFrame con el stock o vacío si no hay ninguna semana anterior archivada
+        """
+        semana = self.semana_anterior(fecha)
+        return self.stock_en_semana(semana) if semana else pd.DataFrame()
+
+    @staticmethod
+    def _unidades_por_articulo(df: pd.DataFrame) -> pd.Series:
+        if df.empty or 'Artículo' not in df.columns:
+            return pd.Series(dtype='float64')
+        claves = pd.DataFrame({
+            col: (df[col].astype(object).where(df[col].notna(), '').map(str).str.strip()
+                  if col in df.columns else '')
+            for col in ('Artículo', 'Talla', 'Color')
+        })
+        claves['Artículo'] = claves['Artículo'].str.replace(r'\.0$', '', regex=True)
+        claves['Unidades'] = pd.to_numeric(df.get('Unidades'), errors='coerce').fillna(0)
+        claves = claves[claves['Artículo'] != '']
+        return claves.groupby(['Artículo', 'Talla', 'Color'])['Unidades'].sum()
+
+    def unidades_en_semana(self, semana: ValorSemana) -> pd.Series:
+        """
+        Unidades archivadas en la semana por artículo+talla+color.
+
+        Returns:
+            Serie indexada por (Artículo, Talla, Color), vacía si la semana no está archivada
+        """
+        return self._unidades_por_articulo(self.stock_en_semana(semana))
+
+    def diferencia(self, semana_1: ValorSemana, semana_2: ValorSemana) -> pd.DataFrame:
+        """
+        Cambios de stock por artículo+talla+color entre dos semanas archivadas.
+
+        Returns:
+            DataFrame con Artículo, Talla, Color, Unidades_1, Unidades_2,
+            Diferencia y Estado ('NUEVO', 'ELIMINADO' o 'MODIFICADO'),
+            solo para las combinaciones que cambian
+        """
+        unidades_1 = self._unidades_por_articulo(self.stock_en_semana(semana_1))
+        unidades_2 = self._unidades_por_articulo(self.stock_en_semana(semana_2))
+
+        tabla = pd.concat([unidades_1.rename('Unidades_1'), unidades_2.rename('Unidades_2')], axis=1)
+        en_1 = tabla['Unidades_1'].notna()
+        en_2 = tabla['Unidades_2'].notna()
+        tabla = tabla.fillna(0)
+        tabla['Diferencia'] = tabla['Unidades_2'] - tabla['Unidades_1']
+        tabla['Estado'] = np.select([~en_1, ~en_2], ['NUEVO', 'ELIMINADO'], default='MODIFICADO')
+        tabla = tabla[(tabla['Diferencia'] != 0) | (en_1 != en_2)]
+        return tabla.reset_index()
+
+
+def crear_archivo_stock(directorio: Optional[Path] = None) -> ArchivoStockSemanal:
+    """
+    Crea una instancia del archivo semanal de stock.
+
+    Args:
+        directorio: Carpeta de particiones (por defecto data/stocks_semanales)
+
+    Returns:
+        ArchivoStockSemanal: Instancia del archivo
+    """
+    return ArchivoStockSemanal(directorio)
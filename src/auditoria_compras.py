@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Módulo AuditoriaCompras - Motor común de los informes de auditoría de compras
+
+Los informes informe_compras_sin_autorizacion.py e Informe_artículos_no_comprados.py
+cruzan los mismos ficheros (stock actual, stock de la semana anterior, ventas de
+la semana y pedidos semanales de todas las secciones). Este motor carga cada
+fichero una única vez por ejecución, construye las claves artículo+talla+color
+de forma vectorizada y resuelve ambos informes como anti-joins sobre todas las
+secciones a la vez, repartiendo los resultados por sección al final.
+
+Conjuntos calculados:
+    - Compras sin pedido: artículos con stock actual > 0 que no estaban en el
+      stock de la semana anterior ni en el pedido de la semana anterior de su
+      sección (la sección se asigna por el prefijo del código de artículo).
+    - Artículos no comprados: artículos del pedido semanal más reciente de cada
+      sección que no aparecen ni en las ventas de la semana ni en el stock actual.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-06
+"""
+
+import logging
+import re
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+import pandas as pd
+
+from src.paths import INPUT_DIR, PEDIDOS_SEMANALES_DIR
+from src.lectura_entradas import leer_tabla, resolver_entrada
+from src.manifiesto_entradas import obtener_manifiesto
+from src.archivo_stock import ArchivoStockSemanal, crear_archivo_stock
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+# Texto que identifica las filas de resumen al final de los pedidos semanales
+PATRON_FILAS_RESUMEN = (
+    'Métrica|Resumen|Total|Subtotal|Articulos_A:|Articulos_B:|Articulos_C:|'
+    'Stock_Minimo|Objetivo_Semana:|Factor_Crecimiento:|Factor_Festivo:'
+)
+
+COLUMNAS_COMPRAS_SIN_PEDIDO = ['Artículo', 'Nombre Artículo', 'Talla', 'Color', 'Stock']
+COLUMNAS_NO_COMPRADOS = ['Artículo', 'Nombre artículo', 'Talla', 'Color', 'Unidades compra']
+
+
+# ============================================================================
+# FUNCIONES DE NORMALIZACIÓN VECTORIZADAS
+# ============================================================================
+
+def fill_forward_blank_cells(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Rellena celdas en blanco hacia abajo (misma regla que los informes).
+
+    Args:
+        df: DataFrame
+        columns: Lista de columnas a procesar
+
+    Returns:
+        DataFrame con las celdas rellenadas
+    """
+    df = df.copy()
+    for col in columns:
+        if col in df.columns:
+            df[col] = df[col].astype(str).replace(['nan', 'None', ''], pd.NA).ffill()
+            df[col] = df[col].astype(str).replace('nan', '')
+    return df
+
+
+def normalizar_codigos(serie: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de normalizar_codigo_articulo: '' para vacíos,
+    sin espacios y sin el sufijo '.0'.
+    """
+    codigos = serie.astype(str).str.strip()
+    codigos = codigos.where(~codigos.str.endswith('.0'), codigos.str[:-2])
+    return codigos.where(serie.notna(), '')
+
+
+def _columna_texto(df: pd.DataFrame, columna: str) -> pd.Series:
+    """str() de cada valor de la columna, o '' si la columna no existe."""
+    if columna in df.columns:
+        # map(str) y no astype(str): las columnas de texto conservan los
+        # vacíos como NaN con astype y la clave debe llevar 'nan'
+        return df[columna].map(str)
+    return pd.Series('', index=df.index, dtype=object)
+
+
+def construir_claves(df: pd.DataFrame, columna_articulo: str = 'Artículo') -> pd.Series:
+    """
+    Construye la clave '{artículo}_{talla}_{color}' de cada fila.
+
+    Equivale a crear_clave_articulo(...) aplicado fila a fila, incluida la
+    representación textual de los vacíos ('nan'), para que los cruces den
+    exactamente los mismos resultados que la versión anterior.
+    """
+    articulos = normalizar_codigos(df[columna_articulo])
+    return articulos + '_' + _columna_texto(df, 'Talla') + '_' + _columna_texto(df, 'Color')
+
+
+def obtener_prefijos(articulos: pd.Series) -> pd.Series:
+    """Primer dígito del código de artículo ('' si está vacío)."""
+    codigos = articulos.astype(str).str.replace('.0', '', regex=False).str.strip()
+    return codigos.str[:1].where((codigos != '') & (codigos != 'nan'), '')
+
+
+# ============================================================================
+# CLASE PRINCIPAL
+# ============================================================================
+
+class MotorAuditoriaCompras:
+    """
+    Carga una sola vez las entradas de los informes de auditoría y calcula
+    los conjuntos de compras sin pedido y artículos no comprados para todas
+    las secciones.
+
+    Attributes:
+        secciones (List[str]): Secciones a auditar (en minúsculas, como en los pedidos)
+        prefijos_seccion (Dict[str, List[str]]): Prefijos de código de cada sección
+        dir_entrada (Path): Directorio con los ficheros SPA_*.xlsx
+        dir_pedidos (Path): Directorio con los Pedido_Semana_*.xlsx
+        archivo_stock (ArchivoStockSemanal): Snapshots semanales de stock
+    """
+
+    def __init__(self, secciones: List[str],
+                 prefijos_seccion: Optional[Dict[str, List[str]]] = None,
+                 dir_entrada: Optional[Path] = None,
+                 dir_pedidos: Optional[Path] = None,
+                 archivo_stock: Optional[ArchivoStockSemanal] = None):
+        """
+        Inicializa el motor.
+
+        Args:
+            secciones: Secciones a auditar
+            prefijos_seccion: Prefijos de código por sección (necesario para
+                las compras sin pedido)
+            dir_entrada: Directorio de entrada (por defecto data/input)
+            dir_pedidos: Directorio de pedidos semanales
+            archivo_stock: Archivo semanal de snapshots de stock
+        """
+        self.secciones = list(secciones)
+        self.prefijos_seccion = prefijos_seccion or {}
+        self.dir_entrada = Path(dir_entrada) if dir_entrada else INPUT_DIR
+        self.dir_pedidos = Path(dir_pedidos) if dir_pedidos else PEDIDOS_SEMANALES_DIR
+        self.archivo_stock = archivo_stock or crear_archivo_stock()
+
+        self._cache: Dict[str, Any] = {}
+        self._excel_pedidos: Dict[Path, pd.DataFrame] = {}
+
+    # ------------------------------------------------------------------
+    # Carga de datos (una vez por ejecución)
+    # ------------------------------------------------------------------
+
+    def _memorizar(self, clave: str, cargador) -> Any:
+        if clave not in self._cache:
+            self._cache[clave] = cargador()
+        return self._cache[clave]
+
+    def _leer_stock(self, archivo: Path) -> pd.DataFrame:
+        df = leer_tabla(archivo)
+        df = fill_forward_blank_cells(df, ['Artículo', 'Nombre artículo'])
+        logger.info(f"Cargado: {archivo.name}")
+        return df
+
+    def _leer_pedido(self, archivo: Path) -> pd.DataFrame:
+        """Lee un pedido semanal (encabezados en la segunda fila) con caché por ruta."""
+        if archivo not in self._excel_pedidos:
+            self._excel_pedidos[archivo] = pd.read_excel(archivo, header=1)
+            logger.info(f"Cargado: {archivo.name}")
+        return self._excel_pedidos[archivo]
+
+    @property
+    def stock_actual(self) -> pd.DataFrame:
+        """Stock actual (SPA_stock_actual.xlsx) con celdas en blanco rellenadas."""
+        def cargar():
+            archivo = resolver_entrada(self.dir_entrada / "SPA_stock_actual.xlsx")
+            return self._leer_stock(archivo) if archivo.exists() else pd.DataFrame()
+        return self._memorizar('stock_actual', cargar)
+
+    @property
+    def ventas_semana(self) -> pd.DataFrame:
+        """Ventas de la semana (SPA_ventas_semana.xlsx)."""
+        def cargar():
+            archivo = resolver_entrada(self.dir_entrada / "SPA_ventas_semana.xlsx")
+            return self._leer_stock(archivo) if archivo.exists() else pd.DataFrame()
+        return self._memorizar('ventas_semana', cargar)
+
+    @property
+    def stock_semana_anterior(self) -> pd.DataFrame:
+        """
+        Stock de la semana anterior: último snapshot del archivo semanal de
+        stock anterior a la semana en curso.
+
+        Mientras el archivo no tenga ninguna semana anterior se usa la copia
+        heredada SPA_stock_semana_anterior.xlsx, si existe.
+        """
+        def cargar():
+            semana = self.archivo_stock.semana_anterior()
+            if semana is not None:
+                logger.info(f"Stock semana anterior: snapshot {semana[0]}-W{semana[1]:02d}")
+                return self.archivo_stock.stock_en_semana(semana)
+
+            archivo = resolver_entrada(self.dir_entrada / "SPA_stock_semana_anterior.xlsx")
+            if archivo.exists():
+                try:
+                    return self._leer_stock(archivo)
+                except Exception as e:
+                    logger.warning(f"Error al cargar stock semana anterior: {e}")
+
+            logger.warning("No hay snapshot de stock de semanas anteriores")
+            return pd.DataFrame()
+        return self._memorizar('stock_semana_anterior', cargar)
+
+    def _archivos_pedido(self) -> List[Path]:
+        return self._memorizar('archivos_pedido',
+                               lambda: [Path(e.ruta) for e in obtener_manifiesto().buscar(self.dir_pedidos, 'Pedido_Semana_*')])
+
+    def obtener_semana_anterior(self) -> Optional[str]:
+        """
+        Semana anterior a la del pedido más reciente ('06', '07', ...) o None.
+        """
+        def calcular():
+            semanas = set()
+            for archivo in self._archivos_pedido():
+                match = re.search(r'Pedido_Semana_(\d+)_', archivo.name)
+                if match:
+                    semanas.add(int(match.group(1)))
+            if not semanas:
+                return None
+            return str(max(semanas) - 1).zfill(2)
+        return self._memorizar('semana_anterior', calcular)
+
+    @property
+    def pedidos_semana_anterior(self) -> pd.DataFrame:
+        """
+        Claves artículo+talla+color autorizadas en el pedido de la semana
+        anterior de cada sección (columnas 'Seccion' y 'clave').
+        """
+        def cargar():
+            semana = self.obtener_semana_anterior()
+            if semana is None:
+                logger.warning("No se pudo determinar la semana anterior")
+                return pd.DataFrame()
+
+            dfs = []
+            for seccion in self.secciones:
+                # El patrón de 'interior' también encaja con los de 'deco_interior'
+                archivos = [Path(e.ruta) for e in
+                            obtener_manifiesto().buscar(self.dir_pedidos, f"Pedido_Semana_{semana}_*_{seccion}.xlsx")
+                            if (e.seccion or '').lower() == seccion.lower()]
+                if not archivos:
+                    logger.warning(f"No se encontró pedido de semana {semana} para {seccion}")
+                    continue
+                try:
+                    df = self._leer_pedido(archivos[0])
+                except Exception as e:
+                    logger.error(f"Error al cargar pedido de semana {semana} ({seccion}): {e}")
+                    continue
+                df = fill_forward_blank_cells(df, ['Código artículo', 'Nombre Artículo', 'Nombre artículo'])
+                df = df.rename(columns={'Código artículo': 'Artículo', 'Código': 'Artículo'})
+                if 'Artículo' not in df.columns:
+                    continue
+                df['Artículo'] = normalizar_codigos(df['Artículo'])
+                df = df[df['Artículo'] != '']
+                # Las claves se construyen por fichero, antes de concatenar,
+                # para que talla/color conserven el tipo con el que se leyeron
+                dfs.append(pd.DataFrame({'Seccion': seccion, 'clave': construir_claves(df)}))
+            return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+        return self._memorizar('pedidos_semana_anterior', cargar)
+
+    @property
+    def pedidos_recientes(self) -> pd.DataFrame:
+        """
+        Líneas del pedido semanal más reciente de cada sección, sin filas de
+        resumen, con las columnas del informe de no comprados más 'Seccion'
+        y 'clave'.
+        """
+        def cargar():
+            archivos = self._archivos_pedido()
+            dfs = []
+            for seccion in self.secciones:
+                candidatos = [a for a in archivos if a.name.endswith(f'_{seccion}.xlsx')]
+                if not candidatos:
+                    continue
+                archivo = max(candidatos, key=lambda a: a.name)
+                df = fill_forward_blank_cells(
+                    self._leer_pedido(archivo),
+                    ['Código artículo', 'Nombre Artículo', 'Nombre artículo', 'Talla', 'Color']
+                )
+                if 'Código artículo' in df.columns:
+                    df = df[df['Código artículo'].notna() & (df['Código artículo'] != '')]
+                    es_resumen = pd.Series(False, index=df.index)
+                    for col in df.columns:
+                        es_resumen |= df[col].astype(str).str.contains(
+                            PATRON_FILAS_RESUMEN, case=False, na=False
+                        )
+                    df = df[~es_resumen]
+                    df = df.assign(**{'Artículo': df['Código artículo']})
+                dfs.append(self._proyectar_pedido(df, seccion))
+            return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+        return self._memorizar('pedidos_recientes', cargar)
+
+    @staticmethod
+    def _proyectar_pedido(df: pd.DataFrame, seccion: str) -> pd.DataFrame:
+        """
+        Reduce un pedido a las columnas del informe. Se hace por fichero,
+        antes de concatenar, porque cada sección puede traer sus propias
+        columnas de nombre y unidades.
+        """
+        if 'Artículo' in df.columns:
+            articulos = normalizar_codigos(df['Artículo'])
+        else:
+            articulos = pd.Series('', index=df.index, dtype=object)
+        nombre_col = next((c for c in ('Nombre Artículo', 'Nombre artículo') if c in df.columns), None)
+        unidades_col = next((c for c in ('Pedido Final', 'Unidades Calculadas', 'Unidades')
+                             if c in df.columns), None)
+        return pd.DataFrame({
+            'Artículo': articulos,
+            'Nombre artículo': df[nombre_col].astype(object) if nombre_col else '',
+            'Talla': df['Talla'] if 'Talla' in df.columns else '',
+            'Color': df['Color'] if 'Color' in df.columns else '',
+            'Unidades compra': df[unidades_col].astype(object) if unidades_col else '',
+            'Seccion': seccion,
+            'clave': articulos + '_' + _columna_texto(df, 'Talla') + '_' + _columna_texto(df, 'Color'),
+        }, index=df.index)
+
+    # ------------------------------------------------------------------
+    # Conjuntos de auditoría
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalizar_stock(df: pd.DataFrame) -> pd.DataFrame:
+        """Renombra columnas de stock y descarta filas sin código de artículo."""
+        if df.empty:
+            return df
+        df = df.rename(columns={'Nombre artículo': 'Nombre Artículo', 'Unidades': 'Stock'})
+        if 'Artículo' in df.columns:
+            df['Artículo'] = normalizar_codigos(df['Artículo'])
+            df = df[df['Artículo'] != '']
+        return df
+
+    def compras_sin_pedido(self) -> pd.DataFrame:
+        """
+        Artículos comprados sin autorización en todas las secciones.
+
+        Returns:
+            DataFrame con COLUMNAS_COMPRAS_SIN_PEDIDO más 'Seccion'
+        """
+        def calcular():
+            stock = self._normalizar_stock(self.stock_actual)
+            if stock.empty or 'Artículo' not in stock.columns:
+                return pd.DataFrame(columns=COLUMNAS_COMPRAS_SIN_PEDIDO + ['Seccion'])
+
+            stock = stock[stock['Stock'].fillna(0) > 0].copy()
+            stock['clave'] = construir_claves(stock)
+
+            # Anti-join contra el stock de la semana anterior (común a todas las secciones)
+            anterior = self._normalizar_stock(self.stock_semana_anterior)
+            if not anterior.empty and 'Artículo' in anterior.columns:
+                stock = stock[~stock['clave'].isin(construir_claves(anterior))]
+
+            # Asignar cada artículo a las secciones que comparten su prefijo
+            asignacion = pd.DataFrame(
+                [(prefijo, seccion) for seccion in self.secciones
+                 for prefijo in self.prefijos_seccion.get(seccion, [])],
+                columns=['_prefijo', 'Seccion']
+            )
+            stock['_orden'] = range(len(stock))
+            stock['_prefijo'] = obtener_prefijos(stock['Artículo'])
+            candidatos = stock.merge(asignacion, on='_prefijo', how='inner')
+
+            # Anti-join contra el pedido de la semana anterior de cada sección
+            autorizados = self.pedidos_semana_anterior
+            if not autorizados.empty:
+                claves = pd.MultiIndex.from_arrays([candidatos['Seccion'], candidatos['clave']])
+                autorizados = pd.MultiIndex.from_frame(autorizados[['Seccion', 'clave']])
+                candidatos = candidatos[~claves.isin(autorizados)]
+
+            candidatos = candidatos.sort_values(['Seccion', '_orden'], kind='stable')
+            resultado = pd.DataFrame({
+                'Artículo': candidatos['Artículo'],
+                'Nombre Artículo': candidatos.get('Nombre Artículo', ''),
+                'Talla': candidatos.get('Talla', ''),
+                'Color': candidatos.get('Color', ''),
+                'Stock': candidatos['Stock'].astype(float),
+                'Seccion': candidatos['Seccion'],
+            })
+            return resultado.reset_index(drop=True)
+        return self._memorizar('compras_sin_pedido', calcular)
+
+    def articulos_no_comprados(self) -> pd.DataFrame:
+        """
+        Artículos pedidos que no aparecen ni en ventas ni en stock, en todas las secciones.
+
+        Returns:
+            DataFrame con COLUMNAS_NO_COMPRADOS más 'Seccion'
+        """
+        def calcular():
+            pedidos = self.pedidos_recientes
+            if pedidos.empty:
+                return pd.DataFrame(columns=COLUMNAS_NO_COMPRADOS + ['Seccion'])
+
+            # Anti-join contra ventas de la semana y stock actual
+            encontrados = pd.Index([])
+            for df in (self.ventas_semana, self.stock_actual):
+                if not df.empty and 'Artículo' in df.columns:
+                    encontrados = encontrados.append(pd.Index(construir_claves(df)))
+            mascara = ~pedidos['clave'].isin(encontrados) & (pedidos['clave'] != '__')
+
+            resultado = pedidos.loc[mascara, COLUMNAS_NO_COMPRADOS + ['Seccion']]
+            return resultado.reset_index(drop=True)
+        return self._memorizar('articulos_no_comprados', calcular)
+
+    # ------------------------------------------------------------------
+    # Reparto por sección
+    # ------------------------------------------------------------------
+
+    def dividir_por_seccion(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Reparte un resultado con columna 'Seccion' en un DataFrame por sección.
+        Las secciones sin resultados reciben un DataFrame vacío.
+        """
+        resultados = {seccion: pd.DataFrame() for seccion in self.secciones}
+        for seccion, grupo in df.groupby('Seccion', sort=False):
+            resultados[seccion] = grupo.drop(columns='Seccion').reset_index(drop=True)
+        return resultados
+
+    def compras_sin_pedido_por_seccion(self) -> Dict[str, pd.DataFrame]:
+        """Compras sin pedido repartidas por sección."""
+        return self.dividir_por_seccion(self.compras_sin_pedido())
+
+    def articulos_no_comprados_por_seccion(self) -> Dict[str, pd.DataFrame]:
+        """Artículos no comprados repartidos por sección."""
+        return self.dividir_por_seccion(self.articulos_no_comprados())
+
+
+def crear_motor_auditoria(secciones: List[str],
+                          prefijos_seccion: Optional[Dict[str, List[str]]] = None,
+                          dir_entrada: Optional[Path] = None,
+                          dir_pedidos: Optional[Path] = None,
+                          archivo_stock: Optional[ArchivoStockSemanal] = None) -> MotorAuditoriaCompras:
+    """
+    Crea una instancia del motor de auditoría de compras.
+
+    Args:
+        secciones: Secciones a auditar
+        prefijos_seccion: Prefijos de código por sección
+        dir_entrada: Directorio de entrada
+        dir_pedidos: Directorio de pedidos semanales
+        archivo_stock: Archivo semanal de snapshots de stock
+
+    Returns:
+        MotorAuditoriaCompras: Instancia del motor
+    """
+    return MotorAuditoriaCompras(secciones, prefijos_seccion, dir_entrada, dir_pedidos, archivo_stock)
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Módulo Backtesting - Repetición vectorizada de los pedidos de semanas pasadas
+
+Hasta ahora no había forma de medir si los pedidos fueron buenos. Este módulo
+rehace el pedido de cada semana y sección de un año ya vendido y lo compara con
+lo que realmente se vendió en la semana que cubría el pedido:
+
+- El forecast (FASE 1) se calcula con ForecastEngine.calcular_pedidos_semanas()
+  sobre las ventas del año base (por defecto el año anterior al evaluado), igual
+  que main.py usa el histórico del año pasado.
+- El stock inicial de cada semana es el snapshot de ArchivoStockSemanal si esa
+  semana está archivada; si no, el stock simulado que dejó la semana anterior
+  (stock + pedido - ventas reales), empezando en 0.
+- Pedido_Final sigue la fórmula de aplicar_stock_minimo() y de la FASE 2
+  (CorrectionEngine): max(0, Unidades_Finales + Stock_Minimo - Stock_Real +
+  Tendencia_Consumo), con la tendencia calculada con las ventas reales y las
+  unidades calculadas de la semana anterior del propio backtest.
+
+Todo se agrega una vez en arrays artículo × semana por sección, de modo que un
+año completo de las 11 secciones se evalúa sin llamar a procesar_pedido_semana()
+semana a semana. Las métricas (sesgo, MAPE, roturas de stock y sobrestock) se
+resumen por sección, categoría ABC y proveedor.
+
+Uso:
+    backtest = crear_backtest_pedidos(config).cargar(año=2025)
+    detalle = backtest.evaluar()
+    resumen_secciones = resumir(detalle, ['seccion'])
+
+    python -m src.backtesting --año 2025
+    python -m src.backtesting --año 2025 --semanas 10-30 --secciones vivero,plantas --excel
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+import numpy as np
+import pandas as pd
+
+from src.date_utils import lista_semanas
+from src.paths import BACKTESTING_DIR
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+SIN_CATEGORIA = 'Sin histórico'
+SIN_PROVEEDOR = 'Sin proveedor'
+
+COLUMNAS_DETALLE = ['seccion', 'semana', 'Codigo_Articulo', 'Talla', 'Color', 'Categoria', 'Proveedor',
+                    'unidades_finales', 'stock_minimo', 'stock_inicial', 'stock_archivado',
+                    'tendencia_consumo', 'pedido_final', 'ventas_reales', 'rotura',
+                    'unidades_no_cubiertas', 'sobrestock', 'unidades_exceso']
+
+METRICAS = ['celdas', 'celdas_con_venta', 'unidades_finales', 'pedido_final', 'ventas_reales',
+            'sesgo_unidades_finales', 'sesgo_pedido_final', 'mape_unidades_finales', 'mape_pedido_final',
+            'roturas', 'tasa_roturas', 'unidades_no_cubiertas', 'sobrestocks', 'tasa_sobrestock',
+            'unidades_exceso']
+
+
+@dataclass
+class DatosBacktest:
+    """
+    Datos de una sección para todo el horizonte, en arrays artículo × semana.
+
+    Las columnas de las matrices siguen el orden de BacktestPedidos.semanas.
+    """
+    seccion: str
+    claves: np.ndarray
+    categoria: np.ndarray
+    proveedor: np.ndarray
+    unidades_finales: np.ndarray
+    ventas_reales: np.ndarray
+
+
+def _normalizar(serie: pd.Series) -> pd.Series:
+    """Texto sin espacios ni '.0' final, '' para vacíos (igual que ArchivoStockSemanal)."""
+    texto = serie.astype(object).where(serie.notna(), '').map(str).str.strip()
+    return texto.str.replace(r'\.0$', '', regex=True)
+
+
+def claves_articulo(codigos: pd.Series, tallas: pd.Series, colores: pd.Series) -> pd.Series:
+    """Clave 'codigo|talla|color' comparable entre ventas, pedidos y snapshots de stock."""
+    return (_normalizar(codigos).reset_index(drop=True) + '|' +
+            _normalizar(tallas).reset_index(drop=True) + '|' +
+            _normalizar(colores).reset_index(drop=True))
+
+
+class BacktestPedidos:
+    """
+    Repite la lógica del pedido sobre semanas pasadas y la compara con las ventas reales.
+
+    Attributes:
+        config (dict): Configuración del sistema
+        año (int): Año evaluado (ventas reales)
+        año_base (int): Año cuyas ventas alimentan el forecast
+        semanas (List[int]): Semanas evaluadas
+        datos (List[DatosBacktest]): Datos por sección (tras cargar())
+    """
+
+    def __init__(self, config: Dict[str, Any], archivo_stock=None):
+        from src.archivo_stock import crear_archivo_stock
+
+        self.config = config
+        self.parametros = config.get('parametros', {})
+        self.archivo_stock = archivo_stock if archivo_stock is not None else crear_archivo_stock()
+        self.año: Optional[int] = None
+        self.año_base: Optional[int] = None
+        self.semanas: List[int] = []
+        self.datos: List[DatosBacktest] = []
+        self._stocks: Dict[int, Optional[pd.Series]] = {}
+
+    # ------------------------------------------------------------------
+    # CARGA
+    # ------------------------------------------------------------------
+
+    def cargar(self, semanas: Optional[List[int]] = None, secciones: Optional[List[str]] = None,
+               año: Optional[int] = None, año_base: Optional[int] = None) -> 'BacktestPedidos':
+        """
+        Calcula el forecast del horizonte y agrega las ventas reales por artículo y semana.
+
+        Args:
+            semanas: Semanas a evaluar (default: todas las que tienen ventas en el año evaluado)
+            secciones: Secciones (default: secciones_activas de config.json)
+            año: Año evaluado (default: el último año con ventas)
+            año_base: Año del histórico del forecast (default: año - 1; si no hay ventas
+                de ese año se usa el propio año evaluado y el backtest es en muestra)
+
+        Returns:
+            BacktestPedidos: self, para encadenar con evaluar()
+        """
+        from src.data_loader import DataLoader
+        from src.forecast_engine import ForecastEngine
+
+        data_loader = DataLoader(self.config)
+        forecast_engine = ForecastEngine(self.config)
+
+        ventas = data_loader.leer_ventas()
+        if ventas is None or 'Fecha' not in ventas.columns:
+            raise ValueError("El backtest necesita el archivo de ventas con la columna 'Fecha'")
+        fechas = pd.to_datetime(ventas['Fecha'], errors='coerce').dropna()
+        if fechas.empty:
+            raise ValueError("El archivo de ventas no tiene fechas válidas")
+        calendario = fechas.dt.isocalendar()
+        años = set(calendario['year'].astype(int))
+
+        # Las ventas de fin de diciembre pueden caer en la semana 1 ISO del año siguiente
+        self.año = int(año) if año is not None else int(fechas.dt.year.max())
+        self.año_base = int(año_base) if año_base is not None else self.año - 1
+        if self.año not in años:
+            raise ValueError(f"No hay ventas del año {self.año} (años con ventas: {sorted(años)})")
+        if self.año_base not in años:
+            logger.warning(f"No hay ventas del año {self.año_base}: el forecast usa las ventas de "
+                           f"{self.año} y el backtest es en muestra")
+            self.año_base = self.año
+        self.semanas = sorted(semanas) if semanas else sorted(
+            set(calendario.loc[calendario['year'] == self.año, 'week'].astype(int))
+        )
+
+        semanas_por_periodo: Dict[str, List[int]] = {}
+        for semana in self.semanas:
+            periodo = data_loader.obtener_periodo_desde_semana(semana, self.año)
+            semanas_por_periodo.setdefault(periodo, []).append(semana)
+
+        self.datos = []
+        for seccion in secciones or self.config.get('secciones_activas', []):
+            pedidos_seccion = []
+            ventas_reales = None
+            for semanas_periodo in semanas_por_periodo.values():
+                abc_df, ventas_df, costes_df = data_loader.leer_datos_seccion(seccion, semanas_periodo[0])
+                if abc_df is None or ventas_df is None or costes_df is None:
+                    break
+                ventas_df = self._ventas_con_año(ventas_df)
+
+                pedidos_semanas = forecast_engine.calcular_pedidos_semanas(
+                    semanas_periodo, ventas_df[ventas_df['Año'] == self.año_base], abc_df, costes_df, seccion
+                )
+                for semana, pedidos in pedidos_semanas.items():
+                    if len(pedidos):
+                        pedidos_seccion.append(pedidos[['Codigo_Articulo', 'Talla', 'Color', 'Categoria',
+                                                        'Proveedor', 'Unidades_Finales']].assign(Semana=semana))
+                if ventas_reales is None:
+                    ventas_reales = ventas_df[(ventas_df['Año'] == self.año) &
+                                              ventas_df['Semana'].isin(self.semanas)]
+
+            if ventas_reales is None:
+                logger.warning(f"Sin datos para la sección '{seccion}': se omite del backtest")
+                continue
+            self.datos.append(self._datos_seccion(seccion, pedidos_seccion, ventas_reales))
+
+        logger.info(f"Backtest {self.año} (forecast con ventas de {self.año_base}): "
+                    f"{len(self.datos)} secciones × {len(self.semanas)} semanas cargadas")
+        return self
+
+    def _ventas_con_año(self, ventas_df: pd.DataFrame) -> pd.DataFrame:
+        """Ventas con columnas 'Semana' y 'Año' ISO (las de todas las semanas son del año evaluado si no hay fecha)."""
+        from src.data_loader import añadir_columna_semana
+
+        ventas_df = ventas_df.copy()
+        if not añadir_columna_semana(ventas_df):
+            raise ValueError("Las ventas no tienen columna 'Fecha' ni 'Semana'")
+        if 'Fecha' in ventas_df.columns:
+            ventas_df['Año'] = pd.to_datetime(ventas_df['Fecha'], errors='coerce').dt.isocalendar().year.fillna(0).astype(int)
+        else:
+            ventas_df['Año'] = self.año
+        return ventas_df
+
+    def _datos_seccion(self, seccion: str, pedidos_seccion: List[pd.DataFrame],
+                       ventas_reales: pd.DataFrame) -> DatosBacktest:
+        columnas = ['Codigo_Articulo', 'Talla', 'Color', 'Categoria', 'Proveedor', 'Unidades_Finales', 'Semana']
+        pedidos = pd.concat(pedidos_seccion, ignore_index=True) if pedidos_seccion else pd.DataFrame(columns=columnas)
+        pedidos['clave'] = claves_articulo(pedidos['Codigo_Articulo'], pedidos['Talla'], pedidos['Color'])
+
+        reales = pd.DataFrame({
+            'clave': claves_articulo(ventas_reales['Codigo'], ventas_reales['Talla'], ventas_reales['Color']),
+            'Semana': ventas_reales['Semana'].to_numpy(),
+            'Unidades': pd.to_numeric(ventas_reales['Unidades'], errors='coerce').fillna(0).to_numpy(),
+        })
+        reales = reales.groupby(['clave', 'Semana'], as_index=False)['Unidades'].sum()
+
+        claves = pd.Index(pd.concat([pedidos['clave'], reales['clave']]).unique())
+        posicion_semana = pd.Index(self.semanas)
+
+        unidades_finales = np.zeros((len(claves), len(self.semanas)))
+        np.add.at(unidades_finales,
+                  (claves.get_indexer(pedidos['clave']), posicion_semana.get_indexer(pedidos['Semana'])),
+                  pd.to_numeric(pedidos['Unidades_Finales'], errors='coerce').fillna(0).to_numpy(dtype=float))
+        ventas = np.zeros_like(unidades_finales)
+        np.add.at(ventas,
+                  (claves.get_indexer(reales['clave']), posicion_semana.get_indexer(reales['Semana'])),
+                  reales['Unidades'].to_numpy(dtype=float))
+
+        # Categoría y proveedor del pedido más reciente de cada artículo
+        info = pedidos.drop_duplicates('clave', keep='last').set_index('clave')
+        categoria = info['Categoria'].reindex(claves).fillna(SIN_CATEGORIA)
+        proveedor = info['Proveedor'].reindex(claves).fillna(SIN_PROVEEDOR)
+
+        return DatosBacktest(
+            seccion=seccion,
+            claves=claves.to_numpy(),
+            categoria=categoria.astype(str).to_numpy(),
+            proveedor=proveedor.astype(str).to_numpy(),
+            unidades_finales=unidades_finales,
+            ventas_reales=ventas,
+        )
+
+    def _stock_semana(self, semana: int) -> Optional[pd.Series]:
+        """Unidades archivadas de la semana por clave de artículo, o None si no está archivada."""
+        if semana not in self._stocks:
+            stock = None
+            if (self.año, semana) in set(self.archivo_stock.semanas()):
+                unidades = self.archivo_stock.unidades_en_semana((self.año, semana)).reset_index()
+                claves = claves_articulo(unidades['Artículo'], unidades['Talla'], unidades['Color'])
+                stock = pd.Series(unidades['Unidades'].to_numpy(), index=claves).groupby(level=0).sum()
+            self._stocks[semana] = stock
+        return self._stocks[semana]
+
+    # ------------------------------------------------------------------
+    # EVALUACIÓN
+    # ------------------------------------------------------------------
+
+    def evaluar(self, stock_minimo_porcentaje: Optional[float] = None) -> pd.DataFrame:
+        """
+        Repite el pedido de cada semana y lo compara con las ventas reales.
+
+        Args:
+            stock_minimo_porcentaje: Porcentaje de stock mínimo (default: el de config.json)
+
+        Returns:
+            pd.DataFrame: Una fila por sección, semana y artículo con pedido o ventas (COLUMNAS_DETALLE)
+        """
+        if stock_minimo_porcentaje is None:
+            stock_minimo_porcentaje = self.parametros.get('stock_minimo_porcentaje', 0.30)
+
+        tablas = [self._evaluar_seccion(datos, stock_minimo_porcentaje) for datos in self.datos]
+        tablas = [tabla for tabla in tablas if not tabla.empty]
+        if not tablas:
+            return pd.DataFrame(columns=COLUMNAS_DETALLE)
+        return pd.concat(tablas, ignore_index=True)
+
+    def _evaluar_seccion(self, datos: DatosBacktest, stock_minimo_porcentaje: float) -> pd.DataFrame:
+        uf = datos.unidades_finales
+        ventas = datos.ventas_reales
+        forma = uf.shape
+
+        stock_minimo = np.ceil(uf * stock_minimo_porcentaje)
+        stock_inicial = np.zeros(forma)
+        archivado = np.zeros(forma[1], dtype=bool)
+        tendencia = np.zeros(forma)
+        pedido = np.zeros(forma)
+
+        # Solo el stock encadena las semanas: el bucle es por semana y vectorizado por artículo
+        stock_simulado = np.zeros(forma[0])
+        for j, semana in enumerate(self.semanas):
+            stock = self._stock_semana(semana)
+            if stock is not None:
+                archivado[j] = True
+                stock_inicial[:, j] = stock.reindex(datos.claves, fill_value=0).to_numpy(dtype=float)
+            else:
+                stock_inicial[:, j] = stock_simulado
+            if j > 0 and self.semanas[j - 1] == semana - 1:
+                tendencia[:, j] = np.maximum(0, ventas[:, j - 1] - uf[:, j - 1])
+            pedido[:, j] = np.maximum(0, uf[:, j] + stock_minimo[:, j] - stock_inicial[:, j] + tendencia[:, j])
+            stock_simulado = np.maximum(0, stock_inicial[:, j] + pedido[:, j] - ventas[:, j])
+
+        disponible = stock_inicial + pedido
+        no_cubiertas = np.maximum(0, ventas - disponible)
+        exceso = np.maximum(0, disponible - ventas - stock_minimo)
+
+        # Tabla larga (semana, artículo) solo de las celdas con pedido o ventas
+        activas = (uf > 0) | (pedido > 0) | (ventas > 0)
+        filas, columnas = np.nonzero(activas)
+        if not filas.size:
+            return pd.DataFrame(columns=COLUMNAS_DETALLE)
+        partes = pd.Series(datos.claves[filas]).str.split('|', n=2, expand=True)
+        return pd.DataFrame({
+            'seccion': datos.seccion,
+            'semana': np.asarray(self.semanas)[columnas],
+            'Codigo_Articulo': partes[0].to_numpy(),
+            'Talla': partes[1].to_numpy(),
+            'Color': partes[2].to_numpy(),
+            'Categoria': datos.categoria[filas],
+            'Proveedor': datos.proveedor[filas],
+            'unidades_finales': uf[filas, columnas],
+            'stock_minimo': stock_minimo[filas, columnas],
+            'stock_inicial': stock_inicial[filas, columnas],
+            'stock_archivado': archivado[columnas],
+            'tendencia_consumo': tendencia[filas, columnas],
+            'pedido_final': pedido[filas, columnas],
+            'ventas_reales': ventas[filas, columnas],
+            'rotura': no_cubiertas[filas, columnas] > 0,
+            'unidades_no_cubiertas': no_cubiertas[filas, columnas],
+            'sobrestock': exceso[filas, columnas] > 0,
+            'unidades_exceso': exceso[filas, columnas],
+        }, columns=COLUMNAS_DETALLE)
+
+
+def resumir(detalle: pd.DataFrame, por: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Métricas de acierto del pedido agrupadas.
+
+    - sesgo: (pedido - ventas reales) / ventas reales, en unidades totales
+    - MAPE: media de |pedido - ventas reales| / ventas reales en las celdas con venta
+    - roturas: celdas en que stock inicial + pedido no cubrió las ventas reales
+    - sobrestock: celdas en que sobró más que el stock mínimo
+
+    Args:
+        detalle: Resultado de BacktestPedidos.evaluar()
+        por: Columnas de agrupación (default: total)
+
+    Returns:
+        pd.DataFrame: Una fila por grupo con METRICAS
+    """
+    detalle = detalle.assign(
+        celdas=1,
+        celdas_con_venta=detalle['ventas_reales'] > 0,
+    )
+    con_venta = detalle['celdas_con_venta']
+    reales = detalle['ventas_reales'].where(con_venta)
+    detalle['ape_unidades_finales'] = (detalle['unidades_finales'] - reales).abs() / reales
+    detalle['ape_pedido_final'] = (detalle['pedido_final'] - reales).abs() / reales
+
+    sumas = ['celdas', 'celdas_con_venta', 'unidades_finales', 'pedido_final', 'ventas_reales', 'rotura',
+             'unidades_no_cubiertas', 'sobrestock', 'unidades_exceso']
+    medias = ['ape_unidades_finales', 'ape_pedido_final']
+    if por:
+        agrupado = detalle.groupby(por, dropna=False)
+        tabla = agrupado[sumas].sum().join(agrupado[medias].mean()).reset_index()
+    else:
+        tabla = pd.DataFrame([{**detalle[sumas].sum().to_dict(), **detalle[medias].mean().to_dict()}])
+
+    tabla = tabla.rename(columns={'rotura': 'roturas', 'sobrestock': 'sobrestocks',
+                                  'ape_unidades_finales': 'mape_unidades_finales',
+                                  'ape_pedido_final': 'mape_pedido_final'})
+    con_ventas = tabla['ventas_reales'] > 0
+    tabla['sesgo_unidades_finales'] = np.where(
+        con_ventas, (tabla['unidades_finales'] - tabla['ventas_reales']) / tabla['ventas_reales'], np.nan
+    )
+    tabla['sesgo_pedido_final'] = np.where(
+        con_ventas, (tabla['pedido_final'] - tabla['ventas_reales']) / tabla['ventas_reales'], np.nan
+    )
+    tabla['tasa_roturas'] = np.where(
+        tabla['celdas_con_venta'] > 0, tabla['roturas'] / tabla['celdas_con_venta'], np.nan
+    )
+    tabla['tasa_sobrestock'] = tabla['sobrestocks'] / tabla['celdas']
+    return tabla[[*(por or []), *METRICAS]]
+
+
+def guardar_excel(detalle: pd.DataFrame, ruta: Optional[Path] = None, incluir_detalle: bool = False) -> Path:
+    """
+    Guarda las métricas del backtest en Excel.
+
+    Hojas: Secciones, Categorias, Proveedores, Semanas y, opcionalmente, Detalle.
+
+    Args:
+        detalle: Resultado de BacktestPedidos.evaluar()
+        ruta: Fichero de salida (default output/Backtesting/Backtesting_<fecha>.xlsx)
+        incluir_detalle: Añadir la tabla por artículo y semana (puede ser grande)
+
+    Returns:
+        Path: Ruta del fichero guardado
+    """
+    if ruta is None:
+        ruta = BACKTESTING_DIR / f"Backtesting_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        resumir(detalle, ['seccion']).to_excel(writer, sheet_name='Secciones', index=False)
+        resumir(detalle, ['seccion', 'Categoria']).to_excel(writer, sheet_name='Categorias', index=False)
+        resumir(detalle, ['seccion', 'Proveedor']).to_excel(writer, sheet_name='Proveedores', index=False)
+        resumir(detalle, ['seccion', 'semana']).to_excel(writer, sheet_name='Semanas', index=False)
+        if incluir_detalle:
+            detalle.to_excel(writer, sheet_name='Detalle', index=False)
+    return ruta
+
+
+def crear_backtest_pedidos(config: Dict[str, Any], archivo_stock=None) -> BacktestPedidos:
+    """
+    Crea un backtest de pedidos.
+
+    Args:
+        config: Configuración del sistema (config.json)
+        archivo_stock: ArchivoStockSemanal con los snapshots (default: data/stocks_semanales)
+
+    Returns:
+        BacktestPedidos
+    """
+    return BacktestPedidos(config, archivo_stock)
+
+
+# ============================================================================
+# LÍNEA DE COMANDOS
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Backtest de los pedidos: repite el pedido de semanas pasadas y lo compara con las ventas reales',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python -m src.backtesting --año 2025
+  python -m src.backtesting --año 2025 --semanas 10-30 --secciones vivero,plantas --excel
+  python -m src.backtesting --año 2025 --año-base 2025 --stock-minimo 0.2 --excel --detalle
+        """
+    )
+    parser.add_argument('--año', type=int, default=None, help='Año evaluado (default: último año con ventas)')
+    parser.add_argument('--año-base', dest='año_base', type=int, default=None,
+                        help='Año de las ventas del forecast (default: año - 1)')
+    parser.add_argument('--semanas', type=lista_semanas, default=None, help='Semanas a evaluar (A-B o A,B,C)')
+    parser.add_argument('--secciones', type=str, default=None, help='Secciones separadas por comas (default: activas)')
+    parser.add_argument('--stock-minimo', dest='stock_minimo', type=float, default=None,
+                        help='Porcentaje de stock mínimo (default: el de config.json)')
+    parser.add_argument('--excel', nargs='?', const='', default=None, metavar='RUTA',
+                        help='Guardar las métricas en Excel (default output/Backtesting/)')
+    parser.add_argument('--detalle', action='store_true', help='Incluir en el Excel la tabla por artículo y semana')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Mostrar el log de la carga de datos')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s - %(message)s')
+
+    from src.registro_config import obtener_registro
+    config = obtener_registro().principal()
+    secciones = [s.strip() for s in args.secciones.split(',')] if args.secciones else None
+
+    inicio = datetime.now()
+    try:
+        backtest = crear_backtest_pedidos(config).cargar(args.semanas, secciones, args.año, args.año_base)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+    carga = (datetime.now() - inicio).total_seconds()
+
+    inicio = datetime.now()
+    detalle = backtest.evaluar(args.stock_minimo)
+    evaluacion = (datetime.now() - inicio).total_seconds()
+
+    if detalle.empty:
+        print("No hay datos para las semanas y secciones indicadas")
+        return 1
+
+    columnas = ['seccion', 'ventas_reales', 'unidades_finales', 'pedido_final', 'sesgo_unidades_finales',
+                'sesgo_pedido_final', 'mape_unidades_finales', 'mape_pedido_final', 'tasa_roturas',
+                'tasa_sobrestock']
+    with pd.option_context('display.max_rows', 200, 'display.width', 160):
+        print(f"BACKTEST {backtest.año} (forecast con ventas de {backtest.año_base}, "
+              f"semanas {backtest.semanas[0]}-{backtest.semanas[-1]})")
+        print(resumir(detalle, ['seccion'])[columnas].round(3).to_string(index=False))
+        print("\nTOTAL")
+        print(resumir(detalle)[columnas[1:]].round(3).to_string(index=False))
+
+    semanas_archivadas = int(detalle.drop_duplicates('semana')['stock_archivado'].sum())
+    print(f"\n{len(detalle)} celdas artículo-semana ({detalle['seccion'].nunique()} secciones, "
+          f"{semanas_archivadas}/{len(backtest.semanas)} semanas con stock archivado) - "
+          f"carga {carga:.1f} s, evaluación {evaluacion:.2f} s")
+
+    if args.excel is not None:
+        ruta = guardar_excel(detalle, Path(args.excel) if args.excel else None, args.detalle)
+        print(f"Métricas guardadas en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
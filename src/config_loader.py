@@ -12,13 +12,31 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
+
+# Rutas cuya carga ya se ha anunciado por consola en este proceso
+_RUTAS_ANUNCIADAS = set()
+
+
+def _registro_para(ruta):
+    """Devuelve (registro, nombre) si la ruta es uno de los ficheros del registro compartido."""
+    from src.registro_config import obtener_registro
+    registro = obtener_registro()
+    return registro, registro.nombre_de_ruta(ruta)
+
+
+def _leer_json(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 
 def cargar_configuracion(ruta_config="config/config_comun.json"):
     """
     Carga la configuración desde el archivo JSON común.
     
+    Los ficheros de config/ se leen a través del registro compartido
+    (src.registro_config), que los parsea una vez por proceso y solo los
+    vuelve a leer si cambian. Se devuelve una copia que puede modificarse.
+    
     Args:
         ruta_config: Ruta al archivo de configuración JSON
     
@@ -28,9 +46,18 @@ def cargar_configuracion(ruta_config="config/config_comun.json"):
     config = {}
     
     try:
-        if os.path.exists(ruta_config):
-            with open(ruta_config, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+        registro, nombre = _registro_para(ruta_config)
+        if nombre is not None:
+            if registro.existe(nombre):
+                config = registro.obtener(nombre)
+                if ruta_config not in _RUTAS_ANUNCIADAS:
+                    _RUTAS_ANUNCIADAS.add(ruta_config)
+                    print(f"  ✓ Configuración cargada desde: {ruta_config}")
+            else:
+                print(f"  ⚠ Archivo de configuración no encontrado: {ruta_config}")
+                print("  ⚠ Usando valores por defecto")
+        elif os.path.exists(ruta_config):
+            config = _leer_json(ruta_config)
             print(f"  ✓ Configuración cargada desde: {ruta_config}")
         else:
             print(f"  ⚠ Archivo de configuración no encontrado: {ruta_config}")
@@ -55,9 +82,11 @@ def cargar_configuracion_email(ruta_email="config/email.json"):
     email_config = {}
     
     try:
-        if os.path.exists(ruta_email):
-            with open(ruta_email, 'r', encoding='utf-8') as f:
-                email_config = json.load(f)
+        registro, nombre = _registro_para(ruta_email)
+        if nombre is not None and registro.existe(nombre):
+            email_config = registro.obtener(nombre)
+        elif nombre is None and os.path.exists(ruta_email):
+            email_config = _leer_json(ruta_email)
         else:
             print(f"  ⚠ Archivo de configuración de email no encontrado: {ruta_email}")
     except Exception as e:
@@ -76,6 +105,8 @@ def calcular_periodo_desde_dataframe(df_ventas):
     Returns:
         dict: Diccionario con FECHA_INICIO, FECHA_FIN, DIAS_PERIODO y formatos de texto
     """
+    import pandas as pd  # diferido: solo lo necesitan los scripts que analizan ventas
+    
     # Convertir columna Fecha a datetime si no lo es
     if df_ventas['Fecha'].dtype != 'datetime64[ns]':
         df_ventas['Fecha'] = pd.to_datetime(df_ventas['Fecha'], errors='coerce')
@@ -124,12 +155,11 @@ def obtener_configuracion_email(config=None):
         'email': 'ivan.delgado@viveverde.es'
     })
     
-    SMTP_CONFIG = email_config.get('smtp_config', {
-        'servidor': 'smtp.serviciodecorreo.es',
-        'puerto': 465,
-        'remitente_email': 'ivan.delgado@viveverde.es',
-        'remitente_nombre': 'Sistema de Pedidos automáticos VIVEVERDE'
-    })
+    SMTP_CONFIG = email_config.get('smtp_config')
+    if not SMTP_CONFIG:
+        # Servidor y remitente desde config/email.json
+        from src.registro_config import obtener_registro
+        SMTP_CONFIG = obtener_registro().smtp().como_dict_scripts('Sistema de Pedidos automáticos VIVEVERDE')
     
     return {
         'DESTINATARIO_IVAN': DESTINATARIO_IVAN,
@@ -17,13 +17,15 @@ Fecha: 2026-02-03
 import pandas as pd
 import numpy as np
 import os
-import glob
 import logging
 import unicodedata
 from typing import Optional, Dict, List, Tuple, Any
 from datetime import datetime
 from src.data_loader import DataLoader
+from src.memoria import copia_defensiva
 from src.paths import INPUT_DIR
+from src.lectura_entradas import buscar_entradas, leer_tabla, resolver_entrada
+from src.manifiesto_entradas import obtener_manifiesto
 
 # Configuración del logger
 logger = logging.getLogger(__name__)
@@ -314,7 +316,7 @@ class CorrectionDataLoader:
     
     def leer_excel(self, ruta_archivo: str, hoja: Optional[str] = None) -> Optional[pd.DataFrame]:
         """
-        Lee un archivo Excel y devuelve un DataFrame.
+        Lee un archivo Excel (o su exportación .csv/.tsv) y devuelve un DataFrame.
         
         Args:
             ruta_archivo (str): Ruta del archivo Excel
@@ -330,10 +332,7 @@ class CorrectionDataLoader:
             
             logger.info(f"Leyendo archivo de corrección: {ruta_archivo}")
             
-            if hoja:
-                df = pd.read_excel(ruta_archivo, sheet_name=hoja)
-            else:
-                df = pd.read_excel(ruta_archivo, sheet_name=None)
+            df = leer_tabla(ruta_archivo, hoja=hoja or None)
             
             logger.info(f"Archivo leído exitosamente: {len(df) if isinstance(df, pd.DataFrame) else len(df)} hojas")
             return df
@@ -353,15 +352,14 @@ class CorrectionDataLoader:
             Optional[str]: Ruta completa del archivo o None si no existe
         """
         dir_entrada = self.obtener_directorio_entrada()
-        ruta_archivo = os.path.join(dir_entrada, nombre_archivo)
+        ruta_archivo = resolver_entrada(os.path.join(dir_entrada, nombre_archivo))
         
         if os.path.exists(ruta_archivo):
             logger.info(f"Archivo de corrección encontrado: {ruta_archivo}")
             return ruta_archivo
         
         # Intentar búsqueda con wildcards
-        patron_buscar = os.path.join(dir_entrada, f"*{nombre_archivo}*")
-        archivos_encontrados = glob.glob(patron_buscar)
+        archivos_encontrados = obtener_manifiesto().glob(os.path.join(dir_entrada, f"*{nombre_archivo}*"))
         
         if archivos_encontrados:
             logger.info(f"Archivo encontrado (búsqueda amplia): {archivos_encontrados[0]}")
@@ -391,7 +389,7 @@ class CorrectionDataLoader:
         
         # Si no se encontró archivo con semana o no se especificó semana, usar el base
         dir_entrada = self.obtener_directorio_entrada()
-        ruta_base = os.path.join(dir_entrada, nombre_base)
+        ruta_base = resolver_entrada(os.path.join(dir_entrada, nombre_base))
         if os.path.exists(ruta_base):
             ruta = ruta_base
         else:
@@ -655,14 +653,15 @@ def encontrar_archivo_semana_anterior(directorio_base: str, semana_actual: int,
         # Buscar cualquier archivo de la semana anterior
         patron_busqueda = f"Pedido_Semana_{semana_anterior:02d}_*.xlsx"
     
-    ruta_patron = os.path.join(directorio_base, patron_busqueda)
+    # El patrón de 'interior' también encaja con los de 'deco_interior': la
+    # sección se compara con la que el manifiesto saca del nombre
+    candidatos = [entrada for entrada in obtener_manifiesto().buscar(directorio_base, patron_busqueda)
+                  if not seccion or (entrada.seccion or '').lower() == seccion.lower()]
     
-    # Buscar archivos que coincidan con el patrón
-    archivos_encontrados = glob.glob(ruta_patron)
+    # Si hay múltiples archivos, seleccionar el más reciente por fecha de modificación
+    archivo_mas_reciente = candidatos[0].ruta if candidatos else None
     
-    if archivos_encontrados:
-        # Si hay múltiples archivos, seleccionar el más reciente por fecha de modificación
-        archivo_mas_reciente = max(archivos_encontrados, key=os.path.getmtime)
+    if archivo_mas_reciente:
         logger.info(f"Archivo de semana anterior encontrado: {os.path.basename(archivo_mas_reciente)}")
         return archivo_mas_reciente
     
@@ -698,7 +697,7 @@ def leer_archivo_ventas_reales(directorio_entrada: str) -> Tuple[Optional[pd.Dat
         Esta advertencia será utilizada posteriormente para el sistema de notificaciones por email.
     """
     nombre_archivo = "SPA_ventas_reales.xlsx"
-    ruta_archivo = os.path.join(directorio_entrada, nombre_archivo)
+    ruta_archivo = resolver_entrada(os.path.join(directorio_entrada, nombre_archivo))
     
     if not os.path.exists(ruta_archivo):
         logger.warning(f"ADVERTENCIA: No se encontró el archivo de ventas reales")
@@ -709,7 +708,7 @@ def leer_archivo_ventas_reales(directorio_entrada: str) -> Tuple[Optional[pd.Dat
         return None, False
     
     try:
-        df = pd.read_excel(ruta_archivo)
+        df = leer_tabla(ruta_archivo)
         logger.info(f"Archivo de ventas reales cargado: {len(df)} registros")
         return df, True
     except Exception as e:
@@ -720,7 +719,8 @@ def leer_archivo_ventas_reales(directorio_entrada: str) -> Tuple[Optional[pd.Dat
 
 def leer_archivo_ventas_semana(directorio_entrada: str) -> Tuple[Optional[pd.DataFrame], bool]:
     """
-    Lee el archivo de ventas de la semana del ERP (SPA_ventas_semana.xlsx).
+    Lee el archivo de ventas de la semana del ERP (SPA_ventas_semana.xlsx, o su
+    exportación .csv/.tsv).
     
     Este archivo contiene las ventas reales de la semana anterior, incluyendo:
     - Artículo: Código del artículo
@@ -747,7 +747,7 @@ def leer_archivo_ventas_semana(directorio_entrada: str) -> Tuple[Optional[pd.Dat
         el sistema debe continuar generando los pedidos incluso sin este dato.
     """
     nombre_archivo = "SPA_ventas_semana.xlsx"
-    ruta_archivo = os.path.join(directorio_entrada, nombre_archivo)
+    ruta_archivo = resolver_entrada(os.path.join(directorio_entrada, nombre_archivo))
     
     if not os.path.exists(ruta_archivo):
         logger.warning(f"ADVERTENCIA: No se encontró el archivo de ventas de semana")
@@ -757,7 +757,7 @@ def leer_archivo_ventas_semana(directorio_entrada: str) -> Tuple[Optional[pd.Dat
         return None, False
     
     try:
-        df = pd.read_excel(ruta_archivo)
+        df = leer_tabla(ruta_archivo)
         
         # ============================================================
         # REGLA: Rellenar artículos en blanco con el valor anterior
@@ -791,7 +791,8 @@ def leer_archivo_stock_actual(directorio_entrada: str) -> Optional[pd.DataFrame]
     Lee el archivo de stock actual del ERP (SPA_stock_actual.xlsx o SPA_stock_actual*.xlsx).
     
     Busca primero SPA_stock_actual.xlsx, y si no existe, busca cualquier archivo
-    que coincida con el patrón SPA_stock_actual*.xlsx.
+    que coincida con el patrón SPA_stock_actual*.xlsx. En los dos casos vale
+    también la exportación .csv/.tsv del ERP.
     
     Args:
         directorio_entrada (str): Directorio donde se encuentra el archivo
@@ -801,11 +802,11 @@ def leer_archivo_stock_actual(directorio_entrada: str) -> Optional[pd.DataFrame]
     """
     # Primero intentar con el nombre exacto
     nombre_exacto = "SPA_stock_actual.xlsx"
-    ruta_exacta = os.path.join(directorio_entrada, nombre_exacto)
+    ruta_exacta = resolver_entrada(os.path.join(directorio_entrada, nombre_exacto))
     
     if os.path.exists(ruta_exacta):
         try:
-            df = pd.read_excel(ruta_exacta)
+            df = leer_tabla(ruta_exacta)
             
             # ============================================================
             # REGLA: Rellenar artículos en blanco con el valor anterior
@@ -835,15 +836,14 @@ def leer_archivo_stock_actual(directorio_entrada: str) -> Optional[pd.DataFrame]
             logger.error(f"Error al leer el archivo de stock actual: {str(e)}")
             return None
     
-    # Si no existe, buscar con patrón SPA_stock_actual*.xlsx
-    patron = os.path.join(directorio_entrada, "SPA_stock_actual*.xlsx")
-    archivos_encontrados = glob.glob(patron)
+    # Si no existe, buscar con patrón SPA_stock_actual*.xlsx (o .csv/.tsv)
+    archivos_encontrados = buscar_entradas(directorio_entrada, "SPA_stock_actual")
     
     if archivos_encontrados:
         # Usar el primer archivo encontrado
         ruta_archivo = archivos_encontrados[0]
         try:
-            df = pd.read_excel(ruta_archivo)
+            df = leer_tabla(ruta_archivo)
             
             # ============================================================
             # REGLA: Rellenar artículos en blanco con el valor anterior
@@ -895,7 +895,7 @@ def normalizar_datos_historicos(df_pedido_anterior: pd.DataFrame) -> pd.DataFram
     col_codigo = encontrar_columna(list(df_pedido_anterior.columns), 'codigoarticulo')
     
     if col_codigo:
-        df = df_pedido_anterior.copy()
+        df = copia_defensiva(df_pedido_anterior)
         
         # Buscar columnas de talla y color
         col_talla = encontrar_columna(list(df.columns), 'talla')
@@ -963,7 +963,7 @@ def fusionar_datos_tendencia(
     if pedidos_df is None or len(pedidos_df) == 0:
         return pedidos_df
     
-    df_resultado = pedidos_df.copy()
+    df_resultado = copia_defensiva(pedidos_df)
     
     # Inicializar nuevas columnas con valores por defecto
     df_resultado['Unidades_Calculadas_Semana_Pasada'] = 0
@@ -1028,7 +1028,7 @@ def fusionar_datos_tendencia(
     # Relación: Artículo (SPA_ventas_semana) = Código artículo (pedido), Talla, Color
     if df_ventas_reales is not None and len(df_ventas_reales) > 0:
         # Normalizar el DataFrame de ventas de semana
-        df_ventas = df_ventas_reales.copy()
+        df_ventas = copia_defensiva(df_ventas_reales)
         
         # Buscar columna de artículo (puede llamarse 'Artículo' o variaciones)
         col_articulo = encontrar_columna(list(df_ventas.columns), 'articulo')
@@ -1093,7 +1093,7 @@ def fusionar_datos_tendencia(
     # Fusionar stock actual desde SPA_stock_actual*.xlsx
     # La relación se hace mediante: Artículo (stock) = Código artículo (pedido), Talla, Color
     if df_stock_actual is not None and len(df_stock_actual) > 0:
-        df_stock = df_stock_actual.copy()
+        df_stock = copia_defensiva(df_stock_actual)
         
         # Buscar columna de artículo (puede llamarse 'Artículo' o variaciones)
         col_articulo = encontrar_columna(list(df_stock.columns), 'articulo')
@@ -1156,3 +1156,54 @@ def fusionar_datos_tendencia(
     logger.info(f"  - Stock_Real: {df_resultado['Stock_Real'].sum()}")
 
     return df_resultado
+
+
+def leer_pedido_semana_anterior(archivo_semana_anterior: Optional[str], seccion: str = '') -> Optional[pd.DataFrame]:
+    """
+    Lee y normaliza el pedido de la semana anterior de una sección.
+    
+    Args:
+        archivo_semana_anterior (Optional[str]): Ruta devuelta por encontrar_archivo_semana_anterior()
+        seccion (str): Sección (solo para los mensajes de log)
+    
+    Returns:
+        Optional[pd.DataFrame]: Unidades calculadas por artículo (ver normalizar_datos_historicos) o None
+    """
+    if not archivo_semana_anterior:
+        return None
+    try:
+        # IMPORTANTE: El archivo Excel tiene los encabezados en la fila 2 (índice 1)
+        # La primera fila es un índice. Sin header=1, pandas lee índices (1,2,3...) como columnas
+        df_pedido_anterior = pd.read_excel(archivo_semana_anterior, header=1)
+        df_ventas_objetivo_anterior = normalizar_datos_historicos(df_pedido_anterior)
+        logger.info(f"Cargados datos de la semana anterior ({seccion}): {len(df_ventas_objetivo_anterior)} registros")
+        return df_ventas_objetivo_anterior
+    except Exception as e:
+        logger.warning(f"No se pudo leer el archivo de la semana anterior para '{seccion}': {str(e)}")
+        return None
+
+
+def extraer_diccionarios_tendencia(pedidos_df: pd.DataFrame) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Extrae de los pedidos fusionados los diccionarios que usa ForecastEngine.aplicar_stock_minimo().
+    
+    Args:
+        pedidos_df (pd.DataFrame): Resultado de fusionar_datos_tendencia()
+    
+    Returns:
+        Tuple: (stock_real_dict, ventas_reales_dict, ventas_objetivo_dict) por clave Codigo|Talla|Color
+    """
+    stock_real_dict = {}
+    ventas_reales_dict = {}
+    ventas_objetivo_dict = {}
+
+    for idx, row in pedidos_df.iterrows():
+        # Normalizar Codigo_Articulo igual que en fusionar_datos_tendencia
+        codigo_raw = row.get('Codigo_Articulo', '')
+        codigo = str(codigo_raw).replace('.0', '', 1).strip() if pd.notna(codigo_raw) else ''
+        clave = f"{codigo}|{row.get('Talla', '')}|{row.get('Color', '')}"
+        stock_real_dict[clave] = row.get('Stock_Real', 0)
+        ventas_reales_dict[clave] = row.get('Ventas_Reales', 0)
+        ventas_objetivo_dict[clave] = row.get('Unidades_Calculadas_Semana_Pasada', 0)
+
+    return stock_real_dict, ventas_reales_dict, ventas_objetivo_dict
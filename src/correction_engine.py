@@ -26,6 +26,7 @@ import unicodedata
 from typing import Optional, Dict, List, Tuple, Any
 from dataclasses import dataclass
 from enum import Enum
+from src.memoria import copia_defensiva
 
 # Configuración del logger
 logger = logging.getLogger(__name__)
@@ -566,7 +567,7 @@ class CorrectionEngine:
         """
         logger.info("Aplicando corrección a DataFrame de pedidos...")
         
-        df = df.copy()
+        df = copia_defensiva(df)
         
         # Asegurar que existen las columnas necesarias
         cols_requeridas = [columna_pedido, columna_stock_real]
@@ -783,7 +784,7 @@ class CorrectionEngine:
             logger.warning(f"No hay datos de ventas reales u objetivo. Omitiendo corrección de tendencia.{seccion_info}")
             return df
         
-        df = df.copy()
+        df = copia_defensiva(df)
         
         # Inicializar columnas de tendencia
         df['Porcentaje_Consumido_Stock'] = 0.0
@@ -14,36 +14,32 @@ Fecha: 2026-01-31
 import pandas as pd
 import numpy as np
 import os
-import glob
 import json
 import logging
 import unicodedata
 from typing import Optional, Dict, List, Tuple, Any
 from datetime import datetime
 from src.paths import INPUT_DIR, OUTPUT_DIR, PEDIDOS_SEMANALES_DIR
+from src.registro_config import obtener_registro
+from src.memoria import copia_defensiva, reducir_memoria, modo_memoria_reducida
+from src.historico_ventas import crear_historico_ventas, historico_activo, años_referencia
+from src.lectura_entradas import leer_tabla, resolver_entrada
+from src.manifiesto_entradas import obtener_manifiesto
 
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
-# Intentamos importar el servicio de alertas (si está disponible)
+# Servicio de alertas compartido por todos los módulos (si está disponible)
 try:
-    from src.alert_service import crear_alert_service
-    ALERT_SERVICE = None  # Se inicializará lazily
-    def get_alert_service():
-        global ALERT_SERVICE
-        if ALERT_SERVICE is None:
-            try:
-                from src.config_loader import cargar_configuracion
-                config = cargar_configuracion()
-                if config:
-                    ALERT_SERVICE = crear_alert_service(config)
-            except:
-                pass
-        return ALERT_SERVICE
+    from src.alert_service import obtener_alert_service_compartido as get_alert_service
 except ImportError:
     def get_alert_service():
         return None
 
+# Columnas del fichero de ventas que usan el forecast y el backtest (leer_ventas)
+COLUMNAS_VENTAS = ('Fecha', 'Semana', 'Artículo', 'Nombre artículo', 'Talla', 'Color',
+                   'Unidades', 'Importe', 'Tipo registro')
+
 # ============================================================================
 # FUNCIONES DE NORMALIZACIÓN PARA BÚSQUEDAS INTELIGENTES
 # ============================================================================
@@ -255,6 +251,28 @@ def buscar_valores_unicos_normalizados(df, nombre_columna):
 # ============================================================================
 
 
+def añadir_columna_semana(ventas_df: pd.DataFrame) -> bool:
+    """
+    Añade a las ventas la semana ISO de 'Fecha' como columna 'Semana', si no la tienen.
+
+    Returns:
+        bool: False si no hay columna 'Fecha' ni 'Semana'
+    """
+    if 'Semana' in ventas_df.columns:
+        return True
+    if 'Fecha' not in ventas_df.columns:
+        return False
+
+    ventas_df['Fecha'] = pd.to_datetime(ventas_df['Fecha'], errors='coerce')
+    semanas = ventas_df['Fecha'].dt.isocalendar().week
+    # Enteros, o float si hay fechas vacías (el mismo tipo que daba el cálculo fila a fila)
+    if semanas.isna().any():
+        ventas_df['Semana'] = semanas.astype('float64')
+    else:
+        ventas_df['Semana'] = semanas.astype('int16' if modo_memoria_reducida() else 'int64')
+    return True
+
+
 class DataLoader:
     """
     Clase principal para la carga y normalización de datos de entrada.
@@ -280,6 +298,11 @@ class DataLoader:
         self.archivos = config.get('archivos_entrada', {})
         self.secciones = config.get('secciones_activas', [])
         
+        # Ventas y costes ya leídos, por (ruta, tamaño, fecha de modificación):
+        # se leen una vez aunque se procesen varias secciones o semanas
+        self._lecturas: Dict[Tuple[str, int, int], pd.DataFrame] = {}
+        self._historico = None
+        
         # Leer códigos de mascotas desde config_comun.json (fuente centralizada)
         try:
             from src.config_loader import obtener_configuracion_mascotas
@@ -462,13 +485,23 @@ class DataLoader:
         
         return salida
     
-    def leer_excel(self, ruta_archivo: str, hoja: Optional[str] = None) -> Optional[pd.DataFrame]:
+    def _clave_lectura(self, ruta_archivo: str) -> Optional[Tuple[str, int, int]]:
+        """Clave de caché de un fichero de entrada (None si no existe)."""
+        try:
+            estado = os.stat(ruta_archivo)
+        except OSError:
+            return None
+        return (os.path.abspath(ruta_archivo), estado.st_size, estado.st_mtime_ns)
+    
+    def leer_excel(self, ruta_archivo: str, hoja: Optional[str] = None,
+                   columnas: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
         """
-        Lee un archivo Excel y devuelve un DataFrame.
+        Lee un archivo Excel (o su exportación .csv/.tsv) y devuelve un DataFrame.
         
         Args:
             ruta_archivo (str): Ruta del archivo Excel a leer
             hoja (Optional[str]): Nombre de la hoja a leer (None para todas)
+            columnas (Optional[List[str]]): Columnas a conservar (None para todas)
         
         Returns:
             Optional[pd.DataFrame]: DataFrame con los datos o None si hay error
@@ -484,10 +517,7 @@ class DataLoader:
             
             logger.info(f"Leyendo archivo: {ruta_archivo}")
             
-            if hoja:
-                df = pd.read_excel(ruta_archivo, sheet_name=hoja)
-            else:
-                df = pd.read_excel(ruta_archivo, sheet_name=None)
+            df = leer_tabla(ruta_archivo, hoja=hoja or None, columnas=columnas)
             
             logger.info(f"Archivo leído exitosamente: {len(df) if isinstance(df, pd.DataFrame) else len(df)} hojas")
             return df
@@ -500,25 +530,12 @@ class DataLoader:
                 alert_svc.alerta_excel_error(ruta_archivo, str(e), seccion="data_loader")
             return None
     
-    def leer_ventas(self) -> Optional[pd.DataFrame]:
+    def hoja_ventas(self, df: Any) -> pd.DataFrame:
         """
-        Lee el archivo de ventas históricas.
-        
-        El archivo debe contener una hoja con datos de ventas por vendedor,
-        incluyendo código de artículo, nombre, fecha, semana, unidades e importe.
-        
-        Returns:
-            Optional[pd.DataFrame]: DataFrame con las ventas procesadas o None
+        Hoja de ventas de un fichero de ventas ya leído con leer_excel().
+
+        Busca la hoja "ventas por vendedor" y, si no la hay, usa la primera.
         """
-        dir_entrada = self.obtener_directorio_entrada()
-        nombre_archivo = self.archivos.get('ventas', 'SPA_ventas.xlsx')
-        ruta_archivo = os.path.join(dir_entrada, nombre_archivo)
-        
-        df = self.leer_excel(ruta_archivo)
-        
-        if df is None:
-            return None
-        
         # Si devuelve diccionario de hojas, convertir a DataFrame
         if isinstance(df, dict):
             # Buscar hoja que contenga "ventas por vendedor"
@@ -533,18 +550,28 @@ class DataLoader:
             if nombre_encontrado:
                 df = df[nombre_encontrado]
                 logger.info(f"Usando hoja: {nombre_encontrado}")
+            elif len(df) == 1:
+                # Un CSV/TSV es una única hoja con el nombre del fichero
+                df = next(iter(df.values()))
             else:
                 # Usar la primera hoja disponible
                 primera_hoja = list(df.keys())[0]
                 df = df[primera_hoja]
                 logger.warning(f"No se encontró hoja específica, usando: {primera_hoja}")
         else:
-            df = df.copy()
+            df = copia_defensiva(df)
         
+        return df
+    
+    def limpiar_ventas(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Deja solo las líneas de detalle con artículo y añade las columnas
+        normalizadas Codigo y Nombre.
+        """
         # Aplicar filtros de limpieza
         if 'Tipo registro' in df.columns:
             # Filtrar solo registros de tipo "Detalle"
-            df = df[df['Tipo registro'].apply(lambda x: self.texto_igual(x, 'Detalle'))]
+            df = df[df['Tipo registro'].apply(lambda x: self.texto_igual(x, 'Detalle')).astype(bool)]
             logger.info(f"Filtrados {len(df)} registros de tipo 'Detalle'")
         
         if 'Artículo' in df.columns:
@@ -562,7 +589,70 @@ class DataLoader:
         if 'Nombre artículo' in df.columns:
             df['Nombre'] = df['Nombre artículo'].astype(str).str.strip()
         
+        return df
+    
+    def leer_ventas(self) -> Optional[pd.DataFrame]:
+        """
+        Lee el archivo de ventas históricas.
+        
+        El archivo debe contener una hoja con datos de ventas por vendedor,
+        incluyendo código de artículo, nombre, fecha, semana, unidades e importe.
+        Puede ser el .xlsx o su exportación .csv/.tsv; solo se cargan las
+        columnas de COLUMNAS_VENTAS.
+        
+        Returns:
+            Optional[pd.DataFrame]: DataFrame con las ventas procesadas o None
+        """
+        dir_entrada = self.obtener_directorio_entrada()
+        nombre_archivo = self.archivos.get('ventas', 'SPA_ventas.xlsx')
+        ruta_archivo = resolver_entrada(os.path.join(dir_entrada, nombre_archivo))
+        
+        clave = self._clave_lectura(ruta_archivo)
+        if clave in self._lecturas:
+            return copia_defensiva(self._lecturas[clave])
+        
+        df = self.leer_excel(ruta_archivo, columnas=COLUMNAS_VENTAS)
+        
+        if df is None:
+            return None
+        
+        df = self.limpiar_ventas(self.hoja_ventas(df))
+        reducir_memoria(df)
         logger.info(f"Ventas cargadas: {len(df)} registros")
+        if clave is not None:
+            self._lecturas[clave] = df
+        return copia_defensiva(df)
+    
+    def leer_ventas_historico(self, seccion: str, semanas: List[int]) -> Optional[pd.DataFrame]:
+        """
+        Lee del histórico de ventas solo las semanas y la sección indicadas.
+        
+        Las semanas se buscan en los años de referencia (por defecto el año
+        anterior al actual, como el SPA_ventas.xlsx del año pasado).
+        
+        Args:
+            seccion (str): Sección a leer
+            semanas (List[int]): Números de semana ISO
+        
+        Returns:
+            Optional[pd.DataFrame]: Ventas con el formato de leer_ventas(), o None si el
+            histórico no está activo (historico_ventas.usar) o le falta alguna semana
+        """
+        if not historico_activo(self.config):
+            return None
+        if self._historico is None:
+            self._historico = crear_historico_ventas(self.config)
+        
+        años = años_referencia(self.config)
+        if not self._historico.cubre(semanas, años):
+            logger.info(f"El histórico de ventas no tiene todas las semanas {semanas} de {años}: "
+                        f"se lee el fichero de ventas")
+            return None
+        
+        df = self.limpiar_ventas(self._historico.ventas(semanas=semanas, años=años, secciones=[seccion]))
+        reducir_memoria(df)
+        logger.info(f"Ventas leídas del histórico: {len(df)} registros de '{seccion}' "
+                    f"(semanas {semanas[0]}-{semanas[-1]} de {años})")
         return df
     
     def leer_coste(self) -> Optional[pd.DataFrame]:
@@ -577,7 +667,11 @@ class DataLoader:
         """
         dir_entrada = self.obtener_directorio_entrada()
         nombre_archivo = self.archivos.get('coste', 'SPA_coste.xlsx')
-        ruta_archivo = os.path.join(dir_entrada, nombre_archivo)
+        ruta_archivo = resolver_entrada(os.path.join(dir_entrada, nombre_archivo))
+
+        clave = self._clave_lectura(ruta_archivo)
+        if clave in self._lecturas:
+            return copia_defensiva(self._lecturas[clave])
 
         df = self.leer_excel(ruta_archivo)
 
@@ -590,7 +684,7 @@ class DataLoader:
             df = df[primera_hoja]
             logger.debug(f"Usando primera hoja del archivo de costes: {primera_hoja}")
 
-        df = df.copy()
+        df = copia_defensiva(df)
         
         # Log de columnas disponibles para debugging
         logger.debug(f"Columnas disponibles en costes: {list(df.columns)}")
@@ -623,7 +717,9 @@ class DataLoader:
                       df['Color'].astype(str).str.strip())
 
         logger.info(f"Costes cargados: {len(df)} registros")
-        return df
+        if clave is not None:
+            self._lecturas[clave] = df
+        return copia_defensiva(df)
     
     def cargar_configuracion_periodos(self) -> Dict[str, Any]:
         """
@@ -632,23 +728,7 @@ class DataLoader:
         Returns:
             Dict[str, Any]: Diccionario con la configuración de períodos
         """
-        try:
-            # Intentar cargar desde config_comun.json
-            config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'config_comun.json')
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_comun = json.load(f)
-                    return config_comun.get('configuracion_periodo_clasificacion', {}).get('periodos', {})
-        except Exception as e:
-            logger.warning(f"No se pudo cargar configuración de períodos: {e}")
-
-        # Valores por defecto si no se puede cargar
-        return {
-            "P1": {"mes_inicio": 1, "dia_inicio": 1, "mes_fin": 2, "dia_fin": 28},
-            "P2": {"mes_inicio": 3, "dia_inicio": 1, "mes_fin": 5, "dia_fin": 31},
-            "P3": {"mes_inicio": 6, "dia_inicio": 1, "mes_fin": 8, "dia_fin": 31},
-            "P4": {"mes_inicio": 9, "dia_inicio": 1, "mes_fin": 12, "dia_fin": 31}
-        }
+        return obtener_registro().periodos()
 
     def obtener_periodo_desde_semana(self, semana: int, año: int = None) -> str:
         """
@@ -698,6 +778,62 @@ class DataLoader:
         logger.warning(f"No se pudo determinar período para semana {semana}, usando P4 por defecto")
         return "P4"
 
+    def _nombre_seccion_abc(self, seccion: str) -> str:
+        """Nombre de la sección tal como aparece en los ficheros CLASIFICACION_ABC+D_*."""
+        # Normalizar nombre de sección para búsqueda
+        seccion_normalizada = self.normalizar_texto(seccion)
+
+        # Mapeo especial para secciones con guiones bajos que deben preservarse en el nombre del archivo
+        # Ejemplo: 'tierras_aridos' debe buscar 'TIERRA_ARIDOS' en el archivo
+        mapeo_secciones = {
+            'tierrasaridos': 'TIERRA_ARIDOS',
+            'tierras_aridos': 'TIERRA_ARIDOS',  # Con guión bajo
+            'mascotasvivo': 'MASCOTAS_VIVO',
+            'mascotasmanufacturado': 'MASCOTAS_MANUFACTURADO',
+            'decointerior': 'DECO_INTERIOR',
+            'decoexterior': 'DECO_EXTERIOR',
+            'utilesjardin': 'UTILES_JARDIN'
+        }
+
+        # Usar el mapeo especial si existe, sinon usar la sección normalizada
+        return mapeo_secciones.get(seccion_normalizada, seccion_normalizada.upper())
+
+    def localizar_archivo_abc(self, seccion: str, periodo: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Localiza en el manifiesto de entradas el archivo ABC+D de una sección, sin registrar nada.
+
+        Orden de búsqueda (en cada paso, el más reciente):
+            'periodo'   CLASIFICACION_ABC+D_{SECCION}_{P}_*.xlsx (si se da el período)
+            'nuevo'     CLASIFICACION_ABC+D_{SECCION}_*.xlsx
+            'antiguo'   CLASIFICACION_ABC+D_{SECCION}.xlsx
+            'generico'  *{SECCION}*.xlsx
+            'catchall'  CLASIFICACION_ABC+D*.xlsx
+
+        Args:
+            seccion (str): Nombre de la sección
+            periodo (Optional[str]): Período (P1-P4) del archivo que se prefiere
+
+        Returns:
+            Tuple: (ruta, formato en el que se encontró) o (None, None)
+        """
+        dir_entrada = self.obtener_directorio_entrada()
+        seccion_busqueda = self._nombre_seccion_abc(seccion)
+        manifiesto = obtener_manifiesto()
+
+        patrones = []
+        if periodo:
+            patrones.append(('periodo', f"CLASIFICACION_ABC+D_{seccion_busqueda}_{periodo}_*.xlsx"))
+        patrones.append(('nuevo', f"CLASIFICACION_ABC+D_{seccion_busqueda}_*.xlsx"))
+        patrones.append(('antiguo', f"CLASIFICACION_ABC+D_{seccion_busqueda}.xlsx"))
+        patrones.append(('generico', f"*{seccion_busqueda}*.xlsx"))
+        patrones.append(('catchall', 'CLASIFICACION_ABC+D*.xlsx'))
+
+        for formato, patron in patrones:
+            ruta = manifiesto.mas_reciente(dir_entrada, patron)
+            if ruta is not None:
+                return ruta, formato
+        return None, None
+
     def buscar_archivo_abc_seccion(self, seccion: str, semana: int = None) -> Optional[str]:
         """
         Busca el archivo CLASIFICACION ABC+D específico para la sección.
@@ -717,92 +853,33 @@ class DataLoader:
         Returns:
             Optional[str]: Ruta del archivo encontrado o None
         """
-        dir_entrada = self.obtener_directorio_entrada()
-        patron = self.archivos.get('clasificacion_abc', 'CLASIFICACION_ABC+D_*.xlsx')
-
-        # Normalizar nombre de sección para búsqueda
-        seccion_normalizada = self.normalizar_texto(seccion)
-
-        # Mapeo especial para secciones con guiones bajos que deben preservarse en el nombre del archivo
-        # Ejemplo: 'tierras_aridos' debe buscar 'TIERRA_ARIDOS' en el archivo
-        mapeo_secciones = {
-            'tierrasaridos': 'TIERRA_ARIDOS',
-            'tierras_aridos': 'TIERRA_ARIDOS',  # Con guión bajo
-            'mascotasvivo': 'MASCOTAS_VIVO',
-            'mascotasmanufacturado': 'MASCOTAS_MANUFACTURADO',
-            'decointerior': 'DECO_INTERIOR',
-            'decoexterior': 'DECO_EXTERIOR',
-            'utilesjardin': 'UTILES_JARDIN'
-        }
-
-        # Usar el mapeo especial si existe, sinon usar la sección normalizada
-        seccion_busqueda = mapeo_secciones.get(seccion_normalizada, seccion_normalizada.upper())
-
         # Determinar el período si se proporciona la semana
         periodo_seleccionado = None
         if semana is not None:
             periodo_seleccionado = self.obtener_periodo_desde_semana(semana)
             logger.info(f"Período determinado para semana {semana}: {periodo_seleccionado}")
 
-        # Buscar archivos con el nuevo formato que incluye período y año
-        # Patrón: CLASIFICACION_ABC+D_{SECCION}_P{N}_*.xlsx
-        # Ejemplos: CLASIFICACION_ABC+D_INTERIOR_P1_2025.xlsx, CLASIFICACION_ABC+D_INTERIOR_P2_2026.xlsx
-
-        if periodo_seleccionado:
-            # Buscar específicamente el archivo del período seleccionado
-            patron_periodo = f"CLASIFICACION_ABC+D_{seccion_busqueda}_{periodo_seleccionado}_*.xlsx"
-            ruta_periodo = os.path.join(dir_entrada, patron_periodo)
-            archivos_periodo = glob.glob(ruta_periodo)
-
-            if archivos_periodo:
-                # Ordenar por fecha de modificación (más reciente primero)
-                archivos_periodo.sort(key=os.path.getmtime, reverse=True)
-                logger.info(f"Archivo ABC encontrado para '{seccion}' (período {periodo_seleccionado}): {archivos_periodo[0]}")
-                return archivos_periodo[0]
-            else:
-                logger.warning(f"No se encontró archivo para '{seccion}' con período {periodo_seleccionado}, buscando cualquier archivo disponible")
+        ruta, formato = self.localizar_archivo_abc(seccion, periodo_seleccionado)
 
-        # Si no se especificó semana o no se encontró el archivo del período, buscar todos los archivos nuevos
-        nuevo_patron = f"CLASIFICACION_ABC+D_{seccion_busqueda}_*.xlsx"
-        ruta_nueva = os.path.join(dir_entrada, nuevo_patron)
-        archivos_nuevos = glob.glob(ruta_nueva)
+        if periodo_seleccionado and formato != 'periodo':
+            logger.warning(f"No se encontró archivo para '{seccion}' con período {periodo_seleccionado}, buscando cualquier archivo disponible")
 
-        if archivos_nuevos:
+        if formato == 'periodo':
+            logger.info(f"Archivo ABC encontrado para '{seccion}' (período {periodo_seleccionado}): {ruta}")
+        elif formato == 'nuevo':
             # Si tenemos semana pero no encontramos archivo del período, usar el más reciente
-            if semana is not None and periodo_seleccionado:
+            if periodo_seleccionado:
                 logger.warning(f"No existe archivo para período {periodo_seleccionado}, usando el más reciente")
+            logger.info(f"Archivo ABC encontrado (nuevo formato) para '{seccion}': {ruta}")
+        elif formato == 'antiguo':
+            logger.info(f"Archivo ABC encontrado (formato antiguo) para '{seccion}': {ruta}")
+        elif formato == 'generico':
+            logger.warning(f"No se encontró archivo con patrón estándar para '{seccion}', usando: {ruta}")
+        elif formato == 'catchall':
+            logger.warning(f"No se encontró archivo específico para '{seccion}', usando: {ruta}")
 
-            # Ordenar por fecha de modificación (más reciente primero)
-            archivos_nuevos.sort(key=os.path.getmtime, reverse=True)
-            logger.info(f"Archivo ABC encontrado (nuevo formato) para '{seccion}': {archivos_nuevos[0]}")
-            return archivos_nuevos[0]
-
-        # Si no encuentra el nuevo formato, buscar el formato antiguo
-        # Patrón: CLASIFICACION_ABC+D_{SECCION}.xlsx (sin período)
-        antiguo_patron = f"CLASIFICACION_ABC+D_{seccion_busqueda}.xlsx"
-        ruta_antigua = os.path.join(dir_entrada, antiguo_patron)
-
-        if os.path.exists(ruta_antigua):
-            logger.info(f"Archivo ABC encontrado (formato antiguo) para '{seccion}': {ruta_antigua}")
-            return ruta_antigua
-
-        # Búsqueda amplia por sección (formato genérico)
-        patron_generico = os.path.join(dir_entrada, f'*{seccion_busqueda}*.xlsx')
-        archivos_genericos = glob.glob(patron_generico)
-
-        if archivos_genericos:
-            archivos_genericos.sort(key=os.path.getmtime, reverse=True)
-            logger.warning(f"No se encontró archivo con patrón estándar para '{seccion}', usando: {archivos_genericos[0]}")
-            return archivos_genericos[0]
-
-        # Búsqueda genérica de cualquier archivo CLASIFICACION_ABC+D
-        patron_catchall = os.path.join(dir_entrada, 'CLASIFICACION_ABC+D*.xlsx')
-        archivos_catchall = glob.glob(patron_catchall)
-
-        if archivos_catchall:
-            archivos_catchall.sort(key=os.path.getmtime, reverse=True)
-            logger.warning(f"No se encontró archivo específico para '{seccion}', usando: {archivos_catchall[0]}")
-            return archivos_catchall[0]
+        if ruta is not None:
+            return ruta
 
         logger.error(f"No se encontró ningún archivo ABC+D para sección '{seccion}'")
         # Enviar alerta específica
@@ -815,6 +892,56 @@ class DataLoader:
             }, clave_unica=f"abc_{seccion}")
         return None
     
+    def ventas_desde_historico(self, semanas: Optional[List[int]] = None) -> bool:
+        """
+        Indica si las ventas de esas semanas se leerán del histórico de ventas
+        y no del fichero de ventas (histórico activo y con todas las semanas).
+
+        Args:
+            semanas (List[int], optional): Semanas que se van a procesar
+
+        Returns:
+            bool: True si no hace falta el fichero de ventas
+        """
+        if not historico_activo(self.config):
+            return False
+        if not semanas:
+            return True
+        if self._historico is None:
+            self._historico = crear_historico_ventas(self.config)
+        return self._historico.cubre(semanas, años_referencia(self.config))
+
+    def archivos_pedido(self, semanas: Optional[List[int]] = None) -> List[str]:
+        """
+        Ficheros de entrada que leerá leer_datos_seccion() para esas semanas, sin leerlos.
+
+        Son las ventas (salvo que el histórico de ventas tenga las semanas), los
+        costes y, si se dan las semanas, el ABC de cada sección activa para cada
+        período. main.py los usa para leerlos en segundo plano al arrancar.
+
+        Args:
+            semanas (List[int], optional): Semanas que se van a procesar
+
+        Returns:
+            List[str]: Rutas de los ficheros que existen, sin repetir
+        """
+        dir_entrada = self.obtener_directorio_entrada()
+        rutas = []
+
+        if not self.ventas_desde_historico(semanas):
+            rutas.append(resolver_entrada(os.path.join(dir_entrada, self.archivos.get('ventas', 'SPA_ventas.xlsx'))))
+        rutas.append(resolver_entrada(os.path.join(dir_entrada, self.archivos.get('coste', 'SPA_coste.xlsx'))))
+
+        periodos = sorted({self.obtener_periodo_desde_semana(semana) for semana in semanas or []})
+        for seccion in self.secciones:
+            for periodo in periodos:
+                ruta, _ = self.localizar_archivo_abc(seccion, periodo)
+                if ruta is not None:
+                    rutas.append(ruta)
+
+        manifiesto = obtener_manifiesto()
+        return [ruta for ruta in dict.fromkeys(rutas) if manifiesto.existe(ruta)]
+    
     def leer_clasificacion_abc(self, seccion: str, semana: int = None) -> Optional[pd.DataFrame]:
         """
         Lee el archivo de clasificación ABC para una sección específica.
@@ -877,13 +1004,16 @@ class DataLoader:
         logger.info(f"Clasificación ABC cargada para '{seccion}': {len(df_resultado)} registros")
         return df_resultado
     
-    def leer_datos_seccion(self, seccion: str, semana: int = None) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    def leer_datos_seccion(self, seccion: str, semana: int = None,
+                           semanas: Optional[List[int]] = None) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame], Optional[pd.DataFrame]]:
         """
         Lee todos los datos necesarios para procesar una sección.
 
         Args:
             seccion (str): Nombre de la sección a procesar
             semana (int, optional): Número de semana del año para determinar el período del archivo ABC
+            semanas (List[int], optional): Semanas de ventas que se van a usar; con el histórico
+                de ventas activo se leen solo esas semanas de la sección
 
         Returns:
             Tuple: (abc_df, ventas_df, costes_df) o (None, None, None) si hay error
@@ -911,7 +1041,9 @@ class DataLoader:
         
         # Leer ventas
         logger.debug(f"[DEBUG] Intentando leer archivo de ventas...")
-        ventas_df = self.leer_ventas()
+        ventas_df = self.leer_ventas_historico(seccion, semanas) if semanas else None
+        if ventas_df is None:
+            ventas_df = self.leer_ventas()
         
         logger.debug(f"[DEBUG] Ventas leído: {len(ventas_df) if ventas_df is not None else 0} registros")
         if ventas_df is not None:
@@ -933,7 +1065,9 @@ class DataLoader:
         logger.debug(f"[DEBUG] Filtrando ventas por sección: {seccion}")
         
         # DEBUG: Mostrar distribución de secciones antes de filtrar
-        ventas_df['Seccion'] = ventas_df['Codigo'].apply(self.determinar_seccion)
+        # determinar_seccion() una vez por código, no por línea de venta
+        codigos = ventas_df['Codigo']
+        ventas_df['Seccion'] = codigos.map({codigo: self.determinar_seccion(codigo) for codigo in codigos.unique()})
         secciones_encontradas = ventas_df['Seccion'].value_counts()
         logger.debug(f"[DEBUG] Distribución de secciones antes de filtrar:")
         for sec, count in secciones_encontradas.items():
@@ -946,7 +1080,8 @@ class DataLoader:
             logger.warning(f"[DEBUG] La sección '{seccion}' NO se encontró en los datos")
             logger.debug(f"[DEBUG] Secciones disponibles: {list(secciones_encontradas.index)}")
         
-        ventas_df = ventas_df[ventas_df['Seccion'] == seccion].copy()
+        ventas_df = copia_defensiva(ventas_df[ventas_df['Seccion'] == seccion])
+        reducir_memoria(ventas_df, categoricas=('Seccion',), enteras=())
         logger.debug(f"[DEBUG] Tras filtrar por '{seccion}': {len(ventas_df)} registros")
         logger.info(f"Filtrados {len(ventas_df)} registros de sección '{seccion}' de {registros_total} total")
         
@@ -1098,8 +1233,15 @@ def cargar_configuracion(ruta_config: str = 'config/config.json') -> Optional[di
         Optional[dict]: Configuración cargada o None si hay error
     """
     try:
-        with open(ruta_config, 'r', encoding='utf-8') as f:
-            config = pd.read_json(f)
+        registro = obtener_registro()
+        nombre = registro.nombre_de_ruta(ruta_config)
+        if nombre is not None:
+            if not registro.existe(nombre):
+                raise FileNotFoundError(ruta_config)
+            config = registro.obtener(nombre)
+        else:
+            with open(ruta_config, 'r', encoding='utf-8') as f:
+                config = json.load(f)
         
         logger.info(f"Configuración cargada desde: {ruta_config}")
         return config
@@ -12,9 +12,9 @@ Definiciones de períodos (basadas en config/config_comun.json):
 - P4: 1 de septiembre al 31 de diciembre
 """
 
+import argparse
 from datetime import datetime
-import json
-from pathlib import Path
+from typing import List
 
 
 # ============================================================================
@@ -73,6 +73,22 @@ def get_semana_del_año(fecha=None):
     return fecha.isocalendar()[1]
 
 
+def lista_semanas(texto: str) -> List[int]:
+    """
+    Semanas de la línea de comandos (--semanas): 'A-B', 'A,B,C' o combinadas ('3,10-12').
+
+    Es el tipo de argparse de src/backtesting.py y src/escenarios.py.
+    """
+    try:
+        semanas = []
+        for parte in texto.split(','):
+            inicio, _, fin = parte.partition('-')
+            semanas.extend(range(int(inicio), int(fin or inicio) + 1))
+        return semanas
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"semanas no válidas: '{texto}' (formato A-B o A,B,C)")
+
+
 def get_año_actual(fecha=None):
     """
     Obtiene el año actual.
@@ -235,18 +251,12 @@ def cargar_periodos_desde_config():
     Returns:
         dict: Definiciones de períodos
     """
-    config_path = Path("config/config.json")
+    from src.registro_config import obtener_registro
     
-    if config_path.exists():
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            # Verificar si hay definiciones de períodos en el config
-            if "periodos" in config:
-                return config["periodos"]
-        except Exception as e:
-            print(f"  AVISO: Error al cargar períodos desde config: {e}")
+    # Verificar si hay definiciones de períodos en config.json
+    periodos = obtener_registro().obtener('principal', copiar=False).get('periodos')
+    if periodos:
+        return dict(periodos)
     
     # Usar definiciones por defecto
     return PERIODOS
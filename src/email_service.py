@@ -12,21 +12,20 @@ Autor: Sistema de Pedidos Viveverde V2
 Fecha: 2026-02-05
 """
 
-import smtplib
-import ssl
 import os
-import json
 import logging
 import unicodedata
-import pandas as pd
 import traceback
 from email import encoders
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
+from src.transporte_email import TransporteSMTP
+from src.registro_config import obtener_registro
+
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
@@ -73,6 +72,8 @@ def normalizar_texto(texto):
     Returns:
         str: Texto normalizado (minúsculas, sin acentos, sin puntuación) o cadena vacía si es None/NaN
     """
+    import pandas as pd  # ya cargado por quien trabaja con DataFrames
+    
     if pd.isna(texto):
         return ''
     texto = str(texto)
@@ -105,6 +106,8 @@ def normalizar_con_espacios(texto):
     Returns:
         str: Texto normalizado (minúsculas, sin acentos,保留 espacios, sin otra puntuación)
     """
+    import pandas as pd  # ya cargado por quien trabaja con DataFrames
+    
     if pd.isna(texto):
         return ''
     texto = str(texto)
@@ -159,6 +162,7 @@ def obtener_columna_segura(df, nombre_buscado):
         return df[nombre_real]
     else:
         logger.warning(f"No se encontró columna '{nombre_buscado}' en el DataFrame")
+        import pandas as pd
         return pd.Series([], dtype='object')
 
 def filtrar_por_valor_normalizado(df, nombre_columna, valor_buscado):
@@ -294,6 +298,7 @@ class EmailService:
         self.plantilla_asunto = ""
         self.plantilla_cuerpo = ""
         self.encargados_por_seccion = {}
+        self._transporte = None
         
         # Cargar configuración
         self._cargar_configuracion()
@@ -312,18 +317,9 @@ class EmailService:
         - SMTP y plantillas: Se leen desde email.json (fuente centralizada)
         - Destinatarios: Se leen desde encargados.json (FUENTE ÚNICA)
         """
-        # Primero intentar leer desde email.json (fuente centralizada)
-        email_json_config = {}
-        try:
-            import os
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            email_json_path = os.path.join(base_dir, 'config', 'email.json')
-            if os.path.exists(email_json_path):
-                with open(email_json_path, 'r', encoding='utf-8') as f:
-                    email_json_config = json.load(f)
-                logger.debug("Configuración SMTP cargada desde email.json")
-        except Exception as e:
-            logger.warning(f"No se pudo cargar email.json: {e}")
+        # email.json y encargados.json se leen a través del registro compartido
+        registro = obtener_registro()
+        email_json_config = registro.obtener('email', copiar=False)
         
         # Obtener configuración desde config.json
         email_config = self.config.get('email', {})
@@ -335,14 +331,16 @@ class EmailService:
                 'servidor': smtp.get('servidor', 'smtp.serviciodecorreo.es'),
                 'puerto': smtp.get('puerto', 465),
                 'usar_ssl': smtp.get('usar_ssl', True),
-                'usar_tls': smtp.get('usar_tls', False)
+                'usar_tls': smtp.get('usar_tls', False),
+                'max_conexiones': smtp.get('max_conexiones', 2)
             }
         else:
             self.smtp_config = {
                 'servidor': email_config.get('smtp', {}).get('servidor', 'smtp.serviciodecorreo.es'),
                 'puerto': email_config.get('smtp', {}).get('puerto', 465),
                 'usar_ssl': email_config.get('smtp', {}).get('usar_ssl', True),
-                'usar_tls': email_config.get('smtp', {}).get('usar_tls', False)
+                'usar_tls': email_config.get('smtp', {}).get('usar_tls', False),
+                'max_conexiones': email_config.get('smtp', {}).get('max_conexiones', 2)
             }
         
         # Remitente -优先从 email.json 读取
@@ -364,12 +362,8 @@ class EmailService:
         self.destinatarios = {}
         self.encargados_por_seccion = {}  # Para compatibilidad con funciones existentes
         try:
-            import os
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            encargado_path = os.path.join(base_dir, 'config', 'encargados.json')
-            if os.path.exists(encargado_path):
-                with open(encargado_path, 'r', encoding='utf-8') as f:
-                    encargodos_data = json.load(f)
+            if registro.existe('encargados'):
+                encargodos_data = registro.obtener('encargados', copiar=False)
                 
                 # Transformar encargado.json al formato de destinatarios
                 # Puede ser un objeto (un encargado) o un array (múltiples encargado)
@@ -445,29 +439,20 @@ class EmailService:
         }
         """
         try:
-            # Construir ruta al archivo de configuración de encargados
-            directorio_base = self.config.get('rutas', {}).get('directorio_base', '.')
-            ruta_archivo = Path(directorio_base) / 'config' / 'encargados.json'
+            registro = obtener_registro()
             
             # Verificar que el archivo existe
-            if not ruta_archivo.exists():
-                logger.warning(f"Archivo de encargados no encontrado: {ruta_archivo}")
+            if not registro.existe('encargados'):
+                logger.warning(f"Archivo de encargados no encontrado: {registro.ruta('encargados')}")
                 logger.info("Se usarán nombres genéricos para los encargados")
                 return
             
-            # Leer el archivo JSON
-            with open(ruta_archivo, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
             # Extraer el diccionario de encargados
-            self.encargados_por_seccion = config_data.get('encargados', {})
+            self.encargados_por_seccion = registro.encargados_json().get('encargados', {})
             
-            logger.info(f"Encargados cargados desde {ruta_archivo}: {len(self.encargados_por_seccion)} secciones")
+            logger.info(f"Encargados cargados desde {registro.ruta('encargados')}: {len(self.encargados_por_seccion)} secciones")
             logger.debug(f"Mapping de encargados: {self.encargados_por_seccion}")
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Error al parsear archivo de encargados (JSON inválido): {e}")
-            logger.info("Se usarán nombres genéricos para los encargados")
         except Exception as e:
             logger.error(f"Error al leer archivo de encargados: {e}")
             logger.info("Se usarán nombres genéricos para los encargados")
@@ -476,10 +461,8 @@ class EmailService:
         """
         Envía el resumen de pedidos de compra a los responsables de gestión.
         
-        Destinatarios:
-        - Sandra: ivan.delgado@viveverde.es
-        - Ivan: ivan.delgado@viveverde.es
-        - Pedro: ivan.delgado@viveverde.es
+        Destinatarios: 'responsables_gestion' de config/encargados.json
+        (Sandra, Ivan y Pedro si no está configurado).
         
         Args:
             semana (int): Número de semana procesada
@@ -494,6 +477,9 @@ class EmailService:
         
         # Destinatarios del resumen de gestión
         destinatarios_resumen = [
+            {'nombre': r.nombre, 'email': r.email}
+            for r in obtener_registro().responsables_gestion()
+        ] or [
             {'nombre': 'Sandra', 'email': 'sandra.delgado@viveverde.es'},
             {'nombre': 'Ivan', 'email': 'ivan.delgado@viveverde.es'},
             {'nombre': 'Pedro', 'email': 'pedro.delgado@viveverde.es'}
@@ -513,6 +499,7 @@ class EmailService:
             emails_enviados = 0
             emails_fallidos = 0
             
+            mensajes = []
             for destinatario in destinatarios_resumen:
                 nombre = destinatario['nombre']
                 email = destinatario['email']
@@ -524,9 +511,12 @@ class EmailService:
                          f"Atentamente,\n"
                          f"Sistema de Pedidos automáticos VIVEVERDE.")
                 
-                # Crear y enviar mensaje
-                msg = self._crear_mensaje([email], asunto, cuerpo, [archivo_resumen])
-                enviado = self._enviar_email(msg)
+                mensajes.append(self._crear_mensaje([email], *self._con_tienda(asunto, cuerpo), [archivo_resumen]))
+            
+            # Enviar todos los mensajes por las sesiones compartidas del transporte
+            for destinatario, enviado in zip(destinatarios_resumen, self._enviar_emails(mensajes)):
+                nombre = destinatario['nombre']
+                email = destinatario['email']
                 
                 if enviado:
                     logger.info(f"✓ Resumen enviado a {nombre} ({email})")
@@ -591,10 +581,39 @@ class EmailService:
         
         return password
     
+    def _texto_tienda(self) -> str:
+        """
+        Tienda del pedido ('Nombre (codigo)') con varias tiendas, o '' con una sola.
+        
+        Returns:
+            str: Texto de la tienda para asuntos y cuerpos
+        """
+        tienda = self.config.get('tienda')
+        return f"{tienda['nombre']} ({tienda['codigo']})" if tienda else ''
+    
+    def _con_tienda(self, asunto: str, cuerpo: str) -> Tuple[str, str]:
+        """
+        Añade la tienda al asunto y al cuerpo de un email (sin cambios con una sola tienda).
+        
+        Args:
+            asunto (str): Asunto del email
+            cuerpo (str): Cuerpo del email
+            
+        Returns:
+            Tuple[str, str]: (asunto, cuerpo)
+        """
+        tienda = self._texto_tienda()
+        if not tienda:
+            return asunto, cuerpo
+        return f"{asunto} - {tienda}", f"Tienda: {tienda}\n\n{cuerpo}"
+    
     def _generar_asunto(self, semana: int, seccion: str) -> str:
         """
         Genera el asunto del email usando la plantilla configurada.
         
+        La plantilla puede usar {tienda}; si no la usa y el pedido es de una
+        tienda, se añade al final.
+        
         Args:
             semana (int): Número de semana
             seccion (str): Nombre de la sección
@@ -602,12 +621,19 @@ class EmailService:
         Returns:
             str: Asunto formateado
         """
-        return self.plantilla_asunto.format(semana=semana, seccion=seccion)
+        tienda = self._texto_tienda()
+        asunto = self.plantilla_asunto.format(semana=semana, seccion=seccion, tienda=tienda)
+        if tienda and '{tienda}' not in self.plantilla_asunto:
+            asunto += f" - {tienda}"
+        return asunto
     
     def _generar_cuerpo(self, semana: int, seccion: str, nombre_encargado: str) -> str:
         """
         Genera el cuerpo del email usando la plantilla configurada.
         
+        La plantilla puede usar {tienda}; si no la usa y el pedido es de una
+        tienda, se indica en la primera línea.
+        
         Args:
             semana (int): Número de semana
             seccion (str): Nombre de la sección
@@ -616,11 +642,16 @@ class EmailService:
         Returns:
             str: Cuerpo del mensaje formateado
         """
-        return self.plantilla_cuerpo.format(
+        tienda = self._texto_tienda()
+        cuerpo = self.plantilla_cuerpo.format(
             semana=semana,
             seccion=seccion,
-            nombre_encargado=nombre_encargado
+            nombre_encargado=nombre_encargado,
+            tienda=tienda
         )
+        if tienda and '{tienda}' not in self.plantilla_cuerpo:
+            cuerpo = f"Tienda: {tienda}\n\n{cuerpo}"
+        return cuerpo
     
     def _crear_mensaje(self, destinatarios: List[str], asunto: str, 
                       cuerpo: str, archivos_adjuntos: List[str]) -> MIMEMultipart:
@@ -687,6 +718,28 @@ class EmailService:
         
         return msg
     
+    def _obtener_transporte(self) -> TransporteSMTP:
+        """
+        Devuelve el transporte SMTP compartido, creándolo en el primer envío.
+        
+        Returns:
+            TransporteSMTP: Transporte con las sesiones autenticadas reutilizables
+            
+        Raises:
+            ValueError: Si la contraseña no está configurada
+        """
+        if self._transporte is None:
+            self._transporte = TransporteSMTP(
+                servidor=self.smtp_config['servidor'],
+                puerto=self.smtp_config['puerto'],
+                usuario=self.remitente['email'],
+                password=self._obtener_password(),
+                usar_ssl=self.smtp_config.get('usar_ssl', True),
+                usar_tls=self.smtp_config.get('usar_tls', False),
+                max_conexiones=self.smtp_config.get('max_conexiones', 2)
+            )
+        return self._transporte
+    
     def _enviar_email(self, msg: MIMEMultipart) -> bool:
         """
         Envía el email a través del servidor SMTP.
@@ -697,48 +750,39 @@ class EmailService:
         Returns:
             bool: True si el envío fue exitoso, False en caso contrario
         """
-        try:
-            password = self._obtener_password()
-            
-            # Crear contexto SSL
-            context = ssl.create_default_context()
-            
-            # Conectar al servidor
-            if self.smtp_config.get('usar_ssl', True):
-                with smtplib.SMTP_SSL(
-                    self.smtp_config['servidor'],
-                    self.smtp_config['puerto'],
-                    context=context
-                ) as server:
-                    server.login(self.remitente['email'], password)
-                    server.sendmail(
-                        self.remitente['email'],
-                        msg['To'].split(', '),
-                        msg.as_string()
-                    )
-            else:
-                with smtplib.SMTP(
-                    self.smtp_config['servidor'],
-                    self.smtp_config['puerto']
-                ) as server:
-                    if self.smtp_config.get('usar_tls', False):
-                        server.starttls(context=context)
-                    server.login(self.remitente['email'], password)
-                    server.sendmail(
-                        self.remitente['email'],
-                        msg['To'].split(', '),
-                        msg.as_string()
-                    )
-            
-            logger.info(f"Email enviado exitosamente a: {msg['To']}")
-            return True
+        return self._enviar_emails([msg])[0]
+    
+    def _enviar_emails(self, mensajes: List[MIMEMultipart]) -> List[bool]:
+        """
+        Envía varios emails reutilizando las sesiones SMTP del transporte.
+        
+        Los mensajes se reparten entre como máximo 'max_conexiones' sesiones
+        autenticadas; los errores transitorios se reintentan con espera.
+        
+        Args:
+            mensajes (List[MIMEMultipart]): Mensajes MIME a enviar
             
-        except smtplib.SMTPException as e:
-            logger.error(f"Error SMTP al enviar email: {e}")
-            return False
+        Returns:
+            List[bool]: Estado de envío de cada mensaje, en el mismo orden
+        """
+        if not mensajes:
+            return []
+        try:
+            transporte = self._obtener_transporte()
         except Exception as e:
             logger.error(f"Error al enviar email: {e}")
-            return False
+            return [False] * len(mensajes)
+        
+        resultados = transporte.enviar_lote(
+            [(msg, msg['To'].split(', ')) for msg in mensajes]
+        )
+        return [r.enviado for r in resultados]
+    
+    def cerrar(self):
+        """Cierra las sesiones SMTP abiertas por el servicio."""
+        if self._transporte is not None:
+            self._transporte.cerrar()
+            self._transporte = None
     
     def obtener_destinatarios_seccion(self, seccion: str) -> List[Dict[str, str]]:
         """
@@ -782,10 +826,10 @@ class EmailService:
         logger.debug(f"Destinatarios para {seccion}: {destinatarios}")
         return destinatarios
     
-    def enviar_pedido_por_seccion(self, semana: int, seccion: str, 
-                                  archivos: List[str]) -> Dict[str, Any]:
+    def _preparar_pedido_seccion(self, semana: int, seccion: str,
+                                 archivos: List[str]) -> Tuple[Dict[str, Any], Optional[MIMEMultipart]]:
         """
-        Envía los archivos de pedido por email al responsable de la sección.
+        Prepara el mensaje de pedido de una sección sin enviarlo.
         
         Args:
             semana (int): Número de semana
@@ -793,7 +837,7 @@ class EmailService:
             archivos (List[str]): Lista de rutas de archivos a adjuntar
             
         Returns:
-            Dict[str, Any]: Resultado del envío con estado y detalles
+            Tuple: (resultado inicial, mensaje MIME o None si no se puede enviar)
         """
         resultado = {
             'seccion': seccion,
@@ -810,7 +854,7 @@ class EmailService:
         if not destinatarios:
             resultado['error'] = "No hay destinatarios configurados"
             logger.warning(f"No se puede enviar email para {seccion}: {resultado['error']}")
-            return resultado
+            return resultado, None
         
         # Filtrar archivos existentes
         archivos_existentes = [f for f in archivos if Path(f).exists()]
@@ -819,7 +863,7 @@ class EmailService:
         if not archivos_existentes:
             resultado['error'] = "No hay archivos para adjuntar"
             logger.warning(f"No se puede enviar email para {seccion}: {resultado['error']}")
-            return resultado
+            return resultado, None
         
         # Generar asunto y cuerpo
         asunto = self._generar_asunto(semana, seccion)
@@ -829,16 +873,59 @@ class EmailService:
         lista_correos = [d['email'] for d in destinatarios]
         resultado['destinatarios'] = lista_correos
         
-        # Crear y enviar mensaje
+        # Crear mensaje
         msg = self._crear_mensaje(lista_correos, asunto, cuerpo, archivos_existentes)
-        resultado['enviado'] = self._enviar_email(msg)
+        return resultado, msg
+    
+    def enviar_pedido_por_seccion(self, semana: int, seccion: str, 
+                                  archivos: List[str]) -> Dict[str, Any]:
+        """
+        Envía los archivos de pedido por email al responsable de la sección.
         
-        if resultado['enviado']:
-            logger.info(f"Email enviado para sección {seccion} (semana {semana})")
-        else:
-            resultado['error'] = "Error en el envío"
+        Args:
+            semana (int): Número de semana
+            seccion (str): Nombre de la sección
+            archivos (List[str]): Lista de rutas de archivos a adjuntar
+            
+        Returns:
+            Dict[str, Any]: Resultado del envío con estado y detalles
+        """
+        return self.enviar_pedidos_secciones(semana, {seccion: archivos})[seccion]
+    
+    def enviar_pedidos_secciones(self, semana: int,
+                                 archivos_por_seccion: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Envía los pedidos de varias secciones en un solo lote.
         
-        return resultado
+        Todos los mensajes salen por las mismas sesiones SMTP autenticadas
+        (como máximo 'max_conexiones' en paralelo) en lugar de abrir una
+        conexión por sección.
+        
+        Args:
+            semana (int): Número de semana
+            archivos_por_seccion (Dict[str, List[str]]): Archivos por sección
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: Resultado del envío de cada sección
+        """
+        resultados = {}
+        pendientes = []
+        for seccion, archivos in archivos_por_seccion.items():
+            resultado, msg = self._preparar_pedido_seccion(semana, seccion, archivos)
+            resultados[seccion] = resultado
+            if msg is not None:
+                pendientes.append((seccion, msg))
+        
+        enviados = self._enviar_emails([msg for _, msg in pendientes])
+        for (seccion, _), enviado in zip(pendientes, enviados):
+            resultado = resultados[seccion]
+            resultado['enviado'] = enviado
+            if enviado:
+                logger.info(f"Email enviado para sección {seccion} (semana {semana})")
+            else:
+                resultado['error'] = "Error en el envío"
+        
+        return resultados
     
     def enviar_resumen_centralizado(self, semana: int, 
                                     archivos: Dict[str, List[str]]) -> Dict[str, Any]:
@@ -879,7 +966,7 @@ class EmailService:
         archivos_existentes = [f for f in todos_archivos if Path(f).exists()]
         
         # Crear y enviar mensaje
-        msg = self._crear_mensaje([email_centralizado], asunto, cuerpo, archivos_existentes)
+        msg = self._crear_mensaje([email_centralizado], *self._con_tienda(asunto, cuerpo), archivos_existentes)
         enviado = self._enviar_email(msg)
         
         return {
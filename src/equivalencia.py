@@ -0,0 +1,783 @@
+#!/usr/bin/env python3
+"""
+Módulo Equivalencia - Comparación de implementaciones de los motores
+
+Cualquier versión optimizada de ForecastEngine, CorrectionEngine o de la
+clasificación ABC puede cambiar sin avisar Pedido_Final, categorías o
+escenarios. Este módulo permite comprobar que una implementación nueva da
+exactamente lo mismo que la actual sobre las mismas entradas:
+
+- Registro de implementaciones por etapa ('forecast', 'correccion'). La
+  implementación actual se registra como 'legacy'; las nuevas se registran con
+  registrar_implementacion() o se indican como 'paquete.modulo:funcion'. El
+  cálculo por lotes de varias semanas (calcular_pedidos_semanas) está
+  registrado como candidata 'semanas' de 'forecast'.
+- comparar_salidas(): compara dos DataFrames por artículo (Codigo/Talla/Color)
+  en todas las columnas, con tolerancias absolutas y relativas configurables,
+  y devuelve un InformeEquivalencia con las diferencias por artículo.
+- comparar_libros() / comparar_directorios(): lo mismo sobre ficheros Excel
+  de salida (pedidos o CLASIFICACION_ABC+D, donde la hoja es la categoría),
+  para comparar contra salidas de referencia guardadas.
+- ejecutar_etapa(): usado por main.py. Ejecuta la implementación activa y, en
+  modo sombra (--shadow), también la candidata; si difieren registra un aviso
+  (que llega como alerta), y guarda el informe y una instantánea de las
+  entradas en logs/equivalencia/ para reproducirlo con comprobar_instantanea().
+
+Uso en pruebas:
+    informe = verificar_equivalencia('forecast', 'mi_modulo:calcular_rapido', config=config,
+                                     semana=15, datos_semana=df, abc_df=abc, costes_df=costes,
+                                     seccion='vivero')
+    informe.afirmar()
+
+Uso desde línea de comandos:
+    python -m src.equivalencia instantanea logs/equivalencia/forecast_vivero_s15.pkl --candidata mi_modulo:calcular_rapido
+    python -m src.equivalencia libros salidas_referencia/ data/output/Pedidos_semanales/
+
+Configuración (config.json, sección "equivalencia"):
+    implementaciones: {etapa: nombre}          Implementación activa (default 'legacy')
+    implementaciones_sombra: {etapa: nombre}   Implementación comparada en modo sombra
+    modo_sombra: bool                          Activar el modo sombra sin --shadow
+    tolerancia_absoluta / tolerancia_relativa  Tolerancias por defecto
+    tolerancias_columna: {columna: {absoluta, relativa}}
+    ignorar_columnas: [columna, ...]
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import copy
+import importlib
+import logging
+import pickle
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.paths import EQUIVALENCIA_DIR
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+IMPLEMENTACION_REFERENCIA = 'legacy'
+
+# Claves de artículo reconocidas en las salidas, por orden de preferencia
+CLAVES_PEDIDO = ('Codigo_Articulo', 'Talla', 'Color')
+CLAVES_PEDIDO_EXCEL = ('Código artículo', 'Talla', 'Color')
+CLAVES_ABC = ('Artículo', 'Talla', 'Color')
+CLAVES_CONOCIDAS = (CLAVES_PEDIDO, CLAVES_PEDIDO_EXCEL, CLAVES_ABC)
+
+# Columna añadida al leer un libro con varias hojas (en el ABC+D, la categoría)
+COLUMNA_HOJA = 'Hoja'
+# Posición de la fila en su hoja, clave de los libros sin columnas de artículo (resúmenes)
+COLUMNA_FILA = 'Fila'
+
+
+# ============================================================================
+# IMPLEMENTACIONES POR ETAPA
+# ============================================================================
+
+def _forecast_legacy(motor, semana, datos_semana, abc_df, costes_df, seccion):
+    return motor.calcular_pedido_semana(semana, datos_semana, abc_df, costes_df, seccion)
+
+
+def _forecast_semanas(motor, semana, datos_semana, abc_df, costes_df, seccion):
+    """Cálculo por lotes de ForecastEngine.calcular_pedidos_semanas() con una sola semana."""
+    ventas = datos_semana.assign(Semana=semana)
+    return motor.calcular_pedidos_semanas([semana], ventas, abc_df, costes_df, seccion)[semana]
+
+
+def _correccion_legacy(motor, pedido, **opciones):
+    return motor.aplicar_correccion_dataframe(pedido, **opciones)
+
+
+def _motor_forecast(config: Dict[str, Any]):
+    from src.forecast_engine import ForecastEngine
+    return ForecastEngine(config)
+
+
+def _motor_correccion(config: Dict[str, Any]):
+    from src.correction_engine import crear_correction_engine
+    return crear_correction_engine(
+        config_abc={'pesos_categoria': config.get('parametros', {}).get('pesos_categoria', {})}
+    )
+
+
+@dataclass(frozen=True)
+class Etapa:
+    """Etapa comparable: claves de la salida y cómo crear su motor desde config.json."""
+    nombre: str
+    claves: Tuple[str, ...]
+    crear_motor: Callable[[Dict[str, Any]], Any]
+
+
+ETAPAS: Dict[str, Etapa] = {
+    'forecast': Etapa('forecast', CLAVES_PEDIDO, _motor_forecast),
+    'correccion': Etapa('correccion', CLAVES_PEDIDO, _motor_correccion),
+}
+
+_IMPLEMENTACIONES: Dict[str, Dict[str, Callable]] = {
+    'forecast': {IMPLEMENTACION_REFERENCIA: _forecast_legacy, 'semanas': _forecast_semanas},
+    'correccion': {IMPLEMENTACION_REFERENCIA: _correccion_legacy},
+}
+
+# Etapas ya avisadas de que no tienen implementación candidata en modo sombra
+_sin_candidata_avisadas = set()
+
+
+def registrar_implementacion(etapa: str, nombre: str, funcion: Optional[Callable] = None):
+    """
+    Registra una implementación de una etapa. Se puede usar como decorador.
+
+    La función recibe el motor de la etapa (ForecastEngine o CorrectionEngine)
+    y las mismas entradas con nombre que la implementación 'legacy', y debe
+    devolver un DataFrame con el mismo formato.
+
+    Args:
+        etapa: 'forecast' o 'correccion'
+        nombre: Nombre de la implementación (p. ej. 'vectorizado')
+        funcion: Implementación (si se omite, devuelve un decorador)
+    """
+    if etapa not in ETAPAS:
+        raise ValueError(f"Etapa desconocida: '{etapa}'. Disponibles: {', '.join(ETAPAS)}")
+
+    def registrar(f: Callable) -> Callable:
+        _IMPLEMENTACIONES[etapa][nombre] = f
+        return f
+
+    return registrar(funcion) if funcion is not None else registrar
+
+
+def implementaciones(etapa: str) -> List[str]:
+    """Nombres de las implementaciones registradas para una etapa."""
+    return sorted(_IMPLEMENTACIONES.get(etapa, {}))
+
+
+def obtener_implementacion(etapa: str, nombre: str) -> Callable:
+    """
+    Devuelve una implementación registrada o importada como 'modulo:funcion'.
+
+    Raises:
+        ValueError: Si la etapa o la implementación no existen
+    """
+    if etapa not in ETAPAS:
+        raise ValueError(f"Etapa desconocida: '{etapa}'. Disponibles: {', '.join(ETAPAS)}")
+    if nombre in _IMPLEMENTACIONES[etapa]:
+        return _IMPLEMENTACIONES[etapa][nombre]
+    if ':' in nombre:
+        modulo, _, atributo = nombre.partition(':')
+        try:
+            funcion = getattr(importlib.import_module(modulo), atributo)
+        except (ImportError, AttributeError) as e:
+            raise ValueError(f"No se pudo importar la implementación '{nombre}': {e}") from e
+        _IMPLEMENTACIONES[etapa][nombre] = funcion
+        return funcion
+    raise ValueError(f"Implementación '{nombre}' no registrada para '{etapa}'. "
+                     f"Disponibles: {', '.join(implementaciones(etapa))}")
+
+
+# ============================================================================
+# TOLERANCIAS
+# ============================================================================
+
+@dataclass
+class Tolerancias:
+    """
+    Tolerancias de la comparación.
+
+    Dos valores numéricos a y b se consideran iguales si
+    |a - b| <= absoluta + relativa * |a|; dos NaN son iguales.
+
+    Attributes:
+        absoluta (float): Tolerancia absoluta por defecto
+        relativa (float): Tolerancia relativa por defecto
+        por_columna (dict): {columna: (absoluta, relativa)}
+        ignorar (tuple): Columnas que no se comparan
+    """
+    absoluta: float = 1e-6
+    relativa: float = 1e-9
+    por_columna: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    ignorar: Tuple[str, ...] = ()
+
+    @classmethod
+    def desde_config(cls, config: Optional[Dict[str, Any]]) -> 'Tolerancias':
+        """Lee las tolerancias de la sección 'equivalencia' de config.json."""
+        ajustes = (config or {}).get('equivalencia', {})
+        base = cls()
+        absoluta = float(ajustes.get('tolerancia_absoluta', base.absoluta))
+        relativa = float(ajustes.get('tolerancia_relativa', base.relativa))
+        por_columna = {
+            columna: (float(valor.get('absoluta', absoluta)), float(valor.get('relativa', relativa)))
+            for columna, valor in ajustes.get('tolerancias_columna', {}).items()
+            if isinstance(valor, dict)
+        }
+        return cls(absoluta, relativa, por_columna, tuple(ajustes.get('ignorar_columnas', ())))
+
+    def de_columna(self, columna: str) -> Tuple[float, float]:
+        return self.por_columna.get(columna, (self.absoluta, self.relativa))
+
+
+# ============================================================================
+# COMPARACIÓN
+# ============================================================================
+
+@dataclass
+class InformeEquivalencia:
+    """
+    Resultado de comparar la salida de referencia con la candidata.
+
+    Attributes:
+        etapa (str): Etapa o fichero comparado
+        claves (tuple): Columnas que identifican el artículo
+        referencia (str): Nombre de la implementación/fichero de referencia
+        candidata (str): Nombre de la implementación/fichero candidato
+        filas_referencia (int): Filas de la salida de referencia
+        filas_candidata (int): Filas de la salida candidata
+        solo_referencia (pd.DataFrame): Artículos que faltan en la candidata
+        solo_candidata (pd.DataFrame): Artículos que sobran en la candidata
+        columnas_solo_referencia (list): Columnas que faltan en la candidata
+        columnas_solo_candidata (list): Columnas que sobran en la candidata
+        diferencias (pd.DataFrame): Una fila por artículo y columna distinta
+            (claves, columna, referencia, candidata, diferencia)
+        notas (list): Avisos de la comparación (hojas sin claves, etc.)
+    """
+    etapa: str
+    claves: Tuple[str, ...]
+    referencia: str
+    candidata: str
+    filas_referencia: int
+    filas_candidata: int
+    solo_referencia: pd.DataFrame
+    solo_candidata: pd.DataFrame
+    columnas_solo_referencia: List[str]
+    columnas_solo_candidata: List[str]
+    diferencias: pd.DataFrame
+    notas: List[str] = field(default_factory=list)
+
+    @property
+    def equivalente(self) -> bool:
+        return (self.diferencias.empty and self.solo_referencia.empty and self.solo_candidata.empty
+                and not self.columnas_solo_referencia and not self.columnas_solo_candidata)
+
+    def articulos_afectados(self) -> int:
+        """Artículos con alguna diferencia, incluidos los que faltan o sobran."""
+        distintos = self.diferencias[list(self.claves)].drop_duplicates() if not self.diferencias.empty else []
+        return len(distintos) + len(self.solo_referencia) + len(self.solo_candidata)
+
+    def resumen_por_columna(self) -> pd.DataFrame:
+        """Número de artículos distintos y diferencia máxima por columna."""
+        if self.diferencias.empty:
+            return pd.DataFrame(columns=['columna', 'articulos', 'max_diferencia_abs'])
+        return (self.diferencias
+                .assign(diferencia_abs=pd.to_numeric(self.diferencias['diferencia'], errors='coerce').abs())
+                .groupby('columna', sort=False)
+                .agg(articulos=('columna', 'size'), max_diferencia_abs=('diferencia_abs', 'max'))
+                .reset_index()
+                .sort_values('articulos', ascending=False))
+
+    def texto(self, max_filas: int = 20) -> str:
+        """Resumen legible, con las primeras diferencias por artículo."""
+        estado = 'EQUIVALENTES' if self.equivalente else 'DIFERENTES'
+        lineas = [
+            f"{self.etapa or 'salida'}: {self.referencia} vs {self.candidata} - {estado}",
+            f"  Filas: {self.filas_referencia} vs {self.filas_candidata}",
+        ]
+        if self.equivalente:
+            return '\n'.join(lineas + [f"  Nota: {n}" for n in self.notas])
+        lineas.append(f"  Artículos afectados: {self.articulos_afectados()}")
+        if self.columnas_solo_referencia:
+            lineas.append(f"  Columnas que faltan en {self.candidata}: {', '.join(self.columnas_solo_referencia)}")
+        if self.columnas_solo_candidata:
+            lineas.append(f"  Columnas nuevas en {self.candidata}: {', '.join(self.columnas_solo_candidata)}")
+        if len(self.solo_referencia):
+            lineas.append(f"  Artículos que faltan en {self.candidata}: {len(self.solo_referencia)}")
+        if len(self.solo_candidata):
+            lineas.append(f"  Artículos nuevos en {self.candidata}: {len(self.solo_candidata)}")
+        for fila in self.resumen_por_columna().itertuples(index=False):
+            maximo = '' if pd.isna(fila.max_diferencia_abs) else f" (máx. {fila.max_diferencia_abs:g})"
+            lineas.append(f"  {' '.join(str(fila.columna).split())}: {fila.articulos} artículos{maximo}")
+        if not self.diferencias.empty:
+            lineas.append("  Primeras diferencias:")
+            for fila in self.diferencias.head(max_filas).to_dict('records'):
+                clave = '/'.join(str(fila[c]) for c in self.claves)
+                columna = ' '.join(str(fila['columna']).split())
+                lineas.append(f"    {clave} {columna}: {fila['referencia']!r} -> {fila['candidata']!r}")
+        lineas.extend(f"  Nota: {n}" for n in self.notas)
+        return '\n'.join(lineas)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            'etapa': self.etapa,
+            'referencia': self.referencia,
+            'candidata': self.candidata,
+            'equivalente': self.equivalente,
+            'filas_referencia': self.filas_referencia,
+            'filas_candidata': self.filas_candidata,
+            'articulos_afectados': self.articulos_afectados(),
+            'columnas_solo_referencia': self.columnas_solo_referencia,
+            'columnas_solo_candidata': self.columnas_solo_candidata,
+            'columnas_distintas': self.resumen_por_columna()['columna'].tolist(),
+            'notas': self.notas,
+        }
+
+    def afirmar(self):
+        """Lanza AssertionError con el resumen si las salidas no son equivalentes (para pruebas)."""
+        if not self.equivalente:
+            raise AssertionError(self.texto())
+
+    def guardar(self, ruta: Path) -> Path:
+        """
+        Guarda el informe en un Excel con hojas Resumen, Diferencias,
+        Solo_referencia y Solo_candidata.
+        """
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        resumen = pd.DataFrame([{k: (', '.join(map(str, v)) if isinstance(v, list) else v)
+                                 for k, v in self.como_dict().items()}]).T.reset_index()
+        resumen.columns = ['campo', 'valor']
+        with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+            resumen.to_excel(writer, sheet_name='Resumen', index=False)
+            self.resumen_por_columna().to_excel(writer, sheet_name='Columnas', index=False)
+            self.diferencias.to_excel(writer, sheet_name='Diferencias', index=False)
+            self.solo_referencia.to_excel(writer, sheet_name='Solo_referencia', index=False)
+            self.solo_candidata.to_excel(writer, sheet_name='Solo_candidata', index=False)
+        return ruta
+
+
+def _normalizar_clave(valor: Any) -> str:
+    """Clave de artículo comparable: 8100000001.0 == '8100000001' == ' 8100000001 '."""
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return ''
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    texto = str(valor).strip()
+    if texto.endswith('.0') and texto[:-2].lstrip('-').isdigit():
+        return texto[:-2]
+    return texto
+
+
+def _indexar(df: pd.DataFrame, claves: Sequence[str]) -> pd.DataFrame:
+    """Indexa por las claves normalizadas y el número de aparición (para claves repetidas)."""
+    normalizadas = pd.DataFrame({c: df[c].map(_normalizar_clave) for c in claves})
+    normalizadas['_aparicion'] = normalizadas.groupby(list(claves), sort=False).cumcount()
+    indexado = df.reset_index(drop=True)
+    indexado.index = pd.MultiIndex.from_frame(normalizadas.reset_index(drop=True))
+    return indexado
+
+
+def _claves_como_tabla(indice: pd.MultiIndex, claves: Sequence[str]) -> pd.DataFrame:
+    return indice.to_frame(index=False)[list(claves)]
+
+
+def _comparar_columna(a: pd.Series, b: pd.Series, absoluta: float, relativa: float):
+    """Devuelve (máscara de distintos, diferencia numérica o None)."""
+    if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+        va = a.to_numpy(dtype=float, na_value=np.nan)
+        vb = b.to_numpy(dtype=float, na_value=np.nan)
+        iguales = np.isclose(vb, va, rtol=relativa, atol=absoluta) | (np.isnan(va) & np.isnan(vb))
+        return ~iguales, vb - va
+    if pd.api.types.is_datetime64_any_dtype(a) or pd.api.types.is_datetime64_any_dtype(b):
+        ta = pd.to_datetime(a, errors='coerce')
+        tb = pd.to_datetime(b, errors='coerce')
+        iguales = (ta == tb) | (ta.isna() & tb.isna())
+        return ~iguales.to_numpy(), None
+    ta = a.map(_normalizar_clave)
+    tb = b.map(_normalizar_clave)
+    return (ta.to_numpy() != tb.to_numpy()), None
+
+
+def comparar_salidas(referencia: pd.DataFrame, candidata: pd.DataFrame,
+                     claves: Sequence[str] = CLAVES_PEDIDO,
+                     tolerancias: Optional[Tolerancias] = None,
+                     etapa: str = '', nombre_referencia: str = IMPLEMENTACION_REFERENCIA,
+                     nombre_candidata: str = 'candidata') -> InformeEquivalencia:
+    """
+    Compara dos salidas artículo a artículo en todas las columnas comunes.
+
+    Las filas se emparejan por las claves normalizadas (el código 8100000001.0
+    y '8100000001' son el mismo artículo), no por posición, así que el orden
+    de las filas no cuenta. Si una clave se repite, se emparejan por orden de
+    aparición.
+
+    Args:
+        referencia: Salida de la implementación actual
+        candidata: Salida de la implementación a validar
+        claves: Columnas que identifican el artículo
+        tolerancias: Tolerancias numéricas y columnas ignoradas
+        etapa: Nombre de lo comparado (para el informe)
+        nombre_referencia: Nombre de la referencia (para el informe)
+        nombre_candidata: Nombre de la candidata (para el informe)
+
+    Returns:
+        InformeEquivalencia: Diferencias por artículo y columna
+
+    Raises:
+        ValueError: Si falta alguna clave en alguna de las salidas
+    """
+    tolerancias = tolerancias or Tolerancias()
+    claves = tuple(claves)
+    for nombre, df in ((nombre_referencia, referencia), (nombre_candidata, candidata)):
+        faltan = [c for c in claves if c not in df.columns]
+        if faltan:
+            raise ValueError(f"Faltan las columnas clave {faltan} en la salida '{nombre}'")
+
+    ref = _indexar(referencia, claves)
+    cand = _indexar(candidata, claves)
+    comunes = ref.index.intersection(cand.index, sort=False)
+    solo_ref = ref.index.difference(cand.index, sort=False)
+    solo_cand = cand.index.difference(ref.index, sort=False)
+
+    ignoradas = set(claves) | set(tolerancias.ignorar)
+    columnas_ref = [c for c in referencia.columns if c not in ignoradas]
+    columnas_cand = [c for c in candidata.columns if c not in ignoradas]
+    columnas = [c for c in columnas_ref if c in set(columnas_cand)]
+
+    ref_comun = ref.loc[comunes]
+    cand_comun = cand.loc[comunes]
+    claves_comunes = _claves_como_tabla(comunes, claves)
+    partes = []
+    for columna in columnas:
+        absoluta, relativa = tolerancias.de_columna(columna)
+        distintos, diferencia = _comparar_columna(ref_comun[columna], cand_comun[columna], absoluta, relativa)
+        if not distintos.any():
+            continue
+        parte = claves_comunes[distintos].reset_index(drop=True)
+        parte['columna'] = columna
+        parte['referencia'] = ref_comun[columna].to_numpy()[distintos]
+        parte['candidata'] = cand_comun[columna].to_numpy()[distintos]
+        parte['diferencia'] = diferencia[distintos] if diferencia is not None else np.nan
+        partes.append(parte)
+
+    columnas_diferencias = [*claves, 'columna', 'referencia', 'candidata', 'diferencia']
+    diferencias = (pd.concat(partes, ignore_index=True) if partes
+                   else pd.DataFrame(columns=columnas_diferencias))
+
+    return InformeEquivalencia(
+        etapa=etapa,
+        claves=claves,
+        referencia=nombre_referencia,
+        candidata=nombre_candidata,
+        filas_referencia=len(referencia),
+        filas_candidata=len(candidata),
+        solo_referencia=_claves_como_tabla(solo_ref, claves),
+        solo_candidata=_claves_como_tabla(solo_cand, claves),
+        columnas_solo_referencia=[c for c in columnas_ref if c not in set(columnas_cand)],
+        columnas_solo_candidata=[c for c in columnas_cand if c not in set(columnas_ref)],
+        diferencias=diferencias,
+    )
+
+
+# ============================================================================
+# FICHEROS EXCEL DE SALIDA
+# ============================================================================
+
+def _detectar_claves(columnas: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    for claves in CLAVES_CONOCIDAS:
+        if all(c in columnas for c in claves):
+            return claves
+    return None
+
+
+def leer_libro(ruta: Path, claves: Optional[Sequence[str]] = None) -> Tuple[pd.DataFrame, Tuple[str, ...], List[str]]:
+    """
+    Lee todas las hojas de un Excel de salida con claves de artículo.
+
+    Las hojas se concatenan con una columna 'Hoja', de modo que un artículo
+    que cambia de hoja (de categoría, en el ABC+D) aparece como diferencia.
+    La cabecera se busca en la primera o la segunda fila (los pedidos tienen
+    una fila de título encima).
+
+    Returns:
+        Tuple: (datos, claves usadas, hojas omitidas por no tener las claves)
+    """
+    hojas = pd.read_excel(ruta, sheet_name=None)
+    partes, omitidas, claves_libro = [], [], tuple(claves) if claves else None
+    for nombre, df in hojas.items():
+        encontradas = claves_libro or _detectar_claves(df.columns)
+        if encontradas is None or not all(c in df.columns for c in encontradas):
+            df = pd.read_excel(ruta, sheet_name=nombre, header=1)
+            encontradas = claves_libro or _detectar_claves(df.columns)
+        if encontradas is None or not all(c in df.columns for c in encontradas):
+            omitidas.append(nombre)
+            continue
+        claves_libro = encontradas
+        partes.append(df.assign(**{COLUMNA_HOJA: nombre}))
+    if not partes:
+        return pd.DataFrame(), claves_libro or (), omitidas
+    return pd.concat(partes, ignore_index=True), claves_libro, omitidas
+
+
+def comparar_libros(ruta_referencia: Path, ruta_candidata: Path,
+                    claves: Optional[Sequence[str]] = None,
+                    tolerancias: Optional[Tolerancias] = None) -> InformeEquivalencia:
+    """
+    Compara dos ficheros Excel de salida (pedido, resumen o ABC+D).
+
+    Args:
+        ruta_referencia: Fichero de referencia (salida guardada de la versión actual)
+        ruta_candidata: Fichero generado por la versión a validar
+        claves: Columnas clave (por defecto se detectan: pedido o ABC+D)
+        tolerancias: Tolerancias numéricas y columnas ignoradas
+
+    Returns:
+        InformeEquivalencia
+    """
+    ref, claves_ref, omitidas_ref = leer_libro(ruta_referencia, claves)
+    cand, claves_cand, omitidas_cand = leer_libro(ruta_candidata, claves or claves_ref or None)
+    claves_usadas = claves_ref or claves_cand
+    notas = [f"Hoja '{hoja}' sin columnas clave: no comparada"
+             for hoja in sorted(set(omitidas_ref) | set(omitidas_cand))]
+    if not claves_usadas:
+        # Libro sin artículos (p. ej. un resumen): se compara fila a fila por posición
+        ref, cand = (_leer_por_posicion(r) for r in (ruta_referencia, ruta_candidata))
+        claves_usadas, notas = (COLUMNA_HOJA, COLUMNA_FILA), ["Sin columnas de artículo: comparado por posición"]
+    informe = comparar_salidas(ref, cand, claves_usadas, tolerancias, etapa=Path(ruta_candidata).name,
+                               nombre_referencia=str(ruta_referencia), nombre_candidata=str(ruta_candidata))
+    informe.notas.extend(notas)
+    return informe
+
+
+def _leer_por_posicion(ruta: Path) -> pd.DataFrame:
+    partes = [df.assign(**{COLUMNA_HOJA: nombre, COLUMNA_FILA: range(len(df))})
+              for nombre, df in pd.read_excel(ruta, sheet_name=None).items()]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=[COLUMNA_HOJA, COLUMNA_FILA])
+
+
+def comparar_directorios(dir_referencia: Path, dir_candidata: Path, patron: str = '*.xlsx',
+                         claves: Optional[Sequence[str]] = None,
+                         tolerancias: Optional[Tolerancias] = None) -> Dict[str, Optional[InformeEquivalencia]]:
+    """
+    Compara los Excel con el mismo nombre de dos directorios.
+
+    Returns:
+        Dict: {nombre de fichero: informe}, con None para los ficheros que
+        solo existen en uno de los dos directorios
+    """
+    referencia = {p.name: p for p in Path(dir_referencia).glob(patron) if not p.name.startswith('~$')}
+    candidata = {p.name: p for p in Path(dir_candidata).glob(patron) if not p.name.startswith('~$')}
+    informes: Dict[str, Optional[InformeEquivalencia]] = {}
+    for nombre in sorted(set(referencia) | set(candidata)):
+        if nombre in referencia and nombre in candidata:
+            informes[nombre] = comparar_libros(referencia[nombre], candidata[nombre], claves, tolerancias)
+        else:
+            informes[nombre] = None
+    return informes
+
+
+# ============================================================================
+# EJECUCIÓN EN SOMBRA E INSTANTÁNEAS
+# ============================================================================
+
+def _copiar_entradas(entradas: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: (v.copy(deep=True) if isinstance(v, (pd.DataFrame, pd.Series)) else copy.deepcopy(v))
+            for k, v in entradas.items()}
+
+
+def _implementacion_sombra(etapa: str, activa: str, config: Dict[str, Any]) -> Optional[str]:
+    ajustes = config.get('equivalencia', {})
+    sombra = ajustes.get('implementaciones_sombra', {}).get(etapa)
+    if sombra:
+        return sombra
+    if activa != IMPLEMENTACION_REFERENCIA:
+        return IMPLEMENTACION_REFERENCIA
+    candidatas = [n for n in implementaciones(etapa) if n != IMPLEMENTACION_REFERENCIA]
+    return candidatas[0] if len(candidatas) == 1 else None
+
+
+def modo_sombra_activo(config: Optional[Dict[str, Any]]) -> bool:
+    return bool((config or {}).get('equivalencia', {}).get('modo_sombra', False))
+
+
+def guardar_instantanea(etapa: str, entradas: Dict[str, Any], config: Dict[str, Any],
+                        ruta: Path) -> Path:
+    """Guarda las entradas de una etapa para repetir la comparación más tarde."""
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, 'wb') as f:
+        pickle.dump({'etapa': etapa, 'fecha': datetime.now().isoformat(timespec='seconds'),
+                     'config': config, 'entradas': entradas}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return ruta
+
+
+def cargar_instantanea(ruta: Path) -> Dict[str, Any]:
+    """Carga una instantánea guardada con guardar_instantanea() (solo ficheros propios)."""
+    with open(ruta, 'rb') as f:
+        return pickle.load(f)
+
+
+def verificar_equivalencia(etapa: str, candidata: str, referencia: str = IMPLEMENTACION_REFERENCIA,
+                           config: Optional[Dict[str, Any]] = None,
+                           tolerancias: Optional[Tolerancias] = None,
+                           **entradas) -> InformeEquivalencia:
+    """
+    Ejecuta dos implementaciones de una etapa sobre las mismas entradas y
+    compara sus salidas (cada una recibe su propia copia de las entradas).
+
+    Args:
+        etapa: 'forecast' o 'correccion'
+        candidata: Implementación a validar
+        referencia: Implementación de referencia (default 'legacy')
+        config: Configuración para crear el motor de la etapa
+        tolerancias: Tolerancias (por defecto, las de config)
+        **entradas: Entradas con nombre de la etapa
+
+    Returns:
+        InformeEquivalencia
+    """
+    config = config or {}
+    definicion = ETAPAS[etapa]
+    funcion_ref = obtener_implementacion(etapa, referencia)
+    funcion_cand = obtener_implementacion(etapa, candidata)
+    salida_ref = funcion_ref(definicion.crear_motor(config), **_copiar_entradas(entradas))
+    salida_cand = funcion_cand(definicion.crear_motor(config), **_copiar_entradas(entradas))
+    return comparar_salidas(salida_ref, salida_cand, definicion.claves,
+                            tolerancias or Tolerancias.desde_config(config), etapa=etapa,
+                            nombre_referencia=referencia, nombre_candidata=candidata)
+
+
+def comprobar_instantanea(ruta: Path, candidata: str, referencia: str = IMPLEMENTACION_REFERENCIA,
+                          tolerancias: Optional[Tolerancias] = None) -> InformeEquivalencia:
+    """Repite la comparación de una etapa sobre las entradas de una instantánea."""
+    instantanea = cargar_instantanea(ruta)
+    return verificar_equivalencia(instantanea['etapa'], candidata, referencia,
+                                  config=instantanea['config'], tolerancias=tolerancias,
+                                  **instantanea['entradas'])
+
+
+def ejecutar_etapa(etapa: str, motor, config: Optional[Dict[str, Any]] = None,
+                   contexto: Optional[Dict[str, Any]] = None, **entradas):
+    """
+    Ejecuta la implementación activa de una etapa (y la de sombra si procede).
+
+    En modo sombra la implementación de sombra se ejecuta después con una
+    copia de las entradas tomada antes de la activa. Sus fallos o diferencias
+    nunca cambian el resultado: se registran como aviso y se guardan el
+    informe y la instantánea de entradas en logs/equivalencia/.
+
+    Args:
+        etapa: 'forecast' o 'correccion'
+        motor: Motor de la etapa ya creado (ForecastEngine o CorrectionEngine)
+        config: Configuración del sistema (sección 'equivalencia')
+        contexto: Datos para identificar la ejecución (sección, semana)
+        **entradas: Entradas con nombre de la etapa
+
+    Returns:
+        Salida de la implementación activa
+    """
+    config = config or {}
+    activa = config.get('equivalencia', {}).get('implementaciones', {}).get(etapa, IMPLEMENTACION_REFERENCIA)
+    funcion = obtener_implementacion(etapa, activa)
+    if not modo_sombra_activo(config):
+        return funcion(motor, **entradas)
+
+    sombra = _implementacion_sombra(etapa, activa, config)
+    if not sombra or sombra == activa:
+        if etapa not in _sin_candidata_avisadas:
+            _sin_candidata_avisadas.add(etapa)
+            logger.info(f"Modo sombra: no hay implementación con la que comparar '{etapa}' "
+                        f"(registradas: {', '.join(implementaciones(etapa))})")
+        return funcion(motor, **entradas)
+
+    copia = _copiar_entradas(entradas)
+    resultado = funcion(motor, **entradas)
+    comprobar_en_sombra(etapa, motor, config, contexto or {}, copia, resultado, activa, sombra)
+    return resultado
+
+
+def comprobar_en_sombra(etapa: str, motor, config: Dict[str, Any], contexto: Dict[str, Any],
+                        entradas: Dict[str, Any], resultado, activa: str, sombra: str) -> Optional[InformeEquivalencia]:
+    """Ejecuta la implementación de sombra y compara con la salida activa."""
+    descripcion = '_'.join(f"{v}" for v in contexto.values()) or 'sin_contexto'
+    inicio = time.perf_counter()
+    try:
+        salida_sombra = obtener_implementacion(etapa, sombra)(motor, **entradas)
+        informe = comparar_salidas(resultado, salida_sombra, ETAPAS[etapa].claves,
+                                   Tolerancias.desde_config(config), etapa=etapa,
+                                   nombre_referencia=activa, nombre_candidata=sombra)
+    except Exception as e:
+        logger.warning(f"Modo sombra: la implementación '{sombra}' de '{etapa}' falló ({descripcion}): {e}")
+        return None
+    duracion = time.perf_counter() - inicio
+
+    if informe.equivalente:
+        logger.info(f"Modo sombra {etapa} ({descripcion}): '{sombra}' equivalente a '{activa}' "
+                    f"({informe.filas_referencia} filas, {duracion:.2f} s)")
+        return informe
+
+    marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+    base = EQUIVALENCIA_DIR / f"{etapa}_{descripcion}_{marca}"
+    try:
+        ruta_informe = informe.guardar(base.with_suffix('.xlsx'))
+        guardar_instantanea(etapa, entradas, config, base.with_suffix('.pkl'))
+    except Exception as e:
+        logger.debug(f"No se pudo guardar el informe de equivalencia: {e}")
+        ruta_informe = None
+    logger.warning(f"Divergencia en modo sombra {etapa} ({descripcion}): '{sombra}' difiere de '{activa}' "
+                   f"en {informe.articulos_afectados()} artículos "
+                   f"({', '.join(informe.resumen_por_columna()['columna'].head(5)) or 'filas o columnas'}). "
+                   f"Informe: {ruta_informe}")
+    logger.debug(informe.texto())
+    return informe
+
+
+# ============================================================================
+# LÍNEA DE COMANDOS
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparación de salidas entre implementaciones de los motores')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_inst = subparsers.add_parser('instantanea', help='Repetir la comparación sobre una instantánea guardada')
+    p_inst.add_argument('ruta', type=str, help='Fichero .pkl de logs/equivalencia/')
+    p_inst.add_argument('--candidata', required=True, help="Implementación a validar (nombre o 'modulo:funcion')")
+    p_inst.add_argument('--referencia', default=IMPLEMENTACION_REFERENCIA, help='Implementación de referencia')
+
+    p_libros = subparsers.add_parser('libros', help='Comparar ficheros Excel de salida (o directorios)')
+    p_libros.add_argument('referencia', type=str, help='Excel o directorio de referencia')
+    p_libros.add_argument('candidata', type=str, help='Excel o directorio a validar')
+    p_libros.add_argument('--claves', type=str, default=None, help='Columnas clave separadas por comas')
+    p_libros.add_argument('--patron', type=str, default='*.xlsx', help='Patrón de ficheros en directorios')
+
+    for p in (p_inst, p_libros):
+        p.add_argument('--absoluta', type=float, default=Tolerancias.absoluta, help='Tolerancia absoluta')
+        p.add_argument('--relativa', type=float, default=Tolerancias.relativa, help='Tolerancia relativa')
+        p.add_argument('--ignorar', type=str, default='', help='Columnas a ignorar separadas por comas')
+        p.add_argument('--guardar', type=str, default=None, help='Guardar el informe en este Excel')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    tolerancias = Tolerancias(args.absoluta, args.relativa,
+                              ignorar=tuple(c.strip() for c in args.ignorar.split(',') if c.strip()))
+
+    if args.comando == 'instantanea':
+        informes = {args.ruta: comprobar_instantanea(Path(args.ruta), args.candidata, args.referencia, tolerancias)}
+    else:
+        claves = [c.strip() for c in args.claves.split(',')] if args.claves else None
+        referencia, candidata = Path(args.referencia), Path(args.candidata)
+        if referencia.is_dir():
+            informes = comparar_directorios(referencia, candidata, args.patron, claves, tolerancias)
+        else:
+            informes = {candidata.name: comparar_libros(referencia, candidata, claves, tolerancias)}
+
+    correcto = True
+    for nombre, informe in informes.items():
+        if informe is None:
+            print(f"{nombre}: solo existe en uno de los dos directorios")
+            correcto = False
+            continue
+        print(informe.texto())
+        correcto = correcto and informe.equivalente
+        if args.guardar and len(informes) == 1:
+            print(f"Informe guardado en {informe.guardar(Path(args.guardar))}")
+    return 0 if correcto else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
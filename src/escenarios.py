@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Módulo Escenarios - Barrido vectorizado de parámetros del pedido (what-if)
+
+Antes de cada temporada se discuten objetivo_crecimiento, los incrementos de
+festivos y stock_minimo_porcentaje de config.json. Probar un cambio suponía
+editar el JSON y volver a lanzar main.py por cada variante.
+
+Este módulo carga una vez los datos de unas semanas (ventas, ABC+D, costes,
+stock y ventas reales, pedido de la semana anterior) y evalúa la matemática del
+forecast y del stock mínimo para todas las combinaciones de una rejilla de
+parámetros a la vez, con arrays de NumPy de forma (escenarios × artículos):
+
+- objetivo_crecimiento:     crecimiento sobre el objetivo semanal
+- festivo:                  incremento de festivo de las semanas evaluadas
+                            (sustituye al de config.json)
+- escala_festivos:          multiplica el incremento de festivo de config.json
+- stock_minimo_porcentaje:  stock mínimo sobre las unidades calculadas
+
+La rejilla puede ser global o distinta por sección. El resultado es una tabla
+por sección, semana y escenario con unidades, importe, coste, margen y
+cumplimiento del objetivo, igual a lo que daría main.py con esos parámetros
+(FASE 1 y stock mínimo, sin la corrección de la FASE 2). No se escribe ningún
+Excel salvo que se pida.
+
+Uso:
+    barrido = crear_barrido_escenarios(config).cargar([14, 15, 16])
+    tabla = barrido.evaluar(
+        {'objetivo_crecimiento': [0.0, 0.05, 0.10], 'stock_minimo_porcentaje': [0.2, 0.3]},
+        rejilla_secciones={'vivero': {'objetivo_crecimiento': [0.08, 0.12]}}
+    )
+    totales = totales_por_escenario(tabla)
+
+    python -m src.escenarios --semanas 14-16 --crecimiento 0,0.05,0.1 --stock-minimo 0.2,0.3
+    python -m src.escenarios --semanas 14 --escala-festivos 0.5,1,1.5 --por-seccion vivero:crecimiento=0.08,0.12 --excel
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import itertools
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.date_utils import lista_semanas
+from src.paths import INPUT_DIR, PEDIDOS_SEMANALES_DIR, ESCENARIOS_DIR, directorio_config
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+# Parámetros que se pueden barrer y su nombre en la línea de comandos
+PARAMETROS = {
+    'objetivo_crecimiento': 'crecimiento',
+    'festivo': 'festivo',
+    'escala_festivos': 'escala-festivos',
+    'stock_minimo_porcentaje': 'stock-minimo',
+}
+
+METRICAS = ['articulos_pedido', 'unidades_calculadas', 'unidades_pedido', 'importe', 'ventas_objetivo',
+            'coste_pedido', 'margen', 'objetivo_semana', 'objetivo_final', 'cumplimiento_objetivo']
+
+
+@dataclass
+class DatosSemana:
+    """
+    Datos de una sección y semana que no dependen de los parámetros barridos.
+
+    Los arrays van por artículo, en el orden en que ForecastEngine los calcula.
+    """
+    seccion: str
+    semana: int
+    objetivo: float
+    festivo: float
+    unidades_abc: np.ndarray
+    pvp: np.ndarray
+    coste: np.ndarray
+    stock_real: np.ndarray
+    tendencia: np.ndarray
+    ventas_actuales: float
+    orden_pvp: np.ndarray
+
+
+def _rejilla_escenarios(rejilla: Dict[str, Sequence[float]], base: Dict[str, Any]) -> pd.DataFrame:
+    """Producto cartesiano de la rejilla; los parámetros sin valores toman el de config."""
+    valores = {nombre: list(rejilla.get(nombre) or [base[nombre]]) for nombre in PARAMETROS}
+    return pd.DataFrame(list(itertools.product(*valores.values())), columns=list(valores))
+
+
+class BarridoEscenarios:
+    """
+    Evalúa rejillas de parámetros sobre un conjunto de datos cargado una vez.
+
+    Attributes:
+        config (dict): Configuración del sistema
+        datos (List[DatosSemana]): Datos por sección y semana (tras cargar())
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.parametros = config.get('parametros', {})
+        self.festivos = config.get('festivos', {})
+        self.datos: List[DatosSemana] = []
+
+    # ------------------------------------------------------------------
+    # CARGA
+    # ------------------------------------------------------------------
+
+    def cargar(self, semanas: List[int], secciones: Optional[List[str]] = None) -> 'BarridoEscenarios':
+        """
+        Lee los datos de las semanas y secciones indicadas.
+
+        El forecast se calcula una vez con los parámetros de config.json para
+        obtener por artículo las unidades ABC, PVP y coste; el stock real, las
+        ventas reales y las unidades de la semana anterior se fusionan como en
+        main.py.
+
+        Args:
+            semanas: Semanas a evaluar
+            secciones: Secciones (default: secciones_activas de config.json)
+
+        Returns:
+            BarridoEscenarios: self, para encadenar con evaluar()
+        """
+        from src.data_loader import DataLoader, añadir_columna_semana
+        from src.forecast_engine import ForecastEngine
+        from src.correction_data_loader import (
+            encontrar_archivo_semana_anterior,
+            leer_archivo_ventas_semana,
+            leer_archivo_stock_actual,
+            leer_pedido_semana_anterior,
+            fusionar_datos_tendencia,
+            extraer_diccionarios_tendencia
+        )
+
+        data_loader = DataLoader(self.config)
+        forecast_engine = ForecastEngine(self.config)
+        dir_entrada = directorio_config(self.config, 'directorio_entrada', INPUT_DIR)
+        dir_salida = directorio_config(self.config, 'directorio_salida', PEDIDOS_SEMANALES_DIR)
+
+        df_ventas_reales, _ = leer_archivo_ventas_semana(dir_entrada)
+        df_stock_actual = leer_archivo_stock_actual(dir_entrada)
+
+        semanas_por_periodo: Dict[str, List[int]] = {}
+        for semana in semanas:
+            semanas_por_periodo.setdefault(data_loader.obtener_periodo_desde_semana(semana), []).append(semana)
+
+        self.datos = []
+        for seccion in secciones or self.config.get('secciones_activas', []):
+            for semanas_periodo in semanas_por_periodo.values():
+                abc_df, ventas_df, costes_df = data_loader.leer_datos_seccion(seccion, semanas_periodo[0])
+                if abc_df is None or ventas_df is None or costes_df is None or not añadir_columna_semana(ventas_df):
+                    logger.warning(f"Sin datos para la sección '{seccion}': se omite del barrido")
+                    continue
+
+                pedidos_semanas = forecast_engine.calcular_pedidos_semanas(
+                    semanas_periodo, ventas_df, abc_df, costes_df, seccion
+                )
+                for semana, pedidos in pedidos_semanas.items():
+                    if len(pedidos) == 0:
+                        continue
+                    # Orden original de los artículos (calcular_pedido_semana ordena por PVP si recorta)
+                    pedidos = pedidos.sort_index()
+                    archivo_anterior = encontrar_archivo_semana_anterior(dir_salida, semana, seccion)
+                    fusionados = fusionar_datos_tendencia(
+                        pedidos, df_ventas_reales, df_stock_actual,
+                        leer_pedido_semana_anterior(archivo_anterior, seccion)
+                    )
+                    stock_real, ventas_reales, ventas_objetivo = extraer_diccionarios_tendencia(fusionados)
+                    self.datos.append(self._datos_semana(
+                        seccion, semana, pedidos, stock_real, ventas_reales, ventas_objetivo, forecast_engine
+                    ))
+
+        logger.info(f"Barrido: {len(self.datos)} combinaciones de sección y semana cargadas")
+        return self
+
+    def _datos_semana(self, seccion: str, semana: int, pedidos: pd.DataFrame,
+                      stock_real: Dict[str, Any], ventas_reales: Dict[str, Any],
+                      ventas_objetivo: Dict[str, Any], forecast_engine) -> DatosSemana:
+        # Misma clave que extraer_diccionarios_tendencia() y aplicar_stock_minimo()
+        claves = [
+            f"{str(c).replace('.0', '', 1).strip() if pd.notna(c) else ''}|{t}|{col}"
+            for c, t, col in zip(pedidos['Codigo_Articulo'], pedidos['Talla'], pedidos['Color'])
+        ]
+        tendencia = np.array([max(0, ventas_reales.get(c, 0) - ventas_objetivo.get(c, 0)) for c in claves],
+                             dtype=float)
+        pvp = pedidos['PVP'].to_numpy(dtype=float)
+        return DatosSemana(
+            seccion=seccion,
+            semana=semana,
+            objetivo=forecast_engine.obtener_objetivo_semana(seccion, semana),
+            festivo=self.festivos.get(str(semana), self.festivos.get(semana, 0.0)),
+            unidades_abc=pedidos['Unidades_ABC'].to_numpy(dtype=float),
+            pvp=pvp,
+            coste=pedidos['Coste_Pedido'].to_numpy(dtype=float),
+            stock_real=np.array([stock_real.get(c, 0) for c in claves], dtype=float),
+            tendencia=tendencia,
+            # Misma suma (y mismo redondeo) que calcular_pedido_semana
+            ventas_actuales=(pedidos['Unidades_ABC'] * pedidos['PVP']).sum(),
+            # sort_values('PVP') de pandas usa el mismo argsort
+            orden_pvp=np.argsort(pvp, kind='quicksort'),
+        )
+
+    # ------------------------------------------------------------------
+    # EVALUACIÓN
+    # ------------------------------------------------------------------
+
+    def evaluar(self, rejilla: Dict[str, Sequence[float]],
+                rejilla_secciones: Optional[Dict[str, Dict[str, Sequence[float]]]] = None) -> pd.DataFrame:
+        """
+        Evalúa todas las combinaciones de la rejilla.
+
+        Args:
+            rejilla: {parámetro: valores}, para todas las secciones
+            rejilla_secciones: {sección: {parámetro: valores}}, sustituye a la rejilla global
+                en los parámetros que indique
+
+        Returns:
+            pd.DataFrame: Una fila por sección, semana y escenario con los parámetros y METRICAS
+        """
+        desconocidos = set(rejilla) | {p for r in (rejilla_secciones or {}).values() for p in r}
+        desconocidos -= set(PARAMETROS)
+        if desconocidos:
+            raise ValueError(f"Parámetros no válidos: {sorted(desconocidos)} (válidos: {list(PARAMETROS)})")
+
+        base = {
+            'objetivo_crecimiento': self.parametros.get('objetivo_crecimiento', 0.05),
+            'festivo': np.nan,
+            'escala_festivos': 1.0,
+            'stock_minimo_porcentaje': self.parametros.get('stock_minimo_porcentaje', 0.30),
+        }
+
+        tablas = []
+        for datos in self.datos:
+            rejilla_seccion = {**rejilla, **(rejilla_secciones or {}).get(datos.seccion, {})}
+            escenarios = _rejilla_escenarios(rejilla_seccion, base)
+            metricas = self._evaluar_semana(datos, escenarios)
+            tabla = pd.concat([escenarios, pd.DataFrame(metricas)], axis=1)
+            tabla.insert(0, 'semana', datos.semana)
+            tabla.insert(0, 'seccion', datos.seccion)
+            tablas.append(tabla)
+
+        if not tablas:
+            return pd.DataFrame(columns=['seccion', 'semana', *PARAMETROS, *METRICAS])
+        return pd.concat(tablas, ignore_index=True)
+
+    def _evaluar_semana(self, datos: DatosSemana, escenarios: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Forecast y stock mínimo de una sección y semana para todos los escenarios.
+
+        Reproduce ForecastEngine.calcular_pedido_semana() y aplicar_stock_minimo()
+        con una fila por escenario.
+        """
+        crecimiento = escenarios['objetivo_crecimiento'].to_numpy(dtype=float)
+        festivo = escenarios['festivo'].to_numpy(dtype=float)
+        festivo = np.where(np.isnan(festivo), datos.festivo, festivo) * escenarios['escala_festivos'].to_numpy(dtype=float)
+        porcentaje = escenarios['stock_minimo_porcentaje'].to_numpy(dtype=float)
+
+        factor_total = (1 + crecimiento) * (1 + festivo)
+        if datos.ventas_actuales > 0 and datos.objetivo > 0:
+            factor_escalado = (datos.objetivo * factor_total) / datos.ventas_actuales
+        else:
+            factor_escalado = np.ones_like(factor_total)
+
+        escaladas = datos.unidades_abc[None, :] * factor_escalado[:, None]
+        unidades = np.where(escaladas > 0, np.ceil(escaladas), 0).astype(np.int64)
+
+        # Recorte del exceso: de menor a mayor PVP, una unidad por artículo mientras
+        # quede exceso y el PVP quepa en él (el bucle de calcular_pedido_semana)
+        objetivo_final = datos.objetivo * factor_total
+        delta = (unidades * datos.pvp).sum(axis=1) - objetivo_final
+        if (delta > 0).any():
+            ordenadas = unidades[:, datos.orden_pvp]
+            pvp = datos.pvp[datos.orden_pvp]
+            elegibles = ordenadas > 0
+            restante = np.subtract.accumulate(
+                np.concatenate([delta[:, None], np.where(elegibles, pvp, 0.0)], axis=1), axis=1
+            )[:, :-1]
+            parar = (restante <= 0) | (elegibles & (pvp > restante))
+            recortar = elegibles & np.logical_and.accumulate(~parar, axis=1) & (delta > 0)[:, None]
+            ordenadas = ordenadas - recortar
+            unidades[:, datos.orden_pvp] = ordenadas
+
+        ventas_objetivo = np.round(unidades * datos.pvp, 2)
+        margen = np.round(ventas_objetivo - unidades * datos.coste, 2)
+
+        stock_minimo = np.ceil(unidades * porcentaje[:, None])
+        pedido_final = np.maximum(0, unidades + stock_minimo - datos.stock_real + datos.tendencia)
+        con_pedido = pedido_final > 0
+
+        ventas_total = ventas_objetivo.sum(axis=1)
+        return {
+            'articulos_pedido': con_pedido.sum(axis=1),
+            'unidades_calculadas': unidades.sum(axis=1),
+            'unidades_pedido': pedido_final.sum(axis=1),
+            # Importe como en main.py: ventas objetivo de los artículos con pedido
+            'importe': np.where(con_pedido, ventas_objetivo, 0).sum(axis=1).round(2),
+            'ventas_objetivo': ventas_total.round(2),
+            'coste_pedido': (pedido_final * datos.coste).sum(axis=1).round(2),
+            'margen': margen.sum(axis=1).round(2),
+            'objetivo_semana': np.full(len(escenarios), datos.objetivo, dtype=float),
+            'objetivo_final': objetivo_final.round(2),
+            'cumplimiento_objetivo': ventas_total / datos.objetivo if datos.objetivo > 0
+            else np.full(len(escenarios), np.nan),
+        }
+
+
+def totales_por_escenario(tabla: pd.DataFrame) -> pd.DataFrame:
+    """
+    Suma las métricas de todas las secciones y semanas por escenario.
+
+    Solo tiene sentido si todas las secciones usan la misma rejilla.
+    """
+    sumables = [m for m in METRICAS if m != 'cumplimiento_objetivo']
+    totales = tabla.groupby(list(PARAMETROS), dropna=False)[sumables].sum().reset_index()
+    totales['cumplimiento_objetivo'] = np.where(
+        totales['objetivo_semana'] > 0, totales['ventas_objetivo'] / totales['objetivo_semana'], np.nan
+    )
+    return totales
+
+
+def guardar_excel(tabla: pd.DataFrame, ruta: Optional[Path] = None) -> Path:
+    """
+    Guarda la tabla de escenarios (y los totales por escenario) en Excel.
+
+    Args:
+        tabla: Resultado de BarridoEscenarios.evaluar()
+        ruta: Fichero de salida (default output/Escenarios/Escenarios_<fecha>.xlsx)
+
+    Returns:
+        Path: Ruta del fichero guardado
+    """
+    if ruta is None:
+        ruta = ESCENARIOS_DIR / f"Escenarios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        tabla.to_excel(writer, sheet_name='Escenarios', index=False)
+        totales_por_escenario(tabla).to_excel(writer, sheet_name='Totales', index=False)
+    return ruta
+
+
+def crear_barrido_escenarios(config: Dict[str, Any]) -> BarridoEscenarios:
+    """
+    Crea un barrido de escenarios.
+
+    Args:
+        config: Configuración del sistema (config.json)
+
+    Returns:
+        BarridoEscenarios
+    """
+    return BarridoEscenarios(config)
+
+
+# ============================================================================
+# LÍNEA DE COMANDOS
+# ============================================================================
+
+def _valores(texto: str) -> List[float]:
+    try:
+        return [float(v) for v in texto.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"lista de valores no válida: '{texto}' (formato v1,v2,...)")
+
+
+def _por_seccion(texto: str) -> tuple:
+    """'vivero:crecimiento=0.1,0.2' -> ('vivero', 'objetivo_crecimiento', [0.1, 0.2])"""
+    nombres = {cli: nombre for nombre, cli in PARAMETROS.items()}
+    seccion, _, resto = texto.partition(':')
+    parametro, _, valores = resto.partition('=')
+    if not seccion or parametro not in nombres:
+        raise argparse.ArgumentTypeError(
+            f"'{texto}' no válido (formato seccion:parametro=v1,v2 con parametro en {list(nombres)})"
+        )
+    return seccion, nombres[parametro], _valores(valores)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Barrido de parámetros del pedido (crecimiento, festivos, stock mínimo) sin escribir pedidos',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python -m src.escenarios --semanas 14-16 --crecimiento 0,0.05,0.1 --stock-minimo 0.2,0.3
+  python -m src.escenarios --semanas 14 --escala-festivos 0.5,1,1.5 --excel
+  python -m src.escenarios --semanas 14 --crecimiento 0.05 --por-seccion vivero:crecimiento=0.08,0.12
+        """
+    )
+    parser.add_argument('--semanas', type=lista_semanas, required=True, help='Semanas a evaluar (A-B o A,B,C)')
+    parser.add_argument('--secciones', type=str, default=None, help='Secciones separadas por comas (default: activas)')
+    for nombre, cli in PARAMETROS.items():
+        parser.add_argument(f'--{cli}', dest=nombre, type=_valores, default=None,
+                            help=f'Valores de {nombre} separados por comas (default: el de config.json)')
+    parser.add_argument('--por-seccion', type=_por_seccion, action='append', default=[],
+                        metavar='SECCION:PARAM=V1,V2', help='Rejilla propia de una sección (repetible)')
+    parser.add_argument('--excel', nargs='?', const='', default=None, metavar='RUTA',
+                        help='Guardar las tablas en Excel (default output/Escenarios/)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Mostrar el log de la carga de datos')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s - %(message)s')
+
+    from src.registro_config import obtener_registro
+    config = obtener_registro().principal()
+
+    rejilla = {nombre: getattr(args, nombre) for nombre in PARAMETROS if getattr(args, nombre)}
+    rejilla_secciones: Dict[str, Dict[str, List[float]]] = {}
+    for seccion, parametro, valores in args.por_seccion:
+        rejilla_secciones.setdefault(seccion, {})[parametro] = valores
+    secciones = [s.strip() for s in args.secciones.split(',')] if args.secciones else None
+
+    inicio = datetime.now()
+    barrido = crear_barrido_escenarios(config).cargar(args.semanas, secciones)
+    carga = (datetime.now() - inicio).total_seconds()
+
+    inicio = datetime.now()
+    tabla = barrido.evaluar(rejilla, rejilla_secciones)
+    evaluacion = (datetime.now() - inicio).total_seconds()
+
+    if tabla.empty:
+        print("No hay datos para las semanas y secciones indicadas")
+        return 1
+
+    columnas = [p for p in PARAMETROS if tabla[p].nunique(dropna=False) > 1]
+    por_seccion = tabla.groupby(['seccion', *columnas], dropna=False)[
+        ['articulos_pedido', 'unidades_pedido', 'importe', 'coste_pedido', 'margen', 'ventas_objetivo', 'objetivo_semana']
+    ].sum().reset_index()
+    por_seccion['cumplimiento_objetivo'] = (por_seccion['ventas_objetivo'] / por_seccion['objetivo_semana']).round(3)
+    with pd.option_context('display.max_rows', 200, 'display.width', 160):
+        print(por_seccion.to_string(index=False))
+        if not rejilla_secciones:
+            print("\nTOTAL POR ESCENARIO")
+            totales = totales_por_escenario(tabla)
+            print(totales[[*columnas, 'articulos_pedido', 'unidades_pedido', 'importe', 'coste_pedido',
+                           'margen', 'cumplimiento_objetivo']].round(3).to_string(index=False))
+
+    print(f"\n{len(tabla)} evaluaciones ({len(barrido.datos)} sección-semana) - "
+          f"carga {carga:.1f} s, evaluación {evaluacion:.2f} s")
+
+    if args.excel is not None:
+        print(f"Tablas guardadas en {guardar_excel(tabla, Path(args.excel) if args.excel else None)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,21 +21,9 @@ from datetime import datetime, date
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
-# Intentamos importar el servicio de alertas (si está disponible)
+# Servicio de alertas compartido por todos los módulos (si está disponible)
 try:
-    from src.alert_service import crear_alert_service
-    ALERT_SERVICE = None
-    def get_alert_service():
-        global ALERT_SERVICE
-        if ALERT_SERVICE is None:
-            try:
-                from src.config_loader import cargar_configuracion
-                config = cargar_configuracion()
-                if config:
-                    ALERT_SERVICE = crear_alert_service(config)
-            except:
-                pass
-        return ALERT_SERVICE
+    from src.alert_service import obtener_alert_service_compartido as get_alert_service
 except ImportError:
     def get_alert_service():
         return None
@@ -271,22 +259,213 @@ class ForecastEngine:
         logger.info(f"Calculando pedido para semana {semana} ({len(datos_semana)} registros)")
         
         # Agrupar por artículo
-        ventas_articulo = datos_semana.groupby(['Codigo', 'Nombre', 'Talla', 'Color']).agg({
+        ventas_articulo = datos_semana.groupby(['Codigo', 'Nombre', 'Talla', 'Color'], observed=True).agg({
             'Unidades': 'sum',
             'Importe': 'sum'
         }).reset_index()
         
         ventas_articulo.columns = ['Codigo', 'Nombre', 'Talla', 'Color', 'Unidades_Base', 'Importe_Base']
         
+        return self._calcular_pedido_articulos(semana, ventas_articulo, abc_df, costes_df, seccion)
+    
+    def calcular_pedidos_semanas(self, semanas: List[int], ventas_df: pd.DataFrame,
+                                 abc_df: pd.DataFrame, costes_df: pd.DataFrame,
+                                 seccion: str) -> Dict[int, pd.DataFrame]:
+        """
+        Calcula el pedido de varias semanas de una sección en una sola pasada.
+        
+        Equivale a llamar a calcular_pedido_semana() para cada semana, pero las
+        ventas de todas las semanas se agregan con un solo groupby en una matriz
+        artículo × semana, la información ABC+D y de costes de cada artículo se
+        busca una vez para todo el horizonte, y las unidades ABC, el escalado al
+        objetivo y el redondeo se calculan sobre la matriz completa. Por semana
+        solo quedan las sumas del escalado y el recorte del exceso, también
+        vectorizado (ver _recortar_exceso). Las semanas son independientes: el
+        encadenamiento del stock acumulado sigue en aplicar_stock_minimo().
+        
+        Args:
+            semanas (List[int]): Semanas a calcular (del mismo período ABC que abc_df)
+            ventas_df (pd.DataFrame): Ventas históricas de la sección con columna 'Semana'
+            abc_df (pd.DataFrame): Datos de clasificación ABC
+            costes_df (pd.DataFrame): Datos de costes y precios
+            seccion (str): Nombre de la sección
+        
+        Returns:
+            Dict[int, pd.DataFrame]: Pedido de cada semana (DataFrame vacío si no hay ventas)
+        """
+        ventas = ventas_df[ventas_df['Semana'].isin(semanas)]
+        ventas_articulo = ventas.groupby(['Semana', 'Codigo', 'Nombre', 'Talla', 'Color'], observed=True).agg({
+            'Unidades': 'sum',
+            'Importe': 'sum'
+        })
+        ventas_articulo.columns = ['Unidades_Base', 'Importe_Base']
+        
+        # Matriz artículo × semana de unidades base (NaN si el artículo no vendió esa semana).
+        # Dentro de cada semana las filas quedan en el orden del groupby, como en
+        # calcular_pedido_semana()
+        ids_articulo, articulos = ventas_articulo.index.droplevel('Semana').factorize()
+        semana_fila = ventas_articulo.index.get_level_values('Semana')
+        columna_fila = pd.Index(semanas).get_indexer(semana_fila)
+        unidades_base = np.full((len(articulos), len(semanas)), np.nan)
+        unidades_base[ids_articulo, columna_fila] = ventas_articulo['Unidades_Base'].to_numpy()
+        
+        # Información de cada artículo, una sola vez para todas las semanas
+        filas_info = []
+        for codigo, nombre, talla, color in articulos:
+            info_articulo = self._buscar_info_articulo(codigo, nombre, talla, color, abc_df, costes_df)
+            factor_compra = self.calcular_factor_compra(info_articulo['accion_raw'])
+            filas_info.append({
+                'Codigo_Articulo': codigo,
+                'Nombre_Articulo': nombre,
+                'Talla': talla,
+                'Color': color,
+                'Seccion': seccion,
+                'PVP': info_articulo['pvp'],
+                'Coste_Pedido': info_articulo['coste'],
+                'Proveedor': info_articulo['proveedor'],
+                'Categoria': info_articulo['categoria'],
+                'Accion_Aplicada': self._texto_accion_aplicada(factor_compra),
+                'Peso_Categoria': self.pesos_categoria.get(info_articulo['categoria'], 0),
+                'Factor_Compra': factor_compra,
+            })
+        info_df = pd.DataFrame(filas_info)
+        factor_compra = info_df.pop('Factor_Compra').to_numpy(dtype=float) if len(info_df) else np.empty(0)
+        pvp = info_df['PVP'].to_numpy(dtype=float) if len(info_df) else np.empty(0)
+        
+        # PASO 1: unidades ABC de todas las semanas
+        unidades_abc = unidades_base * factor_compra[:, None]
+        ventas_abc = unidades_abc * pvp[:, None]
+        
+        # PASO 2: factor de escalado de cada semana
+        crecimiento = self.parametros.get('objetivo_crecimiento', 0.05)
+        objetivos = np.array([self.obtener_objetivo_semana(seccion, semana) for semana in semanas], dtype=float)
+        festivos = np.array([self.festivos.get(str(semana), self.festivos.get(semana, 0.0)) for semana in semanas],
+                            dtype=float)
+        factores_total = (1 + crecimiento) * (1 + festivos)
+        filas_semana = [np.flatnonzero(columna_fila == j) for j in range(len(semanas))]
+        articulos_semana = [ids_articulo[filas] for filas in filas_semana]
+        ventas_actuales = np.array([np.nansum(ventas_abc[ids, j]) for j, ids in enumerate(articulos_semana)])
+        factores_escalado = np.ones(len(semanas))
+        escalar = (ventas_actuales > 0) & (objetivos > 0)
+        factores_escalado[escalar] = (objetivos[escalar] * factores_total[escalar]) / ventas_actuales[escalar]
+        
+        # PASO 3: unidades escaladas y redondeadas hacia arriba de todas las semanas
+        unidades_escaladas = unidades_abc * factores_escalado[None, :]
+        unidades_finales = np.where(unidades_escaladas > 0, np.ceil(unidades_escaladas), 0).astype('int64')
+        
+        pedidos_semanas = {}
+        for j, semana in enumerate(semanas):
+            ids = articulos_semana[j]
+            if len(ids) == 0:
+                logger.warning(f"No hay datos para la semana {semana}")
+                pedidos_semanas[semana] = pd.DataFrame()
+                continue
+            
+            logger.info(f"Calculando pedido para semana {semana} ({len(ids)} artículos)")
+            logger.info(f"  Objetivo: {objetivos[j]}€, Actual (ABC): {ventas_actuales[j]:.2f}€")
+            logger.info(f"  Factor crecimiento: {crecimiento}, Factor festivo: {festivos[j]}")
+            logger.info(f"  Factor total: {factores_total[j]:.4f}")
+            logger.info(f"  Factor escalado: {factores_escalado[j]:.4f}")
+            
+            pedidos_df = info_df.iloc[ids].reset_index(drop=True)
+            pedidos_df['Unidades_Base'] = unidades_base[ids, j]
+            pedidos_df['Unidades_ABC'] = unidades_abc[ids, j]
+            pedidos_df['Unidades_Escaladas'] = unidades_escaladas[ids, j]
+            pedidos_df['Unidades_Finales'] = unidades_finales[ids, j]
+            pedidos_df['Ventas_Preliminares'] = pedidos_df['Unidades_Finales'] * pedidos_df['PVP']
+            pedidos_df = pedidos_df[[
+                'Codigo_Articulo', 'Nombre_Articulo', 'Talla', 'Color', 'Seccion', 'Unidades_Base',
+                'Unidades_ABC', 'PVP', 'Coste_Pedido', 'Proveedor', 'Categoria', 'Accion_Aplicada',
+                'Peso_Categoria', 'Ventas_Preliminares', 'Unidades_Escaladas', 'Unidades_Finales'
+            ]]
+            
+            ventas_preliminares = pedidos_df['Ventas_Preliminares'].sum()
+            objetivo_final = objetivos[j] * factores_total[j]
+            delta = ventas_preliminares - objetivo_final
+            
+            logger.info(f"  Ventas preliminares (con ceil): {ventas_preliminares:.2f}€")
+            logger.info(f"  Objetivo final: {objetivo_final:.2f}€")
+            logger.info(f"  Delta: {delta:.2f}€")
+            
+            # PASO 4: si hay exceso, quitar una unidad a los artículos de menor PVP
+            if delta > 0:
+                pedidos_df = pedidos_df.sort_values('PVP', ascending=True)
+                pedidos_df['Unidades_Finales'] = self._recortar_exceso(
+                    pedidos_df['PVP'].to_numpy(dtype=float), pedidos_df['Unidades_Finales'].to_numpy(), delta
+                )
+            
+            pedidos_df['Ventas_Objetivo'] = (pedidos_df['Unidades_Finales'] * pedidos_df['PVP']).round(2)
+            pedidos_df['Beneficio_Objetivo'] = (
+                pedidos_df['Ventas_Objetivo'] - 
+                (pedidos_df['Unidades_Finales'] * pedidos_df['Coste_Pedido'])
+            ).round(2)
+            
+            logger.info(f"  Ventas finales: {pedidos_df['Ventas_Objetivo'].sum():.2f}€")
+            pedidos_semanas[semana] = pedidos_df
+        
+        return pedidos_semanas
+    
+    @staticmethod
+    def _recortar_exceso(pvp: np.ndarray, unidades: np.ndarray, exceso: float) -> np.ndarray:
+        """
+        Quita una unidad a los artículos de menor PVP hasta cubrir el exceso.
+        
+        Es el bucle de _calcular_pedido_articulos() sin iterar: recorriendo los
+        artículos con unidades por PVP ascendente, se descuenta uno mientras su
+        PVP quepa en el exceso pendiente. Como el PVP no baja, el primero que no
+        cabe corta el recorrido, así que los descontados son el prefijo que
+        cumple la condición. El pendiente se acumula con np.subtract.accumulate,
+        que resta en el mismo orden que el bucle y da los mismos redondeos.
+        
+        Args:
+            pvp: PVP de los artículos, ordenados por PVP ascendente
+            unidades: Unidades finales en el mismo orden
+            exceso: Ventas por encima del objetivo (> 0)
+        
+        Returns:
+            np.ndarray: Unidades finales tras el recorte
+        """
+        unidades = unidades.copy()
+        con_unidades = np.flatnonzero(unidades > 0)
+        precios = pvp[con_unidades]
+        pendiente = np.subtract.accumulate(np.concatenate(([exceso], precios)))[:-1]
+        descontar = np.logical_and.accumulate(precios <= pendiente)
+        unidades[con_unidades[descontar]] -= 1
+        return unidades
+    
+    @staticmethod
+    def _texto_accion_aplicada(factor_compra: float) -> str:
+        """Texto de la acción aplicada a partir del factor de compra."""
+        if factor_compra == 0:
+            return 'ELIMINAR'
+        if factor_compra < 1:
+            return f'REDUCIR {int((1-factor_compra)*100)}%'
+        if factor_compra > 1:
+            return f'AUMENTAR {int((factor_compra-1)*100)}%'
+        return 'MANTENER'
+    
+    def _calcular_pedido_articulos(self, semana: int, ventas_articulo: pd.DataFrame,
+                                   abc_df: pd.DataFrame, costes_df: pd.DataFrame, seccion: str,
+                                   info_articulos: Optional[Dict[Tuple, Dict[str, Any]]] = None) -> pd.DataFrame:
+        """
+        Calcula el pedido de una semana a partir de sus ventas agregadas por artículo.
+        
+        Args:
+            info_articulos: Caché de _buscar_info_articulo() compartida entre semanas
+        """
+        if info_articulos is None:
+            info_articulos = {}
+        
         # PASO 1: Aplicar lógica individualizada basada en "Acción Sugerida"
         pedidos = []
         
         for idx, row in ventas_articulo.iterrows():
             # Buscar información del artículo en ABC y costes
-            info_articulo = self._buscar_info_articulo(
-                row['Codigo'], row['Nombre'], row['Talla'], row['Color'],
-                abc_df, costes_df
-            )
+            clave_articulo = (row['Codigo'], row['Nombre'], row['Talla'], row['Color'])
+            info_articulo = info_articulos.get(clave_articulo)
+            if info_articulo is None:
+                info_articulo = self._buscar_info_articulo(*clave_articulo, abc_df, costes_df)
+                info_articulos[clave_articulo] = info_articulo
             
             unidades_base = row['Unidades_Base']
             
@@ -297,14 +476,7 @@ class ForecastEngine:
             unidades_abc = unidades_base * factor_compra
             
             # Determinar texto de acción aplicada para referencia
-            if factor_compra == 0:
-                accion_aplicada = 'ELIMINAR'
-            elif factor_compra < 1:
-                accion_aplicada = f'REDUCIR {int((1-factor_compra)*100)}%'
-            elif factor_compra > 1:
-                accion_aplicada = f'AUMENTAR {int((factor_compra-1)*100)}%'
-            else:
-                accion_aplicada = 'MANTENER'
+            accion_aplicada = self._texto_accion_aplicada(factor_compra)
             
             pedidos.append({
                 'Codigo_Articulo': row['Codigo'],
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Módulo HistoricoAnalisisCD - Serie temporal de métricas del análisis C y D
+
+Cada ejecución de analisis_categoria_cd.py registra aquí sus métricas de resumen
+por sección y el stock de cada artículo C/D pendiente de eliminar. Las
+comparaciones con la semana anterior (o con las últimas N semanas para ver la
+tendencia) se resuelven con consultas indexadas sobre una base SQLite local,
+en lugar de volver a abrir y recorrer los Excel generados semanas atrás.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-05
+"""
+
+import logging
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple
+
+import pandas as pd
+
+from src.paths import HISTORICO_ANALISIS_CD
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+ESQUEMA_SQL = """
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    id_ejecucion INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL UNIQUE,
+    año_iso INTEGER NOT NULL,
+    semana_iso INTEGER NOT NULL,
+    periodo TEXT,
+    archivo TEXT,
+    registrado TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS metricas_seccion (
+    id_ejecucion INTEGER NOT NULL REFERENCES ejecuciones(id_ejecucion) ON DELETE CASCADE,
+    seccion TEXT NOT NULL,
+    metrica TEXT NOT NULL,
+    valor REAL,
+    PRIMARY KEY (id_ejecucion, seccion, metrica)
+);
+
+CREATE TABLE IF NOT EXISTS stock_articulos (
+    id_ejecucion INTEGER NOT NULL REFERENCES ejecuciones(id_ejecucion) ON DELETE CASCADE,
+    seccion TEXT NOT NULL,
+    articulo TEXT NOT NULL,
+    talla TEXT NOT NULL DEFAULT '',
+    color TEXT NOT NULL DEFAULT '',
+    nombre TEXT,
+    unidades REAL NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_ejecuciones_semana ON ejecuciones (año_iso, semana_iso);
+CREATE INDEX IF NOT EXISTS idx_stock_ejecucion ON stock_articulos (id_ejecucion, seccion);
+CREATE INDEX IF NOT EXISTS idx_stock_articulo ON stock_articulos (articulo, talla, color);
+"""
+
+
+def _normalizar_texto_clave(valor) -> str:
+    """Convierte talla/color a la forma usada como clave ('' si está vacío)."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    return str(valor).strip()
+
+
+class HistoricoAnalisisCD:
+    """
+    Almacén local (SQLite) de la serie temporal del análisis de categorías C y D.
+
+    Attributes:
+        ruta_bd (Path): Ruta al fichero de base de datos
+    """
+
+    def __init__(self, ruta_bd: Optional[Path] = None):
+        """
+        Inicializa el almacén y crea el esquema si no existe.
+
+        Args:
+            ruta_bd: Ruta al fichero SQLite. Por defecto data/historico_analisis_cd.db
+        """
+        self.ruta_bd = Path(ruta_bd) if ruta_bd else HISTORICO_ANALISIS_CD
+        self.ruta_bd.parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(self._conectar()) as conn:
+            conn.executescript(ESQUEMA_SQL)
+            conn.commit()
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.ruta_bd))
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    # ------------------------------------------------------------------
+    # ESCRITURA
+    # ------------------------------------------------------------------
+
+    def registrar_analisis(self, metricas_por_seccion: Dict[str, Dict[str, Any]],
+                           articulos: Optional[pd.DataFrame] = None,
+                           fecha: Optional[datetime] = None,
+                           periodo: Optional[str] = None,
+                           archivo: Optional[str] = None) -> int:
+        """
+        Registra una ejecución del análisis C y D.
+
+        Si ya existe una ejecución con la misma fecha (informe regenerado el mismo
+        día) se sustituye por completo.
+
+        Args:
+            metricas_por_seccion: {seccion: {nombre_metrica: valor}}
+            articulos: DataFrame con columnas Seccion, Artículo, Talla, Color,
+                       Nombre artículo y unidades
+            fecha: Fecha de la ejecución (por defecto, hoy)
+            periodo: Período analizado (ej: 'P1_2025')
+            archivo: Ruta del Excel generado
+
+        Returns:
+            int: Identificador de la ejecución registrada
+        """
+        fecha = fecha or datetime.now()
+        fecha_str = fecha.strftime('%Y-%m-%d')
+        año_iso, semana_iso, _ = fecha.isocalendar()
+
+        filas_metricas = []
+        for seccion, metricas in metricas_por_seccion.items():
+            for metrica, valor in metricas.items():
+                try:
+                    valor = float(str(valor).replace('%', '').replace(',', '.')) if isinstance(valor, str) else float(valor)
+                except (TypeError, ValueError):
+                    valor = None
+                filas_metricas.append((seccion, metrica, valor))
+
+        filas_stock = []
+        if articulos is not None and not articulos.empty:
+            nombres = articulos['Nombre artículo'] if 'Nombre artículo' in articulos.columns else [None] * len(articulos)
+            tallas = articulos['Talla'] if 'Talla' in articulos.columns else [None] * len(articulos)
+            colores = articulos['Color'] if 'Color' in articulos.columns else [None] * len(articulos)
+            for seccion, articulo, talla, color, nombre, unidades in zip(
+                articulos['Seccion'], articulos['Artículo'], tallas, colores, nombres, articulos['unidades']
+            ):
+                filas_stock.append((
+                    seccion,
+                    str(articulo).strip(),
+                    _normalizar_texto_clave(talla),
+                    _normalizar_texto_clave(color),
+                    None if nombre is None or pd.isna(nombre) else str(nombre),
+                    float(unidades) if pd.notna(unidades) else 0.0
+                ))
+
+        with closing(self._conectar()) as conn:
+            with conn:
+                conn.execute("DELETE FROM ejecuciones WHERE fecha = ?", (fecha_str,))
+                cursor = conn.execute(
+                    "INSERT INTO ejecuciones (fecha, año_iso, semana_iso, periodo, archivo, registrado) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (fecha_str, año_iso, semana_iso, periodo, str(archivo) if archivo else None,
+                     datetime.now().isoformat())
+                )
+                id_ejecucion = cursor.lastrowid
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metricas_seccion (id_ejecucion, seccion, metrica, valor) VALUES (?, ?, ?, ?)",
+                    [(id_ejecucion, *fila) for fila in filas_metricas]
+                )
+                conn.executemany(
+                    "INSERT INTO stock_articulos (id_ejecucion, seccion, articulo, talla, color, nombre, unidades) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(id_ejecucion, *fila) for fila in filas_stock]
+                )
+
+        logger.info(f"Análisis C y D registrado en histórico: {fecha_str} "
+                    f"({len(filas_metricas)} métricas, {len(filas_stock)} artículos)")
+        return id_ejecucion
+
+    # ------------------------------------------------------------------
+    # CONSULTAS
+    # ------------------------------------------------------------------
+
+    def obtener_ejecucion(self, fecha: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la ejecución registrada en una fecha (por defecto, la más reciente).
+
+        Returns:
+            dict con id_ejecucion, fecha, año_iso, semana_iso, periodo y archivo, o None
+        """
+        with closing(self._conectar()) as conn:
+            conn.row_factory = sqlite3.Row
+            if fecha is None:
+                fila = conn.execute("SELECT * FROM ejecuciones ORDER BY fecha DESC LIMIT 1").fetchone()
+            else:
+                fila = conn.execute("SELECT * FROM ejecuciones WHERE fecha = ?",
+                                    (fecha.strftime('%Y-%m-%d'),)).fetchone()
+        return dict(fila) if fila else None
+
+    def obtener_ejecucion_anterior(self, fecha: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la ejecución más reciente estrictamente anterior a la fecha indicada.
+
+        Args:
+            fecha: Fecha de referencia (por defecto, hoy)
+
+        Returns:
+            dict con los datos de la ejecución o None si no hay ninguna anterior
+        """
+        fecha = fecha or datetime.now()
+        with closing(self._conectar()) as conn:
+            conn.row_factory = sqlite3.Row
+            fila = conn.execute(
+                "SELECT * FROM ejecuciones WHERE fecha < ? ORDER BY fecha DESC LIMIT 1",
+                (fecha.strftime('%Y-%m-%d'),)
+            ).fetchone()
+        return dict(fila) if fila else None
+
+    def obtener_ultimas_ejecuciones(self, n: int, hasta: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene las últimas N ejecuciones (la más antigua primero).
+
+        Args:
+            n: Número de ejecuciones a recuperar
+            hasta: Fecha máxima incluida (por defecto, sin límite)
+        """
+        with closing(self._conectar()) as conn:
+            conn.row_factory = sqlite3.Row
+            if hasta is None:
+                filas = conn.execute(
+                    "SELECT * FROM ejecuciones ORDER BY fecha DESC LIMIT ?", (n,)
+                ).fetchall()
+            else:
+                filas = conn.execute(
+                    "SELECT * FROM ejecuciones WHERE fecha <= ? ORDER BY fecha DESC LIMIT ?",
+                    (hasta.strftime('%Y-%m-%d'), n)
+                ).fetchall()
+        return [dict(f) for f in reversed(filas)]
+
+    def obtener_metricas(self, id_ejecucion: int) -> Dict[str, Dict[str, float]]:
+        """
+        Obtiene las métricas de una ejecución con el mismo formato que
+        comparar_analisis_cd.extraer_metricas_de_excel: {seccion: {metrica: valor}}.
+        """
+        metricas = {}
+        with closing(self._conectar()) as conn:
+            filas = conn.execute(
+                "SELECT seccion, metrica, valor FROM metricas_seccion WHERE id_ejecucion = ? "
+                "ORDER BY rowid",
+                (id_ejecucion,)
+            ).fetchall()
+        for seccion, metrica, valor in filas:
+            metricas.setdefault(seccion, {})[metrica] = valor
+        return metricas
+
+    def obtener_stock_articulos(self, id_ejecucion: int) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+        """
+        Obtiene el stock por artículo de una ejecución con el mismo formato que
+        analisis_categoria_cd.cargar_datos_semana_anterior:
+        {(articulo, talla, color): {'articulo', 'nombre', 'talla', 'color', 'unidades'}}.
+        """
+        stock = {}
+        with closing(self._conectar()) as conn:
+            filas = conn.execute(
+                "SELECT articulo, talla, color, nombre, unidades FROM stock_articulos "
+                "WHERE id_ejecucion = ? ORDER BY rowid",
+                (id_ejecucion,)
+            ).fetchall()
+        for articulo, talla, color, nombre, unidades in filas:
+            stock[(articulo, talla, color)] = {
+                'articulo': articulo,
+                'nombre': nombre or "",
+                'talla': talla,
+                'color': color,
+                'unidades': int(unidades)
+            }
+        return stock
+
+    def obtener_serie_metricas(self, n_semanas: int, seccion: Optional[str] = None,
+                               metrica: Optional[str] = None,
+                               hasta: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Obtiene la serie temporal de métricas de las últimas N ejecuciones.
+
+        Args:
+            n_semanas: Número de ejecuciones (semanas) a incluir
+            seccion: Filtrar por sección (opcional)
+            metrica: Filtrar por métrica (opcional)
+            hasta: Fecha máxima incluida (opcional)
+
+        Returns:
+            pd.DataFrame: Columnas fecha, año_iso, semana_iso, seccion, metrica, valor
+        """
+        ejecuciones = self.obtener_ultimas_ejecuciones(n_semanas, hasta=hasta)
+        columnas = ['fecha', 'año_iso', 'semana_iso', 'seccion', 'metrica', 'valor']
+        if not ejecuciones:
+            return pd.DataFrame(columns=columnas)
+
+        ids = [e['id_ejecucion'] for e in ejecuciones]
+        consulta = (
+            "SELECT e.fecha, e.año_iso, e.semana_iso, m.seccion, m.metrica, m.valor "
+            "FROM metricas_seccion m JOIN ejecuciones e ON e.id_ejecucion = m.id_ejecucion "
+            f"WHERE m.id_ejecucion IN ({','.join('?' * len(ids))})"
+        )
+        parametros = list(ids)
+        if seccion is not None:
+            consulta += " AND m.seccion = ?"
+            parametros.append(seccion)
+        if metrica is not None:
+            consulta += " AND m.metrica = ?"
+            parametros.append(metrica)
+        consulta += " ORDER BY e.fecha, m.rowid"
+
+        with closing(self._conectar()) as conn:
+            filas = conn.execute(consulta, parametros).fetchall()
+        return pd.DataFrame(filas, columns=columnas)
+
+    def obtener_serie_articulo(self, articulo: str, talla: str = "", color: str = "",
+                               n_semanas: Optional[int] = None) -> pd.DataFrame:
+        """
+        Obtiene la evolución semanal del stock de un artículo C/D.
+
+        Returns:
+            pd.DataFrame: Columnas fecha, seccion, unidades
+        """
+        consulta = (
+            "SELECT e.fecha, s.seccion, s.unidades FROM stock_articulos s "
+            "JOIN ejecuciones e ON e.id_ejecucion = s.id_ejecucion "
+            "WHERE s.articulo = ? AND s.talla = ? AND s.color = ? ORDER BY e.fecha DESC"
+        )
+        parametros = [str(articulo).strip(), _normalizar_texto_clave(talla), _normalizar_texto_clave(color)]
+        if n_semanas is not None:
+            consulta += " LIMIT ?"
+            parametros.append(n_semanas)
+
+        with closing(self._conectar()) as conn:
+            filas = conn.execute(consulta, parametros).fetchall()
+        return pd.DataFrame(list(reversed(filas)), columns=['fecha', 'seccion', 'unidades'])
+
+
+# Funciones de utilidad para uso directo
+def crear_historico_cd(ruta_bd: Optional[Path] = None) -> HistoricoAnalisisCD:
+    """
+    Crea una instancia del histórico de análisis C y D.
+
+    Args:
+        ruta_bd: Ruta alternativa a la base de datos (opcional)
+
+    Returns:
+        HistoricoAnalisisCD: Instancia inicializada
+    """
+    return HistoricoAnalisisCD(ruta_bd)
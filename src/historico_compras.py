@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Módulo HistoricoCompras - Histórico semanal de compras sin pedido
+
+Sustituye a data/compras_sin_pedido_historico.json. Cada ejecución de
+informe_compras_sin_autorizacion.py añade una partición columnar comprimida con
+las compras sin pedido detectadas en su semana ISO
+(data/historico_compras_sin_pedido/compras_2026_S09.npz); las semanas anteriores
+no se vuelven a escribir.
+
+Junto a cada partición se escribe su índice por código de artículo
+(indice_2026_S09.npz: artículo, talla, color y sección, ordenado por artículo y
+consultado con búsqueda binaria). Preguntas como "cuántas veces se ha comprado
+este artículo sin pedido en las últimas N semanas" leen solo los índices de esas
+N semanas, nunca el histórico completo.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-10
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.paths import HISTORICO_COMPRAS_SIN_PEDIDO, HISTORICO_COMPRAS_SIN_PEDIDO_DIR
+from src.archivo_stock import Semana, ValorSemana, clave_semana
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+COLUMNAS_TEXTO = ['seccion', 'articulo', 'talla', 'color', 'nombre']
+COLUMNAS_INDICE = ['articulo', 'talla', 'color', 'seccion']
+
+# Índice único de versiones anteriores (todas las semanas en un fichero)
+NOMBRE_INDICE_ANTIGUO = 'indice_articulos.npz'
+
+
+def codigo_semana(semana: Semana) -> int:
+    """Codifica (año, semana) como entero ordenable: 202609."""
+    return semana[0] * 100 + semana[1]
+
+
+def _texto(valores, longitud: int, es_codigo: bool = False) -> np.ndarray:
+    """Array de texto sin espacios ('' para vacíos; sin '.0' final en los códigos)."""
+    if valores is None:
+        return np.full(longitud, '', dtype=str)
+    serie = pd.Series(list(valores), dtype=object)
+    serie = serie.where(serie.notna(), '').map(str).str.strip()
+    if es_codigo:
+        serie = serie.str.replace(r'\.0$', '', regex=True)
+    return np.array(serie.tolist(), dtype=str)
+
+
+class HistoricoComprasSinPedido:
+    """
+    Histórico append-only de compras sin pedido, particionado por semana ISO.
+
+    Attributes:
+        directorio (Path): Carpeta con las particiones y el índice de artículos
+    """
+
+    def __init__(self, directorio: Optional[Path] = None):
+        """
+        Inicializa el histórico.
+
+        Args:
+            directorio: Carpeta de particiones. Por defecto data/historico_compras_sin_pedido
+        """
+        self.directorio = Path(directorio) if directorio else HISTORICO_COMPRAS_SIN_PEDIDO_DIR
+        self._indices: Dict[Semana, Dict[str, np.ndarray]] = {}
+
+    # ------------------------------------------------------------------
+    # Particiones
+    # ------------------------------------------------------------------
+
+    def _ruta(self, semana: Semana) -> Path:
+        return self.directorio / f"compras_{semana[0]}_S{semana[1]:02d}.npz"
+
+    def _ruta_indice(self, semana: Semana) -> Path:
+        return self.directorio / f"indice_{semana[0]}_S{semana[1]:02d}.npz"
+
+    def _guardar_npz(self, ruta: Path, arrays: Dict[str, np.ndarray]):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.stem + '.tmp.npz')
+        np.savez_compressed(temporal, **arrays)
+        os.replace(temporal, ruta)
+
+    def semanas(self) -> List[Semana]:
+        """Semanas ISO registradas, en orden cronológico."""
+        if not self.directorio.exists():
+            return []
+        semanas = []
+        for archivo in self.directorio.glob('compras_*_S*.npz'):
+            partes = archivo.stem.split('_')
+            if len(partes) == 3 and partes[1].isdigit() and partes[2][1:].isdigit():
+                semanas.append((int(partes[1]), int(partes[2][1:])))
+        return sorted(semanas)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def registrar_semana(self, resultados_por_seccion: Dict[str, pd.DataFrame],
+                         semana: Optional[ValorSemana] = None) -> Path:
+        """
+        Registra las compras sin pedido de una semana (por defecto, la actual).
+
+        Solo se escriben la partición de esa semana y su índice; si ya existían
+        (informe regenerado en la misma semana) se sustituyen.
+
+        Args:
+            resultados_por_seccion: {seccion: DataFrame con Artículo, Nombre Artículo,
+                                     Talla, Color y Stock}
+            semana: Semana ISO, fecha o '2026-W09'
+
+        Returns:
+            Path: Ruta de la partición escrita
+        """
+        semana = clave_semana(semana if semana is not None else datetime.now())
+
+        filas = [df.assign(_seccion=seccion) for seccion, df in resultados_por_seccion.items()
+                 if df is not None and not df.empty]
+        datos = pd.concat(filas, ignore_index=True) if filas else pd.DataFrame(columns=['_seccion'])
+        n = len(datos)
+
+        arrays = {
+            'seccion': np.array(datos['_seccion'].tolist(), dtype=str),
+            'articulo': _texto(datos.get('Artículo'), n, es_codigo=True),
+            'talla': _texto(datos.get('Talla'), n),
+            'color': _texto(datos.get('Color'), n),
+            'nombre': _texto(datos.get('Nombre Artículo'), n),
+            'stock': pd.to_numeric(datos.get('Stock', pd.Series(0.0, index=datos.index)),
+                                   errors='coerce').fillna(0).to_numpy(dtype='float64'),
+        }
+        ruta = self._ruta(semana)
+        self._guardar_npz(ruta, arrays)
+        self._actualizar_indice(semana, arrays)
+
+        logger.info(f"Compras sin pedido registradas para {semana[0]}-W{semana[1]:02d}: {n} artículos")
+        return ruta
+
+    def _actualizar_indice(self, semana: Semana, arrays: Dict[str, np.ndarray]):
+        """Escribe el índice de la semana: sus artículos ordenados por código."""
+        orden = np.lexsort((arrays['color'], arrays['talla'], arrays['articulo']))
+        indice = {col: arrays[col][orden] for col in COLUMNAS_INDICE}
+        self._guardar_npz(self._ruta_indice(semana), indice)
+        self._indices[semana] = indice
+
+        antiguo = self.directorio / NOMBRE_INDICE_ANTIGUO
+        if antiguo.exists():
+            antiguo.unlink()
+
+    def importar_json(self, ruta_json: Optional[Path] = None) -> int:
+        """
+        Importa el histórico heredado compras_sin_pedido_historico.json, asignando
+        cada artículo a la semana ISO de su fecha_actualizacion.
+
+        Returns:
+            int: Número de artículos importados
+        """
+        ruta_json = Path(ruta_json) if ruta_json else HISTORICO_COMPRAS_SIN_PEDIDO
+        if not ruta_json.exists():
+            return 0
+
+        with open(ruta_json, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+
+        por_semana: Dict[Semana, Dict[str, List[dict]]] = {}
+        for seccion, articulos in datos.items():
+            if not isinstance(articulos, dict):
+                continue
+            for clave, info in articulos.items():
+                info = info if isinstance(info, dict) else {}
+                fecha = info.get('fecha_actualizacion') or info.get('fecha_deteccion')
+                try:
+                    semana = clave_semana(datetime.fromisoformat(str(fecha)[:10]))
+                except ValueError:
+                    continue
+                articulo, _, resto = clave.partition('_')
+                talla, _, color = resto.rpartition('_')
+                por_semana.setdefault(semana, {}).setdefault(seccion, []).append({
+                    'Artículo': articulo, 'Talla': talla, 'Color': color,
+                    'Nombre Artículo': '', 'Stock': info.get('stock', 0)
+                })
+
+        total = 0
+        for semana, secciones in sorted(por_semana.items()):
+            if semana in self.semanas():
+                continue
+            self.registrar_semana({s: pd.DataFrame(filas) for s, filas in secciones.items()}, semana)
+            total += sum(len(filas) for filas in secciones.values())
+        logger.info(f"Importados {total} artículos desde {ruta_json.name}")
+        return total
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _indice_semana(self, semana: Semana) -> Dict[str, np.ndarray]:
+        """Índice de una semana; si falta (histórico anterior a los índices por semana) se crea."""
+        if semana not in self._indices:
+            ruta = self._ruta_indice(semana)
+            if ruta.exists():
+                with np.load(ruta, allow_pickle=False) as datos:
+                    self._indices[semana] = {col: datos[col] for col in COLUMNAS_INDICE}
+            else:
+                with np.load(self._ruta(semana), allow_pickle=False) as datos:
+                    self._actualizar_indice(semana, {col: datos[col] for col in COLUMNAS_INDICE})
+        return self._indices[semana]
+
+    def _rango_semanas(self, ultimas_semanas: Optional[int], hasta: Optional[ValorSemana]) -> List[Semana]:
+        """Semanas registradas dentro de la ventana pedida (solo mira los nombres de fichero)."""
+        semanas = self.semanas()
+        if hasta is not None:
+            limite = clave_semana(hasta)
+            semanas = [s for s in semanas if s <= limite]
+        if ultimas_semanas is not None:
+            semanas = semanas[-ultimas_semanas:] if ultimas_semanas > 0 else []
+        return semanas
+
+    def leer_semana(self, semana: ValorSemana) -> pd.DataFrame:
+        """
+        Compras sin pedido registradas en una semana.
+
+        Returns:
+            DataFrame con seccion, articulo, talla, color, nombre y stock
+        """
+        ruta = self._ruta(clave_semana(semana))
+        if not ruta.exists():
+            return pd.DataFrame(columns=COLUMNAS_TEXTO + ['stock'])
+        with np.load(ruta, allow_pickle=False) as datos:
+            return pd.DataFrame({col: datos[col] for col in COLUMNAS_TEXTO + ['stock']})
+
+    def veces_sin_pedido(self, articulo: str, talla: Optional[str] = None,
+                         color: Optional[str] = None, ultimas_semanas: Optional[int] = None,
+                         hasta: Optional[ValorSemana] = None) -> int:
+        """
+        Número de semanas en las que el artículo se compró sin pedido.
+
+        Args:
+            articulo: Código de artículo
+            talla, color: Restringen la consulta a una variante concreta
+            ultimas_semanas: Solo las últimas N semanas registradas
+            hasta: Última semana a considerar (por defecto, la más reciente)
+
+        Returns:
+            int: Semanas distintas con compra sin pedido
+        """
+        articulo = _texto([articulo], 1, es_codigo=True)[0]
+        talla = None if talla is None else _texto([talla], 1)[0]
+        color = None if color is None else _texto([color], 1)[0]
+        veces = 0
+        for semana in self._rango_semanas(ultimas_semanas, hasta):
+            indice = self._indice_semana(semana)
+            inicio = np.searchsorted(indice['articulo'], articulo, side='left')
+            fin = np.searchsorted(indice['articulo'], articulo, side='right')
+            if inicio == fin:
+                continue
+            mascara = np.ones(fin - inicio, dtype=bool)
+            if talla is not None:
+                mascara &= indice['talla'][inicio:fin] == talla
+            if color is not None:
+                mascara &= indice['color'][inicio:fin] == color
+            veces += bool(mascara.any())
+        return veces
+
+    def articulos_recurrentes(self, ultimas_semanas: int = 4, minimo: int = 2,
+                              hasta: Optional[ValorSemana] = None) -> pd.DataFrame:
+        """
+        Artículos comprados sin pedido en al menos 'minimo' de las últimas N semanas.
+
+        Returns:
+            DataFrame con articulo, talla, color, seccion y semanas, ordenado por semanas
+        """
+        partes = [pd.DataFrame(self._indice_semana(semana)).assign(semana=codigo_semana(semana))
+                  for semana in self._rango_semanas(ultimas_semanas, hasta)]
+        df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+        if df.empty:
+            return pd.DataFrame(columns=['articulo', 'talla', 'color', 'seccion', 'semanas'])
+        conteo = (df.groupby(['articulo', 'talla', 'color', 'seccion'])['semana']
+                  .nunique().rename('semanas').reset_index())
+        conteo = conteo[conteo['semanas'] >= minimo]
+        return conteo.sort_values(['semanas', 'articulo'], ascending=[False, True]).reset_index(drop=True)
+
+
+def crear_historico_compras(directorio: Optional[Path] = None) -> HistoricoComprasSinPedido:
+    """
+    Crea una instancia del histórico de compras sin pedido.
+
+    Si el histórico está vacío y existe el JSON heredado, se importa.
+
+    Args:
+        directorio: Carpeta de particiones (por defecto data/historico_compras_sin_pedido)
+
+    Returns:
+        HistoricoComprasSinPedido: Instancia del histórico
+    """
+    historico = HistoricoComprasSinPedido(directorio)
+    if directorio is None and not historico.semanas() and HISTORICO_COMPRAS_SIN_PEDIDO.exists():
+        try:
+            historico.importar_json(HISTORICO_COMPRAS_SIN_PEDIDO)
+        except Exception as e:
+            logger.warning(f"No se pudo importar {HISTORICO_COMPRAS_SIN_PEDIDO.name}: {e}")
+    return historico
@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""
+Módulo HistoricoVentas - Histórico de ventas multianual por año y semana
+
+El forecast usa las ventas de la misma semana del año pasado, y hasta ahora las
+sacaba releyendo el SPA_ventas.xlsx del año completo en cada ejecución, mientras
+que el SPA_ventas_semana.xlsx que llega cada semana se descartaba tras usarlo.
+
+Este módulo guarda las ventas en un histórico append-only de particiones
+columnares comprimidas, una por semana ISO y agrupadas por año
+(data/historico_ventas/2025/ventas_2025_S07.npz):
+
+- importar_archivo_anual(): primera carga desde SPA_ventas.xlsx (solo rellena
+  las semanas que aún no están en el histórico, salvo con forzar=True).
+- importar_ventas_semana(): añade el SPA_ventas_semana.xlsx de cada semana
+  (sustituye la partición si la semana ya estaba).
+
+Cada partición guarda las filas de tipo 'Detalle' con todas sus columnas más la
+sección del artículo, de modo que ventas() devuelve el mismo formato que el
+fichero original pero leyendo solo las semanas y secciones pedidas.
+
+Además se mantiene un cubo artículo × semana ya agregado
+(cubo_articulo_semana.npz: unidades, importe y líneas por artículo+talla+color,
+con su sección y familia) que se actualiza con cada importación. resumen()
+agrega el cubo por sección, familia o categoría ABC sin leer las particiones.
+
+Uso:
+    historico = crear_historico_ventas(config)
+    historico.importar_archivo_anual()
+    ventas = historico.ventas(semanas=[7, 8], años=[2025], secciones=['vivero'])
+    por_familia = historico.resumen('familia', años=[2024, 2025])
+
+    python -m src.historico_ventas importar                       # SPA_ventas.xlsx + SPA_ventas_semana.xlsx
+    python -m src.historico_ventas estado
+    python -m src.historico_ventas resumen --por seccion --años 2024,2025 --semanas 10-20
+
+Solo usa numpy/pandas (np.savez_compressed), sin dependencias adicionales.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+from src.paths import HISTORICO_VENTAS_DIR
+from src.archivo_stock import Semana, ValorSemana, clave_semana
+from src.lectura_entradas import resolver_entrada
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+PATRON_ARCHIVO = re.compile(r'^ventas_(\d{4})_S(\d{2})\.npz$')
+
+NOMBRE_CUBO = 'cubo_articulo_semana.npz'
+NOMBRE_IMPORTACIONES = 'importaciones.json'
+
+COLUMNAS_CUBO_TEXTO = ['articulo', 'talla', 'color', 'nombre', 'seccion', 'familia']
+COLUMNAS_CUBO = ['año', 'semana'] + COLUMNAS_CUBO_TEXTO + ['unidades', 'importe', 'lineas']
+
+NIVELES_RESUMEN = {'seccion': 'seccion', 'familia': 'familia', 'categoria': 'categoria', 'articulo': 'articulo'}
+
+SIN_SECCION = ''
+SIN_CATEGORIA = 'Sin clasificar'
+
+# Fechas como enteros (ns desde 1970); NaT se guarda como el mínimo de int64
+NAT_ENTERO = np.iinfo(np.int64).min
+
+
+def familia_articulo(codigo: str) -> str:
+    """Familia del código: 4 dígitos para animales (empiezan por 2), 2 para el resto."""
+    return codigo[:4] if codigo.startswith('2') else codigo[:2]
+
+
+def lunes_semana(semana: Semana) -> datetime:
+    """Lunes de la semana ISO (año, semana)."""
+    return datetime.fromisocalendar(semana[0], semana[1], 1)
+
+
+def _texto(serie: pd.Series, es_codigo: bool = False) -> pd.Series:
+    """Texto sin espacios ('' para vacíos; sin '.0' final en los códigos)."""
+    serie = serie.astype(object)
+    serie = serie.where(serie.notna(), '').map(str).str.strip()
+    if es_codigo:
+        serie = serie.str.replace(r'\.0$', '', regex=True)
+    return serie
+
+
+class HistoricoVentas:
+    """
+    Histórico append-only de ventas, particionado por año y semana ISO.
+
+    Attributes:
+        directorio (Path): Carpeta del histórico (una subcarpeta por año)
+        config (dict): Configuración principal (secciones para asignar cada artículo)
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, directorio: Optional[Path] = None):
+        """
+        Inicializa el histórico.
+
+        Args:
+            config: Configuración principal (config.json)
+            directorio: Carpeta del histórico. Por defecto historico_ventas.directorio
+                de la configuración (el de cada tienda) o data/historico_ventas
+        """
+        self.config = config or {}
+        directorio = directorio or self.config.get('historico_ventas', {}).get('directorio')
+        self.directorio = Path(directorio) if directorio else HISTORICO_VENTAS_DIR
+        self._data_loader = None
+        self._secciones: Dict[str, str] = {}
+        self._cubo: Optional[pd.DataFrame] = None
+
+    # ------------------------------------------------------------------
+    # Particiones
+    # ------------------------------------------------------------------
+
+    def _ruta(self, semana: Semana) -> Path:
+        return self.directorio / str(semana[0]) / f"ventas_{semana[0]}_S{semana[1]:02d}.npz"
+
+    def semanas(self) -> List[Semana]:
+        """Semanas ISO guardadas, en orden cronológico."""
+        if not self.directorio.exists():
+            return []
+        semanas = []
+        for carpeta in self.directorio.iterdir():
+            if not carpeta.is_dir() or not carpeta.name.isdigit():
+                continue
+            for archivo in carpeta.iterdir():
+                match = PATRON_ARCHIVO.match(archivo.name)
+                if match:
+                    semanas.append((int(match.group(1)), int(match.group(2))))
+        return sorted(semanas)
+
+    def _guardar_npz(self, ruta: Path, arrays: Dict[str, np.ndarray]):
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.stem + '.tmp.npz')
+        np.savez_compressed(temporal, **arrays)
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _codificar(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Una entrada por columna: números como float64, fechas como int64 y el resto como texto."""
+        arrays, tipos = {}, []
+        for i, col in enumerate(df.columns):
+            serie = df[col]
+            if pd.api.types.is_datetime64_any_dtype(serie):
+                fechas = serie.astype('datetime64[ns]')
+                arrays[f'col_{i}'] = np.where(fechas.isna(), NAT_ENTERO, fechas.to_numpy().view('int64'))
+                tipos.append('fecha')
+            elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+                arrays[f'col_{i}'] = serie.to_numpy(dtype='float64', na_value=np.nan)
+                tipos.append('num')
+            else:
+                nulos = serie.isna().to_numpy()
+                arrays[f'col_{i}'] = np.array(serie.astype(object).where(~nulos, '').map(str).tolist(), dtype=str)
+                arrays[f'col_{i}_nulos'] = nulos
+                tipos.append('txt')
+        arrays['columnas'] = np.array([str(c) for c in df.columns], dtype=str)
+        arrays['tipos'] = np.array(tipos, dtype=str)
+        return arrays
+
+    def _leer_particion(self, semana: Semana, columnas: Optional[List[str]] = None,
+                        secciones: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Lee una partición. Solo se descomprimen las columnas pedidas (y la de
+        sección si hay que filtrar por ella).
+        """
+        with np.load(self._ruta(semana), allow_pickle=False) as datos:
+            nombres = [str(c) for c in datos['columnas']]
+            tipos = [str(t) for t in datos['tipos']]
+            mascara = None
+            if secciones is not None:
+                mascara = np.isin(datos[f'col_{nombres.index("Seccion")}'], list(secciones))
+            leer = nombres if columnas is None else [c for c in nombres if c in columnas]
+            resultado = {}
+            for col in leer:
+                i = nombres.index(col)
+                valores = datos[f'col_{i}']
+                nulos = datos[f'col_{i}_nulos'] if tipos[i] == 'txt' else None
+                if mascara is not None:
+                    valores = valores[mascara]
+                    nulos = nulos[mascara] if nulos is not None else None
+                if tipos[i] == 'fecha':
+                    resultado[col] = pd.to_datetime(np.where(valores == NAT_ENTERO, np.datetime64('NaT', 'ns'),
+                                                             valores.view('datetime64[ns]')))
+                elif tipos[i] == 'num':
+                    resultado[col] = valores
+                else:
+                    serie = pd.Series(valores, dtype=object)
+                    resultado[col] = serie.where(~nulos, np.nan)
+        return pd.DataFrame(resultado, columns=leer)
+
+    # ------------------------------------------------------------------
+    # Secciones
+    # ------------------------------------------------------------------
+
+    def _seccion(self, codigo: str) -> str:
+        if codigo not in self._secciones:
+            if self._data_loader is None:
+                from src.data_loader import DataLoader
+                self._data_loader = DataLoader(self.config)
+            self._secciones[codigo] = self._data_loader.determinar_seccion(codigo) or SIN_SECCION
+        return self._secciones[codigo]
+
+    # ------------------------------------------------------------------
+    # Importación
+    # ------------------------------------------------------------------
+
+    def _preparar(self, df: pd.DataFrame, semana: Optional[Semana]) -> pd.DataFrame:
+        """
+        Filas 'Detalle' con artículo, sección y fecha. Las filas sin fecha (el
+        SPA_ventas_semana.xlsx no la trae) se fechan el lunes de 'semana'.
+        """
+        if 'Tipo registro' in df.columns:
+            df = df[_texto(df['Tipo registro']).str.lower() == 'detalle']
+        if 'Artículo' not in df.columns:
+            raise ValueError("Las ventas no tienen columna 'Artículo'")
+        codigos = _texto(df['Artículo'], es_codigo=True)
+        df = df[(codigos != '') & (codigos != 'nan')].reset_index(drop=True)
+
+        fechas = pd.to_datetime(df['Fecha'], errors='coerce') if 'Fecha' in df.columns \
+            else pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+        if fechas.isna().any():
+            if semana is None:
+                logger.warning(f"Descartadas {int(fechas.isna().sum())} filas de ventas sin fecha")
+                df, fechas = df[fechas.notna()].reset_index(drop=True), fechas[fechas.notna()].reset_index(drop=True)
+            else:
+                fechas = fechas.fillna(pd.Timestamp(lunes_semana(semana)))
+        df['Fecha'] = fechas.to_numpy()
+
+        codigos = _texto(df['Artículo'], es_codigo=True)
+        df['Seccion'] = codigos.map({codigo: self._seccion(codigo) for codigo in codigos.unique()})
+        return df
+
+    def importar(self, df: pd.DataFrame, semana: Optional[ValorSemana] = None,
+                 sobrescribir: bool = True, origen: str = '') -> List[Semana]:
+        """
+        Añade ventas al histórico, una partición por semana ISO de su fecha.
+
+        Args:
+            df: Ventas con las columnas del ERP (Artículo, Talla, Color, Unidades, Importe, Fecha...)
+            semana: Semana de las filas sin fecha (obligatoria si no hay columna Fecha)
+            sobrescribir: Sustituir las semanas que ya estaban en el histórico
+            origen: Texto para el registro de importaciones
+
+        Returns:
+            List[Semana]: Semanas escritas
+        """
+        semana = clave_semana(semana) if semana is not None else None
+        df = self._preparar(df, semana)
+        if df.empty:
+            return []
+
+        calendario = df['Fecha'].dt.isocalendar()
+        claves = calendario['year'].astype(int) * 100 + calendario['week'].astype(int)
+        existentes = set(self.semanas())
+        escritas = []
+        for codigo, grupo in df.groupby(claves.to_numpy(), sort=True):
+            semana_grupo = (int(codigo) // 100, int(codigo) % 100)
+            if semana_grupo in existentes and not sobrescribir:
+                continue
+            self._guardar_npz(self._ruta(semana_grupo), self._codificar(grupo.reset_index(drop=True)))
+            escritas.append(semana_grupo)
+
+        if escritas:
+            self._actualizar_cubo(escritas)
+            self._registrar_importacion(origen, escritas, len(df))
+            logger.info(f"Histórico de ventas: {len(escritas)} semanas importadas "
+                        f"({escritas[0][0]}-W{escritas[0][1]:02d} a {escritas[-1][0]}-W{escritas[-1][1]:02d})"
+                        f"{f' desde {origen}' if origen else ''}")
+        return escritas
+
+    def importar_archivo_anual(self, ruta: Optional[Path] = None, forzar: bool = False) -> List[Semana]:
+        """
+        Importa SPA_ventas.xlsx. Sin forzar solo rellena las semanas que faltan
+        (las ya importadas desde los ficheros semanales no se tocan).
+        """
+        from src.data_loader import DataLoader
+        data_loader = DataLoader(self.config)
+        if ruta is None:
+            ruta = resolver_entrada(Path(data_loader.obtener_directorio_entrada())
+                                    / data_loader.archivos.get('ventas', 'SPA_ventas.xlsx'))
+        hojas = data_loader.leer_excel(str(ruta))
+        if hojas is None:
+            return []
+        df = data_loader.hoja_ventas(hojas)
+        return self.importar(df, sobrescribir=forzar, origen=Path(ruta).name)
+
+    def importar_ventas_semana(self, df: Optional[pd.DataFrame] = None,
+                               semana: Optional[ValorSemana] = None) -> List[Semana]:
+        """
+        Importa las ventas de una semana (SPA_ventas_semana.xlsx ya leído, o se
+        lee del directorio de entrada). Sin fecha en el fichero, las filas van a
+        'semana' (por defecto la semana anterior a la actual).
+        """
+        if df is None:
+            from src.correction_data_loader import leer_archivo_ventas_semana
+            from src.data_loader import DataLoader
+            df, existe = leer_archivo_ventas_semana(DataLoader(self.config).obtener_directorio_entrada())
+            if not existe or df is None:
+                return []
+        if semana is None:
+            semana = datetime.now() - timedelta(days=7)
+        return self.importar(df, semana=semana, sobrescribir=True, origen='SPA_ventas_semana.xlsx')
+
+    def _registrar_importacion(self, origen: str, semanas: List[Semana], filas: int):
+        ruta = self.directorio / NOMBRE_IMPORTACIONES
+        registro = []
+        if ruta.exists():
+            with open(ruta, encoding='utf-8') as f:
+                registro = json.load(f)
+        registro.append({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'origen': origen,
+            'filas': int(filas),
+            'semanas': [f"{a}-W{s:02d}" for a, s in semanas],
+        })
+        temporal = ruta.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(registro, f, ensure_ascii=False, indent=1)
+        os.replace(temporal, ruta)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def _seleccionar(self, semanas: Optional[Iterable[Union[int, ValorSemana]]] = None,
+                     años: Optional[Iterable[int]] = None,
+                     desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> List[Semana]:
+        """
+        Semanas guardadas que cumplen los filtros. 'semanas' admite números de
+        semana (combinados con 'años') o semanas completas (año, semana).
+        """
+        disponibles = self.semanas()
+        if años is not None:
+            años = {int(a) for a in años}
+            disponibles = [s for s in disponibles if s[0] in años]
+        if semanas is not None:
+            numeros = {int(s) for s in semanas if isinstance(s, (int, np.integer))}
+            completas = {clave_semana(s) for s in semanas if not isinstance(s, (int, np.integer))}
+            disponibles = [s for s in disponibles if s[1] in numeros or s in completas]
+        if desde is not None:
+            disponibles = [s for s in disponibles if lunes_semana(s) + timedelta(days=7) > pd.Timestamp(desde)]
+        if hasta is not None:
+            disponibles = [s for s in disponibles if lunes_semana(s) <= pd.Timestamp(hasta)]
+        return disponibles
+
+    def cubre(self, semanas: Optional[Iterable[int]] = None, años: Optional[Iterable[int]] = None,
+              desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> bool:
+        """
+        True si están guardadas todas las semanas pedidas: cada número de
+        'semanas' en cada año de 'años', o todas las semanas ISO entre 'desde' y 'hasta'.
+        """
+        guardadas = set(self.semanas())
+        if not guardadas:
+            return False
+        if desde is not None and hasta is not None:
+            necesarias, dia = set(), pd.Timestamp(desde)
+            while dia <= pd.Timestamp(hasta):
+                necesarias.add(clave_semana(dia.to_pydatetime()))
+                dia += timedelta(days=7)
+            necesarias.add(clave_semana(pd.Timestamp(hasta).to_pydatetime()))
+        else:
+            necesarias = {(int(a), int(s)) for a in (años or []) for s in (semanas or [])}
+        return bool(necesarias) and necesarias <= guardadas
+
+    def ventas(self, semanas: Optional[Iterable[Union[int, ValorSemana]]] = None,
+               años: Optional[Iterable[int]] = None, secciones: Optional[Iterable[str]] = None,
+               desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+               columnas: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Ventas guardadas de las semanas y secciones indicadas.
+
+        Args:
+            semanas: Números de semana (con 'años') o semanas (año, semana) / '2025-W07'
+            años: Años ISO
+            secciones: Secciones (por defecto todas)
+            desde, hasta: Rango de fechas (se filtran también las filas)
+            columnas: Columnas a leer (por defecto todas)
+
+        Returns:
+            DataFrame con las columnas del fichero de ventas más 'Seccion'
+        """
+        seleccion = self._seleccionar(semanas, años, desde, hasta)
+        secciones = list(secciones) if secciones is not None else None
+        if columnas is not None and (desde is not None or hasta is not None) and 'Fecha' not in columnas:
+            columnas = list(columnas) + ['Fecha']
+        partes = [self._leer_particion(s, columnas, secciones) for s in seleccion]
+        if not partes:
+            return pd.DataFrame(columns=columnas or [])
+        # Sin filas se devuelve la partición vacía para conservar las columnas
+        partes = [p for p in partes if not p.empty] or partes[:1]
+        df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+        if desde is not None:
+            df = df[df['Fecha'] >= pd.Timestamp(desde)]
+        if hasta is not None:
+            df = df[df['Fecha'] < pd.Timestamp(hasta).normalize() + timedelta(days=1)]
+        return df.reset_index(drop=True)
+
+    # ------------------------------------------------------------------
+    # Cubo artículo × semana
+    # ------------------------------------------------------------------
+
+    def _agregar_particion(self, semana: Semana) -> pd.DataFrame:
+        df = self._leer_particion(semana, ['Artículo', 'Nombre artículo', 'Talla', 'Color',
+                                           'Unidades', 'Importe', 'Seccion'])
+        if df.empty:
+            return pd.DataFrame(columns=COLUMNAS_CUBO)
+        tabla = pd.DataFrame({
+            'articulo': _texto(df['Artículo'], es_codigo=True),
+            'talla': _texto(df['Talla']) if 'Talla' in df.columns else '',
+            'color': _texto(df['Color']) if 'Color' in df.columns else '',
+            'nombre': _texto(df['Nombre artículo']) if 'Nombre artículo' in df.columns else '',
+            'seccion': _texto(df['Seccion']),
+            'unidades': pd.to_numeric(df.get('Unidades'), errors='coerce'),
+            'importe': pd.to_numeric(df.get('Importe'), errors='coerce'),
+        }).fillna({'unidades': 0.0, 'importe': 0.0})
+        cubo = tabla.groupby(['articulo', 'talla', 'color'], sort=True).agg(
+            nombre=('nombre', 'first'), seccion=('seccion', 'first'),
+            unidades=('unidades', 'sum'), importe=('importe', 'sum'), lineas=('unidades', 'size'),
+        ).reset_index()
+        cubo['familia'] = cubo['articulo'].map(familia_articulo)
+        cubo['año'] = semana[0]
+        cubo['semana'] = semana[1]
+        return cubo[COLUMNAS_CUBO]
+
+    def _guardar_cubo(self, cubo: pd.DataFrame):
+        arrays = {col: np.array(cubo[col].tolist(), dtype=str) for col in COLUMNAS_CUBO_TEXTO}
+        arrays['año'] = cubo['año'].to_numpy(dtype=np.int16)
+        arrays['semana'] = cubo['semana'].to_numpy(dtype=np.int16)
+        for col in ('unidades', 'importe'):
+            arrays[col] = cubo[col].to_numpy(dtype='float64')
+        arrays['lineas'] = cubo['lineas'].to_numpy(dtype=np.int32)
+        self._guardar_npz(self.directorio / NOMBRE_CUBO, arrays)
+        self._cubo = cubo
+
+    def _cargar_cubo(self) -> pd.DataFrame:
+        if self._cubo is None:
+            ruta = self.directorio / NOMBRE_CUBO
+            if not ruta.exists():
+                return pd.DataFrame(columns=COLUMNAS_CUBO)
+            with np.load(ruta, allow_pickle=False) as datos:
+                self._cubo = pd.DataFrame({col: datos[col] for col in COLUMNAS_CUBO})
+        return self._cubo
+
+    def _actualizar_cubo(self, semanas: List[Semana]):
+        """Sustituye en el cubo las filas de las semanas reimportadas."""
+        cubo = self._cargar_cubo()
+        codigos = np.array([a * 100 + s for a, s in semanas])
+        conservar = ~np.isin(cubo['año'].to_numpy(dtype=np.int64) * 100 + cubo['semana'].to_numpy(dtype=np.int64),
+                             codigos)
+        partes = [cubo[conservar]] + [self._agregar_particion(s) for s in semanas]
+        partes = [p for p in partes if not p.empty]
+        nuevo = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_CUBO)
+        self._guardar_cubo(nuevo.sort_values(['año', 'semana', 'articulo', 'talla', 'color'],
+                                             kind='stable').reset_index(drop=True))
+
+    def reconstruir_cubo(self) -> int:
+        """Recalcula el cubo desde todas las particiones. Devuelve sus filas."""
+        partes = [self._agregar_particion(s) for s in self.semanas()]
+        partes = [p for p in partes if not p.empty]
+        cubo = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_CUBO)
+        self._guardar_cubo(cubo)
+        return len(cubo)
+
+    def cubo(self, semanas: Optional[Iterable[int]] = None, años: Optional[Iterable[int]] = None,
+             secciones: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Cubo artículo × semana: año, semana, articulo, talla, color, nombre,
+        seccion, familia, unidades, importe y lineas.
+        """
+        cubo = self._cargar_cubo()
+        mascara = np.ones(len(cubo), dtype=bool)
+        if años is not None:
+            mascara &= cubo['año'].isin([int(a) for a in años]).to_numpy()
+        if semanas is not None:
+            mascara &= cubo['semana'].isin([int(s) for s in semanas]).to_numpy()
+        if secciones is not None:
+            mascara &= cubo['seccion'].isin(list(secciones)).to_numpy()
+        return cubo[mascara].reset_index(drop=True)
+
+    def resumen(self, nivel: str = 'seccion', semanas: Optional[Iterable[int]] = None,
+                años: Optional[Iterable[int]] = None, secciones: Optional[Iterable[str]] = None,
+                clasificacion: Optional[pd.DataFrame] = None, por_semana: bool = True) -> pd.DataFrame:
+        """
+        Agrega el cubo por sección, familia, categoría ABC o artículo.
+
+        Args:
+            nivel: 'seccion', 'familia', 'categoria' o 'articulo'
+            semanas, años, secciones: Filtros del cubo
+            clasificacion: Para nivel 'categoria', DataFrame de la clasificación ABC
+                           (Artículo, Talla, Color, Categoria), p. ej. de DataLoader.leer_clasificacion_abc()
+            por_semana: Desglosar por año y semana (si no, solo por año)
+
+        Returns:
+            DataFrame con año[, semana], el nivel, unidades, importe, lineas y articulos
+        """
+        if nivel not in NIVELES_RESUMEN:
+            raise ValueError(f"Nivel no válido: '{nivel}' (opciones: {', '.join(NIVELES_RESUMEN)})")
+        cubo = self.cubo(semanas, años, secciones)
+        if nivel == 'categoria':
+            cubo = cubo.assign(categoria=self._categorias(cubo, clasificacion))
+
+        grupos = ['año', 'semana'] if por_semana else ['año']
+        grupos.append(NIVELES_RESUMEN[nivel])
+        if nivel == 'articulo':
+            grupos += ['talla', 'color']
+        resumen = cubo.groupby(grupos, sort=True).agg(
+            unidades=('unidades', 'sum'), importe=('importe', 'sum'),
+            lineas=('lineas', 'sum'), articulos=('articulo', 'size'),
+        ).reset_index()
+        return resumen
+
+    @staticmethod
+    def _categorias(cubo: pd.DataFrame, clasificacion: Optional[pd.DataFrame]) -> pd.Series:
+        if clasificacion is None or clasificacion.empty:
+            return pd.Series(SIN_CATEGORIA, index=cubo.index)
+        claves = pd.DataFrame({
+            'articulo': _texto(clasificacion['Artículo'], es_codigo=True),
+            'talla': _texto(clasificacion['Talla']),
+            'color': _texto(clasificacion['Color']),
+            'categoria': clasificacion['Categoria'].astype(str),
+        }).drop_duplicates(['articulo', 'talla', 'color'])
+        unidas = cubo[['articulo', 'talla', 'color']].merge(claves, on=['articulo', 'talla', 'color'], how='left')
+        return pd.Series(unidas['categoria'].fillna(SIN_CATEGORIA).to_numpy(), index=cubo.index)
+
+    def actualizar(self, df_ventas_semana: Optional[pd.DataFrame] = None,
+                   semana: Optional[ValorSemana] = None) -> List[Semana]:
+        """
+        Paso de ingesta de cada ejecución: la primera vez importa SPA_ventas.xlsx
+        y después añade las ventas de la semana (si se pasan).
+        """
+        escritas = []
+        if not self.semanas():
+            escritas += self.importar_archivo_anual()
+        if df_ventas_semana is not None and not df_ventas_semana.empty:
+            escritas += self.importar_ventas_semana(df_ventas_semana, semana)
+        return escritas
+
+
+def historico_activo(config: Optional[Dict[str, Any]]) -> bool:
+    """True si config.json pide leer las ventas del histórico (historico_ventas.usar)."""
+    return bool((config or {}).get('historico_ventas', {}).get('usar', False))
+
+
+def años_referencia(config: Optional[Dict[str, Any]], año_actual: Optional[int] = None) -> List[int]:
+    """
+    Años del histórico que hacen de "año pasado" para el forecast:
+    historico_ventas.años_referencia o, por defecto, el año ISO anterior al actual.
+    """
+    años = (config or {}).get('historico_ventas', {}).get('años_referencia')
+    if años:
+        return [int(a) for a in años]
+    año_actual = año_actual if año_actual is not None else datetime.now().isocalendar()[0]
+    return [año_actual - 1]
+
+
+def crear_historico_ventas(config: Optional[Dict[str, Any]] = None,
+                           directorio: Optional[Path] = None) -> HistoricoVentas:
+    """
+    Crea una instancia del histórico de ventas.
+
+    Args:
+        config: Configuración principal
+        directorio: Carpeta del histórico (por defecto data/historico_ventas)
+
+    Returns:
+        HistoricoVentas: Instancia del histórico
+    """
+    return HistoricoVentas(config, directorio)
+
+
+def _lista_enteros(texto: str) -> List[int]:
+    """'2024,2025' -> [2024, 2025]; '10-20' -> [10, ..., 20]."""
+    valores = []
+    for parte in texto.split(','):
+        parte = parte.strip()
+        if '-' in parte:
+            inicio, fin = parte.split('-', 1)
+            valores.extend(range(int(inicio), int(fin) + 1))
+        elif parte:
+            valores.append(int(parte))
+    return valores
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Histórico de ventas por año y semana con cubo artículo × semana',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python -m src.historico_ventas importar                          # SPA_ventas.xlsx (semanas que falten) + SPA_ventas_semana.xlsx
+  python -m src.historico_ventas importar --anual ventas_2024.xlsx --forzar
+  python -m src.historico_ventas importar --solo-semana --semana 2026-W09
+  python -m src.historico_ventas estado
+  python -m src.historico_ventas resumen --por familia --años 2024,2025 --semanas 10-20
+  python -m src.historico_ventas resumen --por categoria --secciones vivero --años 2025 --total
+  python -m src.historico_ventas reconstruir-cubo
+        """
+    )
+    parser.add_argument('--verbose', '-v', action='store_true', help='Mostrar el log de la carga de datos')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_importar = subparsers.add_parser('importar', help='Añadir ventas al histórico')
+    p_importar.add_argument('--anual', type=str, default=None, metavar='RUTA',
+                            help='Fichero de ventas anual (default: SPA_ventas.xlsx de la entrada)')
+    p_importar.add_argument('--forzar', action='store_true',
+                            help='Sustituir también las semanas que ya estaban en el histórico')
+    p_importar.add_argument('--solo-semana', action='store_true', help='Importar solo SPA_ventas_semana.xlsx')
+    p_importar.add_argument('--semana', type=str, default=None,
+                            help='Semana de SPA_ventas_semana.xlsx, p. ej. 2026-W09 (default: la anterior)')
+
+    subparsers.add_parser('estado', help='Semanas guardadas por año y tamaño del cubo')
+
+    p_resumen = subparsers.add_parser('resumen', help='Agregar el cubo por sección, familia o categoría')
+    p_resumen.add_argument('--por', choices=list(NIVELES_RESUMEN), default='seccion')
+    p_resumen.add_argument('--años', type=_lista_enteros, default=None, help='Años (2024,2025)')
+    p_resumen.add_argument('--semanas', type=_lista_enteros, default=None, help='Semanas (A-B o A,B,C)')
+    p_resumen.add_argument('--secciones', type=str, default=None, help='Secciones separadas por comas')
+    p_resumen.add_argument('--total', action='store_true', help='Agregar por año en lugar de por semana')
+
+    subparsers.add_parser('reconstruir-cubo', help='Recalcular el cubo desde las particiones')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s - %(message)s')
+
+    from src.registro_config import obtener_registro
+    config = obtener_registro().principal()
+    historico = crear_historico_ventas(config)
+
+    if args.comando == 'importar':
+        inicio = datetime.now()
+        escritas = []
+        if not args.solo_semana:
+            escritas += historico.importar_archivo_anual(Path(args.anual) if args.anual else None, args.forzar)
+        escritas += historico.importar_ventas_semana(semana=args.semana)
+        duracion = (datetime.now() - inicio).total_seconds()
+        print(f"{len(escritas)} semanas importadas en {duracion:.1f} s ({len(historico.semanas())} en el histórico)")
+        return 0
+
+    if args.comando == 'estado':
+        semanas = historico.semanas()
+        if not semanas:
+            print(f"Histórico vacío ({historico.directorio})")
+            return 1
+        por_año: Dict[int, List[int]] = {}
+        for año, semana in semanas:
+            por_año.setdefault(año, []).append(semana)
+        for año, lista in por_año.items():
+            print(f"  {año}: {len(lista):2d} semanas (S{lista[0]:02d}-S{lista[-1]:02d})")
+        print(f"Cubo artículo × semana: {len(historico.cubo())} filas")
+        return 0
+
+    if args.comando == 'reconstruir-cubo':
+        print(f"Cubo reconstruido: {historico.reconstruir_cubo()} filas")
+        return 0
+
+    secciones = [s.strip() for s in args.secciones.split(',')] if args.secciones else None
+    clasificacion = None
+    if args.por == 'categoria':
+        from src.data_loader import DataLoader
+        data_loader = DataLoader(config)
+        semana_abc = args.semanas[0] if args.semanas else None
+        tablas = [data_loader.leer_clasificacion_abc(s, semana_abc)
+                  for s in (secciones or config.get('secciones_activas', []))]
+        tablas = [t for t in tablas if t is not None]
+        clasificacion = pd.concat(tablas, ignore_index=True) if tablas else None
+
+    inicio = datetime.now()
+    resumen = historico.resumen(args.por, args.semanas, args.años, secciones, clasificacion,
+                                por_semana=not args.total)
+    duracion = (datetime.now() - inicio).total_seconds() * 1000
+    if resumen.empty:
+        print("No hay ventas en el histórico para esos filtros")
+        return 1
+    with pd.option_context('display.max_rows', 500, 'display.width', 160):
+        print(resumen.round(2).to_string(index=False))
+    print(f"\n{len(resumen)} filas en {duracion:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Módulo Lectura de Entradas - Ficheros del ERP en Excel o texto delimitado
+
+El ERP exporta los mismos informes (ventas, costes, compras, stock) como .xlsx
+o como texto delimitado (.csv, .tsv, .txt). Leer el texto es mucho más rápido
+que abrir el .xlsx con openpyxl, así que todos los cargadores aceptan las dos
+variantes con el mismo nombre de fichero:
+
+- resolver_entrada(ruta): dada la ruta esperada (SPA_ventas.xlsx) devuelve la
+  variante que existe (SPA_ventas.csv, SPA_ventas.tsv...). Si hay varias se usa
+  la más reciente, que es la última exportación del ERP.
+- leer_tabla(ruta): lee .xlsx con pd.read_excel y el texto con pd.read_csv
+  según la extensión, y devuelve lo mismo en los dos casos (un DataFrame, o un
+  diccionario de hojas con hoja=None).
+- leer_cabecera(ruta): solo los encabezados de cada hoja, sin leer los datos.
+- PrecargaEntradas: lee en segundo plano (procesos o hilos) los ficheros que
+  se van a necesitar; leer_tabla() usa esa lectura si el fichero no ha
+  cambiado desde que se lanzó.
+- compartir_lectura(ruta): lectura que se sirve a todos los que la pidan, no
+  solo al primero (el fichero de costes que usan todas las tiendas).
+
+En el texto se detectan la codificación (UTF-8 o Windows-1252), el separador
+(; , tabulador o |) y la coma decimal. Los tipos se fijan para que el
+resultado sea el mismo que con el Excel: las columnas de texto del ERP
+(nombre, talla, color, tipo de registro...) se leen como texto tal cual, con
+sus espacios; las fechas se convierten a datetime; y el resto, incluidos los
+códigos de artículo, se deja numérico como lo deja pd.read_excel, de modo que
+las normalizaciones de código y la búsqueda de columnas de cada cargador no
+cambian.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import csv
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from src.manifiesto_entradas import obtener_manifiesto
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+Ruta = Union[str, Path]
+
+EXTENSIONES_EXCEL = ('.xlsx', '.xlsm', '.xls')
+EXTENSIONES_TEXTO = ('.csv', '.tsv', '.txt')
+EXTENSIONES_ENTRADA = EXTENSIONES_EXCEL + EXTENSIONES_TEXTO
+
+SEPARADORES = (';', ',', '\t', '|')
+CODIFICACIONES = ('utf-8-sig', 'cp1252')
+
+# Columnas de texto del ERP (nombre normalizado). El resto se deja inferir a
+# pandas igual que con el Excel.
+COLUMNAS_TEXTO = frozenset({
+    'nombrearticulo', 'definicion', 'descripcion', 'talla', 'color', 'serie', 'documento',
+    'factura', 'tiporegistro', 'nombreproveedor', 'referencia', 'nombrefamilia',
+})
+
+# Formatos de fecha admitidos en el texto (el primero que encaja con la muestra)
+FORMATOS_FECHA = (
+    '%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M',
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S',
+    '%d-%m-%Y', '%d.%m.%Y',
+)
+
+_NUMERO_COMA_DECIMAL = re.compile(r'^-?\d{1,3}(\.\d{3})*,\d+$|^-?\d+,\d+$')
+
+# Bytes que se leen para detectar codificación, separador y coma decimal
+BYTES_MUESTRA = 64 * 1024
+
+
+def normalizar_nombre(nombre: Any) -> str:
+    """Nombre de columna sin acentos, en minúsculas y solo con letras y dígitos."""
+    texto = unicodedata.normalize('NFKD', str(nombre))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]', '', texto.lower())
+
+
+def es_columna_fecha(nombre: Any) -> bool:
+    normalizado = normalizar_nombre(nombre)
+    return normalizado.startswith('fecha') or normalizado in ('ultcompra', 'ultimacompra')
+
+
+def es_texto_delimitado(ruta: Ruta) -> bool:
+    return Path(ruta).suffix.lower() in EXTENSIONES_TEXTO
+
+
+def resolver_entrada(ruta: Ruta) -> Ruta:
+    """
+    Variante existente de un fichero de entrada.
+
+    Busca el mismo nombre con todas las extensiones admitidas (.xlsx, .csv,
+    .tsv...) en el manifiesto de entradas. Si existen varias devuelve la
+    modificada más recientemente (a igualdad, la pedida); si no existe ninguna
+    devuelve la ruta pedida, para que el cargador informe del fichero que
+    falta como siempre.
+
+    Returns:
+        La ruta elegida, del mismo tipo (str o Path) que la recibida
+    """
+    pedida = Path(ruta)
+    candidatas = [pedida] + [pedida.with_suffix(ext) for ext in EXTENSIONES_ENTRADA
+                             if ext != pedida.suffix.lower()]
+    manifiesto = obtener_manifiesto()
+    existentes = []
+    for orden, candidata in enumerate(candidatas):
+        entrada = manifiesto.entrada(candidata)
+        if entrada is not None:
+            existentes.append((entrada.mtime_ns, -orden, candidata))
+    if not existentes:
+        return ruta
+    elegida = max(existentes)[2]
+    if elegida != pedida:
+        logger.debug(f"Entrada {pedida.name}: se usa {elegida.name}")
+    return str(elegida) if isinstance(ruta, str) else elegida
+
+
+def buscar_entradas(directorio: Ruta, prefijo: str) -> List[str]:
+    """
+    Ficheros del directorio que empiezan por 'prefijo' con una extensión
+    admitida (equivale a glob(prefijo + '*.xlsx') con todas las extensiones).
+    """
+    nombres = sorted(obtener_manifiesto().entradas(directorio))
+    return [os.path.join(str(directorio), nombre) for nombre in nombres
+            if nombre.startswith(prefijo) and Path(nombre).suffix.lower() in EXTENSIONES_ENTRADA]
+
+
+def _seleccionada(columna: Any, columnas: Optional[Iterable[str]]) -> bool:
+    return columnas is None or normalizar_nombre(columna) in columnas
+
+
+def _detectar_formato(ruta: Ruta) -> Tuple[str, str, str]:
+    """Codificación, separador y separador decimal de un fichero de texto."""
+    with open(ruta, 'rb') as f:
+        muestra_bytes = f.read(BYTES_MUESTRA)
+
+    codificacion = CODIFICACIONES[-1]
+    for candidata in CODIFICACIONES:
+        try:
+            muestra = muestra_bytes.decode(candidata)
+            codificacion = candidata
+            break
+        except UnicodeDecodeError as e:
+            # Un carácter multibyte cortado al final de la muestra no cuenta
+            if candidata.startswith('utf-8') and e.start >= len(muestra_bytes) - 3:
+                muestra = muestra_bytes[:e.start].decode(candidata)
+                codificacion = candidata
+                break
+    else:
+        muestra = muestra_bytes.decode(codificacion, errors='replace')
+
+    lineas = muestra.splitlines()[:50]
+    if Path(ruta).suffix.lower() == '.tsv':
+        separador = '\t'
+    else:
+        cabecera = lineas[0] if lineas else ''
+        separador = max(SEPARADORES, key=lambda s: (cabecera.count(s), -SEPARADORES.index(s)))
+
+    decimal = '.'
+    if separador != ',':
+        for fila in csv.reader(lineas[1:], delimiter=separador):
+            if any(_NUMERO_COMA_DECIMAL.match(valor.strip()) for valor in fila):
+                decimal = ','
+                break
+    return codificacion, separador, decimal
+
+
+def _convertir_fechas(serie: pd.Series) -> pd.Series:
+    """Convierte una columna de fechas en texto con el formato de su primer valor."""
+    muestra = serie.dropna()
+    if muestra.empty:
+        return pd.to_datetime(serie, errors='coerce')
+    valor = str(muestra.iloc[0]).strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            datetime.strptime(valor, formato)
+        except ValueError:
+            continue
+        return pd.to_datetime(serie.str.strip(), format=formato, errors='coerce')
+    logger.warning(f"Formato de fecha no reconocido en '{serie.name}' ({valor!r}): se deja como texto")
+    return serie
+
+
+def _leer_delimitado(ruta: Ruta, columnas: Optional[Iterable[str]] = None, header: int = 0) -> pd.DataFrame:
+    codificacion, separador, decimal = _detectar_formato(ruta)
+    opciones = dict(sep=separador, decimal=decimal, encoding=codificacion, header=header,
+                    thousands='.' if decimal == ',' else None)
+
+    cabecera = pd.read_csv(ruta, nrows=0, **opciones).columns
+    usar = [c for c in cabecera if _seleccionada(c, columnas)]
+    # Texto y fechas se leen como texto; números y códigos, inferidos como en el Excel
+    tipos = {c: str for c in usar if normalizar_nombre(c) in COLUMNAS_TEXTO or es_columna_fecha(c)}
+
+    df = pd.read_csv(ruta, usecols=usar, dtype=tipos, **opciones)
+    for columna in tipos:
+        if df[columna].isna().all():
+            # Columna vacía: float64 de NaN, como la deja pd.read_excel
+            df[columna] = df[columna].astype('float64')
+        elif es_columna_fecha(columna):
+            df[columna] = _convertir_fechas(df[columna])
+    logger.debug(f"{Path(ruta).name}: separador {separador!r}, decimal {decimal!r}, "
+                 f"{codificacion}, {len(df)} filas x {len(usar)} columnas")
+    return df[usar]
+
+
+def _proyectar(datos: Union[pd.DataFrame, dict], columnas: Optional[Iterable[str]]) -> Union[pd.DataFrame, dict]:
+    if columnas is None:
+        return datos
+    if isinstance(datos, dict):
+        return {nombre: df[[c for c in df.columns if _seleccionada(c, columnas)]]
+                for nombre, df in datos.items()}
+    return datos[[c for c in datos.columns if _seleccionada(c, columnas)]]
+
+
+def _leer(ruta: Ruta, hoja: Union[int, str, None], columnas: Optional[Iterable[str]],
+          header: int) -> Union[pd.DataFrame, dict]:
+    if es_texto_delimitado(ruta):
+        df = _leer_delimitado(ruta, columnas, header)
+        return {Path(ruta).stem: df} if hoja is None else df
+
+    # Las columnas del Excel se recortan después de leerlo: openpyxl lee todas
+    # las celdas igualmente y así la caché de datasets del orquestador sirve
+    return _proyectar(pd.read_excel(ruta, sheet_name=hoja, header=header), columnas)
+
+
+def leer_libro(ruta: Ruta) -> dict:
+    """Todas las hojas de un fichero de entrada, {hoja: DataFrame}. Es lo que lee la precarga."""
+    return _leer(ruta, None, None, 0)
+
+
+def leer_tabla(ruta: Ruta, hoja: Union[int, str, None] = 0, columnas: Optional[Iterable[str]] = None,
+               header: int = 0) -> Union[pd.DataFrame, dict]:
+    """
+    Lee un fichero de entrada en Excel o texto delimitado según su extensión.
+
+    Si la precarga ya ha leído el fichero, o es una lectura compartida (y no ha
+    cambiado desde entonces), se usa esa lectura.
+
+    Args:
+        ruta: Fichero .xlsx/.xls o .csv/.tsv/.txt
+        hoja: Como sheet_name de pd.read_excel: índice o nombre de hoja (un
+            DataFrame) o None para todas (diccionario {hoja: DataFrame}). Un
+            fichero de texto es una sola hoja con el nombre del fichero.
+        columnas: Columnas a conservar (por defecto todas). Se comparan sin
+            acentos ni mayúsculas, así que 'Articulo' conserva 'Artículo'. En el
+            texto solo se leen esas columnas.
+        header: Fila de los encabezados
+
+    Returns:
+        DataFrame o diccionario de DataFrames, como pd.read_excel
+    """
+    normalizadas = None if columnas is None else {normalizar_nombre(c) for c in columnas}
+
+    if header == 0:
+        libro = _tomar_precarga(ruta)
+        compartida = libro is None
+        if compartida:
+            libro = _lectura_compartida(ruta)
+        if libro is not None:
+            if hoja is None:
+                # Las hojas de una lectura compartida las reciben otros cargadores
+                return _proyectar(dict(libro) if compartida else libro, normalizadas)
+            if es_texto_delimitado(ruta):
+                return _proyectar(next(iter(libro.values())), normalizadas)
+            hojas = list(libro)
+            if isinstance(hoja, int) and -len(hojas) <= hoja < len(hojas):
+                return _proyectar(libro[hojas[hoja]], normalizadas)
+            if hoja in libro:
+                return _proyectar(libro[hoja], normalizadas)
+            # Hoja inexistente: la lectura normal da el error de siempre
+
+    return _leer(ruta, hoja, normalizadas, header)
+
+
+def leer_cabecera(ruta: Ruta, hoja: Union[int, str, None] = 0) -> Dict[str, List[str]]:
+    """
+    Encabezados de un fichero de entrada sin leer sus datos.
+
+    El .xlsx se abre con openpyxl en modo de solo lectura y de cada hoja se lee
+    solo la primera fila; del texto delimitado, la primera línea con la
+    codificación y el separador que detecta leer_tabla(). Es lo que usa la
+    validación previa de entradas (src/validacion_entradas.py).
+
+    Args:
+        ruta: Fichero .xlsx/.xls o .csv/.tsv/.txt
+        hoja: Índice o nombre de hoja, o None para todas (como leer_tabla)
+
+    Returns:
+        Dict: {hoja: [encabezados]}, sin las celdas vacías
+
+    Raises:
+        IndexError, KeyError: Si la hoja pedida no existe
+    """
+    if es_texto_delimitado(ruta):
+        codificacion, separador, _ = _detectar_formato(ruta)
+        with open(ruta, encoding=codificacion, errors='replace', newline='') as f:
+            fila = next(csv.reader(f, delimiter=separador), [])
+        return {Path(ruta).stem: [valor for valor in fila if valor.strip()]}
+
+    if Path(ruta).suffix.lower() == '.xls':
+        # openpyxl no lee el formato antiguo: pandas con xlrd y sin filas
+        libro = pd.read_excel(ruta, sheet_name=hoja, nrows=0)
+        if not isinstance(libro, dict):
+            libro = {hoja: libro}
+        return {str(nombre): [str(c) for c in df.columns if not str(c).startswith('Unnamed:')]
+                for nombre, df in libro.items()}
+
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        if hoja is None:
+            hojas = libro.worksheets
+        elif isinstance(hoja, int):
+            hojas = [libro.worksheets[hoja]]
+        else:
+            hojas = [libro[hoja]]
+        cabeceras = {}
+        for ws in hojas:
+            fila = next(ws.iter_rows(max_row=1, values_only=True), ())
+            cabeceras[ws.title] = [str(valor) for valor in fila if valor is not None and str(valor).strip()]
+        return cabeceras
+    finally:
+        libro.close()
+
+
+# ==============================================================================
+# PRECARGA EN SEGUNDO PLANO
+# ==============================================================================
+
+# Lecturas lanzadas por PrecargaEntradas, por (ruta absoluta, tamaño, mtime).
+# leer_tabla() se queda con la lectura la primera vez que pide ese fichero.
+_PRECARGAS: Dict[Tuple[str, int, int], Future] = {}
+_BLOQUEO_PRECARGAS = threading.Lock()
+
+
+def _clave_fichero(ruta: Ruta) -> Optional[Tuple[str, int, int]]:
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+
+
+def _tomar_precarga(ruta: Ruta) -> Optional[dict]:
+    if not _PRECARGAS:
+        return None
+    clave = _clave_fichero(ruta)
+    with _BLOQUEO_PRECARGAS:
+        futuro = _PRECARGAS.pop(clave, None)
+    if futuro is None:
+        return None
+    try:
+        libro = futuro.result()
+    except Exception as e:
+        # Se vuelve a leer en primer plano, que registra el error como siempre
+        logger.debug(f"Precarga de {Path(ruta).name} fallida: {e}")
+        return None
+    logger.debug(f"{Path(ruta).name}: lectura precargada")
+    return libro
+
+
+class PrecargaEntradas:
+    """
+    Lectura en segundo plano de los ficheros de entrada que se van a necesitar.
+
+    Cada fichero se lee entero con leer_libro() en un pool de procesos (openpyxl
+    ocupa la CPU, así que los hilos apenas se solapan) o de hilos, mientras el
+    programa sigue con su preparación. Cuando un cargador llama a leer_tabla()
+    con ese fichero recibe la lectura ya hecha, o espera a que termine.
+
+    Attributes:
+        modo (str): 'procesos' o 'hilos'
+        max_trabajadores (int): Lecturas simultáneas
+    """
+
+    def __init__(self, modo: str = 'procesos', max_trabajadores: Optional[int] = None):
+        if modo not in ('procesos', 'hilos'):
+            raise ValueError(f"Modo de precarga desconocido: {modo!r} (procesos o hilos)")
+        nucleos = os.cpu_count() or 1
+        if modo == 'procesos' and nucleos == 1:
+            # Con un solo núcleo los procesos no leen más deprisa y arrancarlos cuesta
+            modo = 'hilos'
+        self.modo = modo
+        self.max_trabajadores = max_trabajadores or min(4, nucleos)
+        self._ejecutor: Optional[Executor] = None
+        self._claves: List[Tuple[str, int, int]] = []
+
+    def _obtener_ejecutor(self) -> Executor:
+        if self._ejecutor is None:
+            if self.modo == 'procesos':
+                # spawn en todas las plataformas: es lo que hay en Windows y no
+                # hereda hilos ni bloqueos del proceso principal
+                self._ejecutor = ProcessPoolExecutor(self.max_trabajadores,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._ejecutor = ThreadPoolExecutor(self.max_trabajadores, thread_name_prefix='precarga')
+        return self._ejecutor
+
+    def precargar(self, rutas: Iterable[Ruta]) -> int:
+        """
+        Lanza la lectura de los ficheros que aún no se estén leyendo.
+
+        Returns:
+            int: Lecturas lanzadas
+        """
+        lanzadas = 0
+        for ruta in rutas:
+            clave = _clave_fichero(ruta)
+            if clave is None:
+                continue
+            with _BLOQUEO_PRECARGAS:
+                if clave in _PRECARGAS or clave in self._claves:
+                    continue
+                _PRECARGAS[clave] = self._obtener_ejecutor().submit(leer_libro, clave[0])
+                self._claves.append(clave)
+            lanzadas += 1
+            logger.debug(f"Precarga de {Path(ruta).name} ({clave[1] / 1024:,.0f} KB)")
+        return lanzadas
+
+    def cerrar(self) -> None:
+        """Cancela las lecturas pendientes y descarta las que nadie ha usado."""
+        with _BLOQUEO_PRECARGAS:
+            sin_usar = [clave for clave in self._claves if clave in _PRECARGAS]
+            for clave in sin_usar:
+                _PRECARGAS.pop(clave).cancel()
+            self._claves = []
+        if sin_usar:
+            logger.debug(f"Precarga: {len(sin_usar)} lecturas sin usar descartadas")
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown(wait=False, cancel_futures=True)
+            self._ejecutor = None
+
+
+# ==============================================================================
+# LECTURAS COMPARTIDAS
+# ==============================================================================
+
+# Libros leídos una vez para varios consumidores (las tiendas de src/tiendas.py
+# comparten el fichero de costes). A diferencia de la precarga, la lectura no
+# se consume: leer_tabla() la sirve mientras el fichero no cambie.
+_COMPARTIDAS: Dict[Tuple[str, int, int], dict] = {}
+
+
+def _lectura_compartida(ruta: Ruta) -> Optional[dict]:
+    if not _COMPARTIDAS:
+        return None
+    libro = _COMPARTIDAS.get(_clave_fichero(ruta))
+    if libro is not None:
+        logger.debug(f"{Path(ruta).name}: lectura compartida")
+    return libro
+
+
+def compartir_lectura(ruta: Ruta, libro: Optional[dict] = None) -> Optional[dict]:
+    """
+    Registra la lectura de un fichero para que leer_tabla() la sirva siempre.
+
+    Args:
+        ruta: Fichero de entrada (ya resuelto con resolver_entrada)
+        libro: Lectura ya hecha con leer_libro() (la que recibe un proceso
+            trabajador); si no se da se lee ahora
+
+    Returns:
+        Optional[dict]: El libro compartido, o None si el fichero no existe
+    """
+    clave = _clave_fichero(ruta)
+    if clave is None:
+        return None
+    if libro is None:
+        libro = _COMPARTIDAS.get(clave)
+        if libro is None:
+            libro = leer_libro(clave[0])
+    with _BLOQUEO_PRECARGAS:
+        _COMPARTIDAS[clave] = libro
+    return libro
+
+
+def olvidar_compartidas() -> None:
+    """Descarta todas las lecturas compartidas."""
+    with _BLOQUEO_PRECARGAS:
+        _COMPARTIDAS.clear()
+
+
+def crear_precarga(config: Optional[Dict[str, Any]] = None) -> Optional[PrecargaEntradas]:
+    """
+    Crea la precarga según el bloque 'precarga_entradas' de config.json.
+
+    Returns:
+        Optional[PrecargaEntradas]: La precarga, o None si está deshabilitada
+    """
+    opciones = (config or {}).get('precarga_entradas', {})
+    if not opciones.get('habilitar', True):
+        return None
+    return PrecargaEntradas(opciones.get('modo', 'procesos'), opciones.get('max_trabajadores'))
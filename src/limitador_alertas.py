@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Módulo LimitadorAlertas - Control anti-spam de alertas compartido entre procesos
+
+AlertService evitaba repetir una alerta guardando en memoria la hora del último
+envío de cada clave. Cada script programado (main, clasificacionABC, INFORME,
+PRESENTACION, análisis C/D, auditorías de compras) empezaba con ese registro
+vacío, de modo que el mismo archivo o columna ausente se notificaba una vez por
+script y ejecución.
+
+Este módulo guarda el estado en una base SQLite local compartida por todos los
+scripts:
+    - Ventana deslizante por clave de alerta: como máximo N envíos en los
+      últimos T segundos, contando los envíos de cualquier proceso.
+    - Las apariciones suprimidas se cuentan por clave y se entregan, como mucho
+      una vez por intervalo, en un correo de resumen.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-12
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+from src.paths import ESTADO_ALERTAS_DB
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+ESQUEMA_SQL = """
+CREATE TABLE IF NOT EXISTS envios (
+    clave TEXT NOT NULL,
+    instante REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS suprimidas (
+    clave TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    descripcion TEXT,
+    veces INTEGER NOT NULL DEFAULT 0,
+    primera REAL NOT NULL,
+    ultima REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS estado (
+    nombre TEXT PRIMARY KEY,
+    valor REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_envios_clave ON envios (clave, instante);
+"""
+
+
+class LimitadorAlertas:
+    """
+    Limitador de frecuencia de alertas persistente y compartido entre procesos.
+
+    Attributes:
+        ruta_bd (Path): Ruta al fichero de base de datos
+        ventana_segundos (float): Longitud de la ventana deslizante
+        max_por_ventana (int): Envíos permitidos por clave dentro de la ventana
+        intervalo_resumen (float): Segundos mínimos entre dos resúmenes de suprimidas
+    """
+
+    def __init__(self, ruta_bd: Optional[Path] = None, ventana_segundos: float = 3600,
+                 max_por_ventana: int = 1, intervalo_resumen: float = 6 * 3600):
+        """
+        Inicializa el limitador y crea el esquema si no existe.
+
+        Args:
+            ruta_bd: Ruta al fichero SQLite. Por defecto data/estado_alertas.db
+            ventana_segundos: Longitud de la ventana deslizante
+            max_por_ventana: Envíos permitidos por clave dentro de la ventana
+            intervalo_resumen: Segundos mínimos entre dos resúmenes de suprimidas
+        """
+        self.ruta_bd = Path(ruta_bd) if ruta_bd else ESTADO_ALERTAS_DB
+        self.ruta_bd.parent.mkdir(parents=True, exist_ok=True)
+        self.ventana_segundos = ventana_segundos
+        self.max_por_ventana = max(1, max_por_ventana)
+        self.intervalo_resumen = intervalo_resumen
+
+        with closing(self._conectar()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(ESQUEMA_SQL)
+            conn.commit()
+
+    def _conectar(self) -> sqlite3.Connection:
+        # isolation_level=None: las transacciones se abren explícitamente con
+        # BEGIN IMMEDIATE para que la comprobación y el registro sean atómicos
+        # frente a otros scripts que escriban a la vez.
+        conn = sqlite3.connect(str(self.ruta_bd), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    # ------------------------------------------------------------------
+    # VENTANA DESLIZANTE
+    # ------------------------------------------------------------------
+
+    def permitir(self, clave: str, tipo: str = '', descripcion: str = '',
+                 ahora: Optional[float] = None) -> bool:
+        """
+        Decide si una alerta puede enviarse y registra el resultado.
+
+        Si la clave no ha agotado su cupo en la ventana se anota el envío; si lo
+        ha agotado se incrementa su contador de apariciones suprimidas.
+
+        Args:
+            clave: Clave que identifica la alerta (tipo + clave única)
+            tipo: Tipo de alerta, para el resumen
+            descripcion: Texto breve de la alerta, para el resumen
+            ahora: Instante de la comprobación (por defecto, time.time())
+
+        Returns:
+            bool: True si se puede enviar, False si se suprime
+        """
+        ahora = time.time() if ahora is None else ahora
+        desde = ahora - self.ventana_segundos
+
+        with closing(self._conectar()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM envios WHERE clave = ? AND instante <= ?", (clave, desde))
+                (enviados,) = conn.execute(
+                    "SELECT COUNT(*) FROM envios WHERE clave = ? AND instante > ?", (clave, desde)
+                ).fetchone()
+
+                permitido = enviados < self.max_por_ventana
+                if permitido:
+                    conn.execute("INSERT INTO envios (clave, instante) VALUES (?, ?)", (clave, ahora))
+                else:
+                    conn.execute(
+                        """
+                        INSERT INTO suprimidas (clave, tipo, descripcion, veces, primera, ultima)
+                        VALUES (?, ?, ?, 1, ?, ?)
+                        ON CONFLICT (clave) DO UPDATE SET
+                            veces = veces + 1, ultima = excluded.ultima,
+                            descripcion = excluded.descripcion
+                        """,
+                        (clave, tipo, descripcion, ahora, ahora),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return permitido
+
+    # ------------------------------------------------------------------
+    # RESUMEN DE SUPRIMIDAS
+    # ------------------------------------------------------------------
+
+    def reclamar_resumen(self, ahora: Optional[float] = None,
+                         forzar: bool = False) -> List[Dict[str, Any]]:
+        """
+        Devuelve las apariciones suprimidas si toca enviar el resumen.
+
+        El primer proceso que lo reclama dentro del intervalo marca el resumen
+        como en curso; los demás reciben una lista vacía. Los contadores no se
+        descuentan hasta llamar a confirmar_resumen, de modo que si el envío
+        falla se incluyen en el siguiente resumen.
+
+        Args:
+            ahora: Instante de la comprobación (por defecto, time.time())
+            forzar: Ignorar el intervalo mínimo entre resúmenes
+
+        Returns:
+            List[Dict]: Filas con clave, tipo, descripcion, veces, primera y ultima
+        """
+        ahora = time.time() if ahora is None else ahora
+
+        with closing(self._conectar()) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                fila = conn.execute("SELECT valor FROM estado WHERE nombre = 'ultimo_resumen'").fetchone()
+                ultimo = fila['valor'] if fila else None
+                if ultimo is None:
+                    # Primera ejecución: el intervalo empieza a contar ahora
+                    conn.execute("INSERT INTO estado (nombre, valor) VALUES ('ultimo_resumen', ?)", (ahora,))
+                    conn.execute("COMMIT")
+                    return []
+                if not forzar and ahora - ultimo < self.intervalo_resumen:
+                    conn.execute("COMMIT")
+                    return []
+
+                filas = [dict(f) for f in conn.execute(
+                    "SELECT clave, tipo, descripcion, veces, primera, ultima FROM suprimidas "
+                    "WHERE veces > 0 ORDER BY veces DESC, clave"
+                )]
+                if filas:
+                    conn.execute("UPDATE estado SET valor = ? WHERE nombre = 'ultimo_resumen'", (ahora,))
+                conn.execute("COMMIT")
+                return filas
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def confirmar_resumen(self, filas: List[Dict[str, Any]]):
+        """
+        Descuenta las apariciones incluidas en un resumen ya enviado.
+
+        Args:
+            filas: Filas devueltas por reclamar_resumen
+        """
+        if not filas:
+            return
+        with closing(self._conectar()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "UPDATE suprimidas SET veces = veces - ? WHERE clave = ?",
+                    [(f['veces'], f['clave']) for f in filas],
+                )
+                conn.execute("DELETE FROM suprimidas WHERE veces <= 0")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def total_suprimidas(self) -> int:
+        """Número de apariciones suprimidas pendientes de resumir."""
+        with closing(self._conectar()) as conn:
+            (total,) = conn.execute("SELECT COALESCE(SUM(veces), 0) FROM suprimidas").fetchone()
+        return int(total)
+
+
+def crear_limitador_alertas(config: Optional[dict] = None,
+                            ruta_bd: Optional[Path] = None) -> LimitadorAlertas:
+    """
+    Crea un limitador de alertas a partir de la sección 'alertas' de la configuración.
+
+    Claves reconocidas: ventana_spam_segundos (3600), max_por_ventana (1) e
+    intervalo_resumen_suprimidas_segundos (21600).
+
+    Args:
+        config: Configuración del sistema
+        ruta_bd: Ruta al fichero SQLite (por defecto data/estado_alertas.db)
+
+    Returns:
+        LimitadorAlertas: Instancia del limitador
+    """
+    alertas = (config or {}).get('alertas', {})
+    return LimitadorAlertas(
+        ruta_bd=ruta_bd,
+        ventana_segundos=alertas.get('ventana_spam_segundos', 3600),
+        max_por_ventana=alertas.get('max_por_ventana', 1),
+        intervalo_resumen=alertas.get('intervalo_resumen_suprimidas_segundos', 6 * 3600),
+    )
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Módulo ManifiestoEntradas - Inventario de los ficheros de entrada y salida
+
+Cada cargador buscaba sus ficheros por su cuenta: buscar_archivo_abc_seccion()
+hacía hasta cinco glob por sección y los ordenaba con os.path.getmtime,
+encontrar_archivo_semana_anterior() recorría Pedidos_semanales para cada
+sección, resolver_entrada() probaba seis extensiones con os.stat y los
+informes volvían a buscar CLASIFICACION_ABC+D_*.
+
+El manifiesto lista cada directorio una sola vez con os.scandir y guarda de
+cada fichero su tamaño, fecha de modificación y lo que dice su nombre:
+
+    CLASIFICACION_ABC+D_DECO_EXTERIOR_P1_2025.xlsx  tipo clasificacion_abc, sección, período, año
+    Pedido_Semana_08_17022026_interior.xlsx          tipo pedido, semana, fecha, sección
+    Pedido_Semana_08_17022026_Tienda-centro_interior.xlsx  ídem y tienda
+    Resumen_Pedidos_interior_17022026.xlsx           tipo resumen_pedidos, sección, fecha
+    SPA_stock_P2.xlsx                                tipo stock_periodo, período
+    SPA_ventas_semana.csv                            tipo ventas_semana
+
+Las búsquedas (buscar, mas_reciente, glob, existe) se resuelven sobre ese
+inventario con la misma sintaxis de patrones que glob. Un directorio se
+vuelve a listar solo si cambia su fecha de modificación (se ha creado,
+borrado o renombrado algún fichero) o si se llama a escanear().
+
+Uso:
+    from src.manifiesto_entradas import obtener_manifiesto
+
+    manifiesto = obtener_manifiesto()
+    ruta = manifiesto.mas_reciente(INPUT_DIR, 'CLASIFICACION_ABC+D_VIVERO_P2_*.xlsx')
+    abc = manifiesto.filtrar(INPUT_DIR, tipo='clasificacion_abc', periodo='P2')
+
+    python -m src.manifiesto_entradas              # Inventario de data/input y de las salidas
+
+No importa pandas: main.py lo usa antes de cargar los motores de cálculo.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import fnmatch
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+Ruta = Union[str, Path]
+
+# Nombre (sin extensión) -> tipo de fichero y campos que se extraen de él
+PATRONES_NOMBRE: Tuple[Tuple[str, re.Pattern], ...] = (
+    ('clasificacion_abc', re.compile(
+        r'^CLASIFICACION_ABC\+D_(?P<seccion>.+?)(?:_(?P<periodo>P\d))?(?:_(?P<año>\d{4}))?$', re.IGNORECASE)),
+    ('pedido', re.compile(
+        r'^Pedido_Semana_(?P<semana>\d{1,2})(?:_(?P<fecha>\d{8}))?(?:_Tienda-(?P<tienda>[^_]+))?'
+        r'(?:_(?P<seccion>.+))?$', re.IGNORECASE)),
+    ('resumen_pedidos', re.compile(
+        r'^Resumen_Pedidos_(?:Tienda-(?P<tienda>[^_]+)_)?(?P<seccion>.+?)(?:_(?P<fecha>\d{8}))?$', re.IGNORECASE)),
+    ('stock_periodo', re.compile(r'^SPA_stock_(?P<periodo>P\d)$', re.IGNORECASE)),
+)
+
+# Ficheros del ERP: SPA_<tipo>[_fecha]
+PATRON_SPA = re.compile(r'^SPA_(?P<tipo>[A-Za-z_]+?)(?:_(?P<fecha>\d{8}|\d{4}-\d{2}-\d{2}))?$')
+
+# Fecha en cualquier otro nombre (DDMMAAAA o AAAA-MM-DD)
+PATRON_FECHA = re.compile(r'(?<!\d)(\d{8}|\d{4}-\d{2}-\d{2})(?!\d)')
+
+# Un directorio modificado hace menos de esto se vuelve a listar en la
+# siguiente consulta: la fecha de modificación tiene una resolución de
+# milisegundos y un fichero creado justo después de listarlo no la cambiaría
+MARGEN_FIRMA_NS = 2_000_000_000
+
+
+@dataclass(frozen=True)
+class EntradaManifiesto:
+    """Un fichero del manifiesto con los datos sacados de su nombre."""
+    ruta: str
+    nombre: str
+    extension: str
+    tamaño: int
+    mtime_ns: int
+    tipo: Optional[str] = None
+    seccion: Optional[str] = None
+    periodo: Optional[str] = None
+    año: Optional[int] = None
+    semana: Optional[int] = None
+    fecha: Optional[datetime] = None
+    tienda: Optional[str] = None
+
+    @property
+    def clave(self) -> Tuple[str, int, int]:
+        """(ruta absoluta, tamaño, mtime), la clave de las cachés de lectura."""
+        return (self.ruta, self.tamaño, self.mtime_ns)
+
+
+def _fecha_nombre(texto: Optional[str]) -> Optional[datetime]:
+    if not texto:
+        return None
+    formato = '%Y-%m-%d' if '-' in texto else '%d%m%Y'
+    try:
+        return datetime.strptime(texto, formato)
+    except ValueError:
+        return None
+
+
+def analizar_nombre(nombre: str) -> Dict[str, Any]:
+    """
+    Tipo, sección, período, año, semana, fecha y tienda que indica un nombre de fichero.
+
+    Returns:
+        Dict con los campos reconocidos (vacío si el nombre no sigue ningún
+        formato conocido y no lleva fecha)
+    """
+    base = os.path.splitext(nombre)[0]
+    for tipo, patron in PATRONES_NOMBRE:
+        coincidencia = patron.match(base)
+        if coincidencia:
+            grupos = coincidencia.groupdict()
+            campos: Dict[str, Any] = {'tipo': tipo}
+            if grupos.get('seccion'):
+                campos['seccion'] = grupos['seccion']
+            if grupos.get('periodo'):
+                campos['periodo'] = grupos['periodo'].upper()
+            if grupos.get('año'):
+                campos['año'] = int(grupos['año'])
+            if grupos.get('semana'):
+                campos['semana'] = int(grupos['semana'])
+            if grupos.get('tienda'):
+                campos['tienda'] = grupos['tienda']
+            fecha = _fecha_nombre(grupos.get('fecha'))
+            if fecha is not None:
+                campos['fecha'] = fecha
+                campos.setdefault('año', fecha.year)
+            return campos
+
+    coincidencia = PATRON_SPA.match(base)
+    if coincidencia:
+        campos = {'tipo': coincidencia.group('tipo').lower()}
+        fecha = _fecha_nombre(coincidencia.group('fecha'))
+        if fecha is not None:
+            campos['fecha'] = fecha
+        return campos
+
+    coincidencia = PATRON_FECHA.search(base)
+    fecha = _fecha_nombre(coincidencia.group(1)) if coincidencia else None
+    return {'fecha': fecha} if fecha is not None else {}
+
+
+def _coincide(nombre: str, patron: str) -> bool:
+    # Como glob: '*' no encuentra ficheros ocultos salvo que el patrón empiece por '.'
+    if nombre.startswith('.') and not patron.startswith('.'):
+        return False
+    return fnmatch.fnmatch(nombre, patron)
+
+
+class _Directorio:
+    """Contenido listado de un directorio."""
+    __slots__ = ('firma', 'entradas')
+
+    def __init__(self, firma: Optional[int], entradas: Dict[str, EntradaManifiesto]):
+        self.firma = firma
+        self.entradas = entradas
+
+
+class ManifiestoEntradas:
+    """
+    Inventario de los ficheros de varios directorios, compartido por el proceso.
+
+    Attributes:
+        directorios (List[Path]): Directorios que escanear() lista de una vez; el
+            resto se listan la primera vez que se consultan
+    """
+
+    def __init__(self, directorios: Optional[Iterable[Ruta]] = None):
+        if directorios is None:
+            from src.paths import (INPUT_DIR, PEDIDOS_SEMANALES_DIR, PEDIDOS_SEMANALES_RESUMEN_DIR,
+                                   RESUMENES_DIR)
+            directorios = (INPUT_DIR, PEDIDOS_SEMANALES_DIR, PEDIDOS_SEMANALES_RESUMEN_DIR, RESUMENES_DIR)
+        self.directorios = [Path(d) for d in directorios]
+        self._directorios: Dict[str, _Directorio] = {}
+        self._bloqueo = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # ESCANEO
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _firma(directorio: str) -> Optional[int]:
+        try:
+            return os.stat(directorio).st_mtime_ns
+        except OSError:
+            return None
+
+    def _listar(self, directorio: str, firma: Optional[int]) -> _Directorio:
+        entradas: Dict[str, EntradaManifiesto] = {}
+        if firma is not None:
+            try:
+                with os.scandir(directorio) as iterador:
+                    for elemento in iterador:
+                        try:
+                            if not elemento.is_file():
+                                continue
+                            estado = elemento.stat()
+                        except OSError:
+                            continue
+                        entradas[elemento.name] = EntradaManifiesto(
+                            ruta=os.path.join(directorio, elemento.name),
+                            nombre=elemento.name,
+                            extension=os.path.splitext(elemento.name)[1].lower(),
+                            tamaño=estado.st_size,
+                            mtime_ns=estado.st_mtime_ns,
+                            **analizar_nombre(elemento.name),
+                        )
+            except OSError as e:
+                logger.warning(f"No se pudo listar {directorio}: {e}")
+        if firma is not None and time.time_ns() - firma < MARGEN_FIRMA_NS:
+            firma = -1
+        listado = _Directorio(firma, entradas)
+        self._directorios[directorio] = listado
+        return listado
+
+    def escanear(self, directorios: Optional[Iterable[Ruta]] = None) -> int:
+        """
+        Vuelve a listar los directorios (por defecto los del manifiesto).
+
+        Returns:
+            int: Ficheros inventariados
+        """
+        total = 0
+        with self._bloqueo:
+            for directorio in (self.directorios if directorios is None else directorios):
+                clave = os.path.abspath(directorio)
+                total += len(self._listar(clave, self._firma(clave)).entradas)
+        logger.debug(f"Manifiesto de entradas: {total} ficheros")
+        return total
+
+    def entradas(self, directorio: Ruta) -> Dict[str, EntradaManifiesto]:
+        """Ficheros de un directorio por nombre (se lista de nuevo si ha cambiado)."""
+        clave = os.path.abspath(directorio)
+        firma = self._firma(clave)
+        with self._bloqueo:
+            listado = self._directorios.get(clave)
+            if listado is None or listado.firma != firma:
+                listado = self._listar(clave, firma)
+            return listado.entradas
+
+    # ------------------------------------------------------------------
+    # CONSULTAS
+    # ------------------------------------------------------------------
+
+    def buscar(self, directorio: Ruta, patron: str = '*') -> List[EntradaManifiesto]:
+        """
+        Ficheros del directorio que encajan con un patrón de glob, del más
+        reciente al más antiguo (como glob + sort por getmtime descendente).
+        """
+        encontradas = [e for nombre, e in self.entradas(directorio).items() if _coincide(nombre, patron)]
+        # A igual fecha, el último por nombre (P2 antes que P1, 2026 antes que 2025)
+        encontradas.sort(key=lambda e: (e.mtime_ns, e.nombre), reverse=True)
+        return encontradas
+
+    def mas_reciente(self, directorio: Ruta, patron: str) -> Optional[str]:
+        """Ruta del fichero más reciente que encaja con el patrón, o None."""
+        encontradas = self.buscar(directorio, patron)
+        return encontradas[0].ruta if encontradas else None
+
+    def glob(self, patron: Ruta) -> List[str]:
+        """Equivalente a glob.glob(patron) para un patrón sin comodines en el directorio."""
+        directorio, nombre = os.path.split(str(patron))
+        return sorted(os.path.join(directorio, e.nombre) for e in self.buscar(directorio or '.', nombre))
+
+    def entrada(self, ruta: Ruta) -> Optional[EntradaManifiesto]:
+        """Entrada de un fichero (con las mayúsculas que da el sistema de ficheros), o None."""
+        directorio, nombre = os.path.split(str(ruta))
+        entradas = self.entradas(directorio or '.')
+        if nombre in entradas:
+            return entradas[nombre]
+        if os.path.normcase('A') != 'A':
+            # Windows: el nombre pedido puede diferir en mayúsculas del real
+            normalizado = os.path.normcase(nombre)
+            for candidato, entrada in entradas.items():
+                if os.path.normcase(candidato) == normalizado:
+                    return entrada
+        return None
+
+    def existe(self, ruta: Ruta) -> bool:
+        return self.entrada(ruta) is not None
+
+    def filtrar(self, directorio: Ruta, tipo: Optional[str] = None, **campos: Any) -> List[EntradaManifiesto]:
+        """
+        Ficheros del directorio de un tipo y con los campos indicados
+        (seccion, periodo, año, semana...; la sección sin distinguir mayúsculas),
+        del más reciente al más antiguo.
+        """
+        encontradas = []
+        for entrada in self.buscar(directorio):
+            if tipo is not None and entrada.tipo != tipo:
+                continue
+            if all((str(getattr(entrada, campo) or '').lower() == str(valor).lower()) if campo == 'seccion'
+                   else getattr(entrada, campo) == valor for campo, valor in campos.items()):
+                encontradas.append(entrada)
+        return encontradas
+
+    def resumen(self) -> Dict[str, Dict[str, int]]:
+        """Ficheros por tipo de cada directorio listado."""
+        with self._bloqueo:
+            listados = dict(self._directorios)
+        resultado = {}
+        for directorio, listado in listados.items():
+            por_tipo: Dict[str, int] = {}
+            for entrada in listado.entradas.values():
+                por_tipo[entrada.tipo or 'otros'] = por_tipo.get(entrada.tipo or 'otros', 0) + 1
+            resultado[directorio] = por_tipo
+        return resultado
+
+
+_MANIFIESTO: Optional[ManifiestoEntradas] = None
+_BLOQUEO_MANIFIESTO = threading.Lock()
+
+
+def crear_manifiesto(directorios: Optional[Iterable[Ruta]] = None) -> ManifiestoEntradas:
+    """
+    Crea un manifiesto independiente y lista sus directorios.
+
+    Args:
+        directorios: Directorios que listar (por defecto data/input y las salidas
+            de pedidos y resúmenes)
+
+    Returns:
+        ManifiestoEntradas: Nuevo manifiesto ya escaneado
+    """
+    manifiesto = ManifiestoEntradas(directorios)
+    manifiesto.escanear()
+    return manifiesto
+
+
+def obtener_manifiesto() -> ManifiestoEntradas:
+    """Devuelve el manifiesto del proceso (lo crea y escanea la primera vez)."""
+    global _MANIFIESTO
+    if _MANIFIESTO is None:
+        with _BLOQUEO_MANIFIESTO:
+            if _MANIFIESTO is None:
+                _MANIFIESTO = crear_manifiesto()
+    return _MANIFIESTO
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inventario de los ficheros de entrada y de salida')
+    parser.add_argument('directorios', nargs='*', help='Directorios (default: data/input y salidas de pedidos)')
+    parser.add_argument('--tipo', type=str, default=None, help='Mostrar solo un tipo (clasificacion_abc, pedido...)')
+    args = parser.parse_args()
+
+    manifiesto = crear_manifiesto(args.directorios or None)
+    for directorio in manifiesto.directorios:
+        entradas = manifiesto.filtrar(directorio, tipo=args.tipo)
+        print(f"\n{directorio} ({len(entradas)} ficheros)")
+        for e in sorted(entradas, key=lambda e: e.nombre):
+            campos = ' '.join(f"{campo}={getattr(e, campo)}" for campo in ('seccion', 'periodo', 'año', 'semana')
+                              if getattr(e, campo) is not None)
+            fecha = f" fecha={e.fecha:%Y-%m-%d}" if e.fecha else ''
+            modificado = datetime.fromtimestamp(e.mtime_ns / 1e9).strftime('%Y-%m-%d %H:%M')
+            print(f"  {e.nombre:<58} {e.tipo or '-':<18} {campos}{fecha}  {e.tamaño / 1024:,.0f} KB  {modificado}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
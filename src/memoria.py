@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Módulo Memoria - Modo de ejecución con menos memoria
+
+Con los ficheros de ventas de un año completo el pedido y la clasificación
+ABC mantienen varias copias completas de los mismos DataFrames: columnas de
+texto repetitivo (Seccion, Categoria, Tipo registro, Nombre...) como objetos
+de Python y un .copy() defensivo en casi cada paso.
+
+Este módulo reúne las dos medidas:
+
+- copia_defensiva(df): con copy-on-write activo (siempre en pandas >= 3, y en
+  pandas 2.x al activar el modo) devuelve una copia superficial, que solo copia
+  los datos de una columna cuando alguien la modifica; sin copy-on-write hace
+  el .copy() de siempre. Sustituye a los .copy() defensivos del pipeline.
+- reducir_memoria(df): en el modo de memoria reducida convierte las columnas
+  de texto repetitivo a category y los enteros de calendario a enteros
+  pequeños. Fuera del modo no cambia nada. Las columnas que el pipeline
+  rellena o reescribe con texto se quedan como están (ver
+  COLUMNAS_CATEGORICAS); benchmarks/bench_pipeline.py --equivalencia-memoria
+  comprueba que el modo no cambia las salidas.
+
+El modo se activa con --memoria-reducida en main.py y clasificacionABC.py
+(activar_modo_memoria_reducida()).
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import logging
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+# Columnas de texto con pocos valores distintos que se guardan como category.
+# Talla, Color y Proveedor no están: el pipeline los rellena con '' (fillna(''),
+# where(..., '')) o les asigna texto, y en una category eso da TypeError en
+# pandas >= 2 en cuanto el valor no es una de sus categorías. Las versiones ya
+# normalizadas de clasificacionABC.py (talla_str, color_str) sí se convierten.
+COLUMNAS_CATEGORICAS = (
+    'Seccion', 'Categoria', 'Tipo registro', 'Nombre',
+    'Nombre artículo', 'Serie', 'talla_str', 'color_str', 'nombre_str',
+)
+
+# Enteros de calendario y códigos que caben en int16
+COLUMNAS_ENTERAS = ('Semana', 'Año', 'Mes', 'Vendedor')
+
+# Solo se convierte a category si hay como mucho esta fracción de valores distintos
+FRACCION_MAXIMA_CATEGORIAS = 0.5
+
+_modo_reducido = False
+
+
+def _version_pandas() -> int:
+    return int(pd.__version__.split('.')[0])
+
+
+def copy_on_write_activo() -> bool:
+    """True si pandas trabaja con copy-on-write (siempre desde pandas 3)."""
+    if _version_pandas() >= 3:
+        return True
+    try:
+        return bool(pd.get_option('mode.copy_on_write'))
+    except (KeyError, pd.errors.OptionError):
+        return False
+
+
+def activar_copy_on_write() -> bool:
+    """
+    Activa copy-on-write en pandas 2.x (en pandas 3 ya lo está).
+
+    Returns:
+        bool: True si queda activo (pandas < 2 no lo soporta)
+    """
+    if copy_on_write_activo():
+        return True
+    try:
+        pd.set_option('mode.copy_on_write', True)
+        return True
+    except (KeyError, pd.errors.OptionError):
+        logger.warning(f"pandas {pd.__version__} no soporta copy-on-write: se mantienen las copias defensivas")
+        return False
+
+
+def activar_modo_memoria_reducida():
+    """Activa copy-on-write y la reducción de tipos en los cargadores."""
+    global _modo_reducido
+    _modo_reducido = True
+    activar_copy_on_write()
+    logger.info("Modo de memoria reducida activo (category, enteros pequeños y copy-on-write)")
+
+
+def modo_memoria_reducida() -> bool:
+    return _modo_reducido
+
+
+def copia_defensiva(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """
+    Copia de un DataFrame que se puede modificar sin afectar al original.
+
+    Con copy-on-write basta una copia superficial: los datos se comparten hasta
+    que una de las dos partes escribe en una columna.
+    """
+    if df is None:
+        return None
+    return df.copy(deep=False) if copy_on_write_activo() else df.copy()
+
+
+def reducir_memoria(df: Optional[pd.DataFrame], categoricas: Iterable[str] = COLUMNAS_CATEGORICAS,
+                    enteras: Iterable[str] = COLUMNAS_ENTERAS) -> Optional[pd.DataFrame]:
+    """
+    Convierte columnas de texto repetitivo a category y enteros de calendario a int16.
+
+    Solo actúa en el modo de memoria reducida. Las columnas con demasiados
+    valores distintos (más de FRACCION_MAXIMA_CATEGORIAS de las filas) se dejan
+    como están, igual que las enteras con valores fuera del rango de int16.
+
+    Args:
+        df: DataFrame a reducir (se modifica y se devuelve)
+        categoricas: Columnas candidatas a category
+        enteras: Columnas candidatas a int16
+
+    Returns:
+        El mismo DataFrame
+    """
+    if df is None or not _modo_reducido or len(df) == 0:
+        return df
+
+    medir = logger.isEnabledFor(logging.DEBUG)
+    antes = df.memory_usage(deep=True).sum() if medir else 0
+    for columna in categoricas:
+        if columna not in df.columns or isinstance(df[columna].dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_object_dtype(df[columna]) or pd.api.types.is_string_dtype(df[columna]):
+            if df[columna].nunique(dropna=True) <= len(df) * FRACCION_MAXIMA_CATEGORIAS:
+                df[columna] = df[columna].astype('category')
+    for columna in enteras:
+        if columna in df.columns and pd.api.types.is_integer_dtype(df[columna]):
+            if df[columna].abs().max() < 2 ** 15:
+                df[columna] = df[columna].astype('int16')
+    if medir:
+        despues = df.memory_usage(deep=True).sum()
+        logger.debug(f"Memoria reducida: {antes / 2**20:.1f} MB -> {despues / 2**20:.1f} MB")
+    return df
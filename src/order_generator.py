@@ -20,26 +20,15 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
 from openpyxl.utils.dataframe import dataframe_to_rows
 from src.paths import INPUT_DIR, OUTPUT_DIR, PEDIDOS_SEMANALES_DIR, PEDIDOS_SEMANALES_RESUMEN_DIR, RESUMENES_DIR
+from src.tiendas import etiqueta_tienda
 from openpyxl.worksheet.page import PageMargins
 
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
-# Intentamos importar el servicio de alertas (si está disponible)
+# Servicio de alertas compartido por todos los módulos (si está disponible)
 try:
-    from src.alert_service import crear_alert_service
-    ALERT_SERVICE = None
-    def get_alert_service():
-        global ALERT_SERVICE
-        if ALERT_SERVICE is None:
-            try:
-                from src.config_loader import cargar_configuracion
-                config = cargar_configuracion()
-                if config:
-                    ALERT_SERVICE = crear_alert_service(config)
-            except:
-                pass
-        return ALERT_SERVICE
+    from src.alert_service import obtener_alert_service_compartido as get_alert_service
 except ImportError:
     def get_alert_service():
         return None
@@ -69,6 +58,8 @@ class OrderGenerator:
         self.config = config
         self.rutas = config.get('rutas', {})
         self.formato = config.get('formato_salida', {})
+        # 'Tienda-<codigo>' con varias tiendas, para distinguir sus ficheros
+        self.tienda = etiqueta_tienda(config)
         
         # Estilos predefinidos
         self.HEADER_FILL = PatternFill(start_color="008000", end_color="008000", fill_type="solid")
@@ -131,11 +122,34 @@ class OrderGenerator:
         
         return salida
     
+    def obtener_directorio_resumen_pedidos(self) -> str:
+        """
+        Obtiene el directorio del resumen consolidado de los pedidos semanales.
+        
+        Returns:
+            str: Ruta del directorio (rutas.directorio_resumen_pedidos o la centralizada)
+        """
+        base = self.rutas.get('directorio_base', '.')
+        salida = self.rutas.get('directorio_resumen_pedidos')
+        
+        if salida is None:
+            salida = str(PEDIDOS_SEMANALES_RESUMEN_DIR)
+        
+        if not os.path.isabs(salida):
+            salida = os.path.join(base, salida)
+        
+        os.makedirs(salida, exist_ok=True)
+        
+        return salida
+    
     def generar_nombre_archivo(self, semana: int, seccion: Optional[str] = None,
                                 incluir_fecha: bool = True) -> str:
         """
         Genera el nombre del archivo según el formato configurado.
         
+        Con varias tiendas el código de la tienda va tras la fecha:
+        Pedido_Semana_08_17022026_Tienda-centro_interior.xlsx
+        
         Args:
             semana (int): Número de semana
             seccion (Optional[str]): Nombre de la sección (si aplica)
@@ -152,6 +166,9 @@ class OrderGenerator:
         else:
             nombre = f"{prefijo}_{semana:02d}"
         
+        if self.tienda:
+            nombre += f"_{self.tienda}"
+        
         if seccion:
             nombre += f"_{seccion}"
         
@@ -471,8 +488,9 @@ class OrderGenerator:
             return None
         
         # Generar nombre del archivo - usar directorio específico para resúmenes
-        dir_salida = str(PEDIDOS_SEMANALES_RESUMEN_DIR)
-        nombre_archivo = f"Resumen_Pedidos_{seccion}_{datetime.now().strftime('%d%m%Y')}.xlsx"
+        dir_salida = self.obtener_directorio_resumen_pedidos()
+        tienda = f"{self.tienda}_" if self.tienda else ''
+        nombre_archivo = f"Resumen_Pedidos_{tienda}{seccion}_{datetime.now().strftime('%d%m%Y')}.xlsx"
         ruta_completa = os.path.join(dir_salida, nombre_archivo)
         
         logger.info(f"Generando resumen: {ruta_completa}")
@@ -600,7 +618,8 @@ class OrderGenerator:
         
         # Generar nombre del archivo
         dir_salida = self.obtener_directorio_salida()
-        nombre_archivo = f"Pedido_Semana_{semana:02d}_{seccion}_{datetime.now().strftime('%d%m%Y')}.csv"
+        tienda = f"{self.tienda}_" if self.tienda else ''
+        nombre_archivo = f"Pedido_Semana_{semana:02d}_{tienda}{seccion}_{datetime.now().strftime('%d%m%Y')}.csv"
         ruta_completa = os.path.join(dir_salida, nombre_archivo)
         
         try:
@@ -0,0 +1,714 @@
+#!/usr/bin/env python3
+"""
+Módulo Orquestador - Pipeline semanal como grafo de dependencias
+
+Sustituye las tareas programadas independientes (una por script, cada una en
+un proceso Python nuevo que vuelve a leer los mismos Excel del ERP) por un
+único proceso que:
+
+- Declara cada paso (clasificacionABC, main, INFORME, PRESENTACION, análisis
+  C y D, comparación y los dos informes de auditoría) con sus dependencias y
+  sus artefactos de entrada y salida.
+- Ejecuta los scripts en el mismo proceso, compartiendo en memoria los Excel
+  y CSV leídos con pd.read_excel/pd.read_csv (cada paso recibe su propia copia).
+- Ejecuta en paralelo las ramas independientes (p. ej. INFORME, PRESENTACION
+  y el análisis C y D en cuanto termina la clasificación ABC).
+- Omite los pasos cuyas entradas no han cambiado desde su última ejecución
+  correcta (huella de ruta, tamaño y fecha de modificación).
+
+La salida de cada paso se guarda en logs/pipeline/<fecha>/<paso>.log y el
+resultado en data/estado_pipeline.json.
+
+Uso:
+    from src.orquestador import crear_pipeline_semanal
+
+    pipeline = crear_pipeline_semanal()
+    resultados = pipeline.ejecutar()
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import builtins
+import glob
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable
+
+from src.paths import (
+    BASE_DIR, INPUT_DIR, PEDIDOS_SEMANALES_DIR, INFORMES_DIR, PRESENTACIONES_DIR,
+    ANALISIS_CATEGORIA_CD_DIR, COMPARACION_CATEGORIA_CD_DIR, COMPRAS_SIN_AUTORIZACION_DIR,
+    ARTICULOS_NO_COMPRADOS_DIR, PATRON_CLASIFICACION_ABC, ESTADO_PIPELINE, PIPELINE_LOGS_DIR
+)
+from src.perfilado import tramo
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+# Estados posibles de un paso
+ESTADO_OK = 'ok'                  # Ejecutado sin errores
+ESTADO_OMITIDO = 'omitido'        # Entradas sin cambios desde la última ejecución correcta
+ESTADO_NO_TOCA = 'no_toca'        # Su condición de calendario no se cumple
+ESTADO_ERROR = 'error'            # Terminó con excepción o código de salida distinto de 0
+ESTADO_BLOQUEADO = 'bloqueado'    # No se ejecuta porque falló una dependencia
+
+ESTADOS_CORRECTOS = (ESTADO_OK, ESTADO_OMITIDO, ESTADO_NO_TOCA)
+
+# Meses en los que se regenera la clasificación ABC (inicio de P1, P2, P3 y P4,
+# mismo calendario que las tareas de crear_tareas_programadas.py)
+MESES_CLASIFICACION = (1, 2, 5, 8)
+
+MARCA_CRON = '# viveverde-pipeline-semanal'
+
+
+# ============================================================================
+# E/S POR HILO: argv y salida estándar de cada paso
+# ============================================================================
+
+class _ArgvPorHilo(list):
+    """
+    Sustituto de sys.argv que devuelve los argumentos del paso que se ejecuta
+    en el hilo actual. Fuera de un paso se comporta como el sys.argv original.
+    """
+
+    def __init__(self, original: List[str]):
+        super().__init__(original)
+        self._local = threading.local()
+
+    def _actual(self) -> list:
+        return getattr(self._local, 'argv', None) or super().__getitem__(slice(None))
+
+    def establecer(self, argv: Optional[List[str]]):
+        self._local.argv = argv
+
+    def __getitem__(self, i):
+        return self._actual()[i]
+
+    def __setitem__(self, i, valor):
+        argv = getattr(self._local, 'argv', None)
+        if argv is None:
+            super().__setitem__(i, valor)
+        else:
+            argv[i] = valor
+
+    def __len__(self):
+        return len(self._actual())
+
+    def __iter__(self):
+        return iter(self._actual())
+
+    def __contains__(self, valor):
+        return valor in self._actual()
+
+    def __repr__(self):
+        return repr(self._actual())
+
+
+class _SalidaPorHilo:
+    """Sustituto de sys.stdout/sys.stderr que escribe en el log del paso del hilo actual."""
+
+    def __init__(self, original):
+        self._original = original
+        self._local = threading.local()
+
+    def establecer(self, destino):
+        self._local.destino = destino
+
+    def _actual(self):
+        return getattr(self._local, 'destino', None) or self._original
+
+    def write(self, texto):
+        return self._actual().write(texto)
+
+    def flush(self):
+        self._actual().flush()
+
+    def __getattr__(self, nombre):
+        return getattr(self._actual(), nombre)
+
+
+# ============================================================================
+# DATASETS COMPARTIDOS
+# ============================================================================
+
+class CacheDatasets:
+    """
+    Caché en memoria de los Excel y CSV leídos con pd.read_excel y pd.read_csv
+    durante el pipeline.
+
+    La clave incluye la ruta, la fecha de modificación, el tamaño y los
+    argumentos de lectura, así que un fichero reescrito por un paso se vuelve
+    a leer. Cada llamada recibe una copia del DataFrame, de modo que un paso no
+    puede modificar los datos de otro. Si dos pasos piden el mismo fichero a
+    la vez, solo uno lo lee y el otro espera.
+    """
+
+    def __init__(self):
+        self._datos: Dict[tuple, Any] = {}
+        self._bloqueos: Dict[tuple, threading.Lock] = {}
+        self._bloqueo = threading.Lock()
+        self.aciertos = 0
+        self.lecturas = 0
+
+    @staticmethod
+    def _clave(ruta: Any, args: tuple, kwargs: dict) -> Optional[tuple]:
+        if not isinstance(ruta, (str, os.PathLike)):
+            return None
+        try:
+            ruta_abs = Path(ruta).resolve()
+            estado = ruta_abs.stat()
+            return (str(ruta_abs), estado.st_mtime_ns, estado.st_size,
+                    repr(args), repr(sorted(kwargs.items())))
+        except (OSError, TypeError):
+            return None
+
+    @staticmethod
+    def _copiar(datos):
+        if isinstance(datos, dict):
+            return {hoja: df.copy() for hoja, df in datos.items()}
+        return datos.copy()
+
+    def leer_excel(self, lector: Callable, ruta, *args, **kwargs):
+        """Lee un Excel o CSV con `lector` (pd.read_excel/pd.read_csv original) usando la caché."""
+        clave = self._clave(ruta, args, kwargs)
+        if clave is None:
+            return lector(ruta, *args, **kwargs)
+
+        with self._bloqueo:
+            bloqueo = self._bloqueos.setdefault(clave, threading.Lock())
+        with bloqueo:
+            if clave in self._datos:
+                self.aciertos += 1
+            else:
+                self._datos[clave] = lector(ruta, *args, **kwargs)
+                self.lecturas += 1
+            return self._copiar(self._datos[clave])
+
+    def limpiar(self):
+        """Libera los datasets en memoria."""
+        with self._bloqueo:
+            self._datos.clear()
+            self._bloqueos.clear()
+
+    @contextmanager
+    def instalada(self):
+        """Sustituye pd.read_excel y pd.read_csv por versiones con caché mientras dure el bloque."""
+        import pandas as pd  # diferido: el plan y la instalación de cron no lo necesitan
+
+        original = pd.read_excel
+        original_csv = pd.read_csv
+
+        def read_excel(ruta, *args, **kwargs):
+            return self.leer_excel(original, ruta, *args, **kwargs)
+
+        def read_csv(ruta, *args, **kwargs):
+            return self.leer_excel(original_csv, ruta, *args, **kwargs)
+
+        pd.read_excel = read_excel
+        pd.read_csv = read_csv
+        try:
+            yield self
+        finally:
+            pd.read_excel = original
+            pd.read_csv = original_csv
+            self.limpiar()
+
+
+# ============================================================================
+# DEFINICIÓN DE PASOS
+# ============================================================================
+
+@dataclass
+class Paso:
+    """
+    Paso del pipeline: un script del proyecto con sus dependencias y artefactos.
+
+    Attributes:
+        nombre: Identificador del paso
+        script: Script a ejecutar (relativo a BASE_DIR)
+        argumentos: Argumentos de línea de comandos del script
+        depende_de: Pasos que deben terminar correctamente antes
+        entradas: Ficheros o patrones glob que lee (para la huella)
+        salidas: Ficheros o patrones glob que genera
+        condicion: Función (fecha) -> bool; si devuelve False el paso no toca
+        descripcion: Texto para el plan y los logs
+    """
+    nombre: str
+    script: str
+    argumentos: List[str] = field(default_factory=list)
+    depende_de: List[str] = field(default_factory=list)
+    entradas: List[str] = field(default_factory=list)
+    salidas: List[str] = field(default_factory=list)
+    condicion: Optional[Callable[[datetime], bool]] = None
+    descripcion: str = ''
+
+
+@dataclass
+class ResultadoPaso:
+    """Resultado de un paso en una ejecución del pipeline."""
+    nombre: str
+    estado: str
+    motivo: str = ''
+    duracion_s: float = 0.0
+    codigo_salida: Optional[int] = None
+    huella: str = ''
+    log: str = ''
+
+
+def _expandir(patrones: List[str]) -> List[str]:
+    rutas = set()
+    for patron in patrones:
+        if glob.has_magic(patron):
+            rutas.update(glob.glob(patron))
+        elif os.path.exists(patron):
+            rutas.add(patron)
+    return sorted(rutas)
+
+
+def calcular_huella(paso: Paso) -> str:
+    """
+    Huella de las entradas de un paso: ruta, tamaño y fecha de modificación
+    de cada fichero, más el script y sus argumentos.
+
+    Args:
+        paso: Paso a evaluar
+
+    Returns:
+        str: Hash SHA-256 en hexadecimal
+    """
+    h = hashlib.sha256()
+    for ruta in [str(BASE_DIR / paso.script), *_expandir(paso.entradas)]:
+        try:
+            estado = os.stat(ruta)
+            h.update(f"{ruta}|{estado.st_size}|{estado.st_mtime_ns}\n".encode('utf-8'))
+        except OSError:
+            h.update(f"{ruta}|ausente\n".encode('utf-8'))
+    h.update(repr(paso.argumentos).encode('utf-8'))
+    return h.hexdigest()
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class Pipeline:
+    """
+    Grafo de pasos que se ejecuta en un único proceso.
+
+    Attributes:
+        pasos (dict): Pasos por nombre, en el orden de declaración
+        max_hilos (int): Pasos que pueden ejecutarse a la vez
+        ruta_estado (Path): Fichero JSON con la huella y el resultado de cada paso
+        dir_logs (Path): Directorio base de los logs de cada ejecución
+    """
+
+    def __init__(self, pasos: List[Paso], max_hilos: int = 4,
+                 ruta_estado: Path = ESTADO_PIPELINE, dir_logs: Path = PIPELINE_LOGS_DIR):
+        self.pasos = {paso.nombre: paso for paso in pasos}
+        self.max_hilos = max(1, max_hilos)
+        self.ruta_estado = Path(ruta_estado)
+        self.dir_logs = Path(dir_logs)
+        self._bloqueo_estado = threading.Lock()
+        self._orden = self._ordenar()
+
+    def _ordenar(self) -> List[str]:
+        """Orden topológico; valida dependencias desconocidas y ciclos."""
+        for paso in self.pasos.values():
+            for dependencia in paso.depende_de:
+                if dependencia not in self.pasos:
+                    raise ValueError(f"El paso '{paso.nombre}' depende de '{dependencia}', que no existe")
+
+        orden, visitando, visitados = [], set(), set()
+
+        def visitar(nombre):
+            if nombre in visitados:
+                return
+            if nombre in visitando:
+                raise ValueError(f"Dependencia circular en el paso '{nombre}'")
+            visitando.add(nombre)
+            for dependencia in self.pasos[nombre].depende_de:
+                visitar(dependencia)
+            visitando.discard(nombre)
+            visitados.add(nombre)
+            orden.append(nombre)
+
+        for nombre in self.pasos:
+            visitar(nombre)
+        return orden
+
+    @property
+    def orden(self) -> List[str]:
+        """Nombres de los pasos en orden topológico."""
+        return list(self._orden)
+
+    # ------------------------------------------------------------------
+    # ESTADO PERSISTENTE
+    # ------------------------------------------------------------------
+
+    def cargar_estado(self) -> Dict[str, Any]:
+        """Último resultado registrado de cada paso."""
+        try:
+            with open(self.ruta_estado, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _registrar(self, resultado: ResultadoPaso):
+        with self._bloqueo_estado:
+            estado = self.cargar_estado()
+            anterior = estado.get(resultado.nombre, {})
+            if resultado.estado == ESTADO_OK:
+                estado[resultado.nombre] = {
+                    'estado': ESTADO_OK,
+                    'huella': resultado.huella,
+                    'fin': datetime.now().isoformat(timespec='seconds'),
+                    'duracion_s': resultado.duracion_s,
+                }
+            elif resultado.estado == ESTADO_ERROR:
+                # Se olvida la huella para que el paso se repita en la próxima ejecución
+                estado[resultado.nombre] = {
+                    'estado': ESTADO_ERROR,
+                    'huella': '',
+                    'fin': datetime.now().isoformat(timespec='seconds'),
+                    'motivo': resultado.motivo,
+                }
+            else:
+                return
+            if estado.get(resultado.nombre) == anterior:
+                return
+            self.ruta_estado.parent.mkdir(parents=True, exist_ok=True)
+            temporal = self.ruta_estado.with_suffix('.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(estado, f, indent=2, ensure_ascii=False)
+            os.replace(temporal, self.ruta_estado)
+
+    # ------------------------------------------------------------------
+    # DECISIÓN Y EJECUCIÓN
+    # ------------------------------------------------------------------
+
+    def decidir(self, paso: Paso, estado: Dict[str, Any], ahora: datetime,
+                forzar: bool = False) -> ResultadoPaso:
+        """
+        Decide si un paso debe ejecutarse.
+
+        Returns:
+            ResultadoPaso: Con estado ESTADO_NO_TOCA, ESTADO_OMITIDO o '' (ejecutar)
+        """
+        huella = calcular_huella(paso)
+        if not forzar and paso.condicion is not None and not paso.condicion(ahora):
+            return ResultadoPaso(paso.nombre, ESTADO_NO_TOCA, 'fuera de su calendario', huella=huella)
+
+        anterior = estado.get(paso.nombre, {})
+        if (not forzar and anterior.get('estado') == ESTADO_OK and anterior.get('huella') == huella
+                and (not paso.salidas or _expandir(paso.salidas))):
+            return ResultadoPaso(paso.nombre, ESTADO_OMITIDO, 'entradas sin cambios', huella=huella)
+
+        return ResultadoPaso(paso.nombre, '', huella=huella)
+
+    def plan(self, forzar: bool = False, ahora: Optional[datetime] = None) -> List[ResultadoPaso]:
+        """
+        Qué haría cada paso sin ejecutar nada (suponiendo que las dependencias no cambian nada).
+
+        Returns:
+            List[ResultadoPaso]: En orden topológico; estado '' significa que se ejecutaría
+        """
+        ahora = ahora or datetime.now()
+        estado = self.cargar_estado()
+        return [self.decidir(self.pasos[nombre], estado, ahora, forzar) for nombre in self._orden]
+
+    def _ejecutar_script(self, paso: Paso, ruta_log: Path) -> int:
+        ruta_script = BASE_DIR / paso.script
+        codigo = compile(ruta_script.read_text(encoding='utf-8'), str(ruta_script), 'exec')
+        espacio = {'__name__': '__main__', '__file__': str(ruta_script), '__builtins__': builtins}
+
+        with open(ruta_log, 'a', encoding='utf-8', buffering=1) as salida:
+            sys.argv.establecer([str(ruta_script), *paso.argumentos])
+            sys.stdout.establecer(salida)
+            sys.stderr.establecer(salida)
+            try:
+                exec(codigo, espacio)
+                return 0
+            except SystemExit as e:
+                if e.code in (None, 0):
+                    return 0
+                return e.code if isinstance(e.code, int) else 1
+            except Exception:
+                traceback.print_exc(file=salida)
+                return 1
+            finally:
+                sys.argv.establecer(None)
+                sys.stdout.establecer(None)
+                sys.stderr.establecer(None)
+
+    def _ejecutar_paso(self, paso: Paso, decision: ResultadoPaso, dir_log: Path) -> ResultadoPaso:
+        ruta_log = dir_log / f"{paso.nombre}.log"
+        logger.info(f"[pipeline] Inicio de '{paso.nombre}' ({paso.script} {' '.join(paso.argumentos)})".rstrip())
+        inicio = time.perf_counter()
+        with tramo(f"paso:{paso.nombre}", script=paso.script) as t:
+            codigo = self._ejecutar_script(paso, ruta_log)
+            t.anotar(codigo_salida=codigo)
+        duracion = round(time.perf_counter() - inicio, 2)
+
+        if codigo == 0:
+            resultado = ResultadoPaso(paso.nombre, ESTADO_OK, duracion_s=duracion, codigo_salida=0,
+                                      huella=decision.huella, log=str(ruta_log))
+            logger.info(f"[pipeline] '{paso.nombre}' completado en {duracion:.1f} s")
+        else:
+            resultado = ResultadoPaso(paso.nombre, ESTADO_ERROR, f"código de salida {codigo}",
+                                      duracion, codigo, decision.huella, str(ruta_log))
+            logger.error(f"[pipeline] '{paso.nombre}' falló (código {codigo}). Ver {ruta_log}")
+        self._registrar(resultado)
+        return resultado
+
+    def ejecutar(self, forzar: bool = False, solo: Optional[List[str]] = None,
+                 ahora: Optional[datetime] = None) -> Dict[str, ResultadoPaso]:
+        """
+        Ejecuta el pipeline.
+
+        Args:
+            forzar: Ejecutar todos los pasos aunque no toquen o no hayan cambiado
+            solo: Ejecutar solo estos pasos (sus dependencias no se ejecutan)
+            ahora: Fecha de referencia para las condiciones de calendario
+
+        Returns:
+            Dict[str, ResultadoPaso]: Resultado de cada paso en orden topológico
+        """
+        ahora = ahora or datetime.now()
+        seleccion = set(solo) if solo else set(self._orden)
+        desconocidos = seleccion - set(self.pasos)
+        if desconocidos:
+            raise ValueError(f"Pasos desconocidos: {', '.join(sorted(desconocidos))}")
+
+        dir_log = self.dir_logs / ahora.strftime('%Y%m%d_%H%M%S')
+        dir_log.mkdir(parents=True, exist_ok=True)
+        estado = self.cargar_estado()
+        resultados: Dict[str, ResultadoPaso] = {}
+        cache = CacheDatasets()
+
+        argv_original, stdout_original, stderr_original = sys.argv, sys.stdout, sys.stderr
+        sys.argv = _ArgvPorHilo(argv_original)
+        sys.stdout = _SalidaPorHilo(stdout_original)
+        sys.stderr = _SalidaPorHilo(stderr_original)
+        try:
+            with cache.instalada(), ThreadPoolExecutor(max_workers=self.max_hilos,
+                                                       thread_name_prefix='pipeline') as ejecutor:
+                pendientes = [nombre for nombre in self._orden if nombre in seleccion]
+                en_curso = {}
+
+                while pendientes or en_curso:
+                    for nombre in list(pendientes):
+                        paso = self.pasos[nombre]
+                        dependencias = [d for d in paso.depende_de if d in seleccion]
+                        if any(d not in resultados for d in dependencias):
+                            continue
+                        pendientes.remove(nombre)
+
+                        fallidas = [d for d in dependencias if resultados[d].estado not in ESTADOS_CORRECTOS]
+                        if fallidas:
+                            resultados[nombre] = ResultadoPaso(nombre, ESTADO_BLOQUEADO,
+                                                               f"falló {', '.join(fallidas)}")
+                            logger.warning(f"[pipeline] '{nombre}' bloqueado: falló {', '.join(fallidas)}")
+                            continue
+
+                        decision = self.decidir(paso, estado, ahora, forzar)
+                        if decision.estado:
+                            resultados[nombre] = decision
+                            logger.info(f"[pipeline] '{nombre}' {decision.estado}: {decision.motivo}")
+                            continue
+                        en_curso[ejecutor.submit(self._ejecutar_paso, paso, decision, dir_log)] = nombre
+
+                    if not en_curso:
+                        continue
+                    terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                    for futuro in terminados:
+                        nombre = en_curso.pop(futuro)
+                        try:
+                            resultados[nombre] = futuro.result()
+                        except Exception as e:
+                            resultados[nombre] = ResultadoPaso(nombre, ESTADO_ERROR, str(e))
+        finally:
+            sys.argv, sys.stdout, sys.stderr = argv_original, stdout_original, stderr_original
+
+        logger.info(f"[pipeline] Excel compartidos: {cache.lecturas} lecturas, "
+                    f"{cache.aciertos} reutilizaciones en memoria")
+        return {nombre: resultados[nombre] for nombre in self._orden if nombre in resultados}
+
+
+# ============================================================================
+# PIPELINE SEMANAL DEL PROYECTO
+# ============================================================================
+
+def toca_clasificacion(ahora: datetime, patron: str = PATRON_CLASIFICACION_ABC) -> bool:
+    """
+    Indica si corresponde regenerar la clasificación ABC y sus informes:
+    primera semana de los meses de MESES_CLASIFICACION, o si todavía no
+    existe ningún archivo de clasificación (patron; el de una tienda para
+    su clasificación).
+    """
+    if not glob.glob(patron):
+        return True
+    return ahora.month in MESES_CLASIFICACION and ahora.day <= 7
+
+
+def crear_pipeline_semanal(max_hilos: int = 4) -> Pipeline:
+    """
+    Crea el pipeline semanal con los scripts del proyecto.
+
+    Grafo:
+        clasificacion_abc ─┬─ pedidos ─┬─ compras_sin_autorizacion
+                           │           └─ articulos_no_comprados
+                           ├─ informe
+                           ├─ presentacion
+                           └─ analisis_cd ── comparacion_cd
+        clasificacion_abc_<tienda> ── pedidos   (una por tienda de tiendas.lista)
+
+    Con varias tiendas, main.py busca la clasificación de cada una en su
+    carpeta de entrada: cada tienda tiene su paso clasificacionABC.py --tienda.
+
+    Args:
+        max_hilos: Pasos que pueden ejecutarse a la vez
+
+    Returns:
+        Pipeline: Pipeline listo para ejecutar
+    """
+    # Entradas del ERP: el .xlsx o su exportación .csv/.tsv
+    entrada = lambda nombre: str(INPUT_DIR / nombre.replace('.xlsx', '.*'))
+    en = lambda directorio, patron='*': str(Path(directorio) / patron)
+    pedidos_semanales = en(PEDIDOS_SEMANALES_DIR, 'Pedido_Semana_*')
+
+    from src.registro_config import obtener_registro
+    from src.tiendas import cargar_tiendas
+    pasos_tiendas, entradas_tiendas = [], []
+    for tienda in cargar_tiendas(obtener_registro().principal()):
+        entrada_tienda = lambda nombre, d=tienda.directorio_entrada: str(d / nombre.replace('.xlsx', '.*'))
+        patron_abc = en(tienda.directorio_entrada, 'CLASIFICACION_ABC+D_*.xlsx')
+        pasos_tiendas.append(Paso(
+            f'clasificacion_abc_{tienda.codigo}', 'clasificacionABC.py', argumentos=['--tienda', tienda.codigo],
+            entradas=[entrada_tienda('SPA_compras.xlsx'), entrada_tienda('SPA_ventas.xlsx'),
+                      entrada_tienda('SPA_[Cc]oste.xlsx'), entrada('SPA_[Cc]oste.xlsx'),
+                      entrada_tienda('SPA_stock_P*.xlsx')],
+            salidas=[patron_abc],
+            condicion=lambda ahora, patron=patron_abc: toca_clasificacion(ahora, patron),
+            descripcion=f'Clasificación ABC+D de la tienda {tienda.nombre}'))
+        entradas_tiendas += [entrada_tienda('SPA_ventas_semana*.xlsx'), entrada_tienda('SPA_stock_actual.xlsx'),
+                             entrada_tienda('SPA_stock_semana_*.xlsx'), patron_abc]
+
+    pasos = pasos_tiendas + [
+        Paso('clasificacion_abc', 'clasificacionABC.py',
+             entradas=[entrada('SPA_compras.xlsx'), entrada('SPA_ventas.xlsx'),
+                       entrada('SPA_[Cc]oste.xlsx'), entrada('SPA_stock_P*.xlsx')],
+             salidas=[PATRON_CLASIFICACION_ABC],
+             condicion=toca_clasificacion,
+             descripcion='Clasificación ABC+D del período siguiente'),
+        Paso('pedidos', 'main.py', depende_de=['clasificacion_abc'] + [paso.nombre for paso in pasos_tiendas],
+             entradas=[entrada('SPA_ventas_semana*.xlsx'), entrada('SPA_stock_actual.xlsx'),
+                       entrada('SPA_stock_semana_*.xlsx'), entrada('SPA_[Cc]oste.xlsx'),
+                       PATRON_CLASIFICACION_ABC] + entradas_tiendas,
+             salidas=[pedidos_semanales],
+             descripcion='Pedidos de compra semanales (FASE 1 + FASE 2) y emails'),
+        Paso('informe', 'INFORME.py', depende_de=['clasificacion_abc'],
+             entradas=[PATRON_CLASIFICACION_ABC, entrada('SPA_stock_P*.xlsx')],
+             salidas=[en(INFORMES_DIR)],
+             condicion=toca_clasificacion,
+             descripcion='Informes HTML de la clasificación'),
+        Paso('presentacion', 'PRESENTACION.py', depende_de=['clasificacion_abc'],
+             entradas=[PATRON_CLASIFICACION_ABC],
+             salidas=[en(PRESENTACIONES_DIR)],
+             condicion=toca_clasificacion,
+             descripcion='Presentaciones de la clasificación'),
+        Paso('analisis_cd', 'analisis_categoria_cd.py', depende_de=['clasificacion_abc'],
+             entradas=[PATRON_CLASIFICACION_ABC, entrada('SPA_stock_actual.xlsx')],
+             salidas=[en(ANALISIS_CATEGORIA_CD_DIR)],
+             descripcion='Análisis de artículos de categorías C y D'),
+        Paso('comparacion_cd', 'comparar_analisis_cd.py', depende_de=['analisis_cd'],
+             entradas=[en(ANALISIS_CATEGORIA_CD_DIR)],
+             salidas=[en(COMPARACION_CATEGORIA_CD_DIR)],
+             descripcion='Comparación con el análisis C y D anterior'),
+        Paso('compras_sin_autorizacion', 'informe_compras_sin_autorizacion.py', depende_de=['pedidos'],
+             entradas=[entrada('SPA_compras.xlsx'), entrada('SPA_stock_actual.xlsx'),
+                       entrada('SPA_stock_semana_anterior.xlsx'), pedidos_semanales],
+             salidas=[en(COMPRAS_SIN_AUTORIZACION_DIR)],
+             descripcion='Auditoría de compras sin pedido'),
+        Paso('articulos_no_comprados', 'Informe_artículos_no_comprados.py', depende_de=['pedidos'],
+             entradas=[entrada('SPA_compras.xlsx'), entrada('SPA_ventas_semana.xlsx'),
+                       entrada('SPA_stock_actual.xlsx'), pedidos_semanales],
+             salidas=[en(ARTICULOS_NO_COMPRADOS_DIR)],
+             descripcion='Auditoría de artículos pedidos no comprados'),
+    ]
+    return Pipeline(pasos, max_hilos=max_hilos)
+
+
+# ============================================================================
+# DISPARADOR CRON (LINUX)
+# ============================================================================
+
+DIAS_CRON = {
+    'monday': 1, 'tuesday': 2, 'wednesday': 3, 'thursday': 4, 'friday': 5, 'saturday': 6, 'sunday': 0,
+    'lunes': 1, 'martes': 2, 'miercoles': 3, 'jueves': 4, 'viernes': 5, 'sabado': 6, 'domingo': 0,
+}
+
+
+def linea_cron(config: Optional[Dict[str, Any]] = None, python: Optional[str] = None) -> str:
+    """
+    Línea de crontab que lanza el pipeline en el horario de config.json.
+
+    Args:
+        config: Configuración principal (por defecto, la del registro)
+        python: Intérprete a usar (por defecto, el actual)
+
+    Returns:
+        str: Línea de crontab terminada en MARCA_CRON
+    """
+    if config is None:
+        from src.registro_config import obtener_registro
+        config = obtener_registro().principal()
+    horario = config.get('horario_ejecucion', {})
+    dia = DIAS_CRON.get(str(horario.get('dia', 'thursday')).lower(), 4)
+    hora, minuto = int(horario.get('hora', 21)), int(horario.get('minuto', 50))
+    python = python or sys.executable
+    ruta_log = PIPELINE_LOGS_DIR / 'cron.log'
+    return (f"{minuto} {hora} * * {dia} cd \"{BASE_DIR}\" && \"{python}\" pipeline_semanal.py "
+            f">> \"{ruta_log}\" 2>&1 {MARCA_CRON}")
+
+
+def instalar_cron(config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Instala (o actualiza) la entrada del pipeline en el crontab del usuario.
+
+    Las líneas anteriores con MARCA_CRON se sustituyen; el resto del crontab
+    se conserva.
+
+    Returns:
+        str: Línea instalada
+
+    Raises:
+        RuntimeError: Si crontab no está disponible o falla
+    """
+    linea = linea_cron(config)
+    try:
+        actual = subprocess.run(['crontab', '-l'], capture_output=True, text=True)
+    except FileNotFoundError:
+        raise RuntimeError("crontab no está disponible en este sistema")
+
+    lineas = [l for l in (actual.stdout.splitlines() if actual.returncode == 0 else [])
+              if MARCA_CRON not in l]
+    lineas.append(linea)
+    PIPELINE_LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    resultado = subprocess.run(['crontab', '-'], input='\n'.join(lineas) + '\n', capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"No se pudo instalar el crontab: {resultado.stderr.strip()}")
+    logger.info(f"Entrada de cron instalada: {linea}")
+    return linea
@@ -42,6 +42,10 @@ COMPARACION_CATEGORIA_CD_DIR = OUTPUT_DIR / "Comparacion_categoria_C_y_D"  # Dir
 RESUMENES_DIR = OUTPUT_DIR / "Resumenes"
 COMPRAS_SIN_AUTORIZACION_DIR = OUTPUT_DIR / "Compras_sin_autorizacion"
 ARTICULOS_NO_COMPRADOS_DIR = OUTPUT_DIR / "Articulos_no_comprados"
+ESCENARIOS_DIR = OUTPUT_DIR / "Escenarios"  # Tablas de barridos de parámetros (python -m src.escenarios --excel)
+BACKTESTING_DIR = OUTPUT_DIR / "Backtesting"  # Métricas de acierto de pedidos pasados (python -m src.backtesting --excel)
+SIMULACIONES_DIR = OUTPUT_DIR / "Simulaciones"  # Proyecciones de stock hasta fin de temporada (python -m src.simulacion_stock --excel)
+PEDIDOS_TIENDAS_DIR = OUTPUT_DIR / "Pedidos_tiendas"  # Totales por proveedor de todas las tiendas (src/tiendas.py)
 
 # ==============================================================================
 # DIRECTORIO PARA STOCKS SEMANALES
@@ -51,6 +55,12 @@ ARTICULOS_NO_COMPRADOS_DIR = OUTPUT_DIR / "Articulos_no_comprados"
 # Este directorio almacenará copias del stock al final de cada semana
 STOCKS_SEMANALES_DIR = DATA_DIR / "stocks_semanales"
 
+# Histórico de ventas por año y semana con el cubo artículo × semana (src/historico_ventas.py)
+HISTORICO_VENTAS_DIR = DATA_DIR / "historico_ventas"
+
+# Una carpeta por tienda con sus entradas, salidas y estado (bloque tiendas de config.json)
+TIENDAS_DIR = DATA_DIR / "tiendas"
+
 # ==============================================================================
 # ARCHIVOS DE DATOS COMUNES
 # ==============================================================================
@@ -79,6 +89,15 @@ ARCHIVO_COSTES = INPUT_DIR / "SPA_coste.xlsx"
 
 # Archivos históricos
 HISTORICO_COMPRAS_SIN_PEDIDO = DATA_DIR / "compras_sin_pedido_historico.json"
+HISTORICO_COMPRAS_SIN_PEDIDO_DIR = DATA_DIR / "historico_compras_sin_pedido"  # Particiones semanales de compras sin pedido
+HISTORICO_ANALISIS_CD = DATA_DIR / "historico_analisis_cd.db"  # Serie temporal de métricas y stock del análisis C y D
+ESTADO_ALERTAS_DB = DATA_DIR / "estado_alertas.db"  # Control anti-spam de alertas compartido por todos los scripts
+BENCHMARKS_DIR = LOGS_DIR / "benchmarks"  # Histórico de resultados de benchmarks/
+ESTADO_PIPELINE = DATA_DIR / "estado_pipeline.json"  # Huellas y resultado de cada paso del pipeline semanal
+PIPELINE_LOGS_DIR = LOGS_DIR / "pipeline"  # Salida de cada paso del pipeline semanal
+PERFILES_DIR = DATA_DIR / "perfiles"  # Perfiles de tiempo y memoria por etapa (--profile)
+EQUIVALENCIA_DIR = LOGS_DIR / "equivalencia"  # Informes e instantáneas de divergencias entre implementaciones (--shadow)
+PUNTOS_CONTROL_DIR = DATA_DIR / "puntos_control"  # Huellas y resultado de cada sección del pedido semanal (reanudación)
 
 # Archivos de compras
 ARCHIVO_COMPRAS = INPUT_DIR / "SPA_compras.xlsx"
@@ -94,37 +113,18 @@ def cargar_periodos_desde_config():
     Returns:
         dict: Diccionario de períodos con su configuración de fechas
     """
-    import json
-    periodos = {
-        "P1": {"mes_inicio": 1, "dia_inicio": 1, "mes_fin": 2, "dia_fin": 28},
-        "P2": {"mes_inicio": 3, "dia_inicio": 1, "mes_fin": 5, "dia_fin": 31},
-        "P3": {"mes_inicio": 6, "dia_inicio": 1, "mes_fin": 8, "dia_fin": 31},
-        "P4": {"mes_inicio": 9, "dia_inicio": 1, "mes_fin": 12, "dia_fin": 31},
-    }
+    # Import diferido: el registro usa CONFIG_DIR de este módulo
+    from src.registro_config import obtener_registro, PERIODOS_POR_DEFECTO
     
     try:
-        ruta_config = CONFIG_DIR / "config_comun.json"
-        if ruta_config.exists():
-            with open(ruta_config, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # Intentar cargar desde configuracion_periodo_clasificacion
-                if 'configuracion_periodo_clasificacion' in config:
-                    config_periodos = config['configuracion_periodo_clasificacion'].get('periodos', {})
-                    if config_periodos:
-                        # Normalizar el formato
-                        for key, valor in config_periodos.items():
-                            if isinstance(valor, dict):
-                                periodos[key] = {
-                                    'mes_inicio': valor.get('mes_inicio'),
-                                    'dia_inicio': valor.get('dia_inicio'),
-                                    'mes_fin': valor.get('mes_fin'),
-                                    'dia_fin': valor.get('dia_fin')
-                                }
-                        print(f"INFO: Períodos cargados desde config/comun.json")
+        registro = obtener_registro()
+        periodos = registro.periodos()
+        if registro.existe('comun'):
+            print(f"INFO: Períodos cargados desde config/comun.json")
+        return periodos
     except Exception as e:
         print(f"ADVERTENCIA: No se pudieron cargar períodos desde config: {e}. Usando valores por defecto.")
-    
-    return periodos
+        return {clave: dict(valor) for clave, valor in PERIODOS_POR_DEFECTO.items()}
 
 # Cargar períodos desde configuración
 PERIODOS = cargar_periodos_desde_config()
@@ -257,6 +257,25 @@ PATRON_STOCK_PERIODO = str(INPUT_DIR / "SPA_stock_P*.xlsx")
 # FUNCIONES AUXILIARES
 # ==============================================================================
 
+def directorio_config(config: dict, clave: str, por_defecto: Path) -> str:
+    """
+    Directorio rutas.<clave> de config.json, o el centralizado si no está configurado.
+
+    Una ruta relativa se toma desde BASE_DIR; una absoluta (las de las
+    tiendas) se usa tal cual.
+
+    Args:
+        config: Configuración del sistema
+        clave: Clave del bloque rutas (p. ej. 'directorio_entrada')
+        por_defecto: Directorio centralizado (p. ej. INPUT_DIR)
+
+    Returns:
+        str: Ruta del directorio
+    """
+    valor = config.get('rutas', {}).get(clave)
+    return str(por_defecto) if not valor else os.path.join(str(BASE_DIR), valor)
+
+
 
 def get_ruta_salida(nombre_archivo: str) -> Path:
     """
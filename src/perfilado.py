@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Módulo Perfilado - Tramos de tiempo, filas y memoria por etapa
+
+Instrumentación ligera de las etapas del pedido semanal y de los scripts de
+informes. Cada tramo registra:
+
+- Tiempo real (perf_counter) y CPU del hilo que lo ejecuta (thread_time)
+- Filas de entrada y de salida (si la etapa las indica)
+- Pico de memoria residente (RSS) del proceso al empezar y al terminar
+
+Mientras no se active el perfilado, `tramo()` devuelve un contexto vacío y el
+coste es despreciable, así que las etapas pueden quedar instrumentadas
+siempre. Con `--profile` (main.py, pipeline_semanal.py y los scripts) se
+guarda al terminar un JSON y una traza de Chrome (chrome://tracing o
+https://ui.perfetto.dev) en data/perfiles/, junto a state.json, conservando
+los últimos MAX_PERFILES de cada programa.
+
+Uso:
+    from src.perfilado import perfilado, tramo
+
+    with perfilado('pedidos', activo=args.profile):
+        with tramo('forecast', filas_entrada=ventas, seccion='vivero') as t:
+            pedidos = calcular(...)
+            t.filas(salida=pedidos)
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from src.paths import PERFILES_DIR
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+# Perfiles que se conservan por programa
+MAX_PERFILES = 10
+
+
+def _pico_rss_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)."""
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux devuelve KB; macOS, bytes
+        return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class CONTADORES(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+            contadores = CONTADORES()
+            contadores.cb = ctypes.sizeof(CONTADORES)
+            proceso = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+                return round(contadores.PeakWorkingSetSize / (1024 * 1024), 1)
+        except Exception:
+            pass
+    return None
+
+
+def _contar(valor: Any) -> Optional[int]:
+    """Número de filas de un DataFrame, lista o dict (o el entero tal cual)."""
+    if valor is None:
+        return None
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor
+    try:
+        return len(valor)
+    except TypeError:
+        return None
+
+
+class Tramo:
+    """
+    Medición de una etapa.
+
+    Se crea con Perfilador.iniciar() o con el contexto tramo(); se cierra con
+    terminar() (el contexto lo hace solo).
+    """
+    __slots__ = ('nombre', 'datos', 'filas_entrada', 'filas_salida', 'inicio', 'duracion_s',
+                 'cpu_s', 'rss_inicio_mb', 'rss_pico_mb', 'hilo', 'nombre_hilo', 'profundidad',
+                 '_cpu_inicio', '_perfilador')
+
+    def __init__(self, perfilador: 'Perfilador', nombre: str, filas_entrada=None, **datos):
+        self._perfilador = perfilador
+        self.nombre = nombre
+        self.datos = datos
+        self.filas_entrada = _contar(filas_entrada)
+        self.filas_salida = None
+        self.hilo = threading.get_ident()
+        self.nombre_hilo = threading.current_thread().name
+        self.profundidad = 0
+        self.rss_inicio_mb = _pico_rss_mb()
+        self.rss_pico_mb = None
+        self.duracion_s = None
+        self.cpu_s = None
+        self._cpu_inicio = time.thread_time()
+        self.inicio = time.perf_counter()
+
+    def filas(self, entrada=None, salida=None) -> 'Tramo':
+        """Registra filas de entrada y/o salida (DataFrame, lista o entero)."""
+        if entrada is not None:
+            self.filas_entrada = _contar(entrada)
+        if salida is not None:
+            self.filas_salida = _contar(salida)
+        return self
+
+    def anotar(self, **datos) -> 'Tramo':
+        """Añade contexto al tramo (aparece en el JSON y en la traza)."""
+        self.datos.update(datos)
+        return self
+
+    def terminar(self, filas_salida=None) -> 'Tramo':
+        """Cierra el tramo (llamadas repetidas no tienen efecto)."""
+        if self.duracion_s is not None:
+            return self
+        self.duracion_s = time.perf_counter() - self.inicio
+        self.cpu_s = time.thread_time() - self._cpu_inicio
+        self.rss_pico_mb = _pico_rss_mb()
+        if filas_salida is not None:
+            self.filas_salida = _contar(filas_salida)
+        self._perfilador._cerrar(self)
+        return self
+
+    def como_dict(self, origen: float) -> Dict[str, Any]:
+        return {
+            'nombre': self.nombre,
+            'inicio_s': round(self.inicio - origen, 6),
+            'duracion_s': round(self.duracion_s or 0.0, 6),
+            'cpu_s': round(self.cpu_s or 0.0, 6),
+            'filas_entrada': self.filas_entrada,
+            'filas_salida': self.filas_salida,
+            'rss_inicio_mb': self.rss_inicio_mb,
+            'rss_pico_mb': self.rss_pico_mb,
+            'hilo': self.nombre_hilo,
+            'profundidad': self.profundidad,
+            **({'datos': self.datos} if self.datos else {}),
+        }
+
+
+class _TramoNulo:
+    """Tramo que no mide nada (perfilado desactivado)."""
+    __slots__ = ()
+
+    def filas(self, entrada=None, salida=None):
+        return self
+
+    def anotar(self, **datos):
+        return self
+
+    def terminar(self, filas_salida=None):
+        return self
+
+
+_TRAMO_NULO = _TramoNulo()
+
+
+class Perfilador:
+    """
+    Colección de tramos de una ejecución.
+
+    Attributes:
+        nombre (str): Programa perfilado ('pedidos', 'clasificacionABC', ...)
+        tramos (list): Tramos cerrados, en orden de cierre
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.fecha = datetime.now()
+        self.tramos: List[Tramo] = []
+        self._origen = time.perf_counter()
+        self._bloqueo = threading.Lock()
+        self._pilas = threading.local()
+
+    def _pila(self) -> list:
+        pila = getattr(self._pilas, 'pila', None)
+        if pila is None:
+            pila = self._pilas.pila = []
+        return pila
+
+    def iniciar(self, nombre: str, filas_entrada=None, **datos) -> Tramo:
+        """Abre un tramo; debe cerrarse con terminar()."""
+        tramo = Tramo(self, nombre, filas_entrada, **datos)
+        pila = self._pila()
+        tramo.profundidad = len(pila)
+        pila.append(tramo)
+        return tramo
+
+    def _cerrar(self, tramo: Tramo):
+        pila = self._pila()
+        if tramo in pila:
+            pila.remove(tramo)
+        with self._bloqueo:
+            self.tramos.append(tramo)
+
+    # ------------------------------------------------------------------
+    # INFORMES
+    # ------------------------------------------------------------------
+
+    def resumen(self) -> List[Dict[str, Any]]:
+        """
+        Agregado por nombre de tramo, ordenado por tiempo total.
+
+        Returns:
+            List[Dict]: nombre, veces, total_s, cpu_s, filas_entrada, filas_salida, rss_pico_mb
+        """
+        agregado: Dict[str, Dict[str, Any]] = {}
+        for tramo in self.tramos:
+            a = agregado.setdefault(tramo.nombre, {
+                'nombre': tramo.nombre, 'veces': 0, 'total_s': 0.0, 'cpu_s': 0.0,
+                'filas_entrada': 0, 'filas_salida': 0, 'rss_pico_mb': None,
+            })
+            a['veces'] += 1
+            a['total_s'] += tramo.duracion_s or 0.0
+            a['cpu_s'] += tramo.cpu_s or 0.0
+            a['filas_entrada'] += tramo.filas_entrada or 0
+            a['filas_salida'] += tramo.filas_salida or 0
+            if tramo.rss_pico_mb is not None:
+                a['rss_pico_mb'] = max(a['rss_pico_mb'] or 0.0, tramo.rss_pico_mb)
+        filas = sorted(agregado.values(), key=lambda a: a['total_s'], reverse=True)
+        for a in filas:
+            a['total_s'] = round(a['total_s'], 4)
+            a['cpu_s'] = round(a['cpu_s'], 4)
+        return filas
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Perfil completo (metadatos, resumen y tramos) serializable a JSON."""
+        tramos = sorted(self.tramos, key=lambda t: t.inicio)
+        return {
+            'programa': self.nombre,
+            'fecha': self.fecha.isoformat(timespec='seconds'),
+            'duracion_total_s': round(time.perf_counter() - self._origen, 4),
+            'rss_pico_mb': _pico_rss_mb(),
+            'python': sys.version.split()[0],
+            'resumen': self.resumen(),
+            'tramos': [t.como_dict(self._origen) for t in tramos],
+        }
+
+    def como_chrome_trace(self) -> Dict[str, Any]:
+        """Perfil en formato Trace Event de Chrome (eventos completos 'X')."""
+        pid = os.getpid()
+        eventos, hilos = [], {}
+        for tramo in sorted(self.tramos, key=lambda t: t.inicio):
+            hilos[tramo.hilo] = tramo.nombre_hilo
+            eventos.append({
+                'name': tramo.nombre,
+                'cat': self.nombre,
+                'ph': 'X',
+                'ts': round((tramo.inicio - self._origen) * 1e6, 1),
+                'dur': round((tramo.duracion_s or 0.0) * 1e6, 1),
+                'pid': pid,
+                'tid': tramo.hilo,
+                'args': {
+                    'cpu_ms': round((tramo.cpu_s or 0.0) * 1000, 2),
+                    'filas_entrada': tramo.filas_entrada,
+                    'filas_salida': tramo.filas_salida,
+                    'rss_pico_mb': tramo.rss_pico_mb,
+                    **tramo.datos,
+                },
+            })
+        for tid, nombre in hilos.items():
+            eventos.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': nombre}})
+        return {'traceEvents': eventos, 'displayTimeUnit': 'ms',
+                'otherData': {'programa': self.nombre, 'fecha': self.fecha.isoformat(timespec='seconds')}}
+
+    def texto_resumen(self) -> str:
+        """Tabla de texto con el resumen por etapa."""
+        lineas = [f"PERFIL DE {self.nombre.upper()}",
+                  f"{'Etapa':<28}{'Veces':>6}{'Total s':>10}{'CPU s':>10}{'Filas ent.':>12}"
+                  f"{'Filas sal.':>12}{'RSS MB':>9}"]
+        for a in self.resumen():
+            rss = f"{a['rss_pico_mb']:.0f}" if a['rss_pico_mb'] is not None else '-'
+            lineas.append(f"{a['nombre']:<28}{a['veces']:>6}{a['total_s']:>10.3f}{a['cpu_s']:>10.3f}"
+                          f"{a['filas_entrada']:>12}{a['filas_salida']:>12}{rss:>9}")
+        return '\n'.join(lineas)
+
+    def guardar(self, directorio: Optional[Path] = None, max_perfiles: int = MAX_PERFILES) -> Dict[str, Path]:
+        """
+        Guarda el perfil en JSON y como traza de Chrome y purga los antiguos.
+
+        Args:
+            directorio: Destino (por defecto data/perfiles/)
+            max_perfiles: Perfiles de este programa que se conservan
+
+        Returns:
+            Dict[str, Path]: {'json': ruta, 'traza': ruta}
+        """
+        directorio = Path(directorio) if directorio else PERFILES_DIR
+        directorio.mkdir(parents=True, exist_ok=True)
+        base = f"perfil_{self.nombre}_{self.fecha.strftime('%Y%m%d_%H%M%S')}"
+        rutas = {'json': directorio / f"{base}.json", 'traza': directorio / f"{base}.trace.json"}
+
+        with open(rutas['json'], 'w', encoding='utf-8') as f:
+            json.dump(self.como_dict(), f, indent=2, ensure_ascii=False, default=str)
+        with open(rutas['traza'], 'w', encoding='utf-8') as f:
+            json.dump(self.como_chrome_trace(), f, ensure_ascii=False, default=str)
+
+        perfiles = sorted(p for p in directorio.glob(f"perfil_{self.nombre}_*.json")
+                          if not p.name.endswith('.trace.json'))
+        for antiguo in perfiles[:-max_perfiles] if max_perfiles > 0 else []:
+            antiguo.unlink(missing_ok=True)
+            antiguo.with_name(antiguo.name[:-len('.json')] + '.trace.json').unlink(missing_ok=True)
+        return rutas
+
+
+# ============================================================================
+# PERFILADOR DEL PROCESO
+# ============================================================================
+
+_ACTIVO: Optional[Perfilador] = None
+
+
+def obtener_perfilador() -> Optional[Perfilador]:
+    """Perfilador activo del proceso (None si el perfilado está desactivado)."""
+    return _ACTIVO
+
+
+def iniciar_tramo(nombre: str, filas_entrada=None, **datos):
+    """Abre un tramo en el perfilador activo; devuelve un tramo nulo si no hay ninguno."""
+    if _ACTIVO is None:
+        return _TRAMO_NULO
+    return _ACTIVO.iniciar(nombre, filas_entrada, **datos)
+
+
+@contextmanager
+def tramo(nombre: str, filas_entrada=None, **datos):
+    """
+    Mide el bloque como un tramo del perfilador activo.
+
+    Args:
+        nombre: Etapa ('carga', 'forecast', 'escritura_excel', ...)
+        filas_entrada: DataFrame, lista o número de filas que recibe la etapa
+        **datos: Contexto adicional (sección, archivo...)
+    """
+    if _ACTIVO is None:
+        yield _TRAMO_NULO
+        return
+    t = _ACTIVO.iniciar(nombre, filas_entrada, **datos)
+    try:
+        yield t
+    finally:
+        t.terminar()
+
+
+@contextmanager
+def perfilado(nombre: str, activo: bool = True, max_perfiles: int = MAX_PERFILES):
+    """
+    Activa el perfilado durante el bloque y guarda el perfil al salir.
+
+    Si ya hay un perfilador activo (p. ej. un script ejecutado dentro de
+    pipeline_semanal.py --profile), el bloque se registra como un tramo de
+    ese perfil y no se guarda un fichero aparte.
+
+    Args:
+        nombre: Programa perfilado (forma parte del nombre del fichero)
+        activo: Si es False, el bloque se ejecuta sin perfilar
+        max_perfiles: Perfiles de este programa que se conservan
+    """
+    global _ACTIVO
+    if not activo:
+        yield None
+        return
+    if _ACTIVO is not None:
+        with tramo(nombre):
+            yield _ACTIVO
+        return
+
+    perfilador = _ACTIVO = Perfilador(nombre)
+    t = perfilador.iniciar(nombre)
+    try:
+        yield perfilador
+    finally:
+        t.terminar()
+        _ACTIVO = None
+        try:
+            rutas = perfilador.guardar(max_perfiles=max_perfiles)
+            logger.info("\n" + perfilador.texto_resumen())
+            logger.info(f"Perfil guardado en {rutas['json']} (traza: {rutas['traza'].name})")
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el perfil de {nombre}: {e}")
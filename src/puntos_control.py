@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Módulo PuntosControl - Huellas por sección y reanudación del pedido semanal
+
+Regenerar una semana está permitido, pero hasta ahora cada repetición volvía a
+calcular y escribir las 11 secciones aunque solo hubiera cambiado el ABC de
+una de ellas, y si fallaba la sección 9 el reintento rehacía las 1 a 8.
+
+Para cada sección se calcula una huella de todo lo que determina su pedido:
+
+- Ventas de la semana de la sección (contenido)
+- Clasificación ABC+D y costes de la sección (contenido)
+- Filas de stock actual y ventas de la semana de sus artículos (contenido)
+- Pedido de la semana anterior (ruta, tamaño y fecha de modificación)
+- Subconjunto de config.json que usa (parámetros, festivos, sección,
+  corrección, implementación de los motores) y versión del código de cálculo
+
+Al terminar una sección se guarda un punto de control con su huella, el pedido
+final, las métricas de corrección, el stock acumulado antes y después, y el
+fichero generado con la huella de su contenido. En la siguiente ejecución de
+la misma semana, las secciones con la misma huella reutilizan su resultado sin
+recalcular ni reescribir el Excel; como los puntos de control se guardan
+sección a sección, una ejecución que falla se reanuda desde la última sección
+completada. También se registra qué ficheros se enviaron por email, para no
+reenviar un fichero idéntico.
+
+Los puntos de control se guardan en data/puntos_control/semana_NN/.
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Iterable
+
+import pandas as pd
+
+from src.paths import BASE_DIR, PUNTOS_CONTROL_DIR
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+# Código cuyo cambio invalida todos los puntos de control
+ARCHIVOS_CODIGO_CALCULO = (
+    'src/forecast_engine.py',
+    'src/correction_engine.py',
+    'src/correction_data_loader.py',
+    'src/order_generator.py',
+    'src/equivalencia.py',
+)
+
+# Claves de config.json que intervienen en el cálculo de todas las secciones
+CLAVES_CONFIG_CALCULO = ('parametros', 'festivos', 'parametros_correccion', 'archivos_correccion',
+                         'formato_salida', 'rutas')
+
+SIN_DATOS = 'sin_datos'
+
+
+# ============================================================================
+# HUELLAS
+# ============================================================================
+
+def huella_dataframe(df: Optional[pd.DataFrame]) -> str:
+    """
+    Huella del contenido de un DataFrame (columnas, tipos y valores, sin índice).
+
+    Returns:
+        str: SHA-256 en hexadecimal, o 'sin_datos' si df es None
+    """
+    if df is None:
+        return SIN_DATOS
+    h = hashlib.sha256()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode('utf-8'))
+    try:
+        valores = pd.util.hash_pandas_object(df, index=False)
+    except TypeError:
+        # Columnas object con tipos mezclados no hashables directamente
+        valores = pd.util.hash_pandas_object(df.astype(str), index=False)
+    h.update(valores.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def huella_fichero(ruta: Optional[str]) -> str:
+    """Huella de un fichero por ruta, tamaño y fecha de modificación."""
+    if not ruta:
+        return SIN_DATOS
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return f"{ruta}|ausente"
+    return f"{Path(ruta).name}|{estado.st_size}|{estado.st_mtime_ns}"
+
+
+def huella_contenido_excel(ruta: Optional[str]) -> Optional[str]:
+    """
+    Huella de los valores de todas las hojas de un Excel.
+
+    A diferencia de los bytes del fichero, no cambia si se vuelve a escribir
+    el mismo contenido (openpyxl guarda la fecha de creación en el zip).
+    """
+    if not ruta or not os.path.exists(ruta):
+        return None
+    try:
+        hojas = pd.read_excel(ruta, sheet_name=None, header=None)
+    except Exception as e:
+        logger.debug(f"No se pudo leer {ruta} para calcular su huella: {e}")
+        return None
+    h = hashlib.sha256()
+    for nombre, df in hojas.items():
+        h.update(str(nombre).encode('utf-8'))
+        h.update(huella_dataframe(df).encode('utf-8'))
+    return h.hexdigest()
+
+
+def huella_valor(valor: Any) -> str:
+    """Huella de un valor serializable a JSON (p. ej. un trozo de config.json)."""
+    texto = json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def huella_codigo_calculo() -> str:
+    """Versión del código de cálculo (tamaño y fecha de los módulos que generan el pedido)."""
+    return huella_valor([huella_fichero(str(BASE_DIR / ruta)) for ruta in ARCHIVOS_CODIGO_CALCULO])
+
+
+def _normalizar_codigo(serie: pd.Series) -> pd.Series:
+    return serie.astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
+
+
+def filas_de_articulos(df: Optional[pd.DataFrame], codigos: Iterable[str]) -> Optional[pd.DataFrame]:
+    """
+    Filas de un export del ERP (stock, ventas de la semana) de unos artículos.
+
+    Así un cambio en el stock de una sección no invalida las demás.
+    """
+    if df is None:
+        return None
+    from src.correction_data_loader import encontrar_columna
+
+    columna = encontrar_columna(list(df.columns), 'articulo')
+    if columna is None:
+        return df
+    codigos = set(codigos)
+    return df[_normalizar_codigo(df[columna]).isin(codigos)]
+
+
+def codigos_articulo(df: Optional[pd.DataFrame], columna: str = 'Codigo') -> List[str]:
+    """Códigos de artículo normalizados ('8100000001.0' -> '8100000001')."""
+    if df is None or columna not in df.columns:
+        return []
+    return sorted(set(_normalizar_codigo(df[columna].dropna())))
+
+
+def config_seccion(config: Dict[str, Any], seccion: str) -> Dict[str, Any]:
+    """Subconjunto de config.json que interviene en el pedido de una sección."""
+    return {
+        **{clave: config.get(clave) for clave in CLAVES_CONFIG_CALCULO},
+        'seccion': config.get('secciones', {}).get(seccion),
+        'implementaciones': config.get('equivalencia', {}).get('implementaciones'),
+    }
+
+
+# ============================================================================
+# PUNTOS DE CONTROL DE UNA SEMANA
+# ============================================================================
+
+class PuntosControlPedido:
+    """
+    Puntos de control del pedido de una semana.
+
+    Attributes:
+        semana (int): Semana del pedido
+        directorio (Path): data/puntos_control/semana_NN
+        ruta_indice (Path): Índice JSON con la huella, el fichero y los envíos de cada sección
+    """
+
+    def __init__(self, semana: int, directorio: Path = PUNTOS_CONTROL_DIR):
+        self.semana = semana
+        self.directorio = Path(directorio) / f"semana_{semana:02d}"
+        self.ruta_indice = self.directorio / 'indice.json'
+        self._bloqueo = threading.Lock()
+        self._version_codigo = huella_codigo_calculo()
+
+    # ------------------------------------------------------------------
+    # ÍNDICE
+    # ------------------------------------------------------------------
+
+    def cargar_indice(self) -> Dict[str, Any]:
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {'secciones': {}, 'enviados': {}}
+
+    def _guardar_indice(self, indice: Dict[str, Any]):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_indice.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(indice, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, self.ruta_indice)
+
+    def _ruta_datos(self, seccion: str) -> Path:
+        return self.directorio / f"{seccion}.pkl"
+
+    # ------------------------------------------------------------------
+    # SECCIONES
+    # ------------------------------------------------------------------
+
+    def huella_seccion(self, seccion: str, componentes: Dict[str, str]) -> str:
+        """
+        Combina las huellas de las entradas de una sección con la versión del código.
+
+        Args:
+            seccion: Nombre de la sección
+            componentes: {nombre de la entrada: huella}
+        """
+        return huella_valor({'seccion': seccion, 'semana': self.semana,
+                             'codigo': self._version_codigo, **componentes})
+
+    def obtener(self, seccion: str, huella: str, stock_acumulado: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """
+        Resultado guardado de una sección si se puede reutilizar.
+
+        Se reutiliza si la huella coincide, el Excel generado sigue existiendo
+        con el mismo contenido y el stock acumulado de sus artículos es el de
+        antes o el de después de esa ejecución (es decir, no lo ha cambiado el
+        pedido de otra semana).
+
+        Returns:
+            dict con pedidos_final, metricas, archivo, stock_nuevo... o None
+        """
+        entrada = self.cargar_indice()['secciones'].get(seccion)
+        if not entrada or entrada.get('huella') != huella:
+            return None
+
+        archivo = entrada.get('archivo')
+        if archivo and huella_contenido_excel(archivo) != entrada.get('huella_archivo'):
+            logger.info(f"Punto de control de '{seccion}' descartado: el fichero {Path(archivo).name} cambió o no existe")
+            return None
+
+        try:
+            with open(self._ruta_datos(seccion), 'rb') as f:
+                datos = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Punto de control de '{seccion}' ilegible: {e}")
+            return None
+
+        for clave in set(datos['stock_previo']) | set(datos['stock_nuevo']):
+            actual = stock_acumulado.get(clave, 0)
+            if actual not in (datos['stock_previo'].get(clave, 0), datos['stock_nuevo'].get(clave, 0)):
+                logger.info(f"Punto de control de '{seccion}' descartado: el stock acumulado cambió desde entonces")
+                return None
+        return datos
+
+    def guardar(self, seccion: str, huella: str, pedidos_final: pd.DataFrame, metricas: Optional[Dict[str, Any]],
+                archivo: Optional[str], stock_previo: Dict[str, int], stock_nuevo: Dict[str, int],
+                articulos: int = 0, importe: float = 0.0):
+        """Registra una sección terminada (se llama al acabar cada sección)."""
+        datos = {
+            'pedidos_final': pedidos_final,
+            'metricas': metricas,
+            'archivo': archivo,
+            'stock_previo': stock_previo,
+            'stock_nuevo': stock_nuevo,
+        }
+        with self._bloqueo:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            ruta = self._ruta_datos(seccion)
+            temporal = ruta.with_suffix('.tmp')
+            with open(temporal, 'wb') as f:
+                pickle.dump(datos, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+
+            indice = self.cargar_indice()
+            indice['secciones'][seccion] = {
+                'huella': huella,
+                'archivo': archivo,
+                'huella_archivo': huella_contenido_excel(archivo),
+                'articulos': articulos,
+                'importe': round(float(importe), 2),
+                'fin': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._guardar_indice(indice)
+
+    def invalidar(self, seccion: str):
+        """Olvida el punto de control de una sección (p. ej. tras un error)."""
+        with self._bloqueo:
+            indice = self.cargar_indice()
+            if indice['secciones'].pop(seccion, None) is not None:
+                self._guardar_indice(indice)
+
+    # ------------------------------------------------------------------
+    # EMAILS
+    # ------------------------------------------------------------------
+
+    def pendientes_de_envio(self, destino: str, archivos: List[str]) -> List[str]:
+        """
+        Ficheros que aún no se enviaron a `destino` con este mismo contenido.
+
+        Args:
+            destino: Sección o grupo de destinatarios (p. ej. 'gestion')
+            archivos: Ficheros a enviar
+        """
+        enviados = self.cargar_indice().get('enviados', {}).get(destino, {})
+        return [a for a in archivos
+                if enviados.get(Path(a).name) is None or enviados[Path(a).name] != huella_contenido_excel(a)]
+
+    def registrar_envio(self, destino: str, archivos: List[str]):
+        """Anota los ficheros enviados a `destino` con la huella de su contenido."""
+        with self._bloqueo:
+            indice = self.cargar_indice()
+            enviados = indice.setdefault('enviados', {}).setdefault(destino, {})
+            for archivo in archivos:
+                enviados[Path(archivo).name] = huella_contenido_excel(archivo)
+            self._guardar_indice(indice)
+
+
+def crear_puntos_control(semana: int, directorio: Path = PUNTOS_CONTROL_DIR) -> PuntosControlPedido:
+    """
+    Crea los puntos de control del pedido de una semana.
+
+    Args:
+        semana: Semana del pedido
+        directorio: Directorio base (default data/puntos_control)
+
+    Returns:
+        PuntosControlPedido
+    """
+    return PuntosControlPedido(semana, directorio)
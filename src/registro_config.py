@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Módulo RegistroConfiguracion - Configuración única, validada y en caché
+
+La configuración del sistema está repartida en cuatro ficheros JSON:
+
+    config/config.json         Parámetros del pedido semanal (main.py)
+    config/config_comun.json   Configuración común de informes y clasificación
+    config/email.json          Servidor SMTP, remitente y plantillas
+    config/encargados.json     Encargados por sección y responsables
+
+Hasta ahora cada script y módulo los leía por su cuenta (a veces con rutas
+relativas al directorio de trabajo) y los volvía a leer en cada llamada. Este
+registro los lee una sola vez por proceso, los valida contra un esquema
+sencillo y solo los vuelve a leer si cambia la fecha de modificación o el
+tamaño del fichero.
+
+Uso:
+    from src.registro_config import obtener_registro
+
+    registro = obtener_registro()
+    config = registro.principal()          # dict de config.json (copia)
+    smtp = registro.smtp()                 # ConfigSMTP tipada
+    encargados = registro.encargados()     # {seccion: [Encargado, ...]}
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+# Nombre lógico -> fichero dentro de config/
+ARCHIVOS_CONFIGURACION = {
+    'principal': 'config.json',
+    'comun': 'config_comun.json',
+    'email': 'email.json',
+    'encargados': 'encargados.json',
+}
+
+# Esquemas: clave -> tipo esperado, o dict anidado con su propio esquema.
+# Las claves que empiezan por '*' son obligatorias. Solo se valida lo que
+# usa el código; las claves adicionales se permiten.
+ESQUEMAS = {
+    'principal': {
+        '*secciones_activas': list,
+        'secciones': dict,
+        'parametros': {
+            'objetivo_crecimiento': (int, float),
+            'stock_minimo_porcentaje': (int, float),
+            'pesos_categoria': dict,
+        },
+        'festivos': dict,
+        'horario_ejecucion': {'dia': (int, str), 'hora': int, 'minuto': int},
+        'rutas': dict,
+        'archivos_entrada': dict,
+        'parametros_correccion': {'habilitar_correccion': bool},
+        'env_email': {'password_var': str, 'destinatario_alertas': str},
+        'email': dict,
+        'periodos': dict,
+        'alertas': dict,
+        'equivalencia': {
+            'implementaciones': dict,
+            'implementaciones_sombra': dict,
+            'modo_sombra': bool,
+            'tolerancia_absoluta': (int, float),
+            'tolerancia_relativa': (int, float),
+            'tolerancias_columna': dict,
+            'ignorar_columnas': list,
+        },
+        'historico_ventas': {'usar': bool, 'años_referencia': list},
+        'precarga_entradas': {'habilitar': bool, 'modo': str, 'max_trabajadores': int},
+        'validacion_entradas': {'habilitar': bool, 'estricto': bool, 'max_trabajadores': int},
+        'tiendas': {'lista': dict, 'compartidos': list, 'modo': str, 'max_trabajadores': int},
+    },
+    'comun': {
+        'configuracion_email': dict,
+        'configuracion_periodo_clasificacion': {'periodos': dict},
+        'configuracion_umbrales': dict,
+        'configuracion_kpis': dict,
+        'configuracion_colores': dict,
+        'configuracion_mascotas': {'codigos_mascotas_vivo': list},
+        'configuracion_secciones': dict,
+        'configuracion_rotaciones_familia': dict,
+        'configuracion_iva_familia': dict,
+        'configuracion_iva_subfamilia': dict,
+    },
+    'email': {
+        '*smtp': {
+            '*servidor': str,
+            '*puerto': int,
+            'usar_ssl': bool,
+            'usar_tls': bool,
+            'max_conexiones': int,
+        },
+        '*remitente': {'*email': str, 'nombre': str},
+        'configuracion': {'habilitar_envio': bool, 'password_var_entorno': str},
+        'plantillas': dict,
+        'destinatarios_alertas': {'email': str},
+    },
+    'encargados': {
+        '*encargados': dict,
+        'administrador': {'nombre': str, 'email': str},
+        'responsables_gestion': list,
+    },
+}
+
+PERIODOS_POR_DEFECTO = {
+    "P1": {"mes_inicio": 1, "dia_inicio": 1, "mes_fin": 2, "dia_fin": 28},
+    "P2": {"mes_inicio": 3, "dia_inicio": 1, "mes_fin": 5, "dia_fin": 31},
+    "P3": {"mes_inicio": 6, "dia_inicio": 1, "mes_fin": 8, "dia_fin": 31},
+    "P4": {"mes_inicio": 9, "dia_inicio": 1, "mes_fin": 12, "dia_fin": 31},
+}
+
+
+@dataclass(frozen=True)
+class ConfigSMTP:
+    """Servidor SMTP y remitente (email.json)."""
+    servidor: str = 'smtp.serviciodecorreo.es'
+    puerto: int = 465
+    usar_ssl: bool = True
+    usar_tls: bool = False
+    max_conexiones: int = 2
+    remitente_email: str = 'ivan.delgado@viveverde.es'
+    remitente_nombre: str = 'Sistema de Pedidos VIVEVERDE'
+    password_var: str = 'EMAIL_PASSWORD'
+
+    def como_dict_scripts(self, remitente_nombre: Optional[str] = None) -> Dict[str, Any]:
+        """Formato SMTP_CONFIG usado por los scripts de informes."""
+        return {
+            'servidor': self.servidor,
+            'puerto': self.puerto,
+            'remitente_email': self.remitente_email,
+            'remitente_nombre': remitente_nombre or self.remitente_nombre,
+        }
+
+
+@dataclass(frozen=True)
+class Encargado:
+    """Persona que recibe los correos de una sección."""
+    nombre: str
+    email: str
+
+
+def validar_esquema(datos: Any, esquema: Dict[str, Any], ruta: str = '') -> List[str]:
+    """
+    Valida un dict contra un esquema de ESQUEMAS.
+
+    Args:
+        datos: Datos a validar
+        esquema: Esquema (clave -> tipo o esquema anidado)
+        ruta: Prefijo de la clave para los mensajes
+
+    Returns:
+        List[str]: Problemas encontrados (vacía si es válido)
+    """
+    if not isinstance(datos, dict):
+        return [f"{ruta or 'raíz'}: se esperaba un objeto, es {type(datos).__name__}"]
+
+    problemas = []
+    for clave_esquema, tipo in esquema.items():
+        obligatoria = clave_esquema.startswith('*')
+        clave = clave_esquema.lstrip('*')
+        nombre = f"{ruta}.{clave}" if ruta else clave
+
+        if clave not in datos:
+            if obligatoria:
+                problemas.append(f"{nombre}: clave obligatoria ausente")
+            continue
+
+        valor = datos[clave]
+        if isinstance(tipo, dict):
+            problemas.extend(validar_esquema(valor, tipo, nombre))
+        elif valor is not None and not isinstance(valor, tipo) \
+                or (tipo is int and isinstance(valor, bool)):
+            esperado = ' o '.join(t.__name__ for t in (tipo if isinstance(tipo, tuple) else (tipo,)))
+            problemas.append(f"{nombre}: se esperaba {esperado}, es {type(valor).__name__}")
+    return problemas
+
+
+class _Entrada:
+    """Contenido en caché de un fichero de configuración."""
+    __slots__ = ('datos', 'firma', 'problemas', 'comprobado')
+
+    def __init__(self):
+        self.datos: Dict[str, Any] = {}
+        self.firma: Optional[Tuple[int, int]] = None
+        self.problemas: List[str] = []
+        self.comprobado = 0.0
+
+
+class RegistroConfiguracion:
+    """
+    Registro de configuración compartido por todo el proceso.
+
+    Attributes:
+        dir_config (Path): Directorio con los ficheros JSON
+        intervalo_comprobacion (float): Segundos entre dos comprobaciones de
+            la fecha de modificación de un mismo fichero
+    """
+
+    def __init__(self, dir_config: Optional[Path] = None, intervalo_comprobacion: float = 1.0):
+        if dir_config is None:
+            # Import diferido: src.paths carga los períodos a través de este registro
+            from src.paths import CONFIG_DIR
+            dir_config = CONFIG_DIR
+        self.dir_config = Path(dir_config)
+        self.intervalo_comprobacion = intervalo_comprobacion
+        self._entradas: Dict[str, _Entrada] = {nombre: _Entrada() for nombre in ARCHIVOS_CONFIGURACION}
+        self._bloqueo = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # CARGA Y CACHÉ
+    # ------------------------------------------------------------------
+
+    def ruta(self, nombre: str) -> Path:
+        """Ruta del fichero de configuración con ese nombre lógico."""
+        return self.dir_config / ARCHIVOS_CONFIGURACION[nombre]
+
+    def nombre_de_ruta(self, ruta: Any) -> Optional[str]:
+        """
+        Devuelve el nombre lógico de una ruta si corresponde a un fichero del registro.
+
+        Acepta rutas absolutas o relativas (como 'config/config_comun.json').
+        """
+        try:
+            ruta = Path(ruta)
+            ruta_abs = ruta if ruta.is_absolute() else (self.dir_config.parent / ruta)
+            ruta_abs = ruta_abs.resolve()
+        except (TypeError, OSError):
+            return None
+        for nombre in ARCHIVOS_CONFIGURACION:
+            if ruta_abs == self.ruta(nombre).resolve():
+                return nombre
+        return None
+
+    def _vigente(self, nombre: str) -> _Entrada:
+        entrada = self._entradas[nombre]
+        ahora = time.monotonic()
+        if entrada.firma is not None and ahora - entrada.comprobado < self.intervalo_comprobacion:
+            return entrada
+
+        with self._bloqueo:
+            ruta = self.ruta(nombre)
+            try:
+                estado = os.stat(ruta)
+                firma = (estado.st_mtime_ns, estado.st_size)
+            except OSError:
+                firma = (0, -1)
+
+            if firma != entrada.firma:
+                self._cargar(nombre, entrada, ruta, firma)
+            entrada.comprobado = ahora
+        return entrada
+
+    def _cargar(self, nombre: str, entrada: _Entrada, ruta: Path, firma: Tuple[int, int]):
+        if firma[1] < 0:
+            if entrada.firma is None or entrada.firma[1] >= 0:
+                logger.warning(f"Archivo de configuración no encontrado: {ruta}")
+            entrada.datos, entrada.problemas = {}, [f"{ruta.name}: archivo no encontrado"]
+            entrada.firma = firma
+            return
+
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            # Se conserva la última versión válida (si la hay) hasta que se corrija
+            logger.error(f"Error al leer {ruta.name}: {e}. Se mantiene la configuración anterior.")
+            entrada.problemas = [f"{ruta.name}: {e}"]
+            entrada.firma = firma
+            return
+
+        problemas = [f"{ruta.name}: {p}" for p in validar_esquema(datos, ESQUEMAS[nombre])]
+        for problema in problemas:
+            logger.warning(f"Configuración no válida - {problema}")
+
+        recarga = entrada.firma is not None
+        entrada.datos = datos if isinstance(datos, dict) else {}
+        entrada.problemas = problemas
+        entrada.firma = firma
+        logger.debug(f"Configuración {'recargada' if recarga else 'cargada'} desde {ruta}")
+
+    def obtener(self, nombre: str, copiar: bool = True) -> Dict[str, Any]:
+        """
+        Devuelve el contenido de un fichero de configuración.
+
+        Args:
+            nombre: 'principal', 'comun', 'email' o 'encargados'
+            copiar: Devolver una copia independiente (por defecto). Con False
+                se devuelve el dict en caché, que no debe modificarse.
+
+        Returns:
+            dict: Configuración ({} si el fichero no existe)
+        """
+        datos = self._vigente(nombre).datos
+        return copy.deepcopy(datos) if copiar else datos
+
+    def existe(self, nombre: str) -> bool:
+        """Indica si el fichero de configuración existe."""
+        entrada = self._vigente(nombre)
+        return entrada.firma is not None and entrada.firma[1] >= 0
+
+    def problemas(self, nombre: Optional[str] = None) -> List[str]:
+        """Problemas de validación del fichero indicado (o de todos)."""
+        nombres = [nombre] if nombre else list(ARCHIVOS_CONFIGURACION)
+        return [p for n in nombres for p in self._vigente(n).problemas]
+
+    def recargar(self, nombre: Optional[str] = None):
+        """Fuerza la relectura en el siguiente acceso."""
+        with self._bloqueo:
+            for n in ([nombre] if nombre else list(ARCHIVOS_CONFIGURACION)):
+                self._entradas[n] = _Entrada()
+
+    # ------------------------------------------------------------------
+    # ACCESORES POR FICHERO
+    # ------------------------------------------------------------------
+
+    def principal(self) -> Dict[str, Any]:
+        """Copia de config/config.json."""
+        return self.obtener('principal')
+
+    def comun(self) -> Dict[str, Any]:
+        """Copia de config/config_comun.json."""
+        return self.obtener('comun')
+
+    def email(self) -> Dict[str, Any]:
+        """Copia de config/email.json."""
+        return self.obtener('email')
+
+    def encargados_json(self) -> Dict[str, Any]:
+        """Copia de config/encargados.json."""
+        return self.obtener('encargados')
+
+    # ------------------------------------------------------------------
+    # ACCESORES TIPADOS
+    # ------------------------------------------------------------------
+
+    def smtp(self) -> ConfigSMTP:
+        """Servidor SMTP y remitente desde email.json (con valores por defecto)."""
+        email = self.obtener('email', copiar=False)
+        smtp = email.get('smtp', {})
+        remitente = email.get('remitente', {})
+        configuracion = email.get('configuracion', {})
+        defecto = ConfigSMTP()
+        return ConfigSMTP(
+            servidor=smtp.get('servidor', defecto.servidor),
+            puerto=smtp.get('puerto', defecto.puerto),
+            usar_ssl=smtp.get('usar_ssl', defecto.usar_ssl),
+            usar_tls=smtp.get('usar_tls', defecto.usar_tls),
+            max_conexiones=smtp.get('max_conexiones', defecto.max_conexiones),
+            remitente_email=remitente.get('email', defecto.remitente_email),
+            remitente_nombre=remitente.get('nombre', defecto.remitente_nombre),
+            password_var=configuracion.get('password_var_entorno', defecto.password_var),
+        )
+
+    def plantillas_email(self) -> Dict[str, str]:
+        """Plantillas de asunto y cuerpo de email.json."""
+        return dict(self.obtener('email', copiar=False).get('plantillas', {}))
+
+    def destinatario_alertas(self, por_defecto: str = 'ivan.delgado@viveverde.es') -> str:
+        """Destinatario de alertas: config.json (env_email) y, si no, email.json."""
+        destinatario = self.obtener('principal', copiar=False).get('env_email', {}).get('destinatario_alertas')
+        if not destinatario:
+            destinatario = self.obtener('email', copiar=False).get('destinatarios_alertas', {}).get('email')
+        return destinatario or por_defecto
+
+    def encargados(self) -> Dict[str, List[Encargado]]:
+        """
+        Encargados por sección desde encargados.json.
+
+        Acepta tanto un objeto como una lista de objetos por sección; las
+        entradas sin email se descartan.
+
+        Returns:
+            Dict[str, List[Encargado]]: {seccion: [Encargado, ...]}
+        """
+        resultado = {}
+        for seccion, datos in self.obtener('encargados', copiar=False).get('encargados', {}).items():
+            lista = datos if isinstance(datos, list) else [datos]
+            resultado[seccion] = [
+                Encargado(nombre=e.get('nombre', 'Encargado'), email=e['email'].strip())
+                for e in lista if isinstance(e, dict) and e.get('email')
+            ]
+        return resultado
+
+    def responsables_gestion(self) -> List[Encargado]:
+        """Responsables de gestión (encargados.json)."""
+        return [Encargado(nombre=r.get('nombre', ''), email=r['email'].strip())
+                for r in self.obtener('encargados', copiar=False).get('responsables_gestion', [])
+                if isinstance(r, dict) and r.get('email')]
+
+    def secciones_activas(self) -> List[str]:
+        """Secciones activas del pedido semanal (config.json)."""
+        return list(self.obtener('principal', copiar=False).get('secciones_activas', []))
+
+    def periodos(self) -> Dict[str, Dict[str, int]]:
+        """
+        Definición de los períodos P1-P4 (config_comun.json).
+
+        Returns:
+            Dict: {periodo: {mes_inicio, dia_inicio, mes_fin, dia_fin}}
+        """
+        periodos = copy.deepcopy(PERIODOS_POR_DEFECTO)
+        config_periodos = (self.obtener('comun', copiar=False)
+                           .get('configuracion_periodo_clasificacion', {}).get('periodos', {}))
+        for clave, valor in config_periodos.items():
+            if isinstance(valor, dict):
+                periodos[clave] = {
+                    'mes_inicio': valor.get('mes_inicio'),
+                    'dia_inicio': valor.get('dia_inicio'),
+                    'mes_fin': valor.get('mes_fin'),
+                    'dia_fin': valor.get('dia_fin'),
+                }
+        return periodos
+
+
+_REGISTRO: Optional[RegistroConfiguracion] = None
+_BLOQUEO_REGISTRO = threading.Lock()
+
+
+def crear_registro_configuracion(dir_config: Optional[Path] = None,
+                                 intervalo_comprobacion: float = 1.0) -> RegistroConfiguracion:
+    """
+    Crea un registro de configuración independiente (p. ej. sobre otro directorio).
+
+    Args:
+        dir_config: Directorio con los ficheros JSON (por defecto config/)
+        intervalo_comprobacion: Segundos entre comprobaciones de cambios
+
+    Returns:
+        RegistroConfiguracion: Nuevo registro
+    """
+    return RegistroConfiguracion(dir_config, intervalo_comprobacion)
+
+
+def obtener_registro() -> RegistroConfiguracion:
+    """Devuelve el registro de configuración del proceso (lo crea la primera vez)."""
+    global _REGISTRO
+    if _REGISTRO is None:
+        # Fuera del bloqueo: al importarse, src.paths pide este mismo registro
+        from src.paths import CONFIG_DIR
+        with _BLOQUEO_REGISTRO:
+            if _REGISTRO is None:
+                _REGISTRO = crear_registro_configuracion(CONFIG_DIR)
+    return _REGISTRO
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Módulo SimulacionStock - Trayectoria del stock a lo largo de la temporada
+
+aplicar_stock_minimo() razona sobre una sola semana: compara Unidades_Finales y
+el stock mínimo con el Stock_Real de SPA_stock_actual.xlsx y no mira hacia
+delante. Este módulo proyecta la posición de stock de cada artículo semana a
+semana hasta el final de la temporada (el período ABC de la semana de partida)
+con la misma política de pedido:
+
+- Demanda prevista: Unidades_Base del histórico × (1 + crecimiento) × (1 + festivo)
+- Pedido: max(0, Unidades_Finales + Stock_Minimo - Stock + Tendencia_Consumo),
+  la fórmula de aplicar_stock_minimo() y de la FASE 2
+- Stock al final de la semana: stock + pedido - ventas, donde las ventas son la
+  demanda limitada al stock disponible (se supone que el pedido llega a tiempo)
+
+El punto de partida es el de main.py: Stock_Real de SPA_stock_actual.xlsx y
+la tendencia de las ventas reales de SPA_ventas_semana.xlsx frente al pedido
+de la semana anterior. Después la tendencia se calcula con las ventas
+simuladas frente a las Unidades_Finales de la semana anterior.
+
+cargar() calcula el forecast del horizonte una vez; simular() repite la
+proyección con arrays densos artículos × semanas y es barata, de modo que se
+pueden probar políticas distintas (porcentaje de stock mínimo, factor de compra
+por tipo de acción ABC, con o sin corrección de tendencia) de forma interactiva.
+Las roturas de stock y los excesos proyectados se resumen por sección y
+proveedor.
+
+Uso:
+    simulador = crear_simulador_stock(config).cargar(14)
+    trayectorias = simulador.simular(stock_minimo_porcentaje=0.2, factores_accion={'REDUCIR': 1.0})
+    resumen = resumir(trayectorias, ['seccion', 'Proveedor'])
+    roturas = alertas(trayectorias)
+
+    python -m src.simulacion_stock --semana 14
+    python -m src.simulacion_stock --semana 14 --hasta 30 --stock-minimo 0.2 --factor-accion REDUCIR=1 --excel
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+import numpy as np
+import pandas as pd
+
+from src.paths import INPUT_DIR, PEDIDOS_SEMANALES_DIR, SIMULACIONES_DIR, directorio_config
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+# Tipos de acción ABC (primera palabra de Accion_Aplicada del forecast)
+TIPOS_ACCION = ['ELIMINAR', 'REDUCIR', 'MANTENER', 'AUMENTAR']
+
+ULTIMA_SEMANA = 52
+
+
+@dataclass
+class DatosSimulacion:
+    """
+    Datos de una sección que no dependen de la política simulada.
+
+    Arrays por artículo (A) o artículo × semana (A, S), con las semanas en el
+    orden de SimuladorStock.semanas.
+    """
+    seccion: str
+    claves: np.ndarray
+    categoria: np.ndarray
+    proveedor: np.ndarray
+    accion: np.ndarray
+    factor_accion: np.ndarray
+    pvp: np.ndarray
+    unidades_base: np.ndarray
+    unidades_finales: np.ndarray
+    objetivo_final: np.ndarray
+    factor_demanda: np.ndarray
+    stock_inicial: np.ndarray
+    ventas_reales_anterior: np.ndarray
+    unidades_anterior: np.ndarray
+
+
+@dataclass
+class TrayectoriaStock:
+    """Resultado de simular una sección: arrays artículo × semana."""
+    seccion: str
+    claves: np.ndarray
+    categoria: np.ndarray
+    proveedor: np.ndarray
+    semanas: List[int]
+    demanda: np.ndarray
+    unidades_finales: np.ndarray
+    stock_minimo: np.ndarray
+    pedido: np.ndarray
+    ventas: np.ndarray
+    stock_final: np.ndarray
+
+    @property
+    def unidades_no_servidas(self) -> np.ndarray:
+        return self.demanda - self.ventas
+
+    @property
+    def exceso(self) -> np.ndarray:
+        """Stock que queda al final de la semana por encima del stock mínimo."""
+        return np.maximum(0, self.stock_final - self.stock_minimo)
+
+
+class SimuladorStock:
+    """
+    Proyecta el stock de cada artículo hasta el final de la temporada.
+
+    Attributes:
+        config (dict): Configuración del sistema
+        semanas (List[int]): Semanas del horizonte (tras cargar())
+        datos (List[DatosSimulacion]): Datos por sección (tras cargar())
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.parametros = config.get('parametros', {})
+        self.festivos = config.get('festivos', {})
+        self.semanas: List[int] = []
+        self.datos: List[DatosSimulacion] = []
+
+    # ------------------------------------------------------------------
+    # CARGA
+    # ------------------------------------------------------------------
+
+    def cargar(self, semana: int, secciones: Optional[List[str]] = None,
+               hasta: Optional[int] = None) -> 'SimuladorStock':
+        """
+        Calcula el forecast de las semanas que quedan de temporada y el stock de partida.
+
+        Args:
+            semana: Primera semana simulada (la del próximo pedido)
+            secciones: Secciones (default: secciones_activas de config.json)
+            hasta: Última semana simulada (default: última semana del período de 'semana')
+
+        Returns:
+            SimuladorStock: self, para encadenar con simular()
+        """
+        from src.data_loader import DataLoader, añadir_columna_semana
+        from src.forecast_engine import ForecastEngine
+        from src.correction_data_loader import (
+            encontrar_archivo_semana_anterior,
+            leer_archivo_ventas_semana,
+            leer_archivo_stock_actual,
+            leer_pedido_semana_anterior,
+            fusionar_datos_tendencia
+        )
+
+        data_loader = DataLoader(self.config)
+        forecast_engine = ForecastEngine(self.config)
+        dir_entrada = directorio_config(self.config, 'directorio_entrada', INPUT_DIR)
+        dir_salida = directorio_config(self.config, 'directorio_salida', PEDIDOS_SEMANALES_DIR)
+
+        semanas_por_periodo: Dict[str, List[int]] = {}
+        periodo_inicial = data_loader.obtener_periodo_desde_semana(semana)
+        for s in range(semana, (hasta or ULTIMA_SEMANA) + 1):
+            periodo = data_loader.obtener_periodo_desde_semana(s)
+            if hasta is None and periodo != periodo_inicial:
+                break
+            semanas_por_periodo.setdefault(periodo, []).append(s)
+        self.semanas = [s for semanas in semanas_por_periodo.values() for s in semanas]
+
+        df_ventas_reales, _ = leer_archivo_ventas_semana(dir_entrada)
+        df_stock_actual = leer_archivo_stock_actual(dir_entrada)
+
+        self.datos = []
+        for seccion in secciones or self.config.get('secciones_activas', []):
+            pedidos_seccion = []
+            for semanas_periodo in semanas_por_periodo.values():
+                abc_df, ventas_df, costes_df = data_loader.leer_datos_seccion(seccion, semanas_periodo[0])
+                if abc_df is None or ventas_df is None or costes_df is None or not añadir_columna_semana(ventas_df):
+                    break
+                pedidos_semanas = forecast_engine.calcular_pedidos_semanas(
+                    semanas_periodo, ventas_df, abc_df, costes_df, seccion
+                )
+                pedidos_seccion.extend(
+                    pedidos.assign(Semana=s) for s, pedidos in pedidos_semanas.items() if len(pedidos)
+                )
+
+            if not pedidos_seccion:
+                logger.warning(f"Sin datos para la sección '{seccion}': se omite de la simulación")
+                continue
+
+            pedidos = pd.concat(pedidos_seccion, ignore_index=True)
+            archivo_anterior = encontrar_archivo_semana_anterior(dir_salida, semana, seccion)
+            partida = fusionar_datos_tendencia(
+                pedidos.drop_duplicates(['Codigo_Articulo', 'Talla', 'Color']).reset_index(drop=True),
+                df_ventas_reales, df_stock_actual, leer_pedido_semana_anterior(archivo_anterior, seccion)
+            )
+            self.datos.append(self._datos_seccion(seccion, pedidos, partida, forecast_engine))
+
+        logger.info(f"Simulación: {len(self.datos)} secciones, semanas {self.semanas[0]}-{self.semanas[-1]}"
+                    if self.semanas else "Simulación sin semanas")
+        return self
+
+    def _datos_seccion(self, seccion: str, pedidos: pd.DataFrame, partida: pd.DataFrame,
+                       forecast_engine) -> DatosSimulacion:
+        from src.backtesting import claves_articulo
+
+        pedidos['clave'] = claves_articulo(pedidos['Codigo_Articulo'], pedidos['Talla'], pedidos['Color'])
+        claves = pd.Index(pedidos['clave'].unique())
+        filas = claves.get_indexer(pedidos['clave'])
+        columnas = pd.Index(self.semanas).get_indexer(pedidos['Semana'])
+
+        forma = (len(claves), len(self.semanas))
+        unidades_base = np.zeros(forma)
+        unidades_finales = np.zeros(forma)
+        np.add.at(unidades_base, (filas, columnas), pedidos['Unidades_Base'].to_numpy(dtype=float))
+        np.add.at(unidades_finales, (filas, columnas), pedidos['Unidades_Finales'].to_numpy(dtype=float))
+
+        # Datos del artículo en la última semana en que aparece (el ABC puede cambiar de período)
+        info = pedidos.drop_duplicates('clave', keep='last').set_index('clave').reindex(claves)
+        base = info['Unidades_Base'].to_numpy(dtype=float)
+        factor_accion = np.divide(info['Unidades_ABC'].to_numpy(dtype=float), base,
+                                  out=np.ones(len(claves)), where=base > 0)
+
+        crecimiento = self.parametros.get('objetivo_crecimiento', 0.05)
+        factor_demanda = np.array([
+            (1 + crecimiento) * (1 + self.festivos.get(str(s), self.festivos.get(s, 0.0))) for s in self.semanas
+        ])
+        objetivo = np.array([forecast_engine.obtener_objetivo_semana(seccion, s) for s in self.semanas])
+
+        partida = partida.assign(
+            clave=claves_articulo(partida['Codigo_Articulo'], partida['Talla'], partida['Color']).to_numpy()
+        ).groupby('clave')[['Stock_Real', 'Ventas_Reales', 'Unidades_Calculadas_Semana_Pasada']].first()
+        partida = partida.reindex(claves).fillna(0).apply(pd.to_numeric, errors='coerce').fillna(0)
+
+        return DatosSimulacion(
+            seccion=seccion,
+            claves=claves.to_numpy(),
+            categoria=info['Categoria'].astype(str).to_numpy(),
+            proveedor=info['Proveedor'].fillna('').astype(str).to_numpy(),
+            accion=info['Accion_Aplicada'].astype(str).str.split().str[0].to_numpy(),
+            factor_accion=factor_accion,
+            pvp=info['PVP'].to_numpy(dtype=float),
+            unidades_base=unidades_base,
+            unidades_finales=unidades_finales,
+            objetivo_final=objetivo * factor_demanda,
+            factor_demanda=factor_demanda,
+            stock_inicial=partida['Stock_Real'].to_numpy(dtype=float),
+            ventas_reales_anterior=partida['Ventas_Reales'].to_numpy(dtype=float),
+            unidades_anterior=partida['Unidades_Calculadas_Semana_Pasada'].to_numpy(dtype=float),
+        )
+
+    # ------------------------------------------------------------------
+    # SIMULACIÓN
+    # ------------------------------------------------------------------
+
+    def simular(self, stock_minimo_porcentaje: Optional[float] = None,
+                factores_accion: Optional[Dict[str, float]] = None,
+                tendencia: bool = True) -> List[TrayectoriaStock]:
+        """
+        Proyecta el stock con una política de pedido.
+
+        Args:
+            stock_minimo_porcentaje: Stock mínimo sobre Unidades_Finales (default: el de config.json)
+            factores_accion: Factor de compra por tipo de acción ABC ({'REDUCIR': 1.0, ...}),
+                sustituye al del forecast. Las Unidades_Finales se reescalan al objetivo de la
+                semana como en ForecastEngine, sin el recorte final por PVP
+            tendencia: Aplicar la corrección por tendencia de consumo
+
+        Returns:
+            List[TrayectoriaStock]: Una trayectoria por sección
+        """
+        if stock_minimo_porcentaje is None:
+            stock_minimo_porcentaje = self.parametros.get('stock_minimo_porcentaje', 0.30)
+        desconocidos = set(factores_accion or {}) - set(TIPOS_ACCION)
+        if desconocidos:
+            raise ValueError(f"Tipos de acción no válidos: {sorted(desconocidos)} (válidos: {TIPOS_ACCION})")
+
+        return [self._simular_seccion(datos, stock_minimo_porcentaje, factores_accion, tendencia)
+                for datos in self.datos]
+
+    def _simular_seccion(self, datos: DatosSimulacion, stock_minimo_porcentaje: float,
+                         factores_accion: Optional[Dict[str, float]], tendencia: bool) -> TrayectoriaStock:
+        unidades_finales = datos.unidades_finales
+        if factores_accion:
+            factor = datos.factor_accion.copy()
+            for tipo, valor in factores_accion.items():
+                factor[datos.accion == tipo] = valor
+            # Misma matemática que ForecastEngine: unidades ABC escaladas al objetivo × factor total
+            unidades_abc = datos.unidades_base * factor[:, None]
+            # np.nansum como ForecastEngine: un PVP que falta no anula las ventas de la semana
+            ventas_actuales = np.nansum(unidades_abc * datos.pvp[:, None], axis=0)
+            escala = np.divide(datos.objetivo_final, ventas_actuales, out=np.ones(len(self.semanas)),
+                               where=(ventas_actuales > 0) & (datos.objetivo_final > 0))
+            unidades_finales = np.ceil(np.maximum(0, unidades_abc * escala))
+
+        demanda = datos.unidades_base * datos.factor_demanda
+        stock_minimo = np.ceil(unidades_finales * stock_minimo_porcentaje)
+        pedido = np.zeros_like(demanda)
+        ventas = np.zeros_like(demanda)
+        stock_final = np.zeros_like(demanda)
+
+        # Solo el stock encadena las semanas: bucle por semana, vectorizado por artículo
+        stock = datos.stock_inicial
+        ventas_anterior = datos.ventas_reales_anterior
+        unidades_anterior = datos.unidades_anterior
+        for j in range(len(self.semanas)):
+            consumo = np.maximum(0, ventas_anterior - unidades_anterior) if tendencia else 0
+            pedido[:, j] = np.maximum(0, unidades_finales[:, j] + stock_minimo[:, j] - stock + consumo)
+            disponible = stock + pedido[:, j]
+            ventas[:, j] = np.minimum(demanda[:, j], disponible)
+            stock = stock_final[:, j] = disponible - ventas[:, j]
+            ventas_anterior = ventas[:, j]
+            unidades_anterior = unidades_finales[:, j]
+
+        return TrayectoriaStock(
+            seccion=datos.seccion,
+            claves=datos.claves,
+            categoria=datos.categoria,
+            proveedor=datos.proveedor,
+            semanas=list(self.semanas),
+            demanda=demanda,
+            unidades_finales=unidades_finales,
+            stock_minimo=stock_minimo,
+            pedido=pedido,
+            ventas=ventas,
+            stock_final=stock_final,
+        )
+
+
+def por_articulo(trayectorias: List[TrayectoriaStock]) -> pd.DataFrame:
+    """
+    Totales de la temporada por artículo.
+
+    Returns:
+        pd.DataFrame: seccion, Codigo_Articulo, Talla, Color, Categoria, Proveedor, demanda,
+        pedido, ventas, unidades_no_servidas, semanas_con_rotura, primera_semana_rotura,
+        stock_final y exceso_final (stock final por encima del stock mínimo)
+    """
+    tablas = []
+    for trayectoria in trayectorias:
+        if not len(trayectoria.claves):
+            continue
+        no_servidas = trayectoria.unidades_no_servidas
+        rotura = no_servidas > 0
+        semanas = np.asarray(trayectoria.semanas, dtype=float)
+        partes = pd.Series(trayectoria.claves).str.split('|', n=2, expand=True)
+        tablas.append(pd.DataFrame({
+            'seccion': trayectoria.seccion,
+            'Codigo_Articulo': partes[0].to_numpy(),
+            'Talla': partes[1].to_numpy(),
+            'Color': partes[2].to_numpy(),
+            'Categoria': trayectoria.categoria,
+            'Proveedor': trayectoria.proveedor,
+            'demanda': trayectoria.demanda.sum(axis=1),
+            'pedido': trayectoria.pedido.sum(axis=1),
+            'ventas': trayectoria.ventas.sum(axis=1),
+            'unidades_no_servidas': no_servidas.sum(axis=1),
+            'semanas_con_rotura': rotura.sum(axis=1),
+            'primera_semana_rotura': np.where(rotura.any(axis=1), semanas[rotura.argmax(axis=1)], np.nan),
+            'stock_final': trayectoria.stock_final[:, -1],
+            'exceso_final': trayectoria.exceso[:, -1],
+        }))
+    return pd.concat(tablas, ignore_index=True) if tablas else pd.DataFrame()
+
+
+def resumir(trayectorias: List[TrayectoriaStock], por: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Roturas y excesos proyectados agrupados (por defecto por sección).
+
+    Args:
+        trayectorias: Resultado de SimuladorStock.simular()
+        por: Columnas de agrupación de por_articulo() (p. ej. ['seccion', 'Proveedor'])
+
+    Returns:
+        pd.DataFrame: Una fila por grupo
+    """
+    articulos = por_articulo(trayectorias)
+    if articulos.empty:
+        return pd.DataFrame()
+    articulos['articulos'] = 1
+    articulos['articulos_con_rotura'] = articulos['semanas_con_rotura'] > 0
+    articulos['articulos_con_exceso'] = articulos['exceso_final'] > 0
+
+    tabla = articulos.groupby(por or ['seccion'], dropna=False).agg(
+        articulos=('articulos', 'sum'),
+        demanda=('demanda', 'sum'),
+        pedido=('pedido', 'sum'),
+        unidades_no_servidas=('unidades_no_servidas', 'sum'),
+        articulos_con_rotura=('articulos_con_rotura', 'sum'),
+        primera_semana_rotura=('primera_semana_rotura', 'min'),
+        stock_final=('stock_final', 'sum'),
+        articulos_con_exceso=('articulos_con_exceso', 'sum'),
+        exceso_final=('exceso_final', 'sum'),
+    ).reset_index()
+    tabla['nivel_servicio'] = np.where(
+        tabla['demanda'] > 0, 1 - tabla['unidades_no_servidas'] / tabla['demanda'], np.nan
+    )
+    return tabla
+
+
+def alertas(trayectorias: List[TrayectoriaStock]) -> pd.DataFrame:
+    """
+    Artículos con rotura de stock o exceso al final de la temporada, de más a menos grave.
+
+    Returns:
+        pd.DataFrame: Filas de por_articulo() con 'Alerta' ('ROTURA', 'EXCESO' o 'ROTURA+EXCESO')
+    """
+    articulos = por_articulo(trayectorias)
+    if articulos.empty:
+        return articulos
+    articulos = articulos[(articulos['semanas_con_rotura'] > 0) | (articulos['exceso_final'] > 0)].copy()
+    rotura = articulos['semanas_con_rotura'] > 0
+    exceso = articulos['exceso_final'] > 0
+    articulos['Alerta'] = np.select([rotura & exceso, rotura], ['ROTURA+EXCESO', 'ROTURA'], default='EXCESO')
+    return articulos.sort_values(['unidades_no_servidas', 'exceso_final'], ascending=False, ignore_index=True)
+
+
+def guardar_excel(trayectorias: List[TrayectoriaStock], ruta: Optional[Path] = None) -> Path:
+    """
+    Guarda el resumen por sección y proveedor y las alertas por artículo.
+
+    Args:
+        trayectorias: Resultado de SimuladorStock.simular()
+        ruta: Fichero de salida (default output/Simulaciones/Simulacion_stock_<fecha>.xlsx)
+
+    Returns:
+        Path: Ruta del fichero guardado
+    """
+    if ruta is None:
+        ruta = SIMULACIONES_DIR / f"Simulacion_stock_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        resumir(trayectorias).to_excel(writer, sheet_name='Secciones', index=False)
+        resumir(trayectorias, ['seccion', 'Proveedor']).to_excel(writer, sheet_name='Proveedores', index=False)
+        alertas(trayectorias).to_excel(writer, sheet_name='Alertas', index=False)
+    return ruta
+
+
+def crear_simulador_stock(config: Dict[str, Any]) -> SimuladorStock:
+    """
+    Crea un simulador de la trayectoria de stock.
+
+    Args:
+        config: Configuración del sistema (config.json)
+
+    Returns:
+        SimuladorStock
+    """
+    return SimuladorStock(config)
+
+
+# ============================================================================
+# LÍNEA DE COMANDOS
+# ============================================================================
+
+def _factor_accion(texto: str) -> tuple:
+    """'REDUCIR=1' -> ('REDUCIR', 1.0)"""
+    tipo, _, valor = texto.partition('=')
+    try:
+        tipo = tipo.strip().upper()
+        if tipo not in TIPOS_ACCION:
+            raise ValueError
+        return tipo, float(valor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{texto}' no válido (formato TIPO=factor con TIPO en {TIPOS_ACCION})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Proyección del stock por artículo hasta el final de la temporada',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python -m src.simulacion_stock --semana 14
+  python -m src.simulacion_stock --semana 14 --hasta 30 --stock-minimo 0.2 --excel
+  python -m src.simulacion_stock --semana 14 --factor-accion REDUCIR=1 --factor-accion ELIMINAR=0.5 --sin-tendencia
+        """
+    )
+    parser.add_argument('--semana', type=int, required=True, help='Primera semana simulada')
+    parser.add_argument('--hasta', type=int, default=None, help='Última semana (default: fin del período)')
+    parser.add_argument('--secciones', type=str, default=None, help='Secciones separadas por comas (default: activas)')
+    parser.add_argument('--stock-minimo', dest='stock_minimo', type=float, default=None,
+                        help='Porcentaje de stock mínimo (default: el de config.json)')
+    parser.add_argument('--factor-accion', dest='factores_accion', type=_factor_accion, action='append',
+                        default=[], metavar='TIPO=FACTOR', help='Factor de compra de un tipo de acción (repetible)')
+    parser.add_argument('--sin-tendencia', action='store_true', help='No aplicar la corrección por tendencia')
+    parser.add_argument('--alertas', type=int, default=20, help='Artículos con alerta a mostrar (default: 20)')
+    parser.add_argument('--excel', nargs='?', const='', default=None, metavar='RUTA',
+                        help='Guardar el resumen y las alertas en Excel (default output/Simulaciones/)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Mostrar el log de la carga de datos')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s - %(message)s')
+
+    from src.registro_config import obtener_registro
+    config = obtener_registro().principal()
+    secciones = [s.strip() for s in args.secciones.split(',')] if args.secciones else None
+
+    inicio = datetime.now()
+    simulador = crear_simulador_stock(config).cargar(args.semana, secciones, args.hasta)
+    carga = (datetime.now() - inicio).total_seconds()
+
+    inicio = datetime.now()
+    trayectorias = simulador.simular(args.stock_minimo, dict(args.factores_accion), not args.sin_tendencia)
+    simulacion = (datetime.now() - inicio).total_seconds()
+
+    resumen = resumir(trayectorias)
+    if resumen.empty:
+        print("No hay datos para las semanas y secciones indicadas")
+        return 1
+
+    with pd.option_context('display.max_rows', 200, 'display.width', 160):
+        print(f"SIMULACIÓN DE STOCK - semanas {simulador.semanas[0]}-{simulador.semanas[-1]}")
+        print(resumen.round(3).to_string(index=False))
+        lista = alertas(trayectorias)
+        if args.alertas and not lista.empty:
+            print(f"\nALERTAS ({len(lista)} artículos, se muestran {min(args.alertas, len(lista))})")
+            print(lista.head(args.alertas)[['seccion', 'Codigo_Articulo', 'Talla', 'Color', 'Proveedor', 'Alerta',
+                                            'primera_semana_rotura', 'unidades_no_servidas', 'exceso_final']]
+                  .to_string(index=False))
+
+    articulos = sum(len(t.claves) for t in trayectorias)
+    print(f"\n{articulos} artículos × {len(simulador.semanas)} semanas - "
+          f"carga {carga:.1f} s, simulación {simulacion:.3f} s")
+
+    if args.excel is not None:
+        print(f"Resultados guardados en {guardar_excel(trayectorias, Path(args.excel) if args.excel else None)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,24 +24,15 @@ from src.paths import DATA_DIR, BASE_DIR
 # Configuración del logger
 logger = logging.getLogger(__name__)
 
-# Intentamos importar el servicio de alertas (si está disponible)
-try:
-    from src.alert_service import crear_alert_service
-    ALERT_SERVICE = None
-    def get_alert_service():
-        global ALERT_SERVICE
-        if ALERT_SERVICE is None:
-            try:
-                from src.config_loader import cargar_configuracion
-                config = cargar_configuracion()
-                if config:
-                    ALERT_SERVICE = crear_alert_service(config)
-            except:
-                pass
-        return ALERT_SERVICE
-except ImportError:
-    def get_alert_service():
+# Servicio de alertas (si está disponible). Se importa al usarlo por primera vez
+# para que los comandos administrativos (--status, --reset) no carguen el
+# sistema de alertas.
+def get_alert_service():
+    try:
+        from src.alert_service import obtener_alert_service_compartido
+    except ImportError:
         return None
+    return obtener_alert_service_compartido()
 
 
 def _convertir_a_ruta_relativa(ruta: str) -> str:
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Módulo Tiendas - Varios centros de jardinería en una misma instalación
+
+El sistema se escribió para una sola tienda: las ventas, el stock, los ABC,
+los objetivos semanales de cada sección y state.json no llevan tienda. Con el
+bloque 'tiendas' de config.json cada tienda tiene su carpeta (por defecto
+data/tiendas/<codigo>) con la misma estructura de siempre:
+
+    input/                              SPA_ventas, SPA_stock_*, ABC... de la tienda
+    output/Pedidos_semanales/           Pedidos por sección
+    output/Pedidos_semanales_resumen/   Resumen consolidado de la tienda
+    state.json                          Stock acumulado e historial de ejecuciones
+    puntos_control/                     Secciones reutilizables (src/puntos_control.py)
+    historico_ventas/                   Histórico de ventas (src/historico_ventas.py)
+
+y sus propios objetivos, secciones activas, parámetros y festivos, que se
+fusionan sobre los generales (config_tienda). Cada tienda se procesa con la
+configuración resultante, así que los cargadores, los motores, el estado y
+las salidas no cambian: solo leen y escriben en otra carpeta.
+
+Las entradas compartidas (por defecto el fichero de costes, que es el
+catálogo de artículos con PVP, coste y proveedor) están una sola vez en
+data/input: se leen una vez en el proceso principal y cada trabajador las
+recibe ya leídas (compartir_lectura de src/lectura_entradas.py). Las tiendas
+se procesan en paralelo con EjecutorTiendas y al final se generan los
+totales por proveedor de todas las tiendas (data/output/Pedidos_tiendas).
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import copy
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from src.paths import BASE_DIR, PEDIDOS_TIENDAS_DIR, TIENDAS_DIR
+
+# pandas solo hace falta para los totales por proveedor: main.py importa este
+# módulo en los comandos administrativos
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+# Bloques de config.json que una tienda puede redefinir (se fusionan con los generales)
+CLAVES_TIENDA = ('secciones', 'secciones_activas', 'parametros', 'festivos',
+                 'parametros_correccion', 'archivos_entrada', 'archivos_correccion')
+
+# Entradas compartidas por defecto (claves de archivos_entrada)
+COMPARTIDOS_DEFECTO = ('coste',)
+
+SIN_PROVEEDOR = 'SIN PROVEEDOR'
+
+
+# ==============================================================================
+# TIENDAS Y SU CONFIGURACIÓN
+# ==============================================================================
+
+@dataclass
+class Tienda:
+    """
+    Una tienda del bloque 'tiendas' de config.json.
+
+    Attributes:
+        codigo (str): Clave de la tienda en config.json
+        nombre (str): Nombre para los informes
+        directorio (Path): Carpeta de la tienda
+        ajustes (dict): Bloques de config.json que redefine (CLAVES_TIENDA)
+        factor_objetivos (float): Escala de los objetivos semanales generales
+            (una tienda pequeña sin objetivos propios)
+    """
+    codigo: str
+    nombre: str
+    directorio: Path
+    ajustes: Dict[str, Any] = field(default_factory=dict)
+    factor_objetivos: float = 1.0
+
+    @property
+    def directorio_entrada(self) -> Path:
+        return self.directorio / 'input'
+
+    @property
+    def directorio_salida(self) -> Path:
+        return self.directorio / 'output' / 'Pedidos_semanales'
+
+    @property
+    def directorio_resumen(self) -> Path:
+        return self.directorio / 'output' / 'Pedidos_semanales_resumen'
+
+    @property
+    def directorio_puntos_control(self) -> Path:
+        return self.directorio / 'puntos_control'
+
+    @property
+    def directorio_historico(self) -> Path:
+        return self.directorio / 'historico_ventas'
+
+
+def _fusionar(base: Dict[str, Any], cambios: Dict[str, Any]) -> Dict[str, Any]:
+    """Fusiona dos diccionarios de configuración: los anidados clave a clave, el resto se sustituye."""
+    resultado = dict(base)
+    for clave, valor in cambios.items():
+        if isinstance(valor, dict) and isinstance(resultado.get(clave), dict):
+            resultado[clave] = _fusionar(resultado[clave], valor)
+        else:
+            resultado[clave] = copy.deepcopy(valor)
+    return resultado
+
+
+def cargar_tiendas(config: Dict[str, Any], codigos: Optional[Iterable[str]] = None) -> List[Tienda]:
+    """
+    Tiendas configuradas en el bloque 'tiendas' de config.json.
+
+    Args:
+        config: Configuración principal
+        codigos: Solo estas tiendas (--tienda de main.py)
+
+    Returns:
+        List[Tienda]: Vacía si no hay tiendas (instalación de una sola tienda)
+
+    Raises:
+        ValueError: Si se pide una tienda que no está configurada
+    """
+    lista = config.get('tiendas', {}).get('lista', {})
+    tiendas = []
+    for codigo, datos in lista.items():
+        directorio = Path(datos.get('directorio') or TIENDAS_DIR / codigo)
+        if not directorio.is_absolute():
+            directorio = BASE_DIR / directorio
+        tiendas.append(Tienda(
+            codigo=codigo,
+            nombre=datos.get('nombre', codigo),
+            directorio=directorio,
+            ajustes={clave: datos[clave] for clave in CLAVES_TIENDA if clave in datos},
+            factor_objetivos=float(datos.get('factor_objetivos', 1.0)),
+        ))
+    if codigos:
+        codigos = list(codigos)
+        desconocidas = [c for c in codigos if c not in lista]
+        if desconocidas:
+            raise ValueError(f"Tiendas no configuradas: {', '.join(desconocidas)} "
+                             f"(configuradas: {', '.join(lista) or 'ninguna'})")
+        tiendas = [t for t in tiendas if t.codigo in codigos]
+    return tiendas
+
+
+def rutas_compartidas(config: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Entradas que comparten todas las tiendas, {clave de archivos_entrada: ruta}.
+
+    Se buscan en el directorio de entrada general (data/input); las que no
+    existen no se comparten y cada tienda usa la suya.
+    """
+    from src.data_loader import DataLoader
+    from src.lectura_entradas import resolver_entrada
+    from src.manifiesto_entradas import obtener_manifiesto
+
+    loader = DataLoader(config)
+    dir_entrada = loader.obtener_directorio_entrada()
+    rutas = {}
+    for clave in config.get('tiendas', {}).get('compartidos', COMPARTIDOS_DEFECTO):
+        nombre = loader.archivos.get(clave)
+        if not nombre:
+            logger.warning(f"Entrada compartida desconocida: {clave} (no está en archivos_entrada)")
+            continue
+        ruta = str(resolver_entrada(os.path.join(dir_entrada, nombre)))
+        if obtener_manifiesto().existe(ruta):
+            rutas[clave] = os.path.abspath(ruta)
+    return rutas
+
+
+def config_tienda(config: Dict[str, Any], tienda: Tienda,
+                  compartidas: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Configuración con la que se procesa una tienda.
+
+    Es la general con los objetivos escalados por factor_objetivos, los
+    bloques de la tienda fusionados encima, las rutas de la carpeta de la
+    tienda y las entradas compartidas con su ruta absoluta.
+
+    Args:
+        config: Configuración principal
+        tienda: Tienda a procesar
+        compartidas: rutas_compartidas(config)
+
+    Returns:
+        Dict: Configuración de la tienda (copia; config no se modifica)
+    """
+    resultado = {clave: copy.deepcopy(valor) for clave, valor in config.items() if clave != 'tiendas'}
+
+    # El factor escala los objetivos generales; los que da la tienda se usan tal cual
+    if tienda.factor_objetivos != 1.0:
+        for datos_seccion in resultado.get('secciones', {}).values():
+            objetivos = datos_seccion.get('objetivos_semanales', {})
+            for semana, objetivo in objetivos.items():
+                objetivos[semana] = round(objetivo * tienda.factor_objetivos, 2)
+    resultado = _fusionar(resultado, tienda.ajustes)
+
+    rutas = resultado.setdefault('rutas', {})
+    rutas['directorio_entrada'] = str(tienda.directorio_entrada)
+    rutas['directorio_salida'] = str(tienda.directorio_salida)
+    rutas['directorio_resumen_pedidos'] = str(tienda.directorio_resumen)
+    rutas['directorio_puntos_control'] = str(tienda.directorio_puntos_control)
+    rutas['directorio_estado'] = str(tienda.directorio)
+    resultado.setdefault('historico_ventas', {})['directorio'] = str(tienda.directorio_historico)
+
+    archivos = resultado.setdefault('archivos_entrada', {})
+    for clave, ruta in (compartidas or {}).items():
+        if clave not in tienda.ajustes.get('archivos_entrada', {}):
+            archivos[clave] = ruta
+
+    resultado['tienda'] = {'codigo': tienda.codigo, 'nombre': tienda.nombre}
+    return resultado
+
+
+def etiqueta_tienda(config: Dict[str, Any]) -> str:
+    """
+    Marca de la tienda en los nombres de los pedidos y resúmenes ('Tienda-<codigo>').
+
+    Vacía si la configuración no es la de una tienda (config_tienda), de modo
+    que con una sola tienda los nombres no cambian. El código va sin '_' para
+    que el manifiesto de entradas lo distinga de la sección.
+    """
+    tienda = config.get('tienda')
+    return f"Tienda-{str(tienda['codigo']).replace('_', '-')}" if tienda else ''
+
+
+# ==============================================================================
+# EJECUCIÓN EN PARALELO
+# ==============================================================================
+
+def _funcion_importable(funcion: Callable[..., Any]) -> bool:
+    """
+    True si un proceso trabajador puede encontrar la función por su módulo y nombre.
+
+    No es así cuando main.py se ejecuta dentro de otro script (pipeline_semanal.py
+    lo ejecuta con exec en un espacio '__main__'): sys.modules['__main__'] es
+    entonces el script que lo ejecuta y pickle no encuentra la función.
+    """
+    objeto = sys.modules.get(getattr(funcion, '__module__', None) or '')
+    for parte in getattr(funcion, '__qualname__', '').split('.'):
+        objeto = getattr(objeto, parte, None)
+    return objeto is funcion
+
+
+def _iniciar_trabajador(libros: Dict[str, dict]) -> None:
+    """Registra en el proceso trabajador las entradas compartidas que leyó el principal."""
+    from src.lectura_entradas import compartir_lectura
+
+    for ruta, libro in libros.items():
+        compartir_lectura(ruta, libro)
+
+
+class EjecutorTiendas:
+    """
+    Procesa varias tiendas a la vez.
+
+    Cada tienda va en un proceso (spawn, como la precarga de entradas) o, con
+    un solo núcleo o si la función no se puede importar desde otro proceso
+    (main.py ejecutado por pipeline_semanal.py), en un hilo. Las entradas
+    compartidas se leen una vez en el proceso principal con compartir() y los
+    procesos trabajadores las reciben al arrancar; los hilos usan directamente la lectura del principal.
+
+    Attributes:
+        modo (str): 'procesos' o 'hilos'
+        max_trabajadores (int): Tiendas simultáneas (None = según los núcleos)
+    """
+
+    def __init__(self, modo: str = 'procesos', max_trabajadores: Optional[int] = None):
+        if modo not in ('procesos', 'hilos'):
+            raise ValueError(f"Modo de ejecución de tiendas desconocido: {modo!r} (procesos o hilos)")
+        if modo == 'procesos' and (os.cpu_count() or 1) == 1:
+            # Con un solo núcleo los procesos no van más deprisa y arrancarlos cuesta
+            modo = 'hilos'
+        self.modo = modo
+        self.max_trabajadores = max_trabajadores
+        self._libros: Dict[str, dict] = {}
+
+    def compartir(self, rutas: Iterable[str]) -> int:
+        """
+        Lee una vez las entradas compartidas para todas las tiendas.
+
+        Returns:
+            int: Ficheros compartidos
+        """
+        from src.lectura_entradas import compartir_lectura
+
+        for ruta in rutas:
+            libro = compartir_lectura(ruta)
+            if libro is not None:
+                self._libros[str(ruta)] = libro
+                logger.info(f"Entrada compartida entre tiendas: {Path(ruta).name}")
+        return len(self._libros)
+
+    def _crear_ejecutor(self, tareas: int, modo: str) -> Executor:
+        trabajadores = min(tareas, self.max_trabajadores or os.cpu_count() or 1)
+        if modo == 'procesos':
+            return ProcessPoolExecutor(trabajadores, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_iniciar_trabajador, initargs=(self._libros,))
+        return ThreadPoolExecutor(trabajadores, thread_name_prefix='tienda')
+
+    def ejecutar(self, funcion: Callable[..., Any], tareas: Dict[str, tuple]) -> Dict[str, Any]:
+        """
+        Ejecuta funcion(*argumentos) para cada tienda.
+
+        En modo 'procesos' la función tiene que poderse importar desde el
+        proceso trabajador (nivel de módulo); si no, las tiendas se procesan en
+        hilos. El fallo de una tienda no detiene las demás.
+
+        Args:
+            funcion: Trabajo de una tienda
+            tareas: {codigo de tienda: argumentos}
+
+        Returns:
+            Dict: {codigo: resultado, o la excepción si falló}
+        """
+        if not tareas:
+            return {}
+        modo = self.modo
+        if modo == 'procesos' and not _funcion_importable(funcion):
+            logger.warning(f"{getattr(funcion, '__qualname__', funcion)} no se puede importar desde otro "
+                           f"proceso: las tiendas se procesan en hilos")
+            modo = 'hilos'
+        resultados = {}
+        with self._crear_ejecutor(len(tareas), modo) as ejecutor:
+            futuros = {codigo: ejecutor.submit(funcion, *argumentos) for codigo, argumentos in tareas.items()}
+            for codigo, futuro in futuros.items():
+                try:
+                    resultados[codigo] = futuro.result()
+                except Exception as e:
+                    logger.error(f"Error procesando la tienda {codigo}: {type(e).__name__}: {e}")
+                    resultados[codigo] = e
+        return resultados
+
+
+def crear_ejecutor_tiendas(config: Optional[Dict[str, Any]] = None) -> EjecutorTiendas:
+    """
+    Crea el ejecutor según el bloque 'tiendas' de config.json.
+
+    Returns:
+        EjecutorTiendas
+    """
+    opciones = (config or {}).get('tiendas', {})
+    return EjecutorTiendas(opciones.get('modo', 'procesos'), opciones.get('max_trabajadores'))
+
+
+# ==============================================================================
+# TOTALES POR PROVEEDOR
+# ==============================================================================
+
+def totales_proveedor(pedidos: Dict[str, 'pd.DataFrame']) -> 'pd.DataFrame':
+    """
+    Totales por sección y proveedor de los pedidos finales de una tienda.
+
+    Args:
+        pedidos: {sección: pedido final} de procesar_pedido_semana
+
+    Returns:
+        DataFrame con Seccion, Proveedor, Articulos, Unidades, Importe_Coste
+        y Ventas_Objetivo (solo los artículos con pedido)
+    """
+    import pandas as pd
+
+    columnas = ['Seccion', 'Proveedor', 'Articulos', 'Unidades', 'Importe_Coste', 'Ventas_Objetivo']
+    partes = []
+    for seccion, df in pedidos.items():
+        if df is None or len(df) == 0:
+            continue
+        columna = 'Pedido_Final' if 'Pedido_Final' in df.columns else 'Pedido_Corregido_Stock'
+        if columna not in df.columns:
+            continue
+        unidades = pd.to_numeric(df[columna], errors='coerce').fillna(0)
+        con_pedido = unidades > 0
+        if not con_pedido.any():
+            continue
+        coste = pd.to_numeric(df['Coste_Pedido'], errors='coerce').fillna(0) if 'Coste_Pedido' in df.columns else 0
+        ventas = pd.to_numeric(df['Ventas_Objetivo'], errors='coerce').fillna(0) if 'Ventas_Objetivo' in df.columns else 0
+        proveedor = df['Proveedor'] if 'Proveedor' in df.columns else pd.Series(SIN_PROVEEDOR, index=df.index)
+        partes.append(pd.DataFrame({
+            'Seccion': seccion,
+            'Proveedor': proveedor.astype(object).fillna('').astype(str).str.strip().replace('', SIN_PROVEEDOR),
+            'Articulos': 1,
+            'Unidades': unidades,
+            'Importe_Coste': unidades * coste,
+            'Ventas_Objetivo': ventas,
+        })[con_pedido])
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+    return (pd.concat(partes, ignore_index=True)
+            .groupby(['Seccion', 'Proveedor'], as_index=False, sort=True)
+            .sum()[columnas])
+
+
+def consolidar_proveedores(totales: Dict[str, 'pd.DataFrame']) -> 'pd.DataFrame':
+    """
+    Totales por proveedor de todas las tiendas.
+
+    Args:
+        totales: {codigo de tienda: totales_proveedor()}
+
+    Returns:
+        DataFrame con una fila por proveedor: unidades de cada tienda y los
+        totales de todas, ordenado por importe de coste
+    """
+    import pandas as pd
+
+    partes = [df.assign(Tienda=codigo) for codigo, df in totales.items() if df is not None and len(df)]
+    if not partes:
+        return pd.DataFrame(columns=['Proveedor', 'Tiendas', 'Articulos', 'Unidades',
+                                     'Importe_Coste', 'Ventas_Objetivo'])
+    detalle = pd.concat(partes, ignore_index=True)
+    por_tienda = (detalle.pivot_table(index='Proveedor', columns='Tienda', values='Unidades',
+                                      aggfunc='sum', fill_value=0)
+                  .reindex(columns=[c for c in totales if c in set(detalle['Tienda'])])
+                  .add_prefix('Unidades_'))
+    total = detalle.groupby('Proveedor').agg(
+        Tiendas=('Tienda', 'nunique'),
+        Articulos=('Articulos', 'sum'),
+        Unidades=('Unidades', 'sum'),
+        Importe_Coste=('Importe_Coste', 'sum'),
+        Ventas_Objetivo=('Ventas_Objetivo', 'sum'),
+    )
+    resultado = por_tienda.join(total).reset_index()
+    resultado.columns.name = None
+    return resultado.sort_values(['Importe_Coste', 'Proveedor'], ascending=[False, True], ignore_index=True)
+
+
+def generar_consolidado(semana: int, totales: Dict[str, 'pd.DataFrame'], resumen_tiendas: 'pd.DataFrame',
+                        directorio: Path = PEDIDOS_TIENDAS_DIR) -> Optional[str]:
+    """
+    Escribe el Excel con los totales por proveedor de todas las tiendas.
+
+    Hojas: Proveedores (consolidado), Detalle (tienda, sección y proveedor) y
+    Tiendas (resultado de cada tienda).
+
+    Args:
+        semana: Semana del pedido
+        totales: {codigo de tienda: totales_proveedor()}
+        resumen_tiendas: Una fila por tienda (éxito, artículos, importe...)
+        directorio: Carpeta de salida (default data/output/Pedidos_tiendas)
+
+    Returns:
+        Optional[str]: Ruta del fichero o None si no hay nada que consolidar
+    """
+    import pandas as pd
+
+    proveedores = consolidar_proveedores(totales)
+    if proveedores.empty:
+        logger.warning(f"Semana {semana}: ninguna tienda tiene pedido, no se generan los totales por proveedor")
+        return None
+    detalle = pd.concat([df.assign(Tienda=codigo) for codigo, df in totales.items() if df is not None and len(df)],
+                        ignore_index=True)
+    detalle = detalle[['Tienda'] + [c for c in detalle.columns if c != 'Tienda']]
+
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / f"Proveedores_Tiendas_Semana_{semana:02d}_{datetime.now().strftime('%d%m%Y')}.xlsx"
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        proveedores.to_excel(writer, sheet_name='Proveedores', index=False)
+        detalle.to_excel(writer, sheet_name='Detalle', index=False)
+        resumen_tiendas.to_excel(writer, sheet_name='Tiendas', index=False)
+        for hoja in writer.sheets.values():
+            hoja.freeze_panes = 'A2'
+            for celdas in hoja.columns:
+                ancho = max(len(str(c.value)) if c.value is not None else 0 for c in celdas[:200])
+                hoja.column_dimensions[celdas[0].column_letter].width = min(max(ancho + 2, 10), 45)
+    logger.info(f"Totales por proveedor de {len(totales)} tiendas: {ruta} "
+                f"({len(proveedores)} proveedores, {proveedores['Importe_Coste'].sum():.2f}€ a coste)")
+    return str(ruta)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Módulo TransporteEmail - Transporte SMTP compartido con reutilización de sesiones
+
+Todos los envíos del sistema (pedidos por sección, resúmenes de gestión e
+informes de cada script) abrían una conexión TLS nueva, se autenticaban y
+enviaban un único mensaje. Este transporte mantiene un pequeño pool de sesiones
+SMTP autenticadas que se reutilizan entre mensajes, envía lotes de mensajes con
+concurrencia acotada (una sesión por hilo), reintenta con espera exponencial los
+errores transitorios y devuelve el resultado de cada mensaje.
+
+Uso:
+    with TransporteSMTP(servidor, puerto, usuario, password) as transporte:
+        resultados = transporte.enviar_lote([(msg1, [email1]), (msg2, [email2])])
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-12
+"""
+
+import atexit
+import logging
+import os
+import queue
+import smtplib
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.mime.multipart import MIMEMultipart
+from typing import Optional, List, Dict, Any, Tuple
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+# Transportes compartidos por proceso, indexados por (servidor, puerto, usuario)
+_TRANSPORTES_COMPARTIDOS: Dict[Tuple[str, int, str], "TransporteSMTP"] = {}
+_BLOQUEO_COMPARTIDOS = threading.Lock()
+
+
+# Códigos SMTP 4xx: error temporal del servidor, se puede reintentar
+ERRORES_TRANSITORIOS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    socket.timeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+@dataclass
+class ResultadoEnvio:
+    """
+    Resultado del envío de un mensaje.
+
+    Attributes:
+        destinatarios (List[str]): Direcciones a las que se envió
+        asunto (str): Asunto del mensaje
+        enviado (bool): True si el servidor aceptó el mensaje
+        intentos (int): Número de intentos realizados
+        error (str): Último error, si no se pudo enviar
+        rechazados (dict): Destinatarios rechazados por el servidor
+    """
+    destinatarios: List[str]
+    asunto: str = ''
+    enviado: bool = False
+    intentos: int = 0
+    error: Optional[str] = None
+    rechazados: Dict[str, Any] = field(default_factory=dict)
+
+
+def _es_transitorio(error: Exception) -> bool:
+    """
+    Indica si un error SMTP merece reintento.
+
+    Las excepciones de smtplib heredan de OSError, así que se miran antes: la
+    autenticación, el rechazo de los destinatarios y las respuestas 5xx son
+    definitivos; las respuestas 4xx, la desconexión y los errores de red, no.
+    """
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused)):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, ERRORES_TRANSITORIOS):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class TransporteSMTP:
+    """
+    Pool de sesiones SMTP autenticadas con envío concurrente acotado.
+
+    Attributes:
+        servidor (str): Servidor SMTP
+        puerto (int): Puerto SMTP
+        usuario (str): Usuario (y remitente por defecto)
+        max_conexiones (int): Sesiones simultáneas como máximo
+        reintentos (int): Reintentos por mensaje ante errores transitorios
+        espera_base (float): Segundos de la primera espera entre reintentos
+    """
+
+    def __init__(self, servidor: str, puerto: int, usuario: str, password: str,
+                 usar_ssl: bool = True, usar_tls: bool = False,
+                 max_conexiones: int = 2, reintentos: int = 3,
+                 espera_base: float = 1.0, timeout: float = 30.0):
+        self.servidor = servidor
+        self.puerto = puerto
+        self.usuario = usuario
+        self._password = password
+        self.usar_ssl = usar_ssl
+        self.usar_tls = usar_tls
+        self.max_conexiones = max(1, max_conexiones)
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.timeout = timeout
+
+        self._libres: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._semaforo = threading.BoundedSemaphore(self.max_conexiones)
+        self._bloqueo = threading.Lock()
+        self._abiertas: List[smtplib.SMTP] = []
+        self.sesiones_abiertas = 0
+        self._autenticacion_fallida: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Sesiones
+    # ------------------------------------------------------------------
+
+    def _abrir_sesion(self) -> smtplib.SMTP:
+        contexto = ssl.create_default_context()
+        if self.usar_ssl:
+            sesion = smtplib.SMTP_SSL(self.servidor, self.puerto, context=contexto, timeout=self.timeout)
+        else:
+            sesion = smtplib.SMTP(self.servidor, self.puerto, timeout=self.timeout)
+            if self.usar_tls:
+                sesion.starttls(context=contexto)
+        try:
+            sesion.login(self.usuario, self._password)
+        except Exception:
+            self._cerrar_sesion(sesion)
+            raise
+        with self._bloqueo:
+            self._abiertas.append(sesion)
+            self.sesiones_abiertas += 1
+        logger.debug(f"Sesión SMTP abierta con {self.servidor}:{self.puerto}")
+        return sesion
+
+    def _cerrar_sesion(self, sesion: smtplib.SMTP):
+        with self._bloqueo:
+            if sesion in self._abiertas:
+                self._abiertas.remove(sesion)
+        try:
+            sesion.quit()
+        except Exception:
+            try:
+                sesion.close()
+            except Exception:
+                pass
+
+    def _tomar_sesion(self) -> smtplib.SMTP:
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            return self._abrir_sesion()
+
+    # ------------------------------------------------------------------
+    # Envío
+    # ------------------------------------------------------------------
+
+    def enviar(self, msg: MIMEMultipart, destinatarios: Optional[List[str]] = None,
+               remitente: Optional[str] = None) -> ResultadoEnvio:
+        """
+        Envía un mensaje reutilizando una sesión del pool.
+
+        Args:
+            msg: Mensaje MIME
+            destinatarios: Direcciones (por defecto, las de la cabecera To)
+            remitente: Remitente del sobre SMTP (por defecto, el usuario)
+
+        Returns:
+            ResultadoEnvio: Resultado del envío
+        """
+        if destinatarios is None:
+            destinatarios = [d.strip() for d in str(msg['To'] or '').split(',') if d.strip()]
+        resultado = ResultadoEnvio(destinatarios=list(destinatarios), asunto=str(msg['Subject'] or ''))
+
+        if self._autenticacion_fallida:
+            resultado.error = self._autenticacion_fallida
+            return resultado
+
+        contenido = msg.as_string()
+        with self._semaforo:
+            for intento in range(1, self.reintentos + 2):
+                resultado.intentos = intento
+                sesion = None
+                try:
+                    sesion = self._tomar_sesion()
+                    resultado.rechazados = sesion.sendmail(remitente or self.usuario, destinatarios, contenido)
+                    resultado.enviado = True
+                    resultado.error = None
+                    self._libres.put(sesion)
+                    break
+                except Exception as e:
+                    resultado.error = str(e)
+                    if sesion is not None:
+                        self._cerrar_sesion(sesion)
+                    if isinstance(e, smtplib.SMTPAuthenticationError):
+                        # Sin credenciales válidas no tiene sentido seguir intentando
+                        self._autenticacion_fallida = f"Error de autenticación SMTP: {e}"
+                        resultado.error = self._autenticacion_fallida
+                        break
+                    if not _es_transitorio(e) or intento > self.reintentos:
+                        break
+                    espera = self.espera_base * (2 ** (intento - 1))
+                    logger.warning(f"Error transitorio al enviar '{resultado.asunto}' "
+                                   f"(intento {intento}): {e}. Reintentando en {espera:.1f}s")
+                    time.sleep(espera)
+
+        if resultado.enviado:
+            logger.info(f"Email enviado exitosamente a: {', '.join(destinatarios)}")
+        else:
+            logger.error(f"Error al enviar email a {', '.join(destinatarios)}: {resultado.error}")
+        return resultado
+
+    def enviar_lote(self, mensajes: List[Tuple[MIMEMultipart, Optional[List[str]]]]) -> List[ResultadoEnvio]:
+        """
+        Envía varios mensajes con como máximo max_conexiones sesiones en paralelo.
+
+        Args:
+            mensajes: Lista de (mensaje, destinatarios o None)
+
+        Returns:
+            List[ResultadoEnvio]: Resultados en el mismo orden que los mensajes
+        """
+        if not mensajes:
+            return []
+        if len(mensajes) == 1 or self.max_conexiones == 1:
+            return [self.enviar(msg, destinatarios) for msg, destinatarios in mensajes]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_conexiones, len(mensajes)),
+                                thread_name_prefix="EnvioSMTP") as executor:
+            futuros = [executor.submit(self.enviar, msg, destinatarios) for msg, destinatarios in mensajes]
+            return [futuro.result() for futuro in futuros]
+
+    def cerrar(self):
+        """Cierra todas las sesiones abiertas."""
+        with self._bloqueo:
+            abiertas = list(self._abiertas)
+        for sesion in abiertas:
+            self._cerrar_sesion(sesion)
+        while not self._libres.empty():
+            try:
+                self._libres.get_nowait()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+
+def crear_transporte_smtp(smtp_config: Dict[str, Any], usuario: str,
+                          password: Optional[str] = None,
+                          password_var: str = 'EMAIL_PASSWORD',
+                          max_conexiones: int = 2) -> TransporteSMTP:
+    """
+    Crea un transporte SMTP a partir de la sección 'smtp' de email.json.
+
+    Args:
+        smtp_config: Dict con servidor, puerto, usar_ssl y usar_tls
+        usuario: Cuenta con la que autenticarse (remitente)
+        password: Contraseña; si no se indica se lee de la variable de entorno
+        password_var: Variable de entorno con la contraseña
+        max_conexiones: Sesiones simultáneas como máximo
+
+    Returns:
+        TransporteSMTP: Transporte listo para enviar
+
+    Raises:
+        ValueError: Si no hay contraseña disponible
+    """
+    password = password or os.environ.get(password_var)
+    if not password:
+        raise ValueError(f"Variable de entorno '{password_var}' no configurada.")
+    return TransporteSMTP(
+        servidor=smtp_config.get('servidor', 'smtp.serviciodecorreo.es'),
+        puerto=smtp_config.get('puerto', 465),
+        usuario=usuario,
+        password=password,
+        usar_ssl=smtp_config.get('usar_ssl', True),
+        usar_tls=smtp_config.get('usar_tls', False),
+        max_conexiones=max_conexiones,
+    )
+
+
+def transporte_compartido(servidor: str, puerto: int, usuario: str, password: str,
+                          usar_ssl: bool = True, usar_tls: bool = False) -> TransporteSMTP:
+    """
+    Devuelve el transporte del proceso para una cuenta, creándolo si no existe.
+
+    Los scripts que envían un email por sección o por destinatario reutilizan
+    así la misma sesión autenticada en todas sus llamadas. Las sesiones se
+    cierran al terminar el proceso.
+
+    Args:
+        servidor: Servidor SMTP
+        puerto: Puerto SMTP
+        usuario: Cuenta con la que autenticarse (remitente)
+        password: Contraseña de la cuenta
+        usar_ssl: Conexión SSL directa
+        usar_tls: STARTTLS sobre conexión plana (si usar_ssl es False)
+
+    Returns:
+        TransporteSMTP: Transporte compartido
+    """
+    clave = (servidor, puerto, usuario)
+    with _BLOQUEO_COMPARTIDOS:
+        transporte = _TRANSPORTES_COMPARTIDOS.get(clave)
+        if transporte is None:
+            transporte = TransporteSMTP(servidor, puerto, usuario, password,
+                                        usar_ssl=usar_ssl, usar_tls=usar_tls)
+            _TRANSPORTES_COMPARTIDOS[clave] = transporte
+        return transporte
+
+
+@atexit.register
+def cerrar_transportes_compartidos():
+    """Cierra las sesiones de todos los transportes compartidos."""
+    with _BLOQUEO_COMPARTIDOS:
+        transportes = list(_TRANSPORTES_COMPARTIDOS.values())
+        _TRANSPORTES_COMPARTIDOS.clear()
+    for transporte in transportes:
+        transporte.cerrar()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Módulo ValidacionEntradas - Comprobación previa de los encabezados de las entradas
+
+Una columna que falta en un fichero del ERP se descubría tarde: leer_coste()
+devolvía None con "No se encontró columna de código" después de leer las
+ventas, fusionar_datos_tendencia() avisaba de que faltaban Talla y Color al
+corregir cada sección y clasificacionABC.py fallaba con KeyError
+'Nombre artículo' tras varios minutos de carga.
+
+Antes de empezar, ValidadorEntradas abre en modo de solo lectura cada fichero
+que va a usar la ejecución, lee solo la fila de encabezados de las hojas que
+lee el cargador (leer_cabecera) y la compara con el esquema declarado para
+esa entrada en ESQUEMAS_ENTRADA. Los nombres se comparan sin acentos,
+mayúsculas, espacios ni signos, como encontrar_columna(). Los ficheros se
+revisan a la vez en un grupo de hilos y todos los problemas se reúnen en un
+único ResultadoValidacion, que se registra y se envía en una sola alerta
+(ENTRADAS_INVALIDAS).
+
+Cada columna del esquema tiene una gravedad:
+- 'error': el proceso no puede seguir sin ella; la ejecución se detiene
+- 'aviso': el cargador sigue sin ella (p. ej. Talla y Color en las ventas de
+  la semana); se informa pero no se detiene, salvo con estricto=true
+
+Uso:
+    from src.validacion_entradas import crear_validador
+
+    validador = crear_validador(config)
+    resultado = validador.validar(validador.entradas_pedido([15]))
+    resultado.registrar()
+    resultado.alertar('main.py')        # Una sola alerta si hay problemas
+    if not resultado.correcto:
+        ...                             # Detener la ejecución
+
+    python -m src.validacion_entradas --semanas 15      # Entradas del pedido de la semana 15
+    python -m src.validacion_entradas --periodo P2      # Entradas de clasificacionABC.py para P2
+
+Autor: Sistema de Pedidos Viveverde V2
+Fecha: 2026-03-13
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.lectura_entradas import buscar_entradas, leer_cabecera, normalizar_nombre, resolver_entrada
+from src.manifiesto_entradas import obtener_manifiesto
+from src.paths import INPUT_DIR
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# ESQUEMAS DE LAS ENTRADAS
+# ==============================================================================
+
+@dataclass(frozen=True)
+class ColumnaEsperada:
+    """Columna de un esquema: vale cualquiera de los nombres alternativos."""
+    nombres: Tuple[str, ...]
+    gravedad: str = 'error'
+
+    @property
+    def nombre(self) -> str:
+        return ' / '.join(self.nombres)
+
+
+@dataclass(frozen=True)
+class EsquemaEntrada:
+    """
+    Encabezados que necesita el cargador de una entrada.
+
+    hojas: qué hojas se comprueban, las mismas que lee el cargador:
+        'primera'  la primera hoja
+        'ventas'   la hoja "Ventas por vendedor" o, si no hay, la primera (DataLoader.hoja_ventas)
+        'todas'    todas las hojas (una por categoría en el ABC)
+    """
+    descripcion: str
+    columnas: Tuple[ColumnaEsperada, ...]
+    hojas: str = 'primera'
+
+
+def _columnas(*nombres: str, gravedad: str = 'error') -> Tuple[ColumnaEsperada, ...]:
+    return tuple(ColumnaEsperada((nombre,), gravedad) for nombre in nombres)
+
+
+CLAVE_ARTICULO = ('Artículo', 'Nombre artículo', 'Talla', 'Color')
+
+ESQUEMAS_ENTRADA: Dict[str, EsquemaEntrada] = {
+    # DataLoader.leer_ventas / ForecastEngine (Semana se calcula de Fecha si falta)
+    'ventas': EsquemaEntrada(
+        'Ventas históricas',
+        _columnas(*CLAVE_ARTICULO, 'Unidades', 'Importe')
+        + (ColumnaEsperada(('Fecha', 'Semana')),)
+        + _columnas('Tipo registro', gravedad='aviso'),
+        hojas='ventas'),
+    # clasificacionABC.py selecciona todas estas columnas de las ventas
+    'ventas_clasificacion': EsquemaEntrada(
+        'Ventas históricas',
+        _columnas('Vendedor', 'Serie', 'Documento', 'Fecha', 'Factura', *CLAVE_ARTICULO,
+                  'Unidades', 'Precio', 'Importe', 'Comisión', 'Tipo registro')),
+    # DataLoader.leer_coste: Talla y Color se rellenan vacías si faltan
+    'coste': EsquemaEntrada(
+        'Costes y tarifas',
+        (ColumnaEsperada(('Codigo', 'Artículo')),) + _columnas('Talla', 'Color', gravedad='aviso')),
+    'coste_clasificacion': EsquemaEntrada(
+        'Costes y tarifas',
+        _columnas('Artículo', 'Talla', 'Color', 'Coste')),
+    'compras': EsquemaEntrada(
+        'Compras',
+        _columnas(*CLAVE_ARTICULO, 'Fecha', 'Unidades')),
+    'stock_periodo': EsquemaEntrada(
+        'Stock del período',
+        _columnas(*CLAVE_ARTICULO, 'Unidades')),
+    # Corrección (FASE 2): sin Artículo o Unidades se sigue sin tendencia
+    'ventas_semana': EsquemaEntrada(
+        'Ventas de la semana',
+        _columnas('Artículo', 'Unidades', 'Talla', 'Color', gravedad='aviso')),
+    'stock_actual': EsquemaEntrada(
+        'Stock actual',
+        _columnas('Artículo', 'Unidades', 'Talla', 'Color', gravedad='aviso')),
+    'clasificacion_abc': EsquemaEntrada(
+        'Clasificación ABC+D',
+        _columnas(*CLAVE_ARTICULO),
+        hojas='todas'),
+}
+
+
+# ==============================================================================
+# RESULTADO
+# ==============================================================================
+
+@dataclass(frozen=True)
+class EntradaValidar:
+    """Fichero que se va a comprobar contra un esquema."""
+    esquema: str
+    ruta: str
+    obligatoria: bool = True
+    seccion: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ProblemaEntrada:
+    """Un problema encontrado en una entrada."""
+    gravedad: str
+    archivo: str
+    mensaje: str
+    hoja: Optional[str] = None
+
+    def __str__(self) -> str:
+        hoja = f" [{self.hoja}]" if self.hoja else ''
+        return f"{self.archivo}{hoja}: {self.mensaje}"
+
+
+@dataclass
+class ResultadoValidacion:
+    """Problemas de todas las entradas de una ejecución."""
+    ficheros: int = 0
+    segundos: float = 0.0
+    estricto: bool = False
+    problemas: List[ProblemaEntrada] = field(default_factory=list)
+
+    @property
+    def errores(self) -> List[ProblemaEntrada]:
+        return [p for p in self.problemas if p.gravedad == 'error']
+
+    @property
+    def avisos(self) -> List[ProblemaEntrada]:
+        return [p for p in self.problemas if p.gravedad == 'aviso']
+
+    @property
+    def correcto(self) -> bool:
+        """True si la ejecución puede seguir (sin errores, y sin avisos en modo estricto)."""
+        return not (self.errores or (self.estricto and self.avisos))
+
+    def incorporar(self, otro: 'ResultadoValidacion', origen: Optional[str] = None) -> None:
+        """Añade los problemas de otra validación (la de cada tienda), con su origen delante del fichero."""
+        self.ficheros += otro.ficheros
+        self.segundos += otro.segundos
+        for problema in otro.problemas:
+            if origen:
+                problema = replace(problema, archivo=f"{origen}/{problema.archivo}")
+            self.problemas.append(problema)
+
+    def registrar(self) -> None:
+        """
+        Escribe el resultado en el log: una línea por problema.
+
+        Las líneas no generan alertas sueltas (AlertLoggingHandler): los
+        problemas se envían juntos con alertar().
+        """
+        for problema in self.errores:
+            logger.error(f"Entrada no válida: {problema}", extra={'sin_alerta': True})
+        for problema in self.avisos:
+            logger.warning(f"Entrada incompleta: {problema}", extra={'sin_alerta': True})
+        logger.info(f"Validación de entradas: {self.ficheros} ficheros en {self.segundos:.2f} s, "
+                    f"{len(self.errores)} errores y {len(self.avisos)} avisos")
+
+    def alertar(self, proceso: str, alert_service: Any = None) -> bool:
+        """
+        Envía todos los problemas en una sola alerta ENTRADAS_INVALIDAS.
+
+        Args:
+            proceso: Script que se detiene (main.py, clasificacionABC.py)
+            alert_service: AlertService a usar (por defecto el compartido)
+
+        Returns:
+            bool: True si se envió la alerta
+        """
+        if not self.problemas:
+            return False
+        if alert_service is None:
+            from src.alert_service import obtener_alert_service_compartido
+            alert_service = obtener_alert_service_compartido()
+            if alert_service is None:
+                return False
+        problemas = [f"{p.gravedad.upper()}: {p}" for p in self.errores + self.avisos]
+        try:
+            return alert_service.alerta_entradas_invalidas(problemas, self.ficheros, proceso,
+                                                           detenida=not self.correcto)
+        except Exception as e:
+            logger.warning(f"No se pudo enviar la alerta de entradas no válidas: {e}")
+            return False
+
+
+# ==============================================================================
+# VALIDADOR
+# ==============================================================================
+
+def _hojas_a_comprobar(cabeceras: Dict[str, List[str]], modo: str) -> Dict[str, List[str]]:
+    if modo == 'todas' or not cabeceras:
+        return cabeceras
+    if modo == 'ventas':
+        for hoja, columnas in cabeceras.items():
+            nombre = normalizar_nombre(hoja)
+            if 'ventas' in nombre and 'vendedor' in nombre:
+                return {hoja: columnas}
+    primera = next(iter(cabeceras))
+    return {primera: cabeceras[primera]}
+
+
+def comprobar_cabecera(esquema: EsquemaEntrada, columnas: List[str]) -> List[Tuple[str, str]]:
+    """
+    Columnas del esquema que no están entre los encabezados.
+
+    Returns:
+        List: (gravedad, nombre de la columna) de cada columna que falta
+    """
+    presentes = {normalizar_nombre(c) for c in columnas}
+    return [(esperada.gravedad, esperada.nombre) for esperada in esquema.columnas
+            if not any(normalizar_nombre(nombre) in presentes for nombre in esperada.nombres)]
+
+
+class ValidadorEntradas:
+    """
+    Comprueba los encabezados de las entradas de una ejecución antes de leerlas.
+
+    Los ficheros se abren en paralelo en un grupo de hilos: abrir un .xlsx en
+    modo de solo lectura y leer su primera fila apenas cuesta, y con hilos no
+    se paga el arranque de procesos nuevos.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, max_trabajadores: Optional[int] = None,
+                 estricto: bool = False):
+        self.config = config or {}
+        self.max_trabajadores = max_trabajadores or min(8, (os.cpu_count() or 1) + 4)
+        self.estricto = estricto
+
+    # --------------------------------------------------------------------------
+    # ENTRADAS DE CADA PROCESO
+    # --------------------------------------------------------------------------
+
+    def entradas_pedido(self, semanas: List[int], correccion: bool = True) -> List[EntradaValidar]:
+        """
+        Entradas que leerá main.py para el pedido de esas semanas.
+
+        Las ventas (salvo que salgan del histórico) y los costes son
+        obligatorios; el ABC de cada sección activa se comprueba si existe (sin
+        él la sección se omite y buscar_archivo_abc_seccion ya avisa); con
+        corrección, las ventas de la semana y el stock actual si existen.
+        """
+        from src.data_loader import DataLoader
+
+        loader = DataLoader(self.config)
+        dir_entrada = loader.obtener_directorio_entrada()
+        entradas = []
+        if not loader.ventas_desde_historico(semanas):
+            entradas.append(EntradaValidar('ventas', str(resolver_entrada(
+                os.path.join(dir_entrada, loader.archivos.get('ventas', 'SPA_ventas.xlsx'))))))
+        entradas.append(EntradaValidar('coste', str(resolver_entrada(
+            os.path.join(dir_entrada, loader.archivos.get('coste', 'SPA_coste.xlsx'))))))
+
+        periodos = sorted({loader.obtener_periodo_desde_semana(semana) for semana in semanas})
+        for seccion in loader.secciones:
+            for periodo in periodos:
+                ruta, _ = loader.localizar_archivo_abc(seccion, periodo)
+                if ruta is not None:
+                    entradas.append(EntradaValidar('clasificacion_abc', ruta, seccion=seccion))
+
+        if correccion:
+            entradas.append(EntradaValidar('ventas_semana', str(resolver_entrada(
+                os.path.join(dir_entrada, 'SPA_ventas_semana.xlsx'))), obligatoria=False))
+            ruta_stock = resolver_entrada(os.path.join(dir_entrada, 'SPA_stock_actual.xlsx'))
+            if not obtener_manifiesto().existe(ruta_stock):
+                encontrados = buscar_entradas(dir_entrada, 'SPA_stock_actual')
+                ruta_stock = encontrados[0] if encontrados else ruta_stock
+            entradas.append(EntradaValidar('stock_actual', str(ruta_stock), obligatoria=False))
+        return list({(e.esquema, e.ruta): e for e in entradas}.values())
+
+    def entradas_clasificacion(self, periodo: str, directorio: Optional[str] = None,
+                               ventas_historico: bool = False,
+                               compartidas: Optional[Dict[str, str]] = None) -> List[EntradaValidar]:
+        """
+        Entradas que leerá clasificacionABC.py para el período.
+
+        Args:
+            periodo: Período a generar (P1-P4); fija el SPA_stock_{periodo}
+            directorio: Directorio de entrada (por defecto data/input)
+            ventas_historico: Las ventas saldrán del histórico (SPA_ventas es opcional)
+            compartidas: Entradas compartidas entre tiendas ({clave: ruta}) que
+                se usan si el directorio no tiene la suya (--tienda)
+        """
+        directorio = str(directorio or INPUT_DIR)
+        manifiesto = obtener_manifiesto()
+        compartidas = compartidas or {}
+
+        def ruta(nombre: str, clave: Optional[str] = None) -> str:
+            encontrada = str(resolver_entrada(os.path.join(directorio, nombre)))
+            if clave in compartidas and not manifiesto.existe(encontrada):
+                return compartidas[clave]
+            return encontrada
+
+        coste = ruta('SPA_Coste.xlsx')
+        if not manifiesto.existe(coste):
+            coste = ruta('SPA_coste.xlsx', 'coste')
+        stock = ruta(f'SPA_stock_{periodo}.xlsx')
+        if not manifiesto.existe(stock):
+            encontrados = buscar_entradas(directorio, 'SPA_stock')
+            stock = encontrados[0] if encontrados else stock
+        return [
+            EntradaValidar('compras', ruta('SPA_compras.xlsx', 'compras')),
+            EntradaValidar('ventas_clasificacion', ruta('SPA_ventas.xlsx', 'ventas'), obligatoria=not ventas_historico),
+            EntradaValidar('coste_clasificacion', coste),
+            EntradaValidar('stock_periodo', stock),
+        ]
+
+    # --------------------------------------------------------------------------
+    # VALIDACIÓN
+    # --------------------------------------------------------------------------
+
+    def comprobar(self, entrada: EntradaValidar) -> List[ProblemaEntrada]:
+        """Problemas de una entrada: fichero que falta, ilegible o con columnas que faltan."""
+        esquema = ESQUEMAS_ENTRADA[entrada.esquema]
+        archivo = os.path.basename(entrada.ruta)
+        if not obtener_manifiesto().existe(entrada.ruta):
+            if not entrada.obligatoria:
+                return []
+            return [ProblemaEntrada('error', archivo, f"no se encontró ({esquema.descripcion}) en "
+                                                      f"{os.path.dirname(entrada.ruta)}")]
+        try:
+            cabeceras = leer_cabecera(entrada.ruta, hoja=None)
+        except Exception as e:
+            return [ProblemaEntrada('error', archivo, f"no se pudo abrir: {type(e).__name__}: {e}")]
+
+        problemas = []
+        hojas = _hojas_a_comprobar(cabeceras, esquema.hojas)
+        if not hojas:
+            problemas.append(ProblemaEntrada('error', archivo, 'no tiene ninguna hoja'))
+        for hoja, columnas in hojas.items():
+            faltan = comprobar_cabecera(esquema, columnas)
+            for gravedad in ('error', 'aviso'):
+                nombres = [nombre for g, nombre in faltan if g == gravedad]
+                if nombres:
+                    encontradas = ', '.join(columnas[:20]) or '(fila de encabezados vacía)'
+                    problemas.append(ProblemaEntrada(
+                        gravedad, archivo, f"faltan las columnas {', '.join(nombres)}. "
+                                           f"Encabezados: {encontradas}", hoja=hoja))
+        return problemas
+
+    def validar(self, entradas: List[EntradaValidar]) -> ResultadoValidacion:
+        """
+        Comprueba todas las entradas a la vez y reúne los problemas.
+
+        Returns:
+            ResultadoValidacion: Problemas en el orden de las entradas
+        """
+        inicio = time.perf_counter()
+        resultado = ResultadoValidacion(ficheros=len(entradas), estricto=self.estricto)
+        if entradas:
+            with ThreadPoolExecutor(max_workers=min(self.max_trabajadores, len(entradas)),
+                                    thread_name_prefix='validacion') as ejecutor:
+                for problemas in ejecutor.map(self.comprobar, entradas):
+                    resultado.problemas.extend(problemas)
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+
+def crear_validador(config: Optional[Dict[str, Any]] = None) -> Optional[ValidadorEntradas]:
+    """
+    Crea el validador con el bloque validacion_entradas de config.json.
+
+    Returns:
+        ValidadorEntradas o None si la validación está deshabilitada
+    """
+    opciones = (config or {}).get('validacion_entradas', {})
+    if not opciones.get('habilitar', True):
+        return None
+    return ValidadorEntradas(config, max_trabajadores=opciones.get('max_trabajadores'),
+                             estricto=opciones.get('estricto', False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comprobación de los encabezados de los ficheros de entrada')
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument('--semanas', type=str, help='Semana o rango A-B del pedido (entradas de main.py)')
+    grupo.add_argument('--periodo', type=str, help='Período P1-P4 (entradas de clasificacionABC.py)')
+    parser.add_argument('--estricto', action='store_true', help='Tratar los avisos como errores')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+
+    from src.registro_config import obtener_registro
+    config = obtener_registro().principal()
+    validador = crear_validador(config) or ValidadorEntradas(config)
+    validador.estricto = validador.estricto or args.estricto
+
+    if args.semanas:
+        desde, _, hasta = args.semanas.partition('-')
+        entradas = validador.entradas_pedido(list(range(int(desde), int(hasta or desde) + 1)))
+    else:
+        entradas = validador.entradas_clasificacion(args.periodo.upper())
+
+    resultado = validador.validar(entradas)
+    for entrada in entradas:
+        print(f"  {entrada.esquema:<22} {entrada.ruta}")
+    resultado.registrar()
+    return 0 if resultado.correcto else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())